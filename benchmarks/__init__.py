@@ -0,0 +1,5 @@
+"""
+Benchmarks for Stitch AI SDK
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+Run from the repository root, e.g. `python -m benchmarks.push_memory`.
+"""
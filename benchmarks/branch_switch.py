@@ -0,0 +1,58 @@
+"""
+Switching an agent between experiment branches: checkout + pull vs pull --ref.
+
+Pushes an episodic memory of the given size to two branches of a stub space,
+then pulls them alternately, first the way it had to be done before (check out
+the branch, then pull the latest memory) and then with pull_memory(ref=branch),
+which reads through the local commit cache. Reports the time and the bytes
+downloaded by each.
+
+    python -m benchmarks.branch_switch --mb 20 --switches 6 --bandwidth 50
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+from .stub_server import spawn_stub
+
+def main() -> None:
+    from stitch_ai.sdk import StitchSDK
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--mb', type=float, default=20, help='Episodic memory size per branch in MB (default: 20)')
+    parser.add_argument('--switches', type=int, default=6, help='Pulls, alternating between the branches (default: 6)')
+    parser.add_argument('--latency', type=float, default=0.02, help='Stub server seconds per request (default: 0.02)')
+    parser.add_argument('--bandwidth', type=float, default=50, help='Stub server MB/s (default: 50)')
+    args = parser.parse_args()
+
+    with spawn_stub(args.latency, bandwidth=args.bandwidth * 1e6) as url, tempfile.TemporaryDirectory() as tmpdir:
+        sdk = StitchSDK(url, "key", commit_cache=os.path.join(tmpdir, "commits"))
+        sdk.memory_space.create_space("agent")
+        rows = int(args.mb * 1e6 / 60)
+        for branch in ("exp-a", "exp-b"):
+            sdk.git.create_branch("agent", branch, "main")
+            path = os.path.join(tmpdir, f"{branch}.json")
+            with open(path, "w") as f:
+                json.dump({"memories": {"columns": ["id", "content"],
+                                        "rows": [[i, f"{branch} memory {i:>10} of the agent"] for i in range(rows)]}}, f)
+            sdk.push("agent", branch, episodic_path=path, branch=branch)
+        branches = ["exp-a", "exp-b"] * args.switches
+        print(f"{args.switches} pulls, {args.mb:g} MB per branch, {args.bandwidth:g} MB/s")
+        print(f"{'mode':<18}{'seconds':>9}{'MB in':>9}")
+        for mode in ("checkout + pull", "pull --ref"):
+            start = time.perf_counter()
+            downloaded = 0
+            for branch in branches[:args.switches]:
+                if mode == "pull --ref":
+                    (item,) = sdk.pull_memory("agent", os.path.join(tmpdir, "pulled.json"), ref=branch)
+                else:
+                    sdk.git.checkout_branch("agent", branch)
+                    (item,) = sdk.pull_memory("agent", os.path.join(tmpdir, "pulled.json"))
+                download = next(stage for stage in item["profile"]["stages"] if stage["name"] == "download")
+                downloaded += download.get("bytes_in", 0)
+            print(f"{mode:<18}{time.perf_counter() - start:>9.2f}{downloaded / 1e6:>9.1f}")
+        sdk.close()
+
+if __name__ == '__main__':
+    main()
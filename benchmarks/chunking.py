@@ -0,0 +1,50 @@
+"""
+Chunking throughput and chunk counts per strategy.
+
+Runs every chunker over the same generated episodic memory export (the JSON
+produced for SQLite memories) and reports MB/s and the number of chunks.
+
+    python -m benchmarks.chunking --rows 20000 --tokenizer ./tokenizer.json
+"""
+import json
+import time
+import random
+import argparse
+
+WORDS = "the agent met alice at harbor she sold fish dawn bob bought some bread later they talked about weather".split()
+
+def make_export(rows: int) -> str:
+    rng = random.Random(0)
+    data = []
+    for i in range(rows):
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 60))).capitalize() + "."
+        data.append([f"id-{i}", "messages", 1700000000000 + i, json.dumps({"text": text}), None])
+    return json.dumps({"memories": {"columns": ["id", "type", "createdAt", "content", "embedding"], "rows": data}}, indent=2)
+
+def main() -> None:
+    from stitch_ai.processors.chunking import get_chunker
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000, help='Number of memory rows (default: 20000)')
+    parser.add_argument('--tokenizer', help='Tokenizer name or tokenizer.json path for the token chunker (skipped if unavailable)')
+    args = parser.parse_args()
+
+    text = make_export(args.rows)
+    size_mb = len(text.encode('utf-8')) / (1024 * 1024)
+    print(f"{args.rows} rows, {size_mb:.1f} MB")
+    print(f"{'chunker':<12}{'MB/s':>10}{'chunks':>10}{'avg chars':>12}")
+    chunkers = {"character": {}, "sentence": {}, "token": {"tokenizer": args.tokenizer}, "row": {}}
+    for name, options in chunkers.items():
+        chunker = get_chunker(name, **options)
+        try:
+            start = time.perf_counter()
+            chunks = chunker(text)
+            seconds = time.perf_counter() - start
+        except Exception as e:
+            print(f"{name:<12}skipped: {e}")
+            continue
+        average = sum(len(chunk) for chunk in chunks) / max(len(chunks), 1)
+        print(f"{name:<12}{size_mb / seconds:>10.1f}{len(chunks):>10}{average:>12.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Size and speed of the episodic payload formats for a SQLite memories table.
+
+Builds a memories table with float32 embedding blobs, then compares the JSON
+layout with the columnar format: payload size, encode time (export from the
+database) and decode time (back to columns and rows for pull).
+
+    python -m benchmarks.episodic_format --rows 20000 --dimension 384
+"""
+import os
+import json
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+from array import array
+
+def make_database(path: str, rows: int, dimension: int) -> None:
+    rng = random.Random(0)
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE memories (id TEXT PRIMARY KEY, type TEXT, createdAt INTEGER, content TEXT, "
+                 "embedding BLOB, userId TEXT, roomId TEXT, agentId TEXT, \"unique\" INTEGER)")
+    conn.executemany(
+        "INSERT INTO memories VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            (f"{i:08x}-0000-4000-8000-000000000000", "messages", 1700000000000 + i,
+             json.dumps({"text": f"Message {i}: the agent talked about the weather and the harbor.", "source": "discord"}),
+             array("f", (rng.uniform(-1, 1) for _ in range(dimension))).tobytes(),
+             "user-1", "room-1", "agent-1", 1)
+            for i in range(rows)
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+def main() -> None:
+    from stitch_ai.processors.memory_processor import MemoryProcessor
+    from stitch_ai.processors.columnar import decode_tables
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000, help='Number of memory rows (default: 20000)')
+    parser.add_argument('--dimension', type=int, default=384, help='Embedding dimension (default: 384)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "agent.sqlite")
+        make_database(path, args.rows, args.dimension)
+        print(f"{args.rows} rows, database {os.path.getsize(path) / (1024 * 1024):.1f} MB")
+        print(f"{'format':<10}{'payload MB':>12}{'encode s':>10}{'decode s':>10}")
+        decoders = {"json": json.loads, "columnar": decode_tables}
+        for episodic_format, decode in decoders.items():
+            start = time.perf_counter()
+            payload = MemoryProcessor.process_sqlite_file(path, episodic_format)
+            encode_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            decode(payload)
+            decode_seconds = time.perf_counter() - start
+            # The payload travels as a JSON string, so measure it escaped
+            size_mb = len(json.dumps(payload)) / (1024 * 1024)
+            print(f"{episodic_format:<10}{size_mb:>12.1f}{encode_seconds:>10.2f}{decode_seconds:>10.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Marketplace catalog crawl time by concurrency, and local query latency.
+
+Simulates a /marketplace endpoint with a fixed per-page latency, crawls it
+into a catalog with 1, 2, 4, ... concurrent requests, re-syncs incrementally
+after a few updates, then times indexed catalog queries.
+
+    python -m benchmarks.market_catalog --spaces 20000 --latency 0.05
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+
+def make_spaces(count: int):
+    rng = random.Random(0)
+    words = ["trading", "chat", "research", "defi", "game", "support", "news", "code"]
+    return [{"id": f"space-{i}", "name": f"{rng.choice(words)} agent {i}",
+             "description": " ".join(rng.choice(words) for _ in range(8)), "owner": f"user-{i % 500}",
+             "price": round(rng.uniform(0, 100), 2), "updatedAt": f"2024-01-01T00:00:{i % 60:02d}.{i:06d}Z"}
+            for i in range(count)]
+
+def make_server(spaces, page_size: int, latency: float):
+    ordered = sorted(spaces, key=lambda s: s["updatedAt"], reverse=True)
+
+    def fetch_page(page):
+        time.sleep(latency)
+        return {"data": ordered[(page - 1) * page_size:page * page_size], "total": len(spaces)}
+    return fetch_page
+
+def main() -> None:
+    from stitch_ai.processors.market_catalog import MarketCatalog
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--spaces', type=int, default=20000, help='Listed spaces (default: 20000)')
+    parser.add_argument('--page-size', type=int, default=100, help='Spaces per page (default: 100)')
+    parser.add_argument('--latency', type=float, default=0.05, help='Seconds per page request (default: 0.05)')
+    parser.add_argument('--max-workers', type=int, default=16, help='Largest concurrency tried (default: 16)')
+    args = parser.parse_args()
+
+    spaces = make_spaces(args.spaces)
+    server = make_server(spaces, args.page_size, args.latency)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        print(f"{args.spaces} spaces, {args.page_size} per page, {args.latency * 1000:.0f} ms per page")
+        print(f"{'workers':<10}{'full sync s':>12}")
+        workers = 1
+        while workers <= args.max_workers:
+            with MarketCatalog(os.path.join(tmpdir, f"market-{workers}.sqlite")) as catalog:
+                result = catalog.sync("AGENT_MEMORY", server, args.page_size, workers, full=True)
+            print(f"{workers:<10}{result['seconds']:>12.2f}")
+            workers *= 2
+
+        path = os.path.join(tmpdir, f"market-{workers // 2}.sqlite")
+        for space in spaces[:25]:
+            space["price"] += 1
+            space["updatedAt"] = "2024-02-01T00:00:00Z"
+        with MarketCatalog(path) as catalog:
+            result = catalog.sync("AGENT_MEMORY", make_server(spaces, args.page_size, args.latency), args.page_size, workers // 2)
+            print(f"incremental sync: {result['pages']} pages, {result['updated']} updated, {result['seconds']:.2f} s")
+
+            queries = {
+                "newest 20": dict(),
+                "text 'trading defi'": dict(query="trading defi"),
+                "owner, by price": dict(owner="user-7", sort="price"),
+                "price range, by name": dict(min_price=10, max_price=12, sort="name", descending=False),
+            }
+            print(f"{'query':<24}{'results':>8}{'ms':>10}")
+            for label, options in queries.items():
+                runs = 200
+                start = time.perf_counter()
+                for _ in range(runs):
+                    results = catalog.search("AGENT_MEMORY", **options)
+                elapsed = (time.perf_counter() - start) / runs
+                print(f"{label:<24}{len(results):>8}{elapsed * 1000:>10.3f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Batch purchase throughput by concurrency against a local marketplace stub.
+
+Starts an HTTP server that answers /marketplace/purchase after a fixed
+latency, then purchases the same number of memories one at a time with
+purchase_memory and with purchase_many at increasing worker counts.
+
+    python -m benchmarks.marketplace_batch --items 200 --latency 0.02
+"""
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def make_handler(latency: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Buffer headers and body into one write, so responses are not held up by delayed ACKs
+        wbufsize = 1 << 16
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            self._reply({"userId": "user-1"})
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            time.sleep(latency)
+            self._reply({"ok": True})
+
+        def _reply(self, payload):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+    return Handler
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Room for every worker to connect at once
+    request_queue_size = 128
+
+def main() -> None:
+    from stitch_ai.api.marketplace import MarketplaceAPIClient
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--items', type=int, default=200, help='Purchases per run (default: 200)')
+    parser.add_argument('--latency', type=float, default=0.02, help='Server seconds per request (default: 0.02)')
+    parser.add_argument('--max-workers', type=int, default=32, help='Largest concurrency tried (default: 32)')
+    args = parser.parse_args()
+
+    server = StubServer(("127.0.0.1", 0), make_handler(args.latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = MarketplaceAPIClient(f"http://127.0.0.1:{server.server_port}", "key")
+        bodies = [{"memoryId": f"memory-{i}", "agentId": f"agent-{i}"} for i in range(args.items)]
+        print(f"{args.items} purchases, {args.latency * 1000:.0f} ms server latency")
+        print(f"{'mode':<22}{'seconds':>10}{'per s':>10}")
+
+        start = time.perf_counter()
+        for body in bodies:
+            client.purchase_memory(body)
+        elapsed = time.perf_counter() - start
+        print(f"{'serial':<22}{elapsed:>10.2f}{args.items / elapsed:>10.0f}")
+
+        workers = 1
+        while workers <= args.max_workers:
+            start = time.perf_counter()
+            reports = client.purchase_many(bodies, workers=workers)
+            elapsed = time.perf_counter() - start
+            assert all(report["ok"] for report in reports)
+            print(f"{f'purchase_many x{workers}':<22}{elapsed:>10.2f}{args.items / elapsed:>10.0f}")
+            workers *= 2
+    finally:
+        server.shutdown()
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
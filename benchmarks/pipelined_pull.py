@@ -0,0 +1,50 @@
+"""
+Sequential vs pipelined pull into a vector store.
+
+Pulls the stub server's seeded episodic memory into a NumPy store, once with
+download, chunking, embedding and inserts run one after another and once with
+them overlapped, and reports the wall time and the busy time of each stage.
+The download is throttled to --bandwidth so there is something to overlap.
+
+    python -m benchmarks.pipelined_pull --memory-mb 8 --bandwidth 4000000 --embedding hash
+"""
+import os
+import time
+import argparse
+import tempfile
+from .stub_server import SEED_SPACE, spawn_stub
+
+STAGES = ("download", "read_content", "load_embedding", "backup", "chunk", "embed", "insert", "commit")
+
+def main() -> None:
+    from stitch_ai.sdk import StitchSDK
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--memory-mb', type=float, default=4.0, help='Episodic memory size (default: 4)')
+    parser.add_argument('--bandwidth', type=float, default=4e6, help='Download bytes per second (default: 4000000, 0 for unlimited)')
+    parser.add_argument('--latency', type=float, default=0.02, help='Stub server seconds per request (default: 0.02)')
+    parser.add_argument('--embedding', default='hash', help='Embedding backend (default: hash)')
+    parser.add_argument('--workers', type=int, default=2, help='Embedding workers of the pipelined pull (default: 2)')
+    parser.add_argument('--repeat', type=int, default=3, help='Pulls per mode; the fastest is reported (default: 3)')
+    args = parser.parse_args()
+
+    with spawn_stub(args.latency, bandwidth=args.bandwidth, log_commits=1, memory_kb=int(args.memory_mb * 1024)) as url, \
+            tempfile.TemporaryDirectory() as tmpdir:
+        sdk = StitchSDK(url, "key", embedding_backend=args.embedding)
+        path = os.path.join(tmpdir, "agent.npy")
+        print(f"{args.memory_mb:g} MB at {args.bandwidth / 1e6:g} MB/s, {args.embedding} embeddings")
+        print(f"{'mode':<12}{'seconds':>9}" + "".join(f"{stage[:9]:>10}" for stage in STAGES))
+        for mode, pipeline in (("sequential", False), ("pipelined", True)):
+            best = None
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                (item,) = sdk.pull_memory(SEED_SPACE, path, pipeline=pipeline, embed_workers=args.workers)
+                seconds = time.perf_counter() - start
+                if best is None or seconds < best[0]:
+                    best = (seconds, {stage["name"]: stage["seconds"] for stage in item["profile"]["stages"]})
+            seconds, stages = best
+            print(f"{mode:<12}{seconds:>9.2f}" + "".join(f"{stages[stage]:>10.2f}" if stage in stages else f"{'-':>10}"
+                                                         for stage in STAGES))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Peak memory of building a push request body for a large episodic text file.
+
+Compares the in-memory path (read the file, embed it in a dict, json.dumps it as
+requests does) with the memory-mapped streaming body. Each mode runs in a fresh
+subprocess so peak RSS is measured independently.
+
+    python -m benchmarks.push_memory --size-mb 512
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import subprocess
+
+SAMPLE_TEXT = 'User said "hello" to the agent. Agent replied: héllo wörld ✨\n'
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is reported in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def run_mode(mode: str, file_path: str) -> dict:
+    from stitch_ai.processors.memory_processor import MemoryProcessor
+    from stitch_ai.api.body import JSONStreamBody
+
+    baseline = _peak_rss_mb()
+    start = time.perf_counter()
+    if mode == 'in-memory':
+        content = MemoryProcessor.process_memory_file(file_path)
+        payload = {"files": [{"filePath": "episodic.data", "content": content}], "message": "bench"}
+        body = json.dumps(payload).encode('utf-8')
+        size = len(body)
+    else:
+        with MemoryProcessor.map_memory_file(file_path) as mapped:
+            payload = {"files": [{"filePath": "episodic.data", "content": mapped}], "message": "bench"}
+            body = JSONStreamBody(payload)
+            size = 0
+            while True:
+                data = body.read(16384)
+                if not data:
+                    break
+                size += len(data)
+    return {
+        "mode": mode,
+        "body_mb": size / (1024 * 1024),
+        "seconds": time.perf_counter() - start,
+        "peak_rss_delta_mb": _peak_rss_mb() - baseline,
+    }
+
+def write_sample_file(path: str, size_mb: int) -> None:
+    block = SAMPLE_TEXT * (1024 * 1024 // len(SAMPLE_TEXT.encode('utf-8')))
+    with open(path, 'w', encoding='utf-8') as f:
+        for _ in range(size_mb):
+            f.write(block)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size-mb', type=int, default=256, help='Size of the generated episodic file (default: 256)')
+    parser.add_argument('--file', help='Use an existing text file instead of generating one')
+    parser.add_argument('--run', choices=['in-memory', 'streaming'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_mode(args.run, args.file)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        file_path = args.file
+        if not file_path:
+            file_path = os.path.join(tmpdir, 'episodic.txt')
+            write_sample_file(file_path, args.size_mb)
+        print(f"File: {os.path.getsize(file_path) / (1024 * 1024):.0f} MB")
+        print(f"{'mode':<12}{'body MB':>10}{'seconds':>10}{'peak RSS +MB':>14}")
+        for mode in ('in-memory', 'streaming'):
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.push_memory', '--run', mode, '--file', file_path],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{mode:<12}{result['body_mb']:>10.0f}{result['seconds']:>10.2f}{result['peak_rss_delta_mb']:>14.0f}")
+
+if __name__ == '__main__':
+    main()
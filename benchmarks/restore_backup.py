@@ -0,0 +1,85 @@
+"""
+Restoring a Chroma backup: streamed batches vs loading the whole file.
+
+Fills a Chroma collection with random embeddings, backs it up, then restores
+it twice: with MemoryProcessor.restore_backup, which streams the backup and
+reuses the stored embeddings, and the way a backup had to be restored by
+hand before, with json.load and one collection.add of re-embedded chunks.
+Both restore into a new store. Reports the time and the peak Python heap of each.
+
+    python -m benchmarks.restore_backup --chunks 5000
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+import numpy as np
+
+def measure(run):
+    """Wall time of run(name), then the peak Python heap of a second, traced run"""
+    start = time.perf_counter()
+    run("timed")
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    run("traced")
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak / (1024 * 1024)
+
+def main() -> None:
+    import chromadb
+    from stitch_ai.processors.backups import write_backup
+    from stitch_ai.processors.embeddings import get_embedding_backend
+    from stitch_ai.processors.memory_processor import MemoryProcessor
+    from stitch_ai.processors.sinks import ChromaSink
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--chunks', type=int, default=5000, help='Chunks in the collection (default: 5000)')
+    parser.add_argument('--dimension', type=int, default=384, help='Embedding dimension (default: 384)')
+    parser.add_argument('--embedding', default='hash', help='Backend the whole-file restore re-embeds with (default: hash)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "store", "chroma.sqlite3")
+        sink = ChromaSink(path)
+        sink.reset({"embedding": json.dumps({"backend": args.embedding})})
+        rng = np.random.default_rng(0)
+        for start in range(0, args.chunks, 1000):
+            count = min(1000, args.chunks - start)
+            sink.bulk_insert([f"chunk-{i}" for i in range(start, start + count)],
+                             [f"memory chunk {i} " * 20 for i in range(start, start + count)],
+                             rng.standard_normal((count, args.dimension), dtype=np.float32),
+                             [{"memory_type": "episodic"}] * count)
+        sink.close()
+        collection = sink.client.get_collection("short_term")
+        backup = os.path.join(tmpdir, "short_term_backup.jsonl")
+        legacy = os.path.join(tmpdir, "short_term_backup.json")
+        write_backup(collection, backup)
+        with open(legacy, "w", encoding="utf-8") as f:
+            json.dump(dict(collection.get()), f, indent=2)
+        print(f"{args.chunks} chunks, backup {os.path.getsize(backup) / 1e6:.1f} MB")
+
+        def streamed(name):
+            MemoryProcessor().restore_backup(backup, os.path.join(tmpdir, f"streamed-{name}", "chroma.sqlite3"))
+
+        def whole_file(name):
+            with open(legacy, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            client = chromadb.PersistentClient(path=os.path.join(tmpdir, f"whole-file-{name}"))
+            target = client.create_collection("short_term")
+            embeddings = get_embedding_backend(args.embedding)(data["documents"])
+            batch = client.get_max_batch_size()
+            for start in range(0, len(data["ids"]), batch):
+                end = start + batch
+                target.add(ids=data["ids"][start:end], documents=data["documents"][start:end],
+                           embeddings=embeddings[start:end], metadatas=data["metadatas"][start:end])
+
+        print(f"{'mode':<12}{'seconds':>9}{'peak MB':>9}")
+        for mode, run in (("streamed", streamed), ("whole-file", whole_file)):
+            seconds, peak = measure(run)
+            print(f"{mode:<12}{seconds:>9.2f}{peak:>9.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Latency and recall of local memory search, brute force versus HNSW.
+
+Stores clustered synthetic embeddings in a NumPy sink and runs the same queries
+with method="exact" and method="ann". Recall@k is the share of the exact top-k
+that the ANN search also returns.
+
+    python -m benchmarks.search --chunks 50000 -k 10
+"""
+import os
+import time
+import argparse
+import tempfile
+import numpy as np
+
+def make_vectors(rng, count: int, dimension: int, clusters: int = 64) -> np.ndarray:
+    centers = rng.standard_normal((clusters, dimension)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, count)] + 0.5 * rng.standard_normal((count, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def main() -> None:
+    from stitch_ai.processors.sinks import get_memory_sink
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--chunks', type=int, default=50000, help='Number of stored chunks (default: 50000)')
+    parser.add_argument('--dimension', type=int, default=384, help='Embedding dimension (default: 384)')
+    parser.add_argument('--queries', type=int, default=200, help='Number of queries (default: 200)')
+    parser.add_argument('-k', type=int, default=10, help='Results per query (default: 10)')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = make_vectors(rng, args.chunks, args.dimension)
+    queries = make_vectors(rng, args.queries, args.dimension)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "memory.npy")
+        with get_memory_sink(path) as sink:
+            sink.reset()
+            sink.bulk_insert([str(i) for i in range(args.chunks)], [""] * args.chunks, vectors)
+
+        sink = get_memory_sink(path)
+        start = time.perf_counter()
+        sink.query(queries[0], args.k, "ann")
+        build_seconds = time.perf_counter() - start
+
+        results = {}
+        print(f"{args.chunks} chunks x {args.dimension} dimensions, k={args.k}, index build {build_seconds:.2f}s")
+        print(f"{'method':<8}{'mean ms':>10}{'p95 ms':>10}{'recall':>10}")
+        for method in ("exact", "ann"):
+            timings = []
+            results[method] = []
+            for query in queries:
+                start = time.perf_counter()
+                hits = sink.query(query, args.k, method)
+                timings.append((time.perf_counter() - start) * 1000)
+                results[method].append({hit["id"] for hit in hits})
+            recall = np.mean([len(a & e) / len(e) for a, e in zip(results[method], results["exact"])])
+            print(f"{method:<8}{np.mean(timings):>10.2f}{np.percentile(timings, 95):>10.2f}{recall:>10.3f}")
+
+if __name__ == '__main__':
+    main()
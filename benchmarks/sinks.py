@@ -0,0 +1,82 @@
+"""
+Load and query time of pulled memory across vector-store sinks.
+
+Writes the same synthetic chunks to every sink, then, in a fresh subprocess per
+sink, measures import + load time (what an agent pays at startup) and the mean
+top-k query latency.
+
+    python -m benchmarks.sinks --chunks 20000 --dimension 384
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+
+SINK_PATHS = {
+    "chroma": os.path.join("chroma", "chroma.sqlite3"),
+    "numpy": "memory.npy",
+    "sqlite": "memory.db",
+}
+
+def write_sinks(tmpdir: str, chunks: int, dimension: int) -> None:
+    from stitch_ai.processors.sinks import get_memory_sink
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((chunks, dimension)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ids = [f"episodic-memory-{i}" for i in range(chunks)]
+    documents = [f"Memory chunk number {i}. " * 20 for i in range(chunks)]
+    for name, path in SINK_PATHS.items():
+        with get_memory_sink(os.path.join(tmpdir, path), name) as sink:
+            sink.reset()
+            sink.bulk_insert(ids, documents, vectors.tolist())
+
+def run_sink(name: str, tmpdir: str, queries: int, k: int) -> dict:
+    start = time.perf_counter()
+    from stitch_ai.processors.sinks import get_memory_sink
+    sink = get_memory_sink(os.path.join(tmpdir, SINK_PATHS[name]), name)
+    ids, _, embeddings, _ = sink.load()
+    load_seconds = time.perf_counter() - start
+
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((queries, embeddings.shape[1])).astype(np.float32)
+    start = time.perf_counter()
+    for vector in vectors:
+        sink.query(vector.tolist(), k=k)
+    query_ms = (time.perf_counter() - start) * 1000 / queries
+    sink.close()
+    return {"sink": name, "chunks": len(ids), "load_seconds": load_seconds, "query_ms": query_ms}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--chunks', type=int, default=20000, help='Number of stored chunks (default: 20000)')
+    parser.add_argument('--dimension', type=int, default=384, help='Embedding dimension (default: 384)')
+    parser.add_argument('--queries', type=int, default=50, help='Number of queries per sink (default: 50)')
+    parser.add_argument('-k', type=int, default=5, help='Results per query (default: 5)')
+    parser.add_argument('--run', choices=sorted(SINK_PATHS), help=argparse.SUPPRESS)
+    parser.add_argument('--dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_sink(args.run, args.dir, args.queries, args.k)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        write_sinks(tmpdir, args.chunks, args.dimension)
+        print(f"{args.chunks} chunks x {args.dimension} dimensions")
+        print(f"{'sink':<10}{'load s':>10}{'query ms':>10}")
+        for name in SINK_PATHS:
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.sinks', '--run', name, '--dir', tmpdir,
+                 '--queries', str(args.queries), '-k', str(args.k)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{result['sink']:<10}{result['load_seconds']:>10.3f}{result['query_ms']:>10.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Export time of a multi-table SQLite database by number of concurrent readers.
+
+Creates a WAL database with several large tables and exports all of them with
+1, 2, 4, ... workers, reading rows and encoding them to the JSON layout.
+
+    python -m benchmarks.sqlite_export --tables 8 --rows 200000
+"""
+import os
+import time
+import argparse
+import sqlite3
+import tempfile
+
+class _NullWriter:
+    def write(self, s: str) -> int:
+        return len(s)
+
+def make_database(path: str, tables: int, rows: int) -> None:
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    for t in range(tables):
+        conn.execute(f"CREATE TABLE table_{t} (id INTEGER PRIMARY KEY, type TEXT, createdAt INTEGER, content TEXT, score REAL)")
+        conn.executemany(
+            f"INSERT INTO table_{t} VALUES (?, ?, ?, ?, ?)",
+            ((i, "messages", 1700000000000 + i, f'{{"text": "row {i} of table {t} about the harbor"}}', i / 7) for i in range(rows)),
+        )
+    conn.commit()
+    conn.close()
+
+def main() -> None:
+    from stitch_ai.processors.sqlite_export import iter_sqlite_tables, write_sqlite_export
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tables', type=int, default=8, help='Number of tables (default: 8)')
+    parser.add_argument('--rows', type=int, default=200000, help='Rows per table (default: 200000)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "agent.sqlite")
+        make_database(path, args.tables, args.rows)
+        print(f"{args.tables} tables x {args.rows} rows, {os.path.getsize(path) / (1024 * 1024):.0f} MB, {os.cpu_count()} CPUs")
+        print(f"{'workers':<10}{'read s':>10}{'read+json s':>14}")
+        workers = 1
+        while workers <= args.tables:
+            start = time.perf_counter()
+            for _ in iter_sqlite_tables(path, ["table_*"], workers):
+                pass
+            read_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            write_sqlite_export(path, _NullWriter(), ["table_*"], workers)
+            export_seconds = time.perf_counter() - start
+            print(f"{workers:<10}{read_seconds:>10.2f}{export_seconds:>14.2f}")
+            workers *= 2
+
+if __name__ == '__main__':
+    main()
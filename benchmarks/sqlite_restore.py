@@ -0,0 +1,63 @@
+"""
+Time to restore a pulled episodic memory into a local SQLite database.
+
+Exports a generated memories table, then restores it into a new database
+(replace) and merges it into the restored copy again (upsert), for both
+episodic formats. Parsing the payload is timed separately from the load.
+
+    python -m benchmarks.sqlite_restore --rows 1000000
+"""
+import os
+import time
+import sqlite3
+import argparse
+import tempfile
+
+SCHEMA = ("CREATE TABLE memories (id TEXT PRIMARY KEY, type TEXT, createdAt INTEGER, content TEXT, "
+          "embedding BLOB, userId TEXT, roomId TEXT, agentId TEXT)")
+
+def make_database(path: str, rows: int) -> None:
+    conn = sqlite3.connect(path)
+    conn.execute(SCHEMA)
+    conn.executemany(
+        "INSERT INTO memories VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        ((f"{i:08x}-0000-4000-8000-000000000000", "messages", 1700000000000 + i,
+          f'{{"text": "Message {i} about the harbor", "source": "discord"}}', None, "user-1", "room-1", "agent-1")
+         for i in range(rows)),
+    )
+    conn.commit()
+    conn.close()
+
+def main() -> None:
+    from stitch_ai.processors.memory_processor import MemoryProcessor
+    from stitch_ai.processors.sqlite_import import import_sqlite_tables, parse_episodic_tables
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000, help='Number of memory rows (default: 1000000)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source = os.path.join(tmpdir, "source.sqlite")
+        make_database(source, args.rows)
+        print(f"{args.rows} rows")
+        print(f"{'format':<10}{'parse s':>10}{'replace s':>12}{'upsert s':>12}")
+        for episodic_format in ("json", "columnar"):
+            payload = MemoryProcessor.process_sqlite_file(source, episodic_format)
+            start = time.perf_counter()
+            tables = parse_episodic_tables(payload)
+            parse_seconds = time.perf_counter() - start
+
+            target = os.path.join(tmpdir, f"restored-{episodic_format}.sqlite")
+            conn = sqlite3.connect(target)
+            conn.execute(SCHEMA)
+            conn.close()
+            start = time.perf_counter()
+            import_sqlite_tables(target, tables, "replace")
+            replace_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            import_sqlite_tables(target, tables, "upsert")
+            upsert_seconds = time.perf_counter() - start
+            print(f"{episodic_format:<10}{parse_seconds:>10.2f}{replace_seconds:>12.2f}{upsert_seconds:>12.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,514 @@
+"""
+Local stub of the Stitch API for benchmarks and tests.
+
+Implements the endpoints used by GitAPIClient, MemoryAPIClient,
+MemorySpaceAPIClient, UserAPIClient and MarketplaceAPIClient over in-memory
+state, with a configurable delay per request and configurable payload
+sizes. Pushed memory can be pulled back, so push/pull round trips work.
+
+    python -m benchmarks.stub_server --port 8765 --latency 0.02
+    STITCH_API_URL=http://127.0.0.1:8765 STITCH_API_KEY=key stitch pull bench -p ./db
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+import contextlib
+import subprocess
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, parse_qs, unquote
+
+USER_ID = "user-1"
+# Space created at startup with a history, an episodic memory and a character memory
+SEED_SPACE = "bench"
+MARKET_TYPES = ("AGENT_MEMORY", "EXTERNAL_MEMORY")
+
+WORDS = "the agent met alice at harbor she sold fish dawn bob bought some bread later they talked about weather".split()
+
+def make_episodic(size_kb: int, seed: int = 0) -> str:
+    """An episodic SQLite memories export (JSON table layout) of about size_kb"""
+    rng = random.Random(seed)
+    rows, size, i = [], 0, 0
+    while size < size_kb * 1024:
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 60))).capitalize() + "."
+        row = [f"id-{i}", "messages", 1700000000000 + i, json.dumps({"text": text})]
+        size += len(json.dumps(row)) + 2
+        rows.append(row)
+        i += 1
+    return json.dumps({"memories": {"columns": ["id", "type", "createdAt", "content"], "rows": rows}})
+
+def make_character(size_kb: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    words = max(1, size_kb * 1024 // 6)
+    return json.dumps({"name": "agent", "bio": " ".join(rng.choice(WORDS) for _ in range(words))})
+
+def _oid(*parts: Any) -> str:
+    return hashlib.sha1(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+class HTTPStatus(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Buffer headers and body into one write, so responses are not held up by delayed ACKs
+    wbufsize = 1 << 16
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def _dispatch(self, method: str) -> None:
+        url = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        server = self.server
+        server.pause()
+        for route_method, pattern, name in ROUTES:
+            match = pattern.fullmatch(url.path)
+            if route_method == method and match:
+                server.count(name)
+                status = server.take_failure(name)
+                if status:
+                    self._reply(status, {"message": "Injected failure"}, {"Retry-After": "0"})
+                    return
+                try:
+                    body = json.loads(raw) if raw else {}
+                    path = {key: unquote(value) for key, value in match.groupdict().items()}
+                    with server.lock:
+                        payload = getattr(server.api, name)(params, body, self.headers, **path)
+                    self._reply(200, payload)
+                except HTTPStatus as e:
+                    self._reply(e.status, {"message": str(e)})
+                except ValueError as e:
+                    self._reply(400, {"message": str(e)})
+                return
+        server.count("not_found")
+        self._reply(404, {"message": f"No route for {method} {url.path}"})
+
+    def _reply(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        data = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        step = self.server.bandwidth_step()
+        try:
+            if not step:
+                self.wfile.write(data)
+                return
+            for start in range(0, len(data), step):
+                self.wfile.write(data[start:start + step])
+                self.wfile.flush()
+                time.sleep(step / self.server.bandwidth)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading, as a pull at a cached commit does
+            self.close_connection = True
+
+def _route(method: str, template: str, name: str) -> Tuple[str, "re.Pattern", str]:
+    return method, re.compile(re.sub(r"\{(\w+)\}", r"(?P<\1>[^/]+)", template)), name
+
+# Literal paths come before templated ones that would also match them
+ROUTES = [
+    _route("GET", "/user/api-key/user", "api_key_user"),
+    _route("POST", "/user/api-key", "create_key"),
+    _route("GET", "/user", "get_user"),
+    _route("GET", "/user/dashboard/stat", "get_user_stat"),
+    _route("GET", "/user/dashboard/histories", "get_user_histories"),
+    _route("GET", "/user/memory/all", "get_user_memory"),
+    _route("GET", "/user/marketplace/purchases", "get_user_purchases"),
+    _route("POST", "/memory-space/create", "create_space"),
+    _route("POST", "/memory-space/clone", "clone_space"),
+    _route("GET", "/memory-space/{repository}/history", "get_history"),
+    _route("GET", "/memory-space/{repository}", "get_space"),
+    _route("DELETE", "/memory-space/{repository}", "delete_space"),
+    _route("POST", "/memory/{repository}/create", "push_memory"),
+    _route("POST", "/git/create", "create_repo"),
+    _route("POST", "/git/clone", "clone_repo"),
+    _route("GET", "/git/{repository}/branches", "list_branches"),
+    _route("POST", "/git/{repository}/checkout", "checkout_branch"),
+    _route("POST", "/git/{repository}/branch/create", "create_branch"),
+    _route("DELETE", "/git/{repository}/branch/{branch}", "delete_branch"),
+    _route("POST", "/git/{repository}/merge", "merge"),
+    _route("POST", "/git/{repository}/commit", "commit_file"),
+    _route("GET", "/git/{repository}/log", "get_log"),
+    _route("GET", "/git/{repository}/file", "get_file"),
+    _route("GET", "/git/{repository}/diff", "diff"),
+    _route("GET", "/marketplace", "get_marketplace"),
+    _route("POST", "/marketplace/{operation}", "post_marketplace"),
+]
+
+class StubAPI:
+    """
+    In-memory state behind the stub server. Every method takes the query
+    parameters, the decoded JSON body, the headers and the path values of its
+    route, and returns the JSON response.
+    """
+
+    def __init__(self, memory_kb: int = 64, character_kb: int = 4, log_commits: int = 50, file_kb: int = 16,
+                 market_items: int = 500):
+        self.spaces: Dict[str, Dict[str, Any]] = {}
+        self.listings: List[Dict[str, Any]] = []
+        self.purchases: List[Dict[str, Any]] = []
+        self.idempotent: Dict[str, Any] = {}
+        self.market = [self._market_item(i) for i in range(market_items)]
+        space = self._new_space(SEED_SPACE, "AGENT_MEMORY")
+        filler = "x" * (file_kb * 1024)
+        for i in range(max(log_commits - 1, 0)):
+            self._commit(space, "main", {"notes.txt": f"{i}:{filler}"}, f"commit {i}")
+        self._commit(space, "main", {"episodic.data": make_episodic(memory_kb), "character.data": make_character(character_kb),
+                                     "notes.txt": filler}, "seed memory")
+
+    @staticmethod
+    def _market_item(i: int) -> Dict[str, Any]:
+        created = 1700000000 + i * 60
+        return {"id": f"space-{i}", "name": f"memory space {i}", "type": MARKET_TYPES[i % 2],
+                "owner": f"owner-{i % 17}", "price": round(1 + (i * 37 % 1000) / 10, 2),
+                "description": " ".join(WORDS[(i + j) % len(WORDS)] for j in range(12)),
+                "createdAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(created)),
+                "updatedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(created + i % 7 * 3600))}
+
+    def _new_space(self, name: str, type_: str) -> Dict[str, Any]:
+        if name in self.spaces:
+            raise HTTPStatus(409, f"Memory space {name} already exists")
+        space = {"name": name, "type": type_, "owner": USER_ID, "head": "main", "createdAt": time.time(),
+                 "branches": {"main": []}}
+        self.spaces[name] = space
+        return space
+
+    def _space(self, repository: str) -> Dict[str, Any]:
+        if repository not in self.spaces:
+            raise HTTPStatus(404, f"Memory space {repository} not found")
+        return self.spaces[repository]
+
+    def _commit(self, space: Dict[str, Any], branch: str, files: Dict[str, str], message: str) -> Dict[str, Any]:
+        commits = space["branches"][branch]
+        tree = dict(commits[-1]["tree"]) if commits else {}
+        tree.update(files)
+        parent = commits[-1]["oid"] if commits else None
+        commit = {"oid": _oid(space["name"], branch, parent, message, len(commits), sorted(files)), "parent": parent,
+                  "message": message, "timestamp": time.time(), "files": sorted(files), "tree": tree}
+        commits.append(commit)
+        return commit
+
+    def _resolve(self, space: Dict[str, Any], ref: Optional[str]) -> Dict[str, Any]:
+        ref = ref or space["head"]
+        if ref in space["branches"]:
+            if not space["branches"][ref]:
+                raise HTTPStatus(404, f"Branch {ref} has no commits")
+            return space["branches"][ref][-1]
+        for commits in space["branches"].values():
+            for commit in commits:
+                if commit["oid"] == ref:
+                    return commit
+        raise HTTPStatus(404, f"Ref {ref} not found")
+
+    @staticmethod
+    def _summary(commit: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: commit[key] for key in ("oid", "parent", "message", "timestamp", "files")}
+
+    # user
+
+    def api_key_user(self, params, body, headers):
+        return {"userId": USER_ID}
+
+    def create_key(self, params, body, headers):
+        return {"userId": params.get("userId"), "name": body.get("name"), "apiKey": _oid(params, body)[:32]}
+
+    def get_user(self, params, body, headers):
+        return {"userId": USER_ID, "name": "Bench User", "walletAddress": "0x" + "0" * 40}
+
+    def get_user_stat(self, params, body, headers):
+        return {"spaces": len(self.spaces), "listings": len(self.listings), "purchases": len(self.purchases)}
+
+    def get_user_histories(self, params, body, headers):
+        history = [{"space": name, **self._summary(commit)} for name, space in self.spaces.items()
+                   for commits in space["branches"].values() for commit in commits]
+        return {"data": sorted(history, key=lambda entry: entry["timestamp"], reverse=True)[:100]}
+
+    def get_user_memory(self, params, body, headers):
+        names = params.get("memoryNames")
+        names = set(names.split(",")) if names else None
+        items = []
+        for name, space in self.spaces.items():
+            if names is not None and name not in names:
+                continue
+            item = {"name": name, "type": space["type"], "owner": space["owner"]}
+            tree = self._resolve(space, None)["tree"] if space["branches"][space["head"]] else {}
+            for field, path in (("episodicMemory", "episodic.data"), ("characterMemory", "character.data"),
+                                ("externalMemory", "external.data")):
+                if path in tree:
+                    item[field] = {"content": [tree[path]]}
+            items.append(item)
+        return items
+
+    def get_user_purchases(self, params, body, headers):
+        return {"data": self.purchases[-100:], "total": len(self.purchases)}
+
+    # memory spaces
+
+    def create_space(self, params, body, headers):
+        type_ = str(body.get("type", "AGENT_MEMORY")).rsplit(".", 1)[-1]
+        space = self._new_space(body["repository"], type_)
+        return {"name": space["name"], "type": space["type"]}
+
+    def clone_space(self, params, body, headers):
+        source = self._space(body["sourceName"])
+        space = self._new_space(body["repository"], source["type"])
+        space["branches"] = {branch: list(commits) for branch, commits in source["branches"].items()}
+        return {"name": space["name"]}
+
+    def get_space(self, params, body, headers, repository):
+        space = self._space(repository)
+        commit = self._resolve(space, params.get("ref")) if space["branches"][space["head"]] or params.get("ref") else None
+        return {"name": space["name"], "type": space["type"], "owner": space["owner"], "head": space["head"],
+                "branches": sorted(space["branches"]), "commit": self._summary(commit) if commit else None,
+                "files": sorted(commit["tree"]) if commit else []}
+
+    def delete_space(self, params, body, headers, repository):
+        self._space(repository)
+        del self.spaces[repository]
+        return {"name": repository}
+
+    def get_history(self, params, body, headers, repository):
+        space = self._space(repository)
+        return [self._summary(commit) for commit in reversed(space["branches"][space["head"]])]
+
+    def push_memory(self, params, body, headers, repository):
+        space = self._space(repository)
+        files = {entry["filePath"]: entry["content"] for entry in body.get("files", [])}
+        commit = self._commit(space, space["head"], files, body.get("message") or "push")
+        return {"oid": commit["oid"]}
+
+    # git
+
+    def create_repo(self, params, body, headers):
+        return {"name": self._new_space(body["name"], "AGENT_MEMORY")["name"]}
+
+    def clone_repo(self, params, body, headers):
+        return self.clone_space(params, {"repository": body["name"], "sourceName": body["sourceName"]}, headers)
+
+    def list_branches(self, params, body, headers, repository):
+        space = self._space(repository)
+        return {"branches": sorted(space["branches"]), "current": space["head"]}
+
+    def checkout_branch(self, params, body, headers, repository):
+        space = self._space(repository)
+        if body["branch"] not in space["branches"]:
+            raise HTTPStatus(404, f"Branch {body['branch']} not found")
+        space["head"] = body["branch"]
+        return {"branch": space["head"]}
+
+    def create_branch(self, params, body, headers, repository):
+        space = self._space(repository)
+        if body["branchName"] in space["branches"]:
+            raise HTTPStatus(409, f"Branch {body['branchName']} already exists")
+        base = body.get("baseBranch") or space["head"]
+        if base not in space["branches"]:
+            raise HTTPStatus(404, f"Branch {base} not found")
+        space["branches"][body["branchName"]] = list(space["branches"][base])
+        return {"branch": body["branchName"]}
+
+    def delete_branch(self, params, body, headers, repository, branch):
+        space = self._space(repository)
+        if branch not in space["branches"] or branch == space["head"]:
+            raise HTTPStatus(400, f"Cannot delete branch {branch}")
+        del space["branches"][branch]
+        return {"branch": branch}
+
+    def merge(self, params, body, headers, repository):
+        space = self._space(repository)
+        theirs = self._resolve(space, body["theirs"])
+        ours = body["ours"]
+        if ours not in space["branches"]:
+            raise HTTPStatus(404, f"Branch {ours} not found")
+        commit = self._commit(space, ours, theirs["tree"], body.get("message") or f"Merge {body['theirs']}")
+        return {"oid": commit["oid"]}
+
+    def commit_file(self, params, body, headers, repository):
+        space = self._space(repository)
+        commit = self._commit(space, space["head"], {body["filePath"]: body["content"]}, body.get("message") or "commit")
+        return {"oid": commit["oid"]}
+
+    def get_log(self, params, body, headers, repository):
+        space = self._space(repository)
+        commits = [self._summary(commit) for commit in reversed(space["branches"][space["head"]])]
+        if params.get("depth"):
+            commits = commits[:int(params["depth"])]
+        return {"commits": commits}
+
+    def get_file(self, params, body, headers, repository):
+        space = self._space(repository)
+        commit = self._resolve(space, params.get("ref"))
+        path = params.get("filePath")
+        if path not in commit["tree"]:
+            raise HTTPStatus(404, f"File {path} not found at {commit['oid']}")
+        return {"filePath": path, "oid": commit["oid"], "content": commit["tree"][path]}
+
+    def diff(self, params, body, headers, repository):
+        space = self._space(repository)
+        old, new = self._resolve(space, params.get("oid1"))["tree"], self._resolve(space, params.get("oid2"))["tree"]
+        changes = [{"filePath": path, "status": "added" if path not in old else "deleted" if path not in new else "modified"}
+                   for path in sorted(set(old) | set(new)) if old.get(path) != new.get(path)]
+        return {"oid1": params.get("oid1"), "oid2": params.get("oid2"), "changes": changes}
+
+    # marketplace
+
+    def get_marketplace(self, params, body, headers):
+        items = [item for item in self.market if item["type"] == params.get("type", item["type"])]
+        items.sort(key=lambda item: item["updatedAt"], reverse=True)
+        paginate = json.loads(params["paginate"]) if params.get("paginate") else {}
+        page, limit = int(paginate.get("page", 1)), int(paginate.get("limit", 20))
+        return {"data": items[(page - 1) * limit:page * limit], "total": len(items), "page": page, "limit": limit}
+
+    def post_marketplace(self, params, body, headers, operation):
+        if operation not in ("list", "purchase"):
+            raise HTTPStatus(404, f"Unknown marketplace operation {operation}")
+        key = headers.get("Idempotency-Key")
+        if key and key in self.idempotent:
+            return self.idempotent[key]
+        record = {"id": f"{operation}-{len(self.listings) + len(self.purchases)}", **body}
+        (self.listings if operation == "list" else self.purchases).append(record)
+        result = {"ok": True, "id": record["id"]}
+        if key:
+            self.idempotent[key] = result
+        return result
+
+class StubServer(ThreadingHTTPServer):
+    """
+    The stub API on a local port. Use as a context manager:
+
+        with StubServer(latency=0.01) as server:
+            sdk = StitchSDK(server.url, "key")
+
+    Args:
+        latency (float): Seconds each request waits before it is handled
+        jitter (float): Extra random delay per request, up to this many seconds
+        bandwidth (float): Bytes per second each response is sent at (0: unlimited)
+        **options: StubAPI payload sizes (memory_kb, character_kb, log_commits, file_kb, market_items)
+    """
+    daemon_threads = True
+    # Room for many concurrent clients to connect at once
+    request_queue_size = 128
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, host: str = "127.0.0.1", port: int = 0,
+                 bandwidth: float = 0.0, **options):
+        super().__init__((host, port), StubHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.api = StubAPI(**options)
+        self.lock = threading.Lock()
+        self.requests: Counter = Counter()
+        self.failures: Dict[str, List[int]] = {}
+        self._counter_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.server_address[0]}:{self.server_port}"
+
+    def pause(self) -> None:
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            time.sleep(delay)
+
+    def bandwidth_step(self) -> int:
+        """Bytes sent per write when the bandwidth is limited (about 50 writes a second), else 0"""
+        return max(1024, int(self.bandwidth / 50)) if self.bandwidth else 0
+
+    def count(self, route: str) -> None:
+        with self._counter_lock:
+            self.requests[route] += 1
+
+    def fail(self, route: str, times: int = 1, status: int = 503) -> None:
+        """Answer the next times requests to route with status (and Retry-After: 0)"""
+        with self._counter_lock:
+            self.failures.setdefault(route, []).extend([status] * times)
+
+    def take_failure(self, route: str) -> Optional[int]:
+        with self._counter_lock:
+            pending = self.failures.get(route)
+            return pending.pop(0) if pending else None
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="stitch-stub-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+@contextlib.contextmanager
+def spawn_stub(latency: float = 0.0, **options):
+    """
+    Run the stub server in a subprocess, so it does not compete with the
+    code being measured for the GIL. Yields the server URL.
+
+    Args:
+        latency (float): Seconds per request
+        **options: bandwidth, memory_kb, log_commits or market_items
+    """
+    command = [sys.executable, "-m", "benchmarks.stub_server", "--port", "0", "--latency", str(latency)]
+    for name, value in options.items():
+        command += [f"--{name.replace('_', '-')}", str(value)]
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.Popen(command, cwd=root, stdout=subprocess.PIPE, text=True)
+    try:
+        line = process.stdout.readline()
+        if not line:
+            raise Exception(f"Stub server exited with status {process.wait()}")
+        yield line.split()[4]
+    finally:
+        process.terminate()
+        process.wait()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on (default: 8765)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds per request (default: 0)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Extra random seconds per request, up to this (default: 0)')
+    parser.add_argument('--bandwidth', type=float, default=0.0, help='Bytes per second each response is sent at (default: unlimited)')
+    parser.add_argument('--memory-kb', type=int, default=64, help='Size of the seeded episodic memory (default: 64)')
+    parser.add_argument('--log-commits', type=int, default=50, help='Commits in the seeded space (default: 50)')
+    parser.add_argument('--market-items', type=int, default=500, help='Marketplace listings (default: 500)')
+    args = parser.parse_args()
+
+    server = StubServer(args.latency, args.jitter, port=args.port, bandwidth=args.bandwidth, memory_kb=args.memory_kb,
+                        log_commits=args.log_commits, market_items=args.market_items)
+    print(f"Stub Stitch API at {server.url} (space {SEED_SPACE!r}), Ctrl-C to stop", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,282 @@
+"""
+Benchmark suite against the local stub API, with stored baselines.
+
+Measures CLI startup, per-call latency of the API clients, push and pull
+throughput, chunking and embedding speed. Each metric is the median of
+--repeat runs and is compared with benchmarks/baselines.json; the run fails
+(exit code 1) if a metric is worse than its baseline by more than the
+threshold.
+
+    python -m benchmarks.suite                       # run and compare
+    python -m benchmarks.suite --only latency,pull   # some groups only
+    python -m benchmarks.suite --save-baseline       # record new baselines
+
+Baselines depend on the machine; record them on the machine that runs the
+comparison.
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from typing import Any, Callable, Dict, List, Optional
+
+from .stub_server import SEED_SPACE, make_episodic, spawn_stub
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+DEFAULT_THRESHOLD = 0.25
+# Sub-millisecond calls and process startup are noisier than throughput
+DEFAULT_GROUP_THRESHOLDS = {"latency": 0.5, "startup": 0.35}
+# Units where a larger value is better; every other unit is a duration
+HIGHER_IS_BETTER = ("MB/s", "rows/s", "chunks/s", "texts/s")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+Metrics = Dict[str, Dict[str, Any]]
+
+def metric(value: float, unit: str) -> Dict[str, Any]:
+    return {"value": round(value, 4), "unit": unit}
+
+def median_time(run: Callable[[], Any], repeat: int) -> float:
+    """Median wall time of run() in seconds"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+def _cli_env(url: str) -> Dict[str, str]:
+    env = dict(os.environ, STITCH_API_URL=url, STITCH_API_KEY="key")
+    env.pop("STITCH_DAEMON_SOCKET", None)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [ROOT, env.get("PYTHONPATH")]))
+    return env
+
+def bench_startup(options: argparse.Namespace) -> Metrics:
+    """Wall time of a bare interpreter, `stitch --help` and a command that calls the API"""
+    with spawn_stub(options.latency) as url:
+        env = _cli_env(url)
+        commands = {
+            "startup.python_ms": [sys.executable, "-c", "pass"],
+            "startup.cli_help_ms": [sys.executable, "-m", "stitch_ai.cli.main", "--help"],
+            "startup.cli_command_ms": [sys.executable, "-m", "stitch_ai.cli.main", "user-get"],
+        }
+        results = {}
+        for name, command in commands.items():
+            run = lambda: subprocess.run(command, env=env, cwd=ROOT, check=True, capture_output=True)
+            results[name] = metric(median_time(run, options.repeat) * 1000, "ms")
+        return results
+
+def bench_latency(options: argparse.Namespace) -> Metrics:
+    """Median milliseconds per call for each API client, over --calls calls"""
+    from stitch_ai.sdk import StitchSDK
+
+    with spawn_stub(options.latency) as url:
+        results = {"latency.sdk_init_ms": metric(median_time(lambda: StitchSDK(url, "key"), options.repeat) * 1000, "ms")}
+        sdk = StitchSDK(url, "key")
+        log = sdk.git.get_log(SEED_SPACE)["commits"]
+        calls = {
+            "get_user": lambda: sdk.user.get_user(),
+            "get_user_purchases": lambda: sdk.user.get_user_purchases(),
+            "get_space": lambda: sdk.memory_space.get_space(SEED_SPACE),
+            "get_history": lambda: sdk.memory_space.get_history(SEED_SPACE),
+            "list_branches": lambda: sdk.git.list_branches(SEED_SPACE),
+            "get_log": lambda: sdk.git.get_log(SEED_SPACE),
+            "get_file": lambda: sdk.git.get_file(SEED_SPACE, "notes.txt", "main"),
+            "diff": lambda: sdk.git.diff(SEED_SPACE, log[-1]["oid"], log[0]["oid"]),
+            "marketplace_page": lambda: sdk.marketplace.client.get_memory_space_page("AGENT_MEMORY", 1, 100),
+            "purchase_memory": lambda: sdk.marketplace.purchase_memory({"memoryId": "space-1", "agentId": "agent"}),
+        }
+        for name, call in calls.items():
+            call()
+            durations = []
+            for _ in range(options.calls):
+                start = time.perf_counter()
+                call()
+                durations.append(time.perf_counter() - start)
+            results[f"latency.{name}_ms"] = metric(statistics.median(durations) * 1000, "ms")
+        return results
+
+def _write_sqlite(path: str, size_mb: float) -> int:
+    table = json.loads(make_episodic(int(size_mb * 1024)))["memories"]
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE memories (id TEXT PRIMARY KEY, type TEXT, createdAt INTEGER, content TEXT)")
+    conn.executemany("INSERT INTO memories VALUES (?, ?, ?, ?)", table["rows"])
+    conn.commit()
+    conn.close()
+    return len(table["rows"])
+
+def bench_push(options: argparse.Namespace) -> Metrics:
+    """Push throughput of a text file (streamed) and a SQLite memories table (exported to JSON)"""
+    from stitch_ai.sdk import StitchSDK
+
+    with spawn_stub(options.latency, log_commits=1, memory_kb=1) as url, tempfile.TemporaryDirectory() as tmpdir:
+        sdk = StitchSDK(url, "key")
+        text_path = os.path.join(tmpdir, "episodic.txt")
+        with open(text_path, "w", encoding="utf-8") as f:
+            f.write(make_episodic(int(options.memory_mb * 1024)))
+        text_mb = os.path.getsize(text_path) / (1024 * 1024)
+        db_path = os.path.join(tmpdir, "agent.sqlite")
+        rows = _write_sqlite(db_path, options.memory_mb)
+        text = median_time(lambda: sdk.push(SEED_SPACE, "bench", episodic_path=text_path), options.repeat)
+        table = median_time(lambda: sdk.push(SEED_SPACE, "bench", episodic_path=db_path), options.repeat)
+        return {"push.text_mb_s": metric(text_mb / text, "MB/s"), "push.sqlite_rows_s": metric(rows / table, "rows/s")}
+
+def bench_pull(options: argparse.Namespace) -> Metrics:
+    """Pull throughput to a raw JSON file, to a SQLite restore, and chunked and embedded into a NumPy store"""
+    from stitch_ai.sdk import StitchSDK
+
+    memory_kb = int(options.memory_mb * 1024)
+    with spawn_stub(options.latency, log_commits=1, memory_kb=memory_kb) as url, tempfile.TemporaryDirectory() as tmpdir:
+        sdk = StitchSDK(url, "key", embedding_backend=options.embedding)
+        # The stub seeds the space with this same export
+        episodic = make_episodic(memory_kb)
+        size_mb = len(episodic.encode("utf-8")) / (1024 * 1024)
+        rows = len(json.loads(episodic)["memories"]["rows"])
+        targets = {"raw": ("memory.json", True), "restore": ("agent.sqlite", True), "embed": ("agent.npy", True),
+                   "embed_sequential": ("agent.npy", False)}
+        seconds = {}
+        for name, (target, pipeline) in targets.items():
+            path = os.path.join(tmpdir, target)
+            seconds[name] = median_time(lambda: sdk.pull_memory(SEED_SPACE, path, pipeline=pipeline), options.repeat)
+        return {"pull.raw_mb_s": metric(size_mb / seconds["raw"], "MB/s"),
+                "pull.restore_rows_s": metric(rows / seconds["restore"], "rows/s"),
+                f"pull.embed_{options.embedding}_rows_s": metric(rows / seconds["embed"], "rows/s"),
+                f"pull.embed_sequential_{options.embedding}_rows_s": metric(rows / seconds["embed_sequential"], "rows/s")}
+
+def bench_chunking(options: argparse.Namespace) -> Metrics:
+    """Chunking throughput of the row and character chunkers over an episodic export"""
+    from stitch_ai.processors.chunking import get_chunker
+
+    text = make_episodic(int(options.memory_mb * 1024))
+    size_mb = len(text.encode("utf-8")) / (1024 * 1024)
+    results = {}
+    for name in ("row", "character"):
+        chunker = get_chunker(name)
+        results[f"chunking.{name}_mb_s"] = metric(size_mb / median_time(lambda: chunker(text), options.repeat), "MB/s")
+    return results
+
+def bench_embedding(options: argparse.Namespace) -> Metrics:
+    """Embedding throughput of the chosen backend over row chunks"""
+    from stitch_ai.processors.chunking import get_chunker
+    from stitch_ai.processors.embeddings import get_embedding_backend
+
+    chunks = get_chunker("row")(make_episodic(256))[:2000]
+    backend = get_embedding_backend(options.embedding)
+    backend.load()
+    seconds = median_time(lambda: backend(chunks), options.repeat)
+    return {f"embedding.{options.embedding}_texts_s": metric(len(chunks) / seconds, "texts/s")}
+
+BENCHMARKS: Dict[str, Callable[[argparse.Namespace], Metrics]] = {
+    "startup": bench_startup,
+    "latency": bench_latency,
+    "push": bench_push,
+    "pull": bench_pull,
+    "chunking": bench_chunking,
+    "embedding": bench_embedding,
+}
+
+def load_baselines(path: str = BASELINE_PATH) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {"threshold": DEFAULT_THRESHOLD, "thresholds": dict(DEFAULT_GROUP_THRESHOLDS), "metrics": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def compare(current: Metrics, baselines: Dict[str, Any], threshold: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Compare metrics with their baselines
+
+    Args:
+        current (Metrics): Measured metrics by name
+        baselines (Dict[str, Any]): Baseline file contents: metrics, and optionally threshold
+            and thresholds by metric or group name (e.g. "latency")
+        threshold (Optional[float]): Allowed relative slowdown, overriding the file's default
+
+    Returns:
+        List[Dict[str, Any]]: One row per metric with name, unit, baseline, value, change
+            (relative, positive is better) and status: ok, improved, regression or new
+    """
+    default = threshold if threshold is not None else baselines.get("threshold", DEFAULT_THRESHOLD)
+    rows = []
+    for name, measured in current.items():
+        row = {"name": name, "unit": measured["unit"], "value": measured["value"], "baseline": None, "change": None,
+               "status": "new"}
+        base = baselines.get("metrics", {}).get(name)
+        if base and base["value"]:
+            change = (measured["value"] - base["value"]) / base["value"]
+            if measured["unit"] not in HIGHER_IS_BETTER:
+                change = -change
+            limits = baselines.get("thresholds", {})
+            limit = limits.get(name, limits.get(name.split(".")[0], default))
+            row.update(baseline=base["value"], change=change,
+                       status="regression" if change < -limit else "improved" if change > limit else "ok")
+        rows.append(row)
+    return rows
+
+def format_comparison(rows: List[Dict[str, Any]]) -> str:
+    width = max([len(row["name"]) for row in rows] + [6])
+    lines = [f"{'metric':<{width}}{'baseline':>12}{'current':>12}  {'unit':<9}{'change':>8}  status"]
+    for row in rows:
+        baseline = f"{row['baseline']:.2f}" if row["baseline"] is not None else "-"
+        change = f"{row['change'] * 100:+.0f}%" if row["change"] is not None else "-"
+        lines.append(f"{row['name']:<{width}}{baseline:>12}{row['value']:>12.2f}  {row['unit']:<9}{change:>8}  {row['status']}")
+    return "\n".join(lines)
+
+def save_baselines(current: Metrics, baselines: Dict[str, Any], path: str = BASELINE_PATH) -> None:
+    """Store measured metrics as baselines, keeping thresholds and metrics that were not measured"""
+    baselines = dict(baselines)
+    baselines.setdefault("threshold", DEFAULT_THRESHOLD)
+    baselines.setdefault("thresholds", dict(DEFAULT_GROUP_THRESHOLDS))
+    baselines["metrics"] = {**baselines.get("metrics", {}), **current}
+    baselines["environment"] = {"python": platform.python_version(), "platform": platform.platform(),
+                                "cpus": os.cpu_count(), "recorded": time.strftime("%Y-%m-%d")}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--only', help=f'Comma-separated groups to run (default: all of {",".join(BENCHMARKS)})')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement; the median is reported (default: 5)')
+    parser.add_argument('--calls', type=int, default=50, help='Calls per endpoint in the latency group (default: 50)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Stub server seconds per request (default: 0, client overhead only)')
+    parser.add_argument('--memory-mb', type=float, default=2.0, help='Episodic memory size for push, pull and chunking (default: 2)')
+    parser.add_argument('--embedding', default='hash', help='Embedding backend for pull and embedding (default: hash)')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='Baseline file (default: benchmarks/baselines.json)')
+    parser.add_argument('--threshold', type=float, default=None, help='Allowed relative slowdown, e.g. 0.25 (default: from the baseline file)')
+    parser.add_argument('--save-baseline', action='store_true', help='Store the results as the new baselines instead of failing on regressions')
+    parser.add_argument('--json', dest='json_path', help='Also write the comparison as JSON to this path')
+    options = parser.parse_args()
+
+    groups = options.only.split(",") if options.only else list(BENCHMARKS)
+    unknown = [group for group in groups if group not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown groups: {', '.join(unknown)}")
+
+    current: Metrics = {}
+    for group in groups:
+        start = time.perf_counter()
+        current.update(BENCHMARKS[group](options))
+        print(f"{group} done in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    baselines = load_baselines(options.baseline)
+    rows = compare(current, baselines, options.threshold)
+    print(format_comparison(rows))
+    if options.json_path:
+        with open(options.json_path, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+    if options.save_baseline:
+        save_baselines(current, baselines, options.baseline)
+        print(f"Baselines written to {options.baseline}")
+        return
+    regressions = [row["name"] for row in rows if row["status"] == "regression"]
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
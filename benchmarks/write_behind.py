@@ -0,0 +1,61 @@
+"""
+Agent step latency with synchronous vs write-behind pushes.
+
+Runs a simulated agent loop that updates an episodic SQLite file and pushes it
+at every step, once with push() uploading before it returns and once with
+write-behind, where it only queues the push. Reports the step latency, the
+uploads made (write-behind coalesces pushes queued during an upload) and the
+time to drain the queue at the end.
+
+    python -m benchmarks.write_behind --steps 50 --latency 0.1 --work 0.02
+"""
+import os
+import time
+import sqlite3
+import argparse
+import tempfile
+import statistics
+from .stub_server import spawn_stub
+
+def main() -> None:
+    from stitch_ai.sdk import StitchSDK
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--steps', type=int, default=50, help='Agent steps per mode (default: 50)')
+    parser.add_argument('--rows', type=int, default=2000, help='Rows in the episodic memory (default: 2000)')
+    parser.add_argument('--work', type=float, default=0.02, help='Seconds of agent work per step (default: 0.02)')
+    parser.add_argument('--latency', type=float, default=0.1, help='Stub server seconds per request (default: 0.1)')
+    args = parser.parse_args()
+
+    with spawn_stub(args.latency, log_commits=1) as url, tempfile.TemporaryDirectory() as tmpdir:
+        db = os.path.join(tmpdir, "agent.sqlite")
+        conn = sqlite3.connect(db)
+        conn.execute("CREATE TABLE memories (id INTEGER PRIMARY KEY, content TEXT)")
+        conn.executemany("INSERT INTO memories VALUES (?, ?)",
+                         ((i, f"memory {i} of the agent's episodic history") for i in range(args.rows)))
+        conn.commit()
+        setup = StitchSDK(url, "key")
+        setup.memory_space.create_space("agent")
+        print(f"{args.steps} steps, {args.rows} rows, {args.latency * 1000:g} ms per request")
+        print(f"{'mode':<14}{'p50 ms':>9}{'max ms':>9}{'loop s':>9}{'drain s':>9}{'uploads':>9}")
+        for mode, write_behind in (("synchronous", False), ("write-behind", True)):
+            sdk = StitchSDK(url, "key", write_behind=write_behind, queue_path=os.path.join(tmpdir, f"{mode}.sqlite"))
+            steps = []
+            start = time.perf_counter()
+            for step in range(args.steps):
+                step_start = time.perf_counter()
+                time.sleep(args.work)
+                conn.execute("UPDATE memories SET content = ? WHERE id = ?", (f"step {step}", step % args.rows))
+                conn.commit()
+                sdk.push("agent", f"step {step}", episodic_path=db)
+                steps.append(time.perf_counter() - step_start)
+            loop = time.perf_counter() - start
+            drain_start = time.perf_counter()
+            uploads = sdk.drain()["uploaded"] if write_behind else args.steps
+            drain = time.perf_counter() - drain_start
+            sdk.close()
+            print(f"{mode:<14}{statistics.median(steps) * 1000:>9.1f}{max(steps) * 1000:>9.1f}"
+                  f"{loop:>9.2f}{drain:>9.2f}{uploads:>9}")
+
+if __name__ == '__main__':
+    main()
@@ -8,7 +8,7 @@ setup(
     long_description_content_type="text/markdown",
     author="Stitch AI",
     url="https://github.com/StitchAI/stitch-ai-cli-py",
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks", "benchmarks.*"]),
     install_requires=[
         "requests",
         "python-dotenv",
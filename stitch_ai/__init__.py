@@ -1 +1,8 @@
- 
\ No newline at end of file
+__all__ = ["StitchSDK"]
+
+def __getattr__(name):
+    # Imported on first use, so the CLI (and its thin daemon client) starts without loading the SDK
+    if name == "StitchSDK":
+        from .sdk import StitchSDK
+        return StitchSDK
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
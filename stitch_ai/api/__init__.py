@@ -5,9 +5,14 @@ Contains API client and related utilities.
 """
 
 from .client import APIClient, BaseAPIClient
+from .connection import Connection, TTLCache, request_timeout
 from .git import GitAPIClient
 from .memory import MemoryAPIClient
 from .memory_space import MemorySpaceAPIClient
 from .marketplace import MarketplaceAPIClient
+from .tracing import RequestEvent, MetricsRegistry, OpenTelemetryExporter, add_request_hook, remove_request_hook, request_hook, \
+    scoped_request_hook, carry_context
 
-__all__ = ['APIClient', 'BaseAPIClient', 'GitAPIClient', 'MemoryAPIClient', 'MemorySpaceAPIClient', 'MarketplaceAPIClient']
+__all__ = ['APIClient', 'BaseAPIClient', 'Connection', 'TTLCache', 'request_timeout', 'GitAPIClient', 'MemoryAPIClient', 'MemorySpaceAPIClient', 'MarketplaceAPIClient',
+           'RequestEvent', 'MetricsRegistry', 'OpenTelemetryExporter', 'add_request_hook', 'remove_request_hook', 'request_hook',
+           'scoped_request_hook', 'carry_context']
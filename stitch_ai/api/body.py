@@ -0,0 +1,74 @@
+import json
+import uuid
+from typing import Dict, Any, Iterator, List, Union
+
+def is_streamable(value: Any) -> bool:
+    """Whether a payload value can be streamed as a JSON string (e.g. MappedMemoryFile)"""
+    return hasattr(value, 'iter_json_string') and hasattr(value, 'json_string_length')
+
+class JSONStreamBody:
+    """
+    File-like JSON request body whose streamable string values are encoded
+    incrementally while the request is sent, instead of being serialized up front.
+    The total length is known in advance so a Content-Length header is still sent.
+    """
+
+    def __init__(self, payload: Dict[str, Any]):
+        self._parts: List[Union[bytes, Any]] = []
+        streams = {}
+
+        def placeholder(value):
+            token = f"stitch-stream-{uuid.uuid4().hex}"
+            streams[token] = value
+            return token
+
+        encoded = json.dumps(_replace_streams(payload, placeholder))
+        # Split the serialized payload around each placeholder string literal
+        for token, stream in streams.items():
+            before, after = encoded.split(json.dumps(token), 1)
+            self._parts.append(before.encode('utf-8'))
+            self._parts.append(stream)
+            encoded = after
+        self._parts.append(encoded.encode('utf-8'))
+        self._length = sum(len(part) if isinstance(part, bytes) else part.json_string_length() for part in self._parts)
+        self._chunks = self._iter_chunks()
+        self._buffer = b''
+        self._offset = 0
+
+    def _iter_chunks(self) -> Iterator[bytes]:
+        for part in self._parts:
+            if isinstance(part, bytes):
+                yield part
+            else:
+                yield from part.iter_json_string()
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[bytes]:
+        if self._offset < len(self._buffer):
+            yield self._buffer[self._offset:]
+        self._buffer, self._offset = b'', 0
+        yield from self._chunks
+
+    def read(self, size: int = -1) -> bytes:
+        """Read up to size bytes; may return fewer, returns b'' at the end of the body"""
+        if size is None or size < 0:
+            return b''.join(self)
+        while self._offset >= len(self._buffer):
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return b''
+            self._buffer, self._offset = chunk, 0
+        data = self._buffer[self._offset:self._offset + size]
+        self._offset += len(data)
+        return data
+
+def _replace_streams(value: Any, placeholder) -> Any:
+    if is_streamable(value):
+        return placeholder(value)
+    if isinstance(value, dict):
+        return {k: _replace_streams(v, placeholder) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_replace_streams(v, placeholder) for v in value]
+    return value
@@ -1,18 +1,40 @@
+import json
+import time
 import requests
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from .connection import Connection, DEFAULT_POOL_SIZE, current_timeout
+from .tracing import RequestEvent, TracingAdapter, emit_request_event, has_request_hooks, start_connection_timing, connection_timing
+
+# Session.request arguments that belong to sending rather than to the request itself
+_SEND_ARGUMENTS = ("timeout", "allow_redirects", "proxies", "verify", "cert")
 
 class BaseAPIClient:
-    def __init__(self, base_url: str, api_key: str):
+    def __init__(self, base_url: str, api_key: str, connection: Optional[Connection] = None):
         """
-        Initialize the API client
+        Initialize the API client. Clients are safe to share between threads.
         
         Args:
             base_url (str): Base URL for the API
             api_key (str): API key for authentication
+            connection (Optional[Connection]): Connection pool, user id and cache shared with other
+                clients; by default the client gets its own
         """
-        self.base_url = base_url.rstrip('/')
-        self.api_key = api_key
-        self.user_id = self.get_user_id()
+        self.connection = connection or Connection(base_url, api_key)
+        self.base_url = self.connection.base_url
+        self.api_key = self.connection.api_key
+
+    @property
+    def session(self) -> requests.Session:
+        return self.connection.session
+
+    @property
+    def user_id(self) -> str:
+        """The user id of the API key, looked up on first use and shared through the connection"""
+        return self.connection.user_id(self._lookup_user_id)
+
+    def mount_adapter(self, pool_size: Optional[int] = None) -> None:
+        """Make sure the connection pool keeps at least pool_size connections"""
+        self.connection.ensure_pool_size(pool_size or DEFAULT_POOL_SIZE)
 
     def get_headers(self) -> Dict[str, str]:
         """Get the default headers for API requests"""
@@ -23,10 +45,109 @@ class BaseAPIClient:
     
     def get_user_id(self) -> str:
         """Get the user ID from the API key"""
-        url = f"{self.base_url}/user/api-key/user?apiKey={self.api_key}"
-        response = requests.get(url, headers=self.get_headers())
-        response.raise_for_status()
-        return response.json()['userId']
+        return self.user_id
+
+    def _lookup_user_id(self) -> str:
+        return self._request("GET", "/user/api-key/user", params={"apiKey": self.api_key}, decode=True)['userId']
+
+    def _request(self, method: str, endpoint: str, path: Optional[Dict[str, Any]] = None, decode: bool = False,
+                 stream: bool = False, retries: int = 0, **kwargs) -> Any:
+        """
+        Send a request and raise for error statuses, reporting it to the request hooks
+
+        Args:
+            method (str): HTTP method
+            endpoint (str): Path template under base_url, e.g. "/git/{repository}/log"
+            path (Optional[Dict[str, Any]]): Values for the template's placeholders
+            decode (bool): Return the decoded JSON body instead of the response
+            stream (bool): Leave the body unread; the request is reported when the response is closed
+            retries (int): Earlier attempts of this request, for the trace
+            **kwargs: Further requests.Session.request arguments (params, json, data, headers, timeout, ...).
+                Without timeout, the request_timeout of this thread or the connection's timeout applies.
+
+        Returns:
+            Any: The response, or its JSON body with decode=True. Decoded GET bodies come from the
+                connection's response cache when it is enabled; any other request clears it.
+        """
+        if method == "GET" and decode and not stream and self.connection.cache_ttl > 0:
+            key = (endpoint, json.dumps(path, sort_keys=True, default=str),
+                   json.dumps(kwargs.get("params"), sort_keys=True, default=str))
+            return self.connection.cached(key, lambda: self._send(method, endpoint, path, decode, stream, retries, **kwargs))
+        if method != "GET":
+            self.connection.cache.clear()
+        return self._send(method, endpoint, path, decode, stream, retries, **kwargs)
+
+    def _send(self, method: str, endpoint: str, path: Optional[Dict[str, Any]], decode: bool, stream: bool,
+              retries: int, **kwargs) -> Any:
+        url = self.base_url + (endpoint.format(**path) if path else endpoint)
+        kwargs.setdefault("headers", self.get_headers())
+        send_kwargs = {name: kwargs.pop(name) for name in _SEND_ARGUMENTS if name in kwargs}
+        if "timeout" not in send_kwargs:
+            timeout = current_timeout()
+            send_kwargs["timeout"] = timeout if timeout is not None else self.connection.timeout
+        event = RequestEvent(method, endpoint, url, retries)
+        start = sent = time.perf_counter()
+        start_connection_timing()
+        try:
+            prepared = self.session.prepare_request(requests.Request(method, url, **kwargs))
+            event.bytes_out = _body_size(prepared.body)
+            sent = time.perf_counter()
+            event.timings["serialize"] = sent - start
+            settings = self.session.merge_environment_settings(prepared.url, send_kwargs.pop("proxies", {}), stream,
+                                                               send_kwargs.pop("verify", None), send_kwargs.pop("cert", None))
+            settings.update(send_kwargs)
+            response = self.session.send(prepared, **settings)
+        except Exception as e:
+            event.error = str(e)
+            self._report(event, start, sent)
+            raise
+        event.timings["connect"], event.timings["tls"], event.new_connection = connection_timing()
+        event.status = response.status_code
+
+        if stream:
+            close = response.close
+
+            def close_and_report():
+                close()
+                self._report(event, start, sent, response)
+            response.close = close_and_report
+            try:
+                response.raise_for_status()
+            except Exception as e:
+                event.error = str(e)
+                response.close()
+                raise
+            return response
+
+        try:
+            response.raise_for_status()
+            if not decode:
+                return response
+            parse_start = time.perf_counter()
+            result = response.json()
+            event.timings["parse"] = time.perf_counter() - parse_start
+            return result
+        except Exception as e:
+            event.error = str(e)
+            raise
+        finally:
+            self._report(event, start, sent, response)
+
+    def _report(self, event: RequestEvent, start: float, sent: float, response: Optional[requests.Response] = None) -> None:
+        """Fill in the event's timings and sizes and pass it to the request hooks"""
+        if not has_request_hooks():
+            return
+        end = time.perf_counter()
+        event.timings["total"] = end - start
+        if response is None:
+            event.timings["connect"], event.timings["tls"], event.new_connection = connection_timing()
+        else:
+            elapsed = response.elapsed.total_seconds()
+            event.timings["server"] = max(elapsed - event.timings["connect"] - event.timings["tls"], 0.0)
+            event.timings["download"] = max(end - sent - elapsed - event.timings["parse"], 0.0)
+            raw = getattr(response, "raw", None)
+            event.bytes_in = raw.tell() if hasattr(raw, "tell") else len(response.content or b"")
+        emit_request_event(event)
 
 
 class APIClient(BaseAPIClient):
@@ -40,12 +161,9 @@ class APIClient(BaseAPIClient):
         Returns:
             Dict[str, Any]: API response containing key details
         """
-        url = f"{self.base_url}/user/api-key"
         params = {"userId": user_id, "hashedId": hashed_id}
         payload = {"name": name}
-        response = requests.post(url, params=params, json=payload, headers=self.get_headers())
-        response.raise_for_status()
-        return response.json()
+        return self._request("POST", "/user/api-key", params=params, json=payload, decode=True)
 
     def handle_error(self, response: requests.Response) -> None:
         """
@@ -63,4 +181,12 @@ class APIClient(BaseAPIClient):
         except ValueError:
             error_message = response.text or 'Unknown error occurred'
         
-        raise Exception(f"API Error ({response.status_code}): {error_message}")
\ No newline at end of file
+        raise Exception(f"API Error ({response.status_code}): {error_message}")
+
+def _body_size(body: Any) -> int:
+    if body is None:
+        return 0
+    try:
+        return len(body)
+    except TypeError:
+        return 0
@@ -0,0 +1,148 @@
+"""
+State shared by the API clients of one StitchSDK: the HTTP connection pool,
+the user id behind the API key, a response cache and the default timeout.
+Everything here is safe to use from many threads at once.
+"""
+import copy
+import time
+import threading
+import contextlib
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, Union
+import requests
+from .tracing import TracingAdapter
+
+# Connections kept open per host; threads beyond this open extra connections that are not reused
+DEFAULT_POOL_SIZE = 16
+
+Timeout = Union[float, Tuple[float, float], None]
+
+_local = threading.local()
+
+@contextlib.contextmanager
+def request_timeout(timeout: Timeout):
+    """
+    Timeout for the API requests this thread makes inside the with block,
+    overriding the connection default: seconds, or (connect, read) seconds.
+
+        with request_timeout(5):
+            sdk.git.get_log("space")
+    """
+    previous = getattr(_local, "timeout", None)
+    _local.timeout = timeout
+    try:
+        yield
+    finally:
+        _local.timeout = previous
+
+def current_timeout() -> Timeout:
+    """The timeout set by request_timeout on this thread, if any"""
+    return getattr(_local, "timeout", None)
+
+class TTLCache:
+    """
+    Thread-safe cache whose entries expire after a number of seconds.
+    Concurrent get_or_load calls for a missing key load it once; the other
+    callers wait for that result.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._loading: Dict[Hashable, threading.Event] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load(self, key: Hashable, load: Callable[[], Any], ttl: float) -> Any:
+        """
+        Return the cached value for key, or load(), cached for ttl seconds.
+        If load() raises, nothing is cached: the error goes to its caller and a waiting caller loads again.
+        """
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > time.monotonic():
+                    self.hits += 1
+                    return entry[1]
+                loading = self._loading.get(key)
+                if loading is None:
+                    loading = self._loading[key] = threading.Event()
+                    self.misses += 1
+                    break
+            loading.wait()
+        try:
+            value = load()
+            with self._lock:
+                # A clear() while loading means the value may already be stale
+                if self._loading.get(key) is loading:
+                    self._entries[key] = (time.monotonic() + ttl, value)
+            return value
+        finally:
+            with self._lock:
+                if self._loading.get(key) is loading:
+                    del self._loading[key]
+            loading.set()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._loading.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+class Connection:
+    """
+    One HTTP session and the state that goes with an API key, shared by every
+    API client built on it.
+
+    Args:
+        base_url (str): Base URL for the API
+        api_key (str): API key for authentication
+        timeout (Timeout): Default request timeout in seconds, or (connect, read); None waits indefinitely
+        pool_size (int): Connections kept open for reuse
+        cache_ttl (float): Seconds decoded GET responses are cached; 0 disables the cache.
+            Any other request made through this connection clears it.
+    """
+
+    def __init__(self, base_url: str, api_key: str, timeout: Timeout = None, pool_size: int = DEFAULT_POOL_SIZE,
+                 cache_ttl: float = 0.0):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self.cache = TTLCache()
+        self.session = requests.Session()
+        self.pool_size = 0
+        self._lock = threading.Lock()
+        self._user_lock = threading.Lock()
+        self._user_id = None
+        self.ensure_pool_size(pool_size)
+
+    def ensure_pool_size(self, pool_size: int) -> None:
+        """Grow the pool to at least pool_size connections; requests in flight keep their connections"""
+        with self._lock:
+            if pool_size <= self.pool_size:
+                return
+            # Route requests through a connection pool that reports connect and TLS time
+            adapter = TracingAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            self.session.mount("http://", adapter)
+            self.session.mount("https://", adapter)
+            self.pool_size = pool_size
+
+    def user_id(self, lookup: Callable[[], str]) -> str:
+        """The user id of the API key, looked up once with lookup()"""
+        if self._user_id is None:
+            with self._user_lock:
+                if self._user_id is None:
+                    self._user_id = lookup()
+        return self._user_id
+
+    def cached(self, key: Hashable, load: Callable[[], Any]) -> Any:
+        """load() through the response cache; callers get their own copy of the value"""
+        if self.cache_ttl <= 0:
+            return load()
+        return copy.deepcopy(self.cache.get_or_load(key, load, self.cache_ttl))
+
+    def close(self) -> None:
+        self.session.close()
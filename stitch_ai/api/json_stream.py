@@ -0,0 +1,278 @@
+import re
+import codecs
+import tempfile
+from json.decoder import scanstring
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, TextIO
+
+# Strings larger than this are moved from memory to a temporary file
+DEFAULT_SPOOL_SIZE = 8 * 1024 * 1024
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_NUMBER = re.compile(r'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][-+]?\d+)?')
+_STRING_BODY = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.DOTALL)
+_HIGH_SURROGATE_ESCAPE = re.compile(r'\\u[dD][89abAB][0-9a-fA-F]{2}$')
+_LITERALS = {'true': True, 'false': False, 'null': None}
+
+class JSONStreamReader:
+    """
+    Pull parser over JSON text that arrives in chunks.
+
+    Only the values the caller asks for are materialized: containers are walked
+    with iter_array()/iter_object(), unwanted values are skipped without being
+    decoded, and large strings can be decoded straight into a file.
+    """
+
+    def __init__(self, chunks: Iterable[str]):
+        self._chunks = iter(chunks)
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+
+    @classmethod
+    def from_response(cls, response, chunk_size: int = DEFAULT_CHUNK_SIZE) -> 'JSONStreamReader':
+        """Create a reader over the body of a streamed requests response"""
+        decoder = codecs.getincrementaldecoder('utf-8')()
+
+        def chunks():
+            for data in response.iter_content(chunk_size=chunk_size):
+                yield decoder.decode(data)
+            yield decoder.decode(b'', final=True)
+
+        return cls(chunks())
+
+    def _fill(self) -> bool:
+        """Append the next chunk to the buffer, dropping consumed text. Returns False at EOF."""
+        while not self._eof:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self._eof = True
+            elif chunk:
+                self._buf = self._buf[self._pos:] + chunk
+                self._pos = 0
+                return True
+        return False
+
+    def _ensure(self, n: int) -> bool:
+        while len(self._buf) - self._pos < n:
+            if not self._fill():
+                return False
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it ('' at EOF)"""
+        while True:
+            self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' but found {found!r} in JSON stream")
+        self._pos += 1
+
+    def _iter_container(self, open_char: str, close_char: str) -> Iterator[None]:
+        self._expect(open_char)
+        if self.peek() == close_char:
+            self._pos += 1
+            return
+        while True:
+            yield
+            char = self.peek()
+            self._pos += 1
+            if char == close_char:
+                return
+            if char != ',':
+                raise ValueError(f"Expected ',' or '{close_char}' but found {char!r} in JSON stream")
+
+    def iter_array(self) -> Iterator[None]:
+        """Iterate over an array; the caller must consume each element before advancing"""
+        return self._iter_container('[', ']')
+
+    def iter_object(self) -> Iterator[str]:
+        """Iterate over the keys of an object; the caller must consume each value before advancing"""
+        for _ in self._iter_container('{', '}'):
+            key = self.read_string()
+            self._expect(':')
+            yield key
+
+    def read_string(self, sink: Optional[TextIO] = None) -> Optional[str]:
+        """
+        Decode a string value. With a sink, decoded text is written to it piece by
+        piece and None is returned; otherwise the string is returned.
+        """
+        self._expect('"')
+        pieces = []
+        write = sink.write if sink is not None else pieces.append
+        while True:
+            end = self._scan_string_body()
+            if end < len(self._buf) and self._buf[end] == '"':
+                text, self._pos = scanstring(self._buf, self._pos)
+                write(text)
+                break
+            cut = self._safe_cut(end)
+            if cut > self._pos:
+                text, _ = scanstring(self._buf[self._pos:cut] + '"', 0)
+                write(text)
+                self._pos = cut
+            if not self._fill():
+                raise ValueError("Unterminated string in JSON stream")
+        return None if sink is not None else ''.join(pieces)
+
+    def _scan_string_body(self) -> int:
+        """
+        Index just past the longest run of string characters and complete escapes
+        from the current position: the closing quote if it is buffered, otherwise
+        the end of the buffer or the start of an escape cut by the chunk boundary.
+        """
+        return _STRING_BODY.match(self._buf, self._pos).end()
+
+    def _safe_cut(self, cut: int) -> int:
+        """Back off from cut so a \\uXXXX escape or a surrogate pair is not split"""
+        start = self._buf.rfind('\\u', max(self._pos, cut - 5), cut)
+        if start >= 0 and self._escape_starts_at(start):
+            cut = start
+        # Keep a high surrogate escape together with the low surrogate that follows it
+        match = _HIGH_SURROGATE_ESCAPE.search(self._buf, self._pos, cut)
+        if match and self._escape_starts_at(match.start()):
+            cut = match.start()
+        return cut
+
+    def _escape_starts_at(self, index: int) -> bool:
+        """Whether the character at index is not escaped by a preceding backslash"""
+        backslashes = 0
+        while index - backslashes - 1 >= self._pos and self._buf[index - backslashes - 1] == '\\':
+            backslashes += 1
+        return backslashes % 2 == 0
+
+    def skip_value(self) -> None:
+        """Consume the next value without materializing it"""
+        char = self.peek()
+        if char == '"':
+            self._pos += 1
+            while True:
+                self._pos = self._scan_string_body()
+                if self._pos < len(self._buf) and self._buf[self._pos] == '"':
+                    self._pos += 1
+                    return
+                if not self._fill():
+                    raise ValueError("Unterminated string in JSON stream")
+        elif char == '[':
+            for _ in self.iter_array():
+                self.skip_value()
+        elif char == '{':
+            for _ in self.iter_object():
+                self.skip_value()
+        else:
+            self._read_scalar()
+
+    def read_value(self) -> Any:
+        """Materialize the next value"""
+        char = self.peek()
+        if char == '"':
+            return self.read_string()
+        if char == '[':
+            return [self.read_value() for _ in self.iter_array()]
+        if char == '{':
+            return {key: self.read_value() for key in self.iter_object()}
+        return self._read_scalar()
+
+    def _read_scalar(self) -> Any:
+        self.peek()
+        # Make sure a number or literal is not cut at the end of the buffer
+        self._ensure(2)
+        while True:
+            match = _NUMBER.match(self._buf, self._pos)
+            if match:
+                # The number may continue in the next chunk (e.g. "12" + ".5" or "1e" + "-3")
+                tail = self._buf[match.end():match.end() + 1]
+                if tail in ('', '.', 'e', 'E') and self._fill():
+                    continue
+                self._pos = match.end()
+                text = match.group()
+                return float(text) if any(c in text for c in '.eE') else int(text)
+            for literal, value in _LITERALS.items():
+                if self._ensure(len(literal)) and self._buf.startswith(literal, self._pos):
+                    self._pos += len(literal)
+                    return value
+            raise ValueError(f"Invalid JSON value at {self._buf[self._pos:self._pos + 20]!r}")
+
+
+def spooled_text_file(max_size: int = DEFAULT_SPOOL_SIZE):
+    """Text file kept in memory up to max_size characters, then rolled over to disk"""
+    return tempfile.SpooledTemporaryFile(max_size=max_size, mode='w+', encoding='utf-8')
+
+def read_memory_item(reader: JSONStreamReader, content_fields: Iterable[str], spool_size: int = DEFAULT_SPOOL_SIZE,
+                     open_content: Optional[Callable[[str], TextIO]] = None, name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Read one memory object. For each of content_fields, only the first entry of its
+    "content" list is kept, spooled to a temporary file; the other entries are skipped.
+    Of everything else, only scalar metadata (name, ids, timestamps) is decoded: other
+    fields, and nested objects and lists, are skipped without being decoded.
+
+    With a name, content fields of a memory not called `name` are skipped once its name
+    is known. With open_content, a string entry of the memory called `name` is instead
+    decoded into open_content(field) as it arrives, and that file is closed at the end
+    of the string. Entries read before the name is known are spooled, then copied to
+    open_content(field) if the name matches.
+    """
+    content_fields = set(content_fields)
+    item = {}
+    spooled = []
+    for key in reader.iter_object():
+        if key in content_fields and reader.peek() == '{':
+            if name is not None and "name" in item and item["name"] != name:
+                reader.skip_value()
+                continue
+            field = {}
+            for field_key in reader.iter_object():
+                if field_key == "content" and reader.peek() == '[':
+                    field["content"] = []
+                    for index, _ in enumerate(reader.iter_array()):
+                        if index == 0 and reader.peek() == '"' and open_content is not None and item.get("name") == name:
+                            out = open_content(key)
+                            reader.read_string(out)
+                            out.close()
+                            field["content"].append(out)
+                        elif index == 0 and reader.peek() == '"':
+                            spool = spooled_text_file(spool_size)
+                            reader.read_string(spool)
+                            spool.seek(0)
+                            field["content"].append(spool)
+                            spooled.append(key)
+                        elif index == 0:
+                            field["content"].append(reader.read_value())
+                        else:
+                            reader.skip_value()
+                else:
+                    _read_scalar_or_skip(reader, field, field_key)
+            item[key] = field
+        else:
+            _read_scalar_or_skip(reader, item, key)
+    if open_content is not None and item.get("name") == name:
+        for key in spooled:
+            content = item[key]["content"]
+            with content[0] as spool:
+                out = open_content(key)
+                for piece in iter(lambda: spool.read(DEFAULT_CHUNK_SIZE), ''):
+                    out.write(piece)
+                out.close()
+            content[0] = out
+    return item
+
+def _read_scalar_or_skip(reader: JSONStreamReader, target: Dict[str, Any], key: str) -> None:
+    if reader.peek() in '{[':
+        reader.skip_value()
+    else:
+        target[key] = reader.read_value()
+
+def close_memory_item(item: Dict[str, Any]) -> None:
+    """Close the spooled files of a memory item returned by read_memory_item"""
+    for value in item.values():
+        if isinstance(value, dict):
+            for content in value.get("content") or []:
+                if hasattr(content, 'close'):
+                    content.close()
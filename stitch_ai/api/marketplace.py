@@ -1,13 +1,31 @@
+import json
+import time
+import uuid
+import hashlib
 import requests
-from typing import Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterable, List, Optional
 from .client import BaseAPIClient
+from .retry import is_retryable, retry_delay
+from .tracing import carry_context
+
+DEFAULT_BATCH_WORKERS = 8
+DEFAULT_RETRIES = 3
+IDEMPOTENCY_FIELD = "idempotencyKey"
+
+def idempotency_key(operation: str, body: Dict[str, Any]) -> str:
+    """
+    Stable key for an operation on a body, so a rerun of the same batch file is
+    recognised as a duplicate; identical bodies share the key
+    """
+    digest = hashlib.sha256(json.dumps([operation, body], sort_keys=True, separators=(",", ":")).encode("utf-8"))
+    return f"{operation}-{digest.hexdigest()[:32]}"
 
 class MarketplaceAPIClient(BaseAPIClient):
     def get_memory_space_lists(self, type_: str, paginate: Optional[str] = None, sort: Optional[str] = None, filters: Optional[str] = None) -> Dict[str, Any]:
         """
         Get listed memory spaces or external memories (/marketplace)
         """
-        url = f"{self.base_url}/marketplace"
         params = {"type": type_, "userId": self.user_id}
         if paginate:
             params["paginate"] = paginate
@@ -15,28 +33,102 @@ class MarketplaceAPIClient(BaseAPIClient):
             params["sort"] = sort
         if filters:
             params["filters"] = filters
-        response = requests.get(url, params=params, headers=self.get_headers())
-        response.raise_for_status()
-        return response.json()
+        return self._request("GET", "/marketplace", params=params, decode=True)
+
+    def get_memory_space_page(self, type_: str, page: int, page_size: int, sort: Optional[str] = None,
+                              filters: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get one page of listed memory spaces (/marketplace)
+
+        Args:
+            type_ (str): AGENT_MEMORY or EXTERNAL_MEMORY
+            page (int): 1-based page number
+            page_size (int): Spaces per page
+        """
+        paginate = json.dumps({"page": page, "limit": page_size})
+        return self.get_memory_space_lists(type_, paginate, sort, filters)
 
-    def list_memory(self, body: Dict[str, Any]) -> Dict[str, Any]:
+    def list_memory(self, body: Dict[str, Any], idempotency_key: Optional[str] = None) -> Dict[str, Any]:
         """
         List agent memory or external memory (/marketplace/list)
         """
-        url = f"{self.base_url}/marketplace/list"
-        params = {"userId": self.user_id, "apiKey": self.api_key}
-        payload = body
-        response = requests.post(url, params=params, json=payload, headers=self.get_headers())
-        response.raise_for_status()
+        self._post_marketplace("list", body, idempotency_key)
         return {"body": body}
 
-    def purchase_memory(self, body: Dict[str, Any]) -> Dict[str, Any]:
+    def purchase_memory(self, body: Dict[str, Any], idempotency_key: Optional[str] = None) -> Dict[str, Any]:
         """
         Purchase a listed memory (/marketplace/purchase)
         """
-        url = f"{self.base_url}/marketplace/purchase"
+        self._post_marketplace("purchase", body, idempotency_key)
+        return {"body": body}
+
+    def list_many(self, bodies: Iterable[Dict[str, Any]], workers: int = DEFAULT_BATCH_WORKERS,
+                  retries: int = DEFAULT_RETRIES, key_from_content: bool = False) -> List[Dict[str, Any]]:
+        """
+        List many memories concurrently (see purchase_many)
+        """
+        return self._post_many("list", bodies, workers, retries, key_from_content)
+
+    def purchase_many(self, bodies: Iterable[Dict[str, Any]], workers: int = DEFAULT_BATCH_WORKERS,
+                      retries: int = DEFAULT_RETRIES, key_from_content: bool = False) -> List[Dict[str, Any]]:
+        """
+        Purchase many listed memories concurrently over the shared connection pool
+
+        Each request carries an Idempotency-Key header: the body's "idempotencyKey"
+        field if present (it is not sent in the body), otherwise a new random key per
+        item. Connection errors, timeouts and 429/5xx responses are retried with
+        exponential backoff under the item's key, so a retried purchase is not charged twice.
+
+        Args:
+            bodies (Iterable[Dict[str, Any]]): Request bodies
+            workers (int): Maximum concurrent requests
+            retries (int): Retries per item after the first attempt
+            key_from_content (bool): Derive missing keys from the bodies (see idempotency_key), so a
+                rerun of the same bodies is deduplicated; identical bodies are then sent once
+
+        Returns:
+            List[Dict[str, Any]]: One report per body, in input order, with index, ok,
+                idempotency_key, attempts and either body or error
+        """
+        return self._post_many("purchase", bodies, workers, retries, key_from_content)
+
+    def _post_marketplace(self, operation: str, body: Dict[str, Any], idempotency_key: Optional[str] = None,
+                          retries: int = 0) -> requests.Response:
         params = {"userId": self.user_id, "apiKey": self.api_key}
-        payload = body
-        response = requests.post(url, params=params, json=payload, headers=self.get_headers())
-        response.raise_for_status()
-        return {"body": body} 
\ No newline at end of file
+        headers = self.get_headers()
+        if idempotency_key:
+            headers["Idempotency-Key"] = idempotency_key
+        return self._request("POST", "/marketplace/{operation}", {"operation": operation}, retries=retries,
+                             params=params, json=body, headers=headers)
+
+    def _post_many(self, operation: str, bodies: Iterable[Dict[str, Any]], workers: int, retries: int,
+                   key_from_content: bool = False) -> List[Dict[str, Any]]:
+        items = []
+        for body in bodies:
+            body = dict(body)
+            key = body.pop(IDEMPOTENCY_FIELD, None)
+            if not key:
+                key = idempotency_key(operation, body) if key_from_content else f"{operation}-{uuid.uuid4().hex}"
+            items.append((body, key))
+        workers = max(1, min(workers, len(items) or 1))
+        # One pooled connection per worker, so concurrent calls reuse connections
+        self.connection.ensure_pool_size(workers)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            post = carry_context(lambda item: self._post_with_retries(operation, item[0], item[1], retries))
+            reports = list(executor.map(post, items))
+        for index, report in enumerate(reports):
+            report["index"] = index
+        return reports
+
+    def _post_with_retries(self, operation: str, body: Dict[str, Any], key: str, retries: int) -> Dict[str, Any]:
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                self._post_marketplace(operation, body, key, retries=attempts - 1)
+                return {"ok": True, "idempotency_key": key, "attempts": attempts, "body": body}
+            except requests.RequestException as e:
+                status = e.response.status_code if e.response is not None else None
+                if not is_retryable(e) or attempts > retries:
+                    return {"ok": False, "idempotency_key": key, "attempts": attempts, "status": status, "error": str(e)}
+                time.sleep(retry_delay(e.response, attempts))
@@ -1,15 +1,42 @@
-import requests
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from .client import BaseAPIClient
+from .body import JSONStreamBody, is_streamable
 
 class MemoryAPIClient(BaseAPIClient):
     def push_memory(self, repository: str, message: str, files: list) -> Dict[str, Any]:
         """
         Commit memory to a memory space (/memory/{repository}/create)
+
+        The result includes the "oid" of the new commit when the server returns it.
         """
-        url = f"{self.base_url}/memory/{repository}/create"
+        endpoint, path = "/memory/{repository}/create", {"repository": repository}
         params = {"userId": self.user_id, "apiKey": self.api_key}
         payload = {"files": files, "message": message}
-        response = requests.post(url, params=params, json=payload, headers=self.get_headers())
-        response.raise_for_status()
-        return {"repository": repository, "message": message, "files": files}
+        if any(is_streamable(f.get("content")) for f in files):
+            # Stream large file contents into the body instead of serializing them up front
+            response = self._request("POST", endpoint, path, params=params, data=JSONStreamBody(payload))
+        else:
+            response = self._request("POST", endpoint, path, params=params, json=payload)
+        result = {"repository": repository, "message": message, "files": [_file_summary(f) for f in files]}
+        oid = _commit_oid(response)
+        if oid:
+            result["oid"] = oid
+        return result
+
+def _commit_oid(response) -> Optional[str]:
+    """The oid of the commit a push created, if the response names it"""
+    try:
+        body = response.json()
+    except ValueError:
+        return None
+    return body.get("oid") if isinstance(body, dict) else None
+
+def _file_summary(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """A pushed file without its content, which may be a memory map closed after the push"""
+    content = entry.get("content")
+    summary = {"filePath": entry.get("filePath")}
+    if is_streamable(content):
+        summary.update({"path": getattr(content, "file_path", None), "bytes": getattr(content, "size", None)})
+    elif isinstance(content, str):
+        summary["bytes"] = len(content.encode("utf-8"))
+    return summary
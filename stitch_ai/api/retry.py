@@ -0,0 +1,26 @@
+"""
+Retry policy shared by the marketplace batch requests and the push queue:
+which failed requests are worth sending again, and how long to wait first.
+"""
+import random
+from typing import Optional
+import requests
+
+# Statuses worth retrying: rate limiting and gateway/availability errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether a failed request is worth retrying: a connection error or timeout, or a retryable status"""
+    if not isinstance(error, requests.RequestException):
+        return False
+    status = error.response.status_code if error.response is not None else None
+    return status is None or status in RETRY_STATUSES
+
+def retry_delay(response: Optional[requests.Response], attempt: int) -> float:
+    """Retry-After if the server sent seconds, otherwise exponential backoff with jitter"""
+    if response is not None:
+        try:
+            return min(float(response.headers.get("Retry-After", "")), 60.0)
+        except ValueError:
+            pass
+    return min(0.5 * 2 ** (attempt - 1), 30.0) * random.uniform(0.5, 1.0)
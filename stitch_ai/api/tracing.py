@@ -0,0 +1,311 @@
+"""
+Request tracing for the API clients. Every request made through
+BaseAPIClient._request produces a RequestEvent, passed to the hooks
+registered with add_request_hook, and to those registered for the current
+context with scoped_request_hook. Two exporters are included:
+MetricsRegistry (in-process aggregates per endpoint) and
+OpenTelemetryExporter (one client span per request).
+"""
+import time
+import random
+import functools
+import contextvars
+import threading
+import contextlib
+from typing import Any, Callable, Dict, List, Optional
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Phases in request order; each is in seconds and 0 when it did not happen
+PHASES = ("serialize", "connect", "tls", "server", "download", "parse")
+
+RequestHook = Callable[["RequestEvent"], None]
+
+_hooks: List[RequestHook] = []
+_hooks_lock = threading.Lock()
+_local = threading.local()
+_scoped_hooks: contextvars.ContextVar = contextvars.ContextVar("stitch_request_hooks", default=())
+
+def add_request_hook(hook: RequestHook) -> None:
+    """Call hook(event) after every API request in this process"""
+    with _hooks_lock:
+        _hooks.append(hook)
+
+def remove_request_hook(hook: RequestHook) -> None:
+    with _hooks_lock:
+        if hook in _hooks:
+            _hooks.remove(hook)
+
+@contextlib.contextmanager
+def request_hook(hook: RequestHook):
+    """Register hook for the duration of a with block"""
+    add_request_hook(hook)
+    try:
+        yield hook
+    finally:
+        remove_request_hook(hook)
+
+@contextlib.contextmanager
+def scoped_request_hook(hook: RequestHook):
+    """
+    Register hook for the requests made in this context during a with block: by this
+    thread, and by functions it hands to other threads wrapped with carry_context.
+    Requests of other threads sharing the process (daemon or batch commands) are not seen.
+    """
+    token = _scoped_hooks.set(_scoped_hooks.get() + (hook,))
+    try:
+        yield hook
+    finally:
+        _scoped_hooks.reset(token)
+
+def carry_context(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """fn wrapped to run in the caller's context, so scoped hooks see the requests it makes on another thread"""
+    context = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        # A context can only be entered by one thread at a time
+        return context.copy().run(fn, *args, **kwargs)
+    return run
+
+def has_request_hooks() -> bool:
+    return bool(_hooks) or bool(_scoped_hooks.get())
+
+def emit_request_event(event: "RequestEvent") -> None:
+    """Pass an event to every hook; a failing hook never fails the request"""
+    for hook in list(_hooks) + list(_scoped_hooks.get()):
+        try:
+            hook(event)
+        except Exception:
+            pass
+
+class RequestEvent:
+    """
+    One API request
+
+    Attributes:
+        method (str): HTTP method
+        endpoint (str): Path template, e.g. /git/{repository}/log
+        url (str): Requested URL, without the query string
+        status (Optional[int]): Response status, None if no response arrived
+        bytes_out (int): Request body size
+        bytes_in (int): Response body bytes read from the connection
+        retries (int): Earlier attempts of the same request
+        error (Optional[str]): Error message if the request failed
+        new_connection (bool): Whether a connection was opened for this request
+        start (float): Start time (seconds since the epoch)
+        timings (Dict[str, float]): Seconds per phase (see PHASES) plus "total"
+    """
+
+    def __init__(self, method: str, endpoint: str, url: str, retries: int = 0):
+        self.method = method
+        self.endpoint = endpoint
+        self.url = url
+        self.status = None
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.retries = retries
+        self.error = None
+        self.new_connection = False
+        self.start = time.time()
+        self.timings = {phase: 0.0 for phase in PHASES}
+        self.timings["total"] = 0.0
+
+    @property
+    def name(self) -> str:
+        return f"{self.method} {self.endpoint}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"method": self.method, "endpoint": self.endpoint, "url": self.url, "status": self.status,
+                "bytes_out": self.bytes_out, "bytes_in": self.bytes_in, "retries": self.retries,
+                "error": self.error, "new_connection": self.new_connection, "start": self.start,
+                "timings": dict(self.timings)}
+
+    def attributes(self) -> Dict[str, Any]:
+        """OpenTelemetry HTTP client span attributes, plus per-phase timings in milliseconds"""
+        attributes = {
+            "http.request.method": self.method,
+            "url.full": self.url,
+            "url.template": self.endpoint,
+            "http.request.body.size": self.bytes_out,
+            "http.response.body.size": self.bytes_in,
+            "http.request.resend_count": self.retries,
+            "stitch.new_connection": self.new_connection,
+        }
+        if self.status is not None:
+            attributes["http.response.status_code"] = self.status
+        if self.error is not None:
+            attributes["error.type"] = str(self.status) if self.status else "request_error"
+        for phase, seconds in self.timings.items():
+            attributes[f"stitch.timing.{phase}_ms"] = round(seconds * 1000, 3)
+        return attributes
+
+    def to_span(self) -> Dict[str, Any]:
+        """The event as a span in OTLP JSON shape, for exporting without the OpenTelemetry SDK"""
+        start_ns = int(self.start * 1e9)
+        return {
+            "traceId": f"{random.getrandbits(128):032x}",
+            "spanId": f"{random.getrandbits(64):016x}",
+            "name": self.name,
+            "kind": "SPAN_KIND_CLIENT",
+            "startTimeUnixNano": str(start_ns),
+            "endTimeUnixNano": str(start_ns + int(self.timings["total"] * 1e9)),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes().items()],
+            "status": {"code": "STATUS_CODE_ERROR", "message": self.error} if self.error else {"code": "STATUS_CODE_UNSET"},
+        }
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+class MetricsRegistry:
+    """
+    In-process request metrics: counts, errors, bytes and latency per
+    method and endpoint template. Register it with add_request_hook.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Dict[str, Any]] = {}
+
+    def __call__(self, event: RequestEvent) -> None:
+        with self._lock:
+            metric = self._metrics.get(event.name)
+            if metric is None:
+                metric = self._metrics[event.name] = {
+                    "count": 0, "errors": 0, "retries": 0, "bytes_out": 0, "bytes_in": 0,
+                    "durations": [], "phases": {phase: 0.0 for phase in PHASES}}
+            metric["count"] += 1
+            metric["errors"] += event.error is not None
+            metric["retries"] += event.retries > 0
+            metric["bytes_out"] += event.bytes_out
+            metric["bytes_in"] += event.bytes_in
+            metric["durations"].append(event.timings["total"])
+            for phase in PHASES:
+                metric["phases"][phase] += event.timings[phase]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._metrics.clear()
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """
+        Per-endpoint totals, slowest total time first
+
+        Returns:
+            List[Dict[str, Any]]: request, count, errors, retries, bytes_out, bytes_in,
+                total_ms, p50_ms, p95_ms, max_ms and the mean milliseconds of each phase
+        """
+        with self._lock:
+            rows = []
+            for name, metric in self._metrics.items():
+                durations = sorted(metric["durations"])
+                row = {"request": name, "count": metric["count"], "errors": metric["errors"],
+                       "retries": metric["retries"], "bytes_out": metric["bytes_out"], "bytes_in": metric["bytes_in"],
+                       "total_ms": round(sum(durations) * 1000, 3),
+                       "p50_ms": round(_percentile(durations, 0.5) * 1000, 3),
+                       "p95_ms": round(_percentile(durations, 0.95) * 1000, 3),
+                       "max_ms": round(durations[-1] * 1000, 3)}
+                for phase in PHASES:
+                    row[f"{phase}_ms"] = round(metric["phases"][phase] / metric["count"] * 1000, 3)
+                rows.append(row)
+        return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
+
+    def format_summary(self) -> str:
+        """The summary as a text table"""
+        rows = self.summary()
+        if not rows:
+            return "No API requests"
+        width = max(len(row["request"]) for row in rows)
+        columns = ["count", "errors", "p50_ms", "p95_ms"] + [f"{phase}_ms" for phase in PHASES] + ["bytes_in"]
+        lines = [f"{'request':<{width}}" + "".join(f"{column.replace('_ms', ''):>11}" for column in columns)]
+        for row in rows:
+            lines.append(f"{row['request']:<{width}}" + "".join(
+                f"{row[column]:>11.1f}" if column.endswith("_ms") else f"{row[column]:>11}" for column in columns))
+        total = sum(row["total_ms"] for row in rows)
+        lines.append(f"{sum(row['count'] for row in rows)} requests, {total:.1f} ms total (phases are mean ms per request)")
+        return "\n".join(lines)
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+class OpenTelemetryExporter:
+    """
+    Record each request as an OpenTelemetry client span, a child of the span
+    that is current when the request is made. Requires opentelemetry-api; spans
+    are exported by whatever tracer provider the application configured.
+    """
+
+    def __init__(self, tracer: Any = None):
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            raise Exception("The OpenTelemetry exporter requires `pip install opentelemetry-api`")
+        self._trace = trace
+        self.tracer = tracer or trace.get_tracer("stitch_ai")
+
+    def __call__(self, event: RequestEvent) -> None:
+        start_ns = int(event.start * 1e9)
+        span = self.tracer.start_span(event.name, kind=self._trace.SpanKind.CLIENT, start_time=start_ns,
+                                      attributes=event.attributes())
+        if event.error is not None:
+            span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, event.error))
+        span.end(end_time=start_ns + int(event.timings["total"] * 1e9))
+
+# Connection timing. urllib3 opens connections lazily on the requesting thread,
+# so the connection classes below add their connect and TLS time to a thread-local.
+
+def start_connection_timing() -> None:
+    _local.connect = _local.tls = 0.0
+    _local.opened = False
+
+def connection_timing() -> tuple:
+    """(connect seconds, TLS seconds, whether a connection was opened) since start_connection_timing"""
+    return getattr(_local, "connect", 0.0), getattr(_local, "tls", 0.0), getattr(_local, "opened", False)
+
+class _TimedConnectionMixin:
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            _local.connect = getattr(_local, "connect", 0.0) + time.perf_counter() - start
+            _local.opened = True
+
+    def connect(self):
+        start = time.perf_counter()
+        connect_before = getattr(_local, "connect", 0.0)
+        try:
+            return super().connect()
+        finally:
+            # connect() covers DNS, TCP (timed in _new_conn) and the TLS handshake
+            tls = time.perf_counter() - start - (getattr(_local, "connect", 0.0) - connect_before)
+            _local.tls = getattr(_local, "tls", 0.0) + max(tls, 0.0)
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+class TracingAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections report DNS/TCP connect and TLS handshake time"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _TimedHTTPConnectionPool, "https": _TimedHTTPSConnectionPool}
@@ -1,33 +1,26 @@
-import requests
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Callable, Optional, Iterable, TextIO
 from .client import BaseAPIClient
+from .json_stream import JSONStreamReader, DEFAULT_SPOOL_SIZE, read_memory_item, close_memory_item
 
 class UserAPIClient(BaseAPIClient):
     def get_user(self) -> Dict[str, Any]:
         """
         Get user info (/user)
         """
-        url = f"{self.base_url}/user"
         params = {"userId": self.user_id}
-        response = requests.get(url, params=params, headers=self.get_headers())
-        response.raise_for_status()
-        return response.json()
+        return self._request("GET", "/user", params=params, decode=True)
 
     def get_user_stat(self) -> Dict[str, Any]:
         """
         Get user dashboard stats (/user/dashboard/stat)
         """
-        url = f"{self.base_url}/user/dashboard/stat"
         params = {"userId": self.user_id}
-        response = requests.get(url, params=params, headers=self.get_headers())
-        response.raise_for_status()
-        return response.json()
+        return self._request("GET", "/user/dashboard/stat", params=params, decode=True)
 
     def get_user_histories(self, paginate: Optional[str] = None, sort: Optional[str] = None, filters: Optional[str] = None) -> Dict[str, Any]:
         """
         Get user dashboard histories (/user/dashboard/histories)
         """
-        url = f"{self.base_url}/user/dashboard/histories"
         params = {"userId": self.user_id}
         if paginate:
             params["paginate"] = paginate
@@ -35,27 +28,45 @@ class UserAPIClient(BaseAPIClient):
             params["sort"] = sort
         if filters:
             params["filters"] = filters
-        response = requests.get(url, params=params, headers=self.get_headers())
-        response.raise_for_status()
-        return response.json()
+        return self._request("GET", "/user/dashboard/histories", params=params, decode=True)
 
     def get_user_memory(self, memory_names: Optional[str] = None) -> Dict[str, Any]:
         """
         Get user memory (/user/memory)
         """
-        url = f"{self.base_url}/user/memory/all"
         params = {"userId": self.user_id, "apiKey": self.api_key}
         if memory_names:
             params["memoryNames"] = memory_names
-        response = requests.get(url, params=params, headers=self.get_headers())
-        response.raise_for_status()
-        return response.json()
+        return self._request("GET", "/user/memory/all", params=params, decode=True)
+
+    def get_user_memory_item(self, name: str, content_fields: Iterable[str], spool_size: int = DEFAULT_SPOOL_SIZE,
+                             open_content: Optional[Callable[[str], TextIO]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Stream user memory (/user/memory/all) and return only the memory called `name`.
+        The first entry of each content field is spooled to a temporary file as it is
+        parsed, or written to open_content(field) if given. Other memories' content,
+        other fields and nested metadata are skipped without being decoded; only scalar
+        metadata such as the name is kept (see read_memory_item).
+        """
+        params = {"userId": self.user_id, "apiKey": self.api_key, "memoryNames": name}
+        with self._request("GET", "/user/memory/all", params=params, stream=True) as response:
+            reader = JSONStreamReader.from_response(response)
+            if reader.peek() != '[':
+                return None
+            for _ in reader.iter_array():
+                if reader.peek() != '{':
+                    reader.skip_value()
+                    continue
+                item = read_memory_item(reader, content_fields, spool_size, open_content, name)
+                if item.get("name") == name:
+                    return item
+                close_memory_item(item)
+        return None
 
     def get_user_purchases(self, paginate: Optional[str] = None, sort: Optional[str] = None, filters: Optional[str] = None) -> Dict[str, Any]:
         """
         Get user marketplace purchases (/user/marketplace/purchases)
         """
-        url = f"{self.base_url}/user/marketplace/purchases"
         params = {"userId": self.user_id}
         if paginate:
             params["paginate"] = paginate
@@ -63,6 +74,4 @@ class UserAPIClient(BaseAPIClient):
             params["sort"] = sort
         if filters:
             params["filters"] = filters
-        response = requests.get(url, params=params, headers=self.get_headers())
-        response.raise_for_status()
-        return response.json() 
\ No newline at end of file
+        return self._request("GET", "/user/marketplace/purchases", params=params, decode=True) 
\ No newline at end of file
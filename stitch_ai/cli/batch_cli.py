@@ -0,0 +1,100 @@
+import sys
+import json
+import shlex
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+from ..sdk import StitchSDK
+from .runner import run_command
+
+def add_batch_subparsers(subparsers, handlers):
+    # Batch command
+    batch_parser = subparsers.add_parser('batch', help='Run many commands in one process and print JSONL results')
+    batch_parser.add_argument('file', nargs='?', default='-', help='File with one command per line, shell-style or JSON (default: stdin)')
+    batch_parser.add_argument('--jobs', '-j', type=int, default=1, help='Number of commands to run in parallel; only for independent commands (default: 1)')
+    batch_parser.add_argument('--fail-fast', action='store_true', help='Stop scheduling commands after the first failure')
+
+    handlers.update({
+        'batch': handle_batch,
+    })
+
+def parse_batch_line(line: str) -> List[str]:
+    """
+    Parse one batch line into argv. Lines may be shell-style (`get-space my_space`),
+    a JSON array of arguments, or a JSON object with an "argv" array.
+    """
+    line = line.strip()
+    if line.startswith('['):
+        argv = json.loads(line)
+    elif line.startswith('{'):
+        argv = json.loads(line).get("argv")
+    else:
+        argv = shlex.split(line)
+    if not isinstance(argv, list) or not all(isinstance(arg, str) for arg in argv):
+        raise ValueError("Expected a list of string arguments")
+    return argv
+
+def read_batch_commands(lines) -> List[Tuple[int, str]]:
+    """Return (line number, line) pairs for non-empty, non-comment lines"""
+    commands = []
+    for lineno, line in enumerate(lines, start=1):
+        stripped = line.strip()
+        if stripped and not stripped.startswith('#'):
+            commands.append((lineno, stripped))
+    return commands
+
+def handle_batch(sdk: StitchSDK, args: argparse.Namespace) -> None:
+    from .main import create_parser_and_handlers
+
+    try:
+        if args.file == '-':
+            commands = read_batch_commands(sys.stdin)
+        else:
+            with open(args.file, 'r', encoding='utf-8') as f:
+                commands = read_batch_commands(f)
+    except Exception as e:
+        print(f"❌ Error reading batch file: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    parser, handlers = create_parser_and_handlers()
+    out = sys.stdout
+    failed = threading.Event()
+
+    def run(item):
+        lineno, line = item
+        result = {"line": lineno}
+        if args.fail_fast and failed.is_set():
+            result.update({"exit_code": None, "skipped": True})
+            return result
+        try:
+            argv = parse_batch_line(line)
+        except ValueError as e:
+            result.update({"exit_code": 2, "stdout": "", "stderr": f"Invalid batch line: {e}\n"})
+            return result
+        result["argv"] = argv
+        if argv[:1] in (['batch'], ['daemon']):
+            result.update({"exit_code": 2, "stdout": "", "stderr": f"'{argv[0]}' is not allowed in batch mode\n"})
+            return result
+        # Commands default to JSON output so results can be embedded as structured data
+        result.update(run_command(lambda: sdk, parser, handlers, ['--output', 'json'] + argv))
+        try:
+            result["result"] = json.loads(result["stdout"])
+            del result["stdout"]
+        except (KeyError, ValueError):
+            # Binary output stays base64-encoded in stdout_b64
+            pass
+        if result["exit_code"]:
+            failed.set()
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+        # map() yields results in input order, so output is deterministic with --jobs > 1
+        for result in executor.map(run, commands):
+            if result["exit_code"]:
+                failed.set()
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+
+    if failed.is_set():
+        sys.exit(1)
@@ -0,0 +1,274 @@
+import io
+import os
+import sys
+import base64
+import json
+import socket
+import argparse
+import threading
+import contextlib
+import socketserver
+from typing import Dict, Any, List, Optional, Callable
+from .runner import run_command, env_timeout
+
+DEFAULT_SOCKET_PATH = os.path.join(os.path.expanduser("~"), ".stitch-ai", "daemon.sock")
+DEFAULT_BASE_URL = 'https://api-demo.stitch-ai.co'
+# Seconds a command waits for the one running before the client runs it locally instead
+DEFAULT_QUEUE_TIMEOUT = 5.0
+# Settings sent with every request rather than in the forwarded environment
+_REQUEST_SETTINGS = {'STITCH_API_URL', 'STITCH_API_KEY', 'STITCH_DAEMON_SOCKET'}
+
+def get_socket_path(socket_path: Optional[str] = None) -> str:
+    """Resolve the daemon socket path from the argument, STITCH_DAEMON_SOCKET or the default"""
+    return socket_path or os.environ.get('STITCH_DAEMON_SOCKET') or DEFAULT_SOCKET_PATH
+
+def send_request(socket_path: str, request: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Send one request to the daemon and wait for its response
+
+    Args:
+        socket_path (str): Path of the daemon Unix socket
+        request (Dict[str, Any]): Request message
+        timeout (Optional[float]): Socket timeout in seconds
+
+    Returns:
+        Dict[str, Any]: Response message
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as f:
+            line = f.readline()
+    if not line:
+        raise ConnectionError("Daemon closed the connection without a response")
+    return json.loads(line)
+
+def forward_command(argv: List[str], socket_path: str) -> Optional[int]:
+    """
+    Forward a CLI command to a running daemon and replay its output
+
+    A command that reads stdin (batch or market-purchase-many without a file) is sent
+    again with this process's stdin once the daemon reports that it read stdin. The
+    STITCH_* environment of this process (STITCH_API_TIMEOUT, STITCH_EMBEDDING_URL, ...)
+    is sent along and applied while the command runs.
+
+    Returns:
+        Optional[int]: Exit code of the command, or None if no daemon is listening or it
+            is busy with another command, in which case the command should run locally
+    """
+    request = {
+        "argv": argv,
+        "cwd": os.getcwd(),
+        "base_url": os.environ.get('STITCH_API_URL'),
+        "api_key": os.environ.get('STITCH_API_KEY'),
+        "env": {name: value for name, value in os.environ.items()
+                if name.startswith('STITCH_') and name not in _REQUEST_SETTINGS},
+    }
+    try:
+        response = send_request(socket_path, request)
+    except (FileNotFoundError, ConnectionRefusedError):
+        return None
+    if response.get("stdin_required"):
+        request["stdin"] = sys.stdin.read()
+        response = send_request(socket_path, request)
+        if response.get("busy"):
+            # Hand the stdin already read to the local run
+            sys.stdin = io.StringIO(request["stdin"])
+    if response.get("busy"):
+        return None
+    if "stdout_b64" in response:
+        from .output import write_raw
+        write_raw(base64.b64decode(response["stdout_b64"]), sys.stdout)
+    else:
+        sys.stdout.write(response.get("stdout", ""))
+    sys.stdout.flush()
+    sys.stderr.write(response.get("stderr", ""))
+    return response.get("exit_code", 1)
+
+
+class _DaemonRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            response = {"exit_code": 1, "stdout": "", "stderr": f"Invalid daemon request: {e}\n"}
+        else:
+            response = self.server.handle_request_message(request)
+        self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+
+class StitchDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Long-lived local server that runs CLI commands against warm SDK instances.
+
+    A command runs in the client's working directory and with the client's STITCH_*
+    environment, both of which are process-wide, so commands run one at a time. A
+    command that cannot start within queue_timeout seconds, e.g. behind a long pull,
+    is answered as busy and the client runs it locally instead.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: Optional[str] = None, sdk_factory: Optional[Callable[[str, str], Any]] = None,
+                 queue_timeout: float = DEFAULT_QUEUE_TIMEOUT):
+        from .main import create_parser_and_handlers
+
+        self.socket_path = get_socket_path(socket_path)
+        self.sdk_factory = sdk_factory or _create_sdk
+        self.queue_timeout = queue_timeout
+        self.parser, self.handlers = create_parser_and_handlers()
+        self._sdks = {}
+        self._sdks_lock = threading.Lock()
+        self._command_lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.socket_path)), mode=0o700, exist_ok=True)
+        if os.path.exists(self.socket_path):
+            if _is_listening(self.socket_path):
+                raise Exception(f"Daemon already running at {self.socket_path}")
+            os.unlink(self.socket_path)
+        super().__init__(self.socket_path, _DaemonRequestHandler)
+        os.chmod(self.socket_path, 0o600)
+
+    def get_sdk(self, base_url: Optional[str] = None, api_key: Optional[str] = None):
+        """Return the cached SDK for a base URL and API key, creating it on first use"""
+        base_url = base_url or os.environ.get('STITCH_API_URL', DEFAULT_BASE_URL)
+        api_key = api_key or os.environ.get('STITCH_API_KEY')
+        if not api_key:
+            raise ValueError("STITCH_API_KEY environment variable is not set")
+        # SDKs are built with the request timeout, so clients with different timeouts get their own
+        key = (base_url, api_key, env_timeout())
+        with self._sdks_lock:
+            if key not in self._sdks:
+                self._sdks[key] = self.sdk_factory(base_url, api_key)
+            return self._sdks[key]
+
+    def handle_request_message(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Dispatch a control message or run a forwarded command"""
+        control = request.get("control")
+        if control == "ping":
+            return {"status": "ok", "pid": os.getpid(), "sdks": len(self._sdks)}
+        if control == "stop":
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {"status": "stopping"}
+
+        if not self._command_lock.acquire(timeout=self.queue_timeout):
+            return {"busy": True, "exit_code": 1, "stdout": "", "stderr": "Daemon is busy running another command\n"}
+        get_sdk = lambda: self.get_sdk(request.get("base_url"), request.get("api_key"))
+        stdin = _ForwardedInput(request.get("stdin"))
+        cwd = os.getcwd()
+        try:
+            os.chdir(request.get("cwd") or cwd)
+            with _client_environment(request.get("env")):
+                response = run_command(get_sdk, self.parser, self.handlers, request.get("argv") or [], stdin)
+            if stdin.missing:
+                # The client sends the request again with its stdin
+                response["stdin_required"] = True
+            return response
+        except Exception as e:
+            return {"exit_code": 1, "stdout": "", "stderr": f"Daemon error: {e}\n"}
+        finally:
+            os.chdir(cwd)
+            self._command_lock.release()
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        # Let the push queue workers finish their current upload; queued pushes stay on disk
+        for sdk in self._sdks.values():
+            close = getattr(sdk, "close", None)
+            if close is not None:
+                close()
+
+
+class _ForwardedInput(io.StringIO):
+    """
+    stdin of a forwarded command: the client's stdin if the request carries it, otherwise
+    empty, noting that the command read it so the client can send it
+    """
+
+    def __init__(self, text: Optional[str]):
+        super().__init__(text or "")
+        self.missing = False
+        self._forwarded = text is not None
+
+    def read(self, size: Optional[int] = -1) -> str:
+        self.missing = self.missing or not self._forwarded
+        return super().read(size)
+
+    def readline(self, size: Optional[int] = -1) -> str:
+        self.missing = self.missing or not self._forwarded
+        return super().readline(size)
+
+@contextlib.contextmanager
+def _client_environment(env: Optional[Dict[str, str]]):
+    """Replace the daemon's STITCH_* settings with the client's for the duration of a command"""
+    if env is None:
+        yield
+        return
+    saved = {name: value for name, value in os.environ.items()
+             if name.startswith('STITCH_') and name not in _REQUEST_SETTINGS}
+    for name in saved:
+        del os.environ[name]
+    os.environ.update(env)
+    try:
+        yield
+    finally:
+        for name in env:
+            os.environ.pop(name, None)
+        os.environ.update(saved)
+
+def _create_sdk(base_url: str, api_key: str):
+    from ..sdk import StitchSDK
+    # The daemon uploads pushes queued with push --queue in the background, so the key is checked up front
+    return StitchSDK(base_url=base_url, api_key=api_key, timeout=env_timeout(), write_behind=True, validate_key=True)
+
+def _is_listening(socket_path: str) -> bool:
+    try:
+        send_request(socket_path, {"control": "ping"}, timeout=1)
+        return True
+    except (OSError, ValueError):
+        return False
+
+def add_daemon_subparsers(subparsers, handlers):
+    # Daemon command
+    daemon_parser = subparsers.add_parser('daemon', help='Run or control the local CLI daemon')
+    daemon_parser.add_argument('action', choices=['start', 'stop', 'status'], help='Daemon action')
+    daemon_parser.add_argument('--socket', default=None, help='Path to the daemon socket (default: $STITCH_DAEMON_SOCKET or ~/.stitch-ai/daemon.sock)')
+
+    handlers.update({
+        'daemon': handle_daemon,
+    })
+
+def handle_daemon(sdk, args: argparse.Namespace) -> None:
+    socket_path = get_socket_path(args.socket)
+    try:
+        if args.action == 'start':
+            daemon = StitchDaemon(socket_path)
+            try:
+                if os.environ.get('STITCH_API_KEY'):
+                    # Warm up the default SDK so the first forwarded command is fast and a bad key fails now
+                    daemon.get_sdk()
+                print(f"🛰️ Stitch daemon listening on {socket_path}")
+                sys.stdout.flush()
+                daemon.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                daemon.server_close()
+        elif args.action == 'stop':
+            send_request(socket_path, {"control": "stop"}, timeout=5)
+            print(f"🛑 Stopped daemon at {socket_path}")
+        else:
+            response = send_request(socket_path, {"control": "ping"}, timeout=5)
+            print(f"🛰️ Daemon running at {socket_path} (pid {response['pid']})")
+    except (FileNotFoundError, ConnectionRefusedError):
+        print(f"❌ No daemon running at {socket_path}", file=sys.stderr)
+        sys.exit(1)
+    except Exception as e:
+        print(f"❌ Daemon error: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -1,5 +1,6 @@
 import sys
 from ..sdk import StitchSDK
+from .output import emit
 import argparse
 
 def add_git_subparsers(subparsers, handlers):
@@ -80,121 +81,93 @@ def add_git_subparsers(subparsers, handlers):
 
 def handle_create_repo(sdk: StitchSDK, args: argparse.Namespace) -> None:
     try:
-        print("_" * 50)
         response = sdk.git.create_repo(args.name)
-        print(f"📦 Successfully created repository: {args.name}")
-        print(response)
-        print("_" * 50)
+        emit(args, response, f"📦 Successfully created repository: {args.name}")
     except Exception as e:
         print(f"❌ Error creating repository: {e}", file=sys.stderr)
         sys.exit(1)
 
 def handle_clone_repo(sdk: StitchSDK, args: argparse.Namespace) -> None:
     try:
-        print("_" * 50)
         response = sdk.git.clone_repo(args.name, args.source_name, args.source_owner_id)
-        print(f"🔄 Successfully cloned repository: {args.name}")
-        print(response)
-        print("_" * 50)
+        emit(args, response, f"🔄 Successfully cloned repository: {args.name}")
     except Exception as e:
         print(f"❌ Error cloning repository: {e}", file=sys.stderr)
         sys.exit(1)
 
 def handle_list_branches(sdk: StitchSDK, args: argparse.Namespace) -> None:
     try:
-        print("_" * 50)
         response = sdk.git.list_branches(args.repository)
-        print(f"🌿 Branches in repository '{args.repository}':")
-        print(response)
-        print("_" * 50)
+        emit(args, response, f"🌿 Branches in repository '{args.repository}':")
     except Exception as e:
         print(f"❌ Error listing branches: {e}", file=sys.stderr)
         sys.exit(1)
 
 def handle_checkout_branch(sdk: StitchSDK, args: argparse.Namespace) -> None:
     try:
-        print("_" * 50)
         response = sdk.git.checkout_branch(args.repository, args.branch)
-        print(f"✅ Checked out branch '{args.branch}' in repository '{args.repository}'")
-        print(response)
-        print("_" * 50)
+        emit(args, response, f"✅ Checked out branch '{args.branch}' in repository '{args.repository}'")
     except Exception as e:
         print(f"❌ Error checking out branch: {e}", file=sys.stderr)
         sys.exit(1)
 
 def handle_create_branch(sdk: StitchSDK, args: argparse.Namespace) -> None:
     try:
-        print("_" * 50)
         response = sdk.git.create_branch(args.repository, args.branch_name, args.base_branch)
-        print(f"🌱 Created branch '{args.branch_name}' from '{args.base_branch}' in repository '{args.repository}'")
-        print(response)
-        print("_" * 50)
+        emit(args, response, f"🌱 Created branch '{args.branch_name}' from '{args.base_branch}' in repository '{args.repository}'")
     except Exception as e:
         print(f"❌ Error creating branch: {e}", file=sys.stderr)
         sys.exit(1)
 
 def handle_delete_branch(sdk: StitchSDK, args: argparse.Namespace) -> None:
     try:
-        print("_" * 50)
         response = sdk.git.delete_branch(args.repository, args.branch)
-        print(f"🗑️ Deleted branch '{args.branch}' in repository '{args.repository}'")
-        print(response)
-        print("_" * 50)
+        emit(args, response, f"🗑️ Deleted branch '{args.branch}' in repository '{args.repository}'")
     except Exception as e:
         print(f"❌ Error deleting branch: {e}", file=sys.stderr)
         sys.exit(1)
 
 def handle_merge(sdk: StitchSDK, args: argparse.Namespace) -> None:
     try:
-        print("_" * 50)
         response = sdk.git.merge(args.repository, args.ours, args.theirs, args.message)
-        print(f"🔀 Merged '{args.theirs}' into '{args.ours}' in repository '{args.repository}'")
-        print(response)
-        print("_" * 50)
+        emit(args, response, f"🔀 Merged '{args.theirs}' into '{args.ours}' in repository '{args.repository}'")
     except Exception as e:
         print(f"❌ Error merging branches: {e}", file=sys.stderr)
         sys.exit(1)
 
 def handle_commit_file(sdk: StitchSDK, args: argparse.Namespace) -> None:
     try:
-        print("_" * 50)
         response = sdk.git.commit_file(args.repository, args.file_path, args.content, args.message)
-        print(f"💾 Committed file '{args.file_path}' to repository '{args.repository}'")
-        print(response)
-        print("_" * 50)
+        emit(args, response, f"💾 Committed file '{args.file_path}' to repository '{args.repository}'")
     except Exception as e:
         print(f"❌ Error committing file: {e}", file=sys.stderr)
         sys.exit(1)
 
 def handle_get_log(sdk: StitchSDK, args: argparse.Namespace) -> None:
     try:
-        print("_" * 50)
         response = sdk.git.get_log(args.repository, args.depth)
-        print(f"📜 Commit log for repository '{args.repository}':")
-        print(response)
-        print("_" * 50)
+        emit(args, response, f"📜 Commit log for repository '{args.repository}':")
     except Exception as e:
         print(f"❌ Error getting log: {e}", file=sys.stderr)
         sys.exit(1)
 
 def handle_get_file(sdk: StitchSDK, args: argparse.Namespace) -> None:
     try:
-        print("_" * 50)
+        if getattr(args, 'output', 'text') == 'raw':
+            # Write the content to stdout as it downloads
+            sdk.git.stream_file(args.repository, args.file_path, args.ref, sys.stdout)
+            sys.stdout.flush()
+            return
         response = sdk.git.get_file(args.repository, args.file_path, args.ref)
-        print(f"📄 File '{args.file_path}' at ref '{args.ref}' in repository '{args.repository}':")
-        print(response)
-        print("_" * 50)
+        emit(args, response, f"📄 File '{args.file_path}' at ref '{args.ref}' in repository '{args.repository}':")
     except Exception as e:
         print(f"❌ Error getting file: {e}", file=sys.stderr)
         sys.exit(1)
 
 def handle_diff(sdk: StitchSDK, args: argparse.Namespace) -> None:
     try:
-        print("_" * 50)
         response = sdk.git.diff(args.repository, args.oid1, args.oid2)
-        print(f"🔍 Diff between '{args.oid1}' and '{args.oid2}' in repository '{args.repository}':")
-        print(response)
-        print("_" * 50)
+        emit(args, response, f"🔍 Diff between '{args.oid1}' and '{args.oid2}' in repository '{args.repository}':")
     except Exception as e:
         print(f"❌ Error getting diff: {e}", file=sys.stderr)
         sys.exit(1) 
\ No newline at end of file
@@ -2,13 +2,20 @@ import os
 import argparse
 import sys
 from dotenv import load_dotenv
-from ..sdk import StitchSDK
-from .memory_cli import add_memory_subparsers
-from .git_cli import add_git_subparsers
-from .marketplace_cli import add_marketplace_subparsers
-from .user_cli import add_user_subparsers
+from .daemon import forward_command
+from .runner import SDK_FREE_COMMANDS, env_timeout
 
 def create_parser_and_handlers():
+    # Imported lazily so that forwarding to the daemon does not load the SDK
+    from .memory_cli import add_memory_subparsers
+    from .git_cli import add_git_subparsers
+    from .marketplace_cli import add_marketplace_subparsers
+    from .user_cli import add_user_subparsers
+    from .batch_cli import add_batch_subparsers
+    from .daemon import add_daemon_subparsers
+    from .output import add_output_arguments, add_trace_arguments
+    from .profiling import add_profile_arguments
+
     parser = argparse.ArgumentParser(description="Stitch AI CLI tool")
     subparsers = parser.add_subparsers(dest='command', help='Available commands')
     handlers = {}
@@ -16,9 +23,25 @@ def create_parser_and_handlers():
     add_git_subparsers(subparsers, handlers)
     add_marketplace_subparsers(subparsers, handlers)
     add_user_subparsers(subparsers, handlers)
+    add_batch_subparsers(subparsers, handlers)
+    add_daemon_subparsers(subparsers, handlers)
+    add_output_arguments(parser, subparsers)
+    add_trace_arguments(parser, subparsers)
+    add_profile_arguments(parser, subparsers)
     return parser, handlers
 
 def main() -> None:
+    load_dotenv()
+
+    # Thin client mode: forward the command to a running daemon if one is configured
+    # Profiles are of this process, so profiled commands always run locally
+    socket_path = os.environ.get('STITCH_DAEMON_SOCKET')
+    profiling = any(arg == '--profile' or arg.startswith('--profile=') for arg in sys.argv[1:])
+    if socket_path and sys.argv[1:2] != ['daemon'] and not profiling:
+        exit_code = forward_command(sys.argv[1:], socket_path)
+        if exit_code is not None:
+            sys.exit(exit_code)
+
     parser, handlers = create_parser_and_handlers()
     args = parser.parse_args()
 
@@ -26,8 +49,18 @@ def main() -> None:
         parser.print_help()
         sys.exit(1)
 
+    from .output import traced
+    from .profiling import profiled
+    with profiled(args):
+        if args.command in SDK_FREE_COMMANDS:
+            handlers[args.command](None, args)
+            return
+        with traced(args):
+            run_with_sdk(args, handlers)
+
+def run_with_sdk(args: argparse.Namespace, handlers) -> None:
     # Initialize SDK
-    load_dotenv()
+    from ..sdk import StitchSDK
     base_url = os.environ.get('STITCH_API_URL', 'https://api-demo.stitch-ai.co')
     api_key = os.environ.get('STITCH_API_KEY')
     if not api_key:
@@ -35,7 +68,7 @@ def main() -> None:
         sys.exit(1)
 
     try:
-        sdk = StitchSDK(base_url=base_url, api_key=api_key)
+        sdk = StitchSDK(base_url=base_url, api_key=api_key, timeout=env_timeout())
     except Exception as e:
         print(f"Error initializing SDK: {e}", file=sys.stderr)
         sys.exit(1)
@@ -48,4 +81,4 @@ def main() -> None:
         sys.exit(1)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
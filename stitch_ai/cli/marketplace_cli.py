@@ -1,7 +1,12 @@
+import os
 import sys
 import argparse
 import json
 from ..sdk import StitchSDK
+from ..api.marketplace import DEFAULT_BATCH_WORKERS, DEFAULT_RETRIES
+from ..processors.market_catalog import (MarketCatalog, DEFAULT_CATALOG_PATH, DEFAULT_PAGE_SIZE,
+                                          DEFAULT_SYNC_WORKERS, SORT_COLUMNS)
+from .output import emit
 
 def add_marketplace_subparsers(subparsers, handlers):
     # List memory spaces
@@ -14,53 +19,145 @@ def add_marketplace_subparsers(subparsers, handlers):
     # List memory in a space
     list_memory_parser = subparsers.add_parser('market-list-memory', help='List memory in a marketplace space')
     list_memory_parser.add_argument('body', help='Request body (JSON string)')
+    list_memory_parser.add_argument('--idempotency-key', default=None, help='Idempotency-Key header, to make resending safe (optional)')
 
     # Purchase memory
     purchase_parser = subparsers.add_parser('market-purchase', help='Purchase memory from the marketplace')
     purchase_parser.add_argument('body', help='Request body (JSON string)')
+    purchase_parser.add_argument('--idempotency-key', default=None, help='Idempotency-Key header, to make resending safe (optional)')
+
+    # Batch listing and purchasing
+    for command, action in (('market-list-many', 'List'), ('market-purchase-many', 'Purchase')):
+        many_parser = subparsers.add_parser(command, help=f'{action} many memories from a JSONL file of request bodies')
+        many_parser.add_argument('file', nargs='?', default='-', help='File with one JSON request body per line (default: stdin)')
+        many_parser.add_argument('--workers', type=int, default=DEFAULT_BATCH_WORKERS, help=f'Concurrent requests (default: {DEFAULT_BATCH_WORKERS})')
+        many_parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES, help=f'Retries per item on connection errors, 429 and 5xx (default: {DEFAULT_RETRIES})')
+        many_parser.add_argument('--idempotency-key-from-content', action='store_true',
+                                 help='Derive missing idempotency keys from the bodies, so rerunning a file does not repeat '
+                                      'requests; identical lines are then sent once (default: a new key per line)')
+
+    # Crawl the marketplace into a local catalog
+    sync_parser = subparsers.add_parser('market-sync', help='Sync the marketplace listing into a local catalog')
+    sync_parser.add_argument('type', help='Type of memory space (e.g. AGENT_MEMORY, EXTERNAL_MEMORY)')
+    sync_parser.add_argument('--db', default=DEFAULT_CATALOG_PATH, help=f'Catalog database (default: {DEFAULT_CATALOG_PATH})')
+    sync_parser.add_argument('--workers', type=int, default=DEFAULT_SYNC_WORKERS, help=f'Concurrent page requests (default: {DEFAULT_SYNC_WORKERS})')
+    sync_parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE, help=f'Spaces per page (default: {DEFAULT_PAGE_SIZE})')
+    sync_parser.add_argument('--full', action='store_true', help='Crawl every page and drop delisted spaces instead of stopping at known updates')
+    sync_parser.add_argument('--filters', help='Filters (optional)', default=None)
+
+    # Query the local catalog
+    search_parser = subparsers.add_parser('market-search', help='Search the local marketplace catalog')
+    search_parser.add_argument('type', help='Type of memory space (e.g. AGENT_MEMORY, EXTERNAL_MEMORY)')
+    search_parser.add_argument('query', nargs='?', default=None, help='Words to match in names and descriptions (optional)')
+    search_parser.add_argument('--db', default=DEFAULT_CATALOG_PATH, help=f'Catalog database (default: {DEFAULT_CATALOG_PATH})')
+    search_parser.add_argument('--owner', default=None, help='Only spaces of this owner')
+    search_parser.add_argument('--min-price', type=float, default=None, help='Minimum price')
+    search_parser.add_argument('--max-price', type=float, default=None, help='Maximum price')
+    search_parser.add_argument('--sort', choices=SORT_COLUMNS, default='updated_at', help='Sort column (default: updated_at)')
+    search_parser.add_argument('--asc', action='store_true', help='Sort ascending (default: descending)')
+    search_parser.add_argument('--limit', type=int, default=20, help='Maximum number of results (default: 20)')
+    search_parser.add_argument('--offset', type=int, default=0, help='Results to skip')
 
     handlers.update({
+        'market-sync': handle_market_sync,
+        'market-search': handle_market_search,
         'market-list-spaces': handle_market_list_spaces,
         'market-list-memory': handle_market_list_memory,
         'market-purchase': handle_market_purchase,
+        'market-list-many': handle_market_list_many,
+        'market-purchase-many': handle_market_purchase_many,
     })
 
 def handle_market_list_spaces(sdk: StitchSDK, args: argparse.Namespace) -> None:
     try:
-        print('_' * 50)
         response = sdk.marketplace.get_memory_space_lists(
             args.type,  
             paginate=args.paginate,
             sort=args.sort,
             filters=args.filters
         )
-        print('🛒 Marketplace memory spaces:')
-        print(response)
-        print('_' * 50)
+        emit(args, response, '🛒 Marketplace memory spaces:')
     except Exception as e:
         print(f'❌ Error listing marketplace spaces: {e}', file=sys.stderr)
         sys.exit(1)
 
 def handle_market_list_memory(sdk: StitchSDK, args: argparse.Namespace) -> None:
     try:
-        print('_' * 50)
         body = json.loads(args.body)
-        response = sdk.marketplace.list_memory(body)
-        print('🛒 Marketplace memory list:')
-        print(response)
-        print('_' * 50)
+        response = sdk.marketplace.list_memory(body, args.idempotency_key)
+        emit(args, response, '🛒 Marketplace memory list:')
     except Exception as e:
         print(f'❌ Error listing marketplace memory: {e}', file=sys.stderr)
         sys.exit(1)
 
 def handle_market_purchase(sdk: StitchSDK, args: argparse.Namespace) -> None:
     try:
-        print('_' * 50)
         body = json.loads(args.body)
-        response = sdk.marketplace.purchase_memory(args.api_key, body)
-        print('🛒 Marketplace purchase result:')
-        print(response)
-        print('_' * 50)
+        response = sdk.marketplace.purchase_memory(body, args.idempotency_key)
+        emit(args, response, '🛒 Marketplace purchase result:')
     except Exception as e:
         print(f'❌ Error purchasing memory: {e}', file=sys.stderr)
-        sys.exit(1) 
\ No newline at end of file
+        sys.exit(1)
+
+def read_bodies(lines) -> list:
+    """JSON request bodies from JSONL lines, skipping blank lines and # comments"""
+    bodies = []
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            body = json.loads(line)
+        except ValueError as e:
+            raise Exception(f"Line {number} is not valid JSON: {e}")
+        if not isinstance(body, dict):
+            raise Exception(f"Line {number} is not a JSON object")
+        bodies.append(body)
+    return bodies
+
+def _handle_many(args: argparse.Namespace, run, action: str) -> None:
+    try:
+        if args.file == '-':
+            bodies = read_bodies(sys.stdin)
+        else:
+            with open(args.file, 'r', encoding='utf-8') as f:
+                bodies = read_bodies(f)
+        response = run(bodies, workers=args.workers, retries=args.retries,
+                       key_from_content=args.idempotency_key_from_content)
+    except Exception as e:
+        print(f'❌ Error reading {action} requests: {e}', file=sys.stderr)
+        sys.exit(1)
+    failed = [report for report in response if not report['ok']]
+    emit(args, response, f'🛒 {len(response) - len(failed)} of {len(response)} {action} requests succeeded')
+    if failed:
+        print(f'❌ {len(failed)} {action} requests failed', file=sys.stderr)
+        sys.exit(1)
+
+def handle_market_list_many(sdk: StitchSDK, args: argparse.Namespace) -> None:
+    _handle_many(args, sdk.marketplace.list_many, 'list')
+
+def handle_market_purchase_many(sdk: StitchSDK, args: argparse.Namespace) -> None:
+    _handle_many(args, sdk.marketplace.purchase_many, 'purchase')
+
+def handle_market_sync(sdk: StitchSDK, args: argparse.Namespace) -> None:
+    try:
+        response = sdk.marketplace.sync_catalog(args.type, args.db, workers=args.workers, page_size=args.page_size,
+                                                full=args.full, filters=args.filters)
+        emit(args, response, f"🛒 Synced {response['fetched']} marketplace spaces ({response['updated']} updated, "
+                             f"{response['removed']} removed) to {args.db}")
+    except Exception as e:
+        print(f'❌ Error syncing marketplace catalog: {e}', file=sys.stderr)
+        sys.exit(1)
+
+def handle_market_search(sdk: StitchSDK, args: argparse.Namespace) -> None:
+    try:
+        if not os.path.exists(args.db):
+            raise Exception(f"No catalog at {args.db}, run market-sync first")
+        with MarketCatalog(args.db) as catalog:
+            response = catalog.search(args.type, args.query, owner=args.owner, min_price=args.min_price,
+                                      max_price=args.max_price, sort=args.sort, descending=not args.asc,
+                                      limit=args.limit, offset=args.offset)
+        emit(args, response, f'🛒 {len(response)} marketplace spaces:')
+    except Exception as e:
+        print(f'❌ Error searching marketplace catalog: {e}', file=sys.stderr)
+        sys.exit(1)
@@ -1,6 +1,15 @@
 import sys
 from ..sdk import StitchSDK
+from .output import emit
+from ..processors.embeddings import EMBEDDING_BACKENDS
+from ..processors.chunking import CHUNKERS
+from ..processors.sinks import MEMORY_SINKS, SEARCH_METHODS
+from ..processors.memory_processor import MemoryProcessor, EPISODIC_FORMATS, TABLE_SINK
+from ..processors.pipeline import DEFAULT_EMBED_WORKERS
+from ..processors.push_queue import DEFAULT_QUEUE_PATH, FAILED
+from ..processors.backups import DEFAULT_BACKUP_BATCH_SIZE
 import argparse
+import json
 import os
 
 def add_memory_subparsers(subparsers, handlers):
@@ -34,17 +43,74 @@ def add_memory_subparsers(subparsers, handlers):
     push_parser.add_argument('--message', '-m', help='Commit message')
     push_parser.add_argument('--episodic', '-e', help='Path to episodic memory file')
     push_parser.add_argument('--character', '-c', help='Path to character memory file')
+    push_parser.add_argument('--tables', type=lambda value: [t.strip() for t in value.split(',') if t.strip()], default=None,
+                             help='Comma-separated tables or glob patterns to export from a .sqlite episodic file (default: memories)')
+    push_parser.add_argument('--export-workers', type=int, default=None, help='Tables exported concurrently (default: one per table, up to the CPU count)')
+    push_parser.add_argument('--snapshot', action='store_true', help='Export all tables from one consistent copy of the database')
+    push_parser.add_argument('--profile-json', default=None, metavar='PATH', help='Write the time and peak memory of each push stage as JSON')
+    push_parser.add_argument('--episodic-format', choices=EPISODIC_FORMATS, default='json', help='Encoding of .sqlite episodic memory: json (default) or compact columnar')
+    push_parser.add_argument('--queue', action='store_true',
+                             help='Queue the push and return; it is uploaded by queue-flush, or by the daemon '
+                                  'if it is in the default queue file')
+    push_parser.add_argument('--queue-db', default=DEFAULT_QUEUE_PATH, help=f'Push queue file (default: {DEFAULT_QUEUE_PATH})')
+    push_parser.add_argument('--branch', '-b', default=None, help='Commit to this branch of the space instead of the checked-out one; the branch is '
+                                                                       'checked out during the push, so other clients must not use the space meanwhile')
+
+    # Push queue commands
+    queue_status_parser = subparsers.add_parser('queue-status', help='Show the depth and lag of the push queue')
+    queue_status_parser.add_argument('--queue-db', default=DEFAULT_QUEUE_PATH, help=f'Push queue file (default: {DEFAULT_QUEUE_PATH})')
+    queue_flush_parser = subparsers.add_parser('queue-flush', help='Upload every queued push now')
+    queue_flush_parser.add_argument('--queue-db', default=DEFAULT_QUEUE_PATH, help=f'Push queue file (default: {DEFAULT_QUEUE_PATH})')
+    queue_flush_parser.add_argument('--timeout', type=float, default=None, help='Seconds to wait for the uploads (default: no limit)')
+    queue_flush_parser.add_argument('--retry-failed', action='store_true', help='Queue failed pushes again before flushing')
+    queue_purge_parser = subparsers.add_parser('queue-purge', help='Drop failed pushes and their file copies')
+    queue_purge_parser.add_argument('--queue-db', default=DEFAULT_QUEUE_PATH, help=f'Push queue file (default: {DEFAULT_QUEUE_PATH})')
 
     # Pull memory command
     pull_parser = subparsers.add_parser('pull', help='Pull memory from a space')
     pull_parser.add_argument('repository', help='Name of the memory space')
     pull_parser.add_argument('--db-path', '-p', required=True, help='Path to save the memory data')
+    pull_parser.add_argument('--embedding', choices=sorted(EMBEDDING_BACKENDS), default=None, help='Embedding backend (default: onnx)')
+    pull_parser.add_argument('--embedding-batch-size', type=int, default=None, help='Number of chunks embedded per batch')
+    pull_parser.add_argument('--embedding-threads', type=int, default=None, help='Threads used by the embedding backend')
+    pull_parser.add_argument('--chunker', choices=sorted(CHUNKERS), default=None, help='Chunking strategy (default: row, which chunks plain text by characters)')
+    pull_parser.add_argument('--chunk-size', type=int, default=None, help='Chunk size in characters, or in tokens for the token chunker')
+    pull_parser.add_argument('--chunk-overlap', type=int, default=None, help='Overlap between chunks (default: a tenth of the chunk size)')
+    pull_parser.add_argument('--sink', choices=sorted([*MEMORY_SINKS, TABLE_SINK]), default=None,
+                             help='Where to write: a vector store, or memories to restore the episodic tables into the SQLite database at db_path (default: numpy for .npy, otherwise chroma)')
+    pull_parser.add_argument('--profile-json', default=None, metavar='PATH', help='Write the time and peak memory of each pull stage as JSON')
+    pull_parser.add_argument('--upsert', action='store_true', help='With the memories sink, merge rows by primary key instead of replacing the tables')
+    pull_parser.add_argument('--no-pipeline', dest='pipeline', action='store_false',
+                             help='Download, chunk, embed and insert one after another instead of overlapping them')
+    pull_parser.add_argument('--embed-workers', type=int, default=DEFAULT_EMBED_WORKERS,
+                             help=f'Embedding worker threads of a pipelined pull (default: {DEFAULT_EMBED_WORKERS})')
+    pull_parser.add_argument('--ref', default=None,
+                             help='Pull the memory at this branch or commit oid; files at a commit are cached locally')
 
     # Pull external memory command
     pull_external_parser = subparsers.add_parser('pull-external', help='Pull external memory')
     pull_external_parser.add_argument('repository', help='Name of the memory space')
     pull_external_parser.add_argument('--rag-path', '-p', required=True, help='Path to save the RAG file')
 
+    # Search pulled memory command
+    search_parser = subparsers.add_parser('search', help='Search memory pulled to a local path')
+    search_parser.add_argument('db_path', help='Path the memory was pulled to')
+    search_parser.add_argument('query', help='Text to search for')
+    search_parser.add_argument('-k', type=int, default=5, help='Number of results (default: 5)')
+    search_parser.add_argument('--sink', choices=sorted(MEMORY_SINKS), default=None, help='Vector store at db_path (default: inferred from the path)')
+    search_parser.add_argument('--where', action='append', default=[], metavar='KEY=VALUE', help='Only return chunks with this metadata value (repeatable)')
+    search_parser.add_argument('--method', choices=SEARCH_METHODS, default='auto', help='exact (brute force), ann (HNSW index) or auto (default)')
+
+    # Restore a vector-store backup
+    restore_parser = subparsers.add_parser('restore-backup', help='Restore a vector store from a backup taken by pull')
+    restore_parser.add_argument('backup', help='Backup file, or a store directory to restore its latest backup')
+    restore_parser.add_argument('--db-path', '-p', default=None, help='Store to restore into (default: the store the backup was taken from)')
+    restore_parser.add_argument('--sink', choices=sorted(MEMORY_SINKS), default=None, help='Vector store at db_path (default: inferred from the path)')
+    restore_parser.add_argument('--embedding', choices=sorted(EMBEDDING_BACKENDS), default=None,
+                                help='Embed the chunks again with this backend instead of using the stored embeddings')
+    restore_parser.add_argument('--batch-size', type=int, default=DEFAULT_BACKUP_BATCH_SIZE,
+                                help=f'Chunks restored at a time (default: {DEFAULT_BACKUP_BATCH_SIZE})')
+
     handlers.update({
         'create-space': handle_create_space,
         'get-space': handle_get_space,
@@ -52,61 +118,51 @@ def add_memory_subparsers(subparsers, handlers):
         'clone-space': handle_clone_space,
         'get-history': handle_get_history,
         'push': handle_push,
+        'queue-status': handle_queue_status,
+        'queue-flush': handle_queue_flush,
+        'queue-purge': handle_queue_purge,
         'pull': handle_pull,
         'pull-external': handle_pull_external,
+        'search': handle_search,
+        'restore-backup': handle_restore_backup,
     })
 
 def handle_create_space(sdk: StitchSDK, args: argparse.Namespace) -> None:
     try:
-        print("_" * 50)
         response = sdk.memory_space.create_space(args.space, args.type)
-        print(f"🌟 Successfully created space: {args.space}")
-        print(response)
-        print("_" * 50)
+        emit(args, response, f"🌟 Successfully created space: {args.space}")
     except Exception as e:
         print(f"❌ Error creating space: {e}", file=sys.stderr)
         sys.exit(1)
 
 def handle_get_space(sdk: StitchSDK, args: argparse.Namespace) -> None:
     try:
-        print("_" * 50)
         response = sdk.memory_space.get_space(args.space, args.ref)
-        print(f"🔍 Successfully retrieved space: {args.space}") 
-        print(response)
-        print("_" * 50)
+        emit(args, response, f"🔍 Successfully retrieved space: {args.space}")
     except Exception as e:
         print(f"❌ Error getting space: {e}", file=sys.stderr)
         sys.exit(1)
 
 def handle_delete_space(sdk: StitchSDK, args: argparse.Namespace) -> None:
     try:
-        print("_" * 50)
         response = sdk.memory_space.delete_space(args.space)
-        print(f"🗑️ Successfully deleted space: {args.space}")
-        print(response)
-        print("_" * 50)
+        emit(args, response, f"🗑️ Successfully deleted space: {args.space}")
     except Exception as e:
         print(f"❌ Error deleting space: {e}", file=sys.stderr)
         sys.exit(1)
 
 def handle_clone_space(sdk: StitchSDK, args: argparse.Namespace) -> None:
     try:
-        print("_" * 50)
         response = sdk.memory_space.clone_space(args.space, args.source_name, args.source_owner_id)
-        print(f"🔄 Successfully cloned space: {args.space}")
-        print(response)
-        print("_" * 50)
+        emit(args, response, f"🔄 Successfully cloned space: {args.space}")
     except Exception as e:
         print(f"❌ Error cloning space: {e}", file=sys.stderr)
         sys.exit(1)
 
 def handle_get_history(sdk: StitchSDK, args: argparse.Namespace) -> None:
     try:
-        print("_" * 50)
         response = sdk.memory_space.get_history(args.space)
-        print(f"📜 Successfully retrieved history: {args.space}")
-        print(response)
-        print("_" * 50)
+        emit(args, response, f"📜 Successfully retrieved history: {args.space}")
     except Exception as e:
         print(f"❌ Error getting history: {e}", file=sys.stderr)
         sys.exit(1)
@@ -116,46 +172,122 @@ def handle_push(sdk: StitchSDK, args: argparse.Namespace) -> None:
         if not args.episodic and not args.character:
             raise ValueError("At least one of --episodic or --character must be provided")
 
-        print("_" * 50)
-        response = sdk.push(
-            space=args.space,
+        push_args = dict(
             message=args.message,
             episodic_path=args.episodic,
-            character_path=args.character
+            character_path=args.character,
+            episodic_format=args.episodic_format,
+            tables=args.tables,
+            export_workers=args.export_workers,
+            snapshot=args.snapshot,
+            profile_path=args.profile_json,
+            branch=args.branch
         )
-        print(f"📤 Successfully pushed memory to space: {args.space}")
-        print(response)
-        print("_" * 50)
+        if args.queue:
+            with sdk.open_push_queue(args.queue_db) as queue:
+                response = queue.enqueue(args.space, **push_args)
+            emit(args, response, f"🕒 Queued push to space: {args.space} ({response['depth']} queued)")
+            return
+        response = sdk.push(space=args.space, background=False, **push_args)
+        target = f"{args.space} ({args.branch} at {response['oid']})" if args.branch else args.space
+        emit(args, response, f"📤 Successfully pushed memory to space: {target}")
     except Exception as e:
         print(f"❌ Error pushing memory: {e}", file=sys.stderr)
         sys.exit(1)
 
+def handle_queue_status(sdk: StitchSDK, args: argparse.Namespace) -> None:
+    try:
+        with sdk.open_push_queue(args.queue_db) as queue:
+            response = {**queue.metrics(), "failed_pushes": queue.entries(FAILED)}
+        emit(args, response, f"🕒 {response['depth']} pushes queued, oldest {response['lag_seconds']}s ago, "
+                             f"{response['failed']} failed")
+    except Exception as e:
+        print(f"❌ Error reading push queue: {e}", file=sys.stderr)
+        sys.exit(1)
+
+def handle_queue_flush(sdk: StitchSDK, args: argparse.Namespace) -> None:
+    try:
+        with sdk.open_push_queue(args.queue_db) as queue:
+            if args.retry_failed:
+                queue.retry_failed()
+            response = queue.drain(args.timeout)
+        emit(args, response, f"📤 Uploaded {response['uploaded']} queued pushes, {response['failed']} failed")
+        if response['failed']:
+            sys.exit(1)
+    except Exception as e:
+        print(f"❌ Error flushing push queue: {e}", file=sys.stderr)
+        sys.exit(1)
+
+def handle_queue_purge(sdk: StitchSDK, args: argparse.Namespace) -> None:
+    try:
+        with sdk.open_push_queue(args.queue_db) as queue:
+            response = {"purged": queue.purge_failed()}
+        emit(args, response, f"🗑️ Dropped {response['purged']} failed pushes")
+    except Exception as e:
+        print(f"❌ Error purging push queue: {e}", file=sys.stderr)
+        sys.exit(1)
+
 def handle_pull(sdk: StitchSDK, args: argparse.Namespace) -> None:
     try:
-        print("_" * 50)
         response = sdk.pull_memory(
             repository=args.repository,
-            db_path=args.db_path
+            db_path=args.db_path,
+            embedding_backend=args.embedding,
+            embedding_options={"batch_size": args.embedding_batch_size, "threads": args.embedding_threads},
+            sink=args.sink,
+            chunker=args.chunker,
+            chunking_options={"chunk_size": args.chunk_size, "overlap": args.chunk_overlap},
+            upsert=args.upsert,
+            profile_path=args.profile_json,
+            pipeline=args.pipeline,
+            embed_workers=args.embed_workers,
+            ref=args.ref
         )
-        print(f"📥 Successfully pulled memory from space: {args.repository}")
-        print(f"💾 Memory data saved to: {args.db_path}")
-        print(response)
-        print("_" * 50)
+        source = args.repository
+        if args.ref:
+            cached = [memory_type for memory_type, hit in response[0]["cached"].items() if hit]
+            source += f" at {response[0]['oid'] or args.ref}" + (f" ({', '.join(cached)} from cache)" if cached else "")
+        emit(args, response, f"📥 Successfully pulled memory from space: {source}", f"💾 Memory data saved to: {args.db_path}")
     except Exception as e:
         print(f"❌ Error pulling memory: {e}", file=sys.stderr)
         sys.exit(1)
 
 def handle_pull_external(sdk: StitchSDK, args: argparse.Namespace) -> None:
     try:
-        print("_" * 50)
         response = sdk.pull_external_memory(
             repository=args.repository,
             rag_path=args.rag_path
         )
-        print(f"🌐 Successfully pulled external memory")
-        print(f"💾 External memory data saved to: {args.rag_path}")
-        print(response)
-        print("_" * 50)
+        emit(args, response, "🌐 Successfully pulled external memory", f"💾 External memory data saved to: {args.rag_path}")
     except Exception as e:
         print(f"❌ Error pulling external memory: {e}", file=sys.stderr)
         sys.exit(1)
+
+def parse_where(condition: str):
+    """Parse KEY=VALUE, reading VALUE as JSON when possible so numbers and booleans match"""
+    key, sep, value = condition.partition('=')
+    if not sep or not key:
+        raise ValueError(f"Invalid --where condition: {condition} (expected KEY=VALUE)")
+    try:
+        return key, json.loads(value)
+    except ValueError:
+        return key, value
+
+def handle_restore_backup(sdk: StitchSDK, args: argparse.Namespace) -> None:
+    try:
+        response = MemoryProcessor().restore_backup(args.backup, args.db_path, sink=args.sink,
+                                                    embedding_backend=args.embedding, batch_size=args.batch_size)
+        emit(args, response, f"♻️ Restored {response['restored']} chunks from {response['backup']} "
+                             f"in {response['seconds']}s")
+    except Exception as e:
+        print(f"❌ Error restoring backup: {e}", file=sys.stderr)
+        sys.exit(1)
+
+def handle_search(sdk: StitchSDK, args: argparse.Namespace) -> None:
+    try:
+        where = dict(parse_where(condition) for condition in args.where)
+        response = MemoryProcessor().search(args.db_path, args.query, k=args.k, sink=args.sink, method=args.method, where=where)
+        emit(args, response, f"🔎 Top {len(response)} results for: {args.query}")
+    except Exception as e:
+        print(f"❌ Error searching memory: {e}", file=sys.stderr)
+        sys.exit(1)
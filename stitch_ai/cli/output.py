@@ -0,0 +1,111 @@
+import sys
+import json
+import argparse
+import contextlib
+from typing import Any, Iterable
+
+OUTPUT_FORMATS = ['text', 'json', 'jsonl', 'raw']
+
+def add_output_arguments(parser: argparse.ArgumentParser, subparsers) -> None:
+    """
+    Add the global --output option. It is accepted both before the command
+    (`stitch --output json get-log repo`) and after it (`stitch get-log repo --output json`).
+    """
+    help_text = 'Output format: text (default), json, jsonl (one record per line) or raw (content only)'
+    parser.add_argument('--output', choices=OUTPUT_FORMATS, default='text', help=help_text)
+    for subparser in subparsers.choices.values():
+        subparser.add_argument('--output', choices=OUTPUT_FORMATS, default=argparse.SUPPRESS, help=help_text)
+
+def add_trace_arguments(parser: argparse.ArgumentParser, subparsers) -> None:
+    """Add the global --trace flag, accepted before or after the command like --output"""
+    help_text = 'Print a timing summary of the API requests made by the command to stderr'
+    parser.add_argument('--trace', action='store_true', help=help_text)
+    for subparser in subparsers.choices.values():
+        subparser.add_argument('--trace', action='store_true', default=argparse.SUPPRESS, help=help_text)
+
+@contextlib.contextmanager
+def traced(args: argparse.Namespace):
+    """
+    With --trace, collect request metrics while the block runs and print them
+    to stderr afterwards, also when the command exits with an error. Only this
+    command's requests are counted, not those of other commands running in the
+    same daemon or batch.
+    """
+    if not getattr(args, 'trace', False):
+        yield
+        return
+    from ..api.tracing import MetricsRegistry, scoped_request_hook
+    registry = MetricsRegistry()
+    try:
+        with scoped_request_hook(registry):
+            yield
+    finally:
+        print(f"⏱  Request timings (ms)\n{registry.format_summary()}", file=sys.stderr)
+
+def emit(args: argparse.Namespace, response: Any, *titles: str) -> None:
+    """
+    Write a command result to stdout in the format selected with --output
+
+    Args:
+        args (argparse.Namespace): Parsed command arguments
+        response (Any): Command result
+        *titles (str): Human readable lines shown above the result in text mode
+    """
+    output = getattr(args, 'output', 'text')
+    out = sys.stdout
+    if output == 'json':
+        write_json(response, out)
+        out.write("\n")
+    elif output == 'jsonl':
+        for record in iter_records(response):
+            write_json(record, out)
+            out.write("\n")
+    elif output == 'raw':
+        write_raw(response, out)
+    else:
+        print("_" * 50)
+        for title in titles:
+            print(title)
+        print(response)
+        print("_" * 50)
+    out.flush()
+
+def write_json(value: Any, out) -> None:
+    """Encode value as JSON piece by piece instead of building the whole string first"""
+    for chunk in json.JSONEncoder(default=str, ensure_ascii=False).iterencode(value):
+        out.write(chunk)
+
+def iter_records(response: Any) -> Iterable[Any]:
+    """
+    Split a response into JSONL records: the items of a list, the items of the single
+    list in a one-key envelope such as {"commits": [...]}, or the response itself
+    """
+    if isinstance(response, (list, tuple)):
+        return response
+    if isinstance(response, dict) and len(response) == 1:
+        value = next(iter(response.values()))
+        if isinstance(value, list):
+            return value
+    return [response]
+
+def write_raw(response: Any, out) -> None:
+    """
+    Write bytes or text content as-is, falling back to JSON for structured results
+
+    Raises:
+        ValueError: If the content is bytes and out has no binary buffer to write them to
+    """
+    if isinstance(response, dict) and "content" in response:
+        response = response["content"]
+    if isinstance(response, bytes):
+        buffer = getattr(out, 'buffer', None)
+        if buffer is None:
+            # Decoding would corrupt binary content
+            raise ValueError("Binary content cannot be written to this output as raw; use --output json")
+        out.flush()
+        buffer.write(response)
+    elif isinstance(response, str):
+        out.write(response)
+    else:
+        write_json(response, out)
+        out.write("\n")
@@ -0,0 +1,53 @@
+import io
+import sys
+import argparse
+import contextlib
+
+PROFILERS = ['cprofile', 'sample']
+DEFAULT_PROFILE_OUTPUT = {'cprofile': 'stitch-profile.pstats', 'sample': 'stitch-profile.folded'}
+
+def add_profile_arguments(parser: argparse.ArgumentParser, subparsers) -> None:
+    """Add the global --profile and --profile-output options, accepted before or after the command"""
+    profile_help = 'Run the command under cProfile or a sampling profiler and print the hottest functions to stderr'
+    output_help = 'Where to write the profile: pstats for cprofile, collapsed stacks (flamegraph input) for sample'
+    parser.add_argument('--profile', choices=PROFILERS, default=None, help=profile_help)
+    parser.add_argument('--profile-output', default=None, help=output_help)
+    for subparser in subparsers.choices.values():
+        subparser.add_argument('--profile', choices=PROFILERS, default=argparse.SUPPRESS, help=profile_help)
+        subparser.add_argument('--profile-output', default=argparse.SUPPRESS, help=output_help)
+
+@contextlib.contextmanager
+def profiled(args: argparse.Namespace, limit: int = 25):
+    """
+    With --profile, profile the block and report afterwards, also when the
+    command exits with an error. cprofile traces every call on the running
+    thread; sample takes stack samples of all threads every 5 ms.
+    """
+    profiler = getattr(args, 'profile', None)
+    if not profiler:
+        yield
+        return
+    output = getattr(args, 'profile_output', None) or DEFAULT_PROFILE_OUTPUT[profiler]
+    if profiler == 'cprofile':
+        import cProfile
+        import pstats
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            profile.dump_stats(output)
+            report = io.StringIO()
+            pstats.Stats(profile, stream=report).sort_stats('cumulative').print_stats(limit)
+            print(f"🔬 cProfile written to {output}\n{report.getvalue()}", file=sys.stderr)
+    else:
+        from ..processors.profiling import StackSampler
+        sampler = StackSampler()
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop()
+            sampler.write_folded(output)
+            print(f"🔬 {sampler.samples} stack samples written to {output}\n{sampler.format_top(limit)}", file=sys.stderr)
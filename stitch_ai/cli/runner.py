@@ -0,0 +1,142 @@
+import io
+import os
+import sys
+import base64
+import threading
+import contextlib
+from typing import Dict, Any, List, Callable, Optional
+
+# Commands that run without an initialized SDK
+SDK_FREE_COMMANDS = {'daemon', 'search', 'market-search', 'restore-backup'}
+
+def env_timeout() -> Optional[float]:
+    """API request timeout in seconds from STITCH_API_TIMEOUT, if set"""
+    value = os.environ.get('STITCH_API_TIMEOUT')
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"STITCH_API_TIMEOUT must be a number of seconds, got {value!r}")
+
+class _ThreadLocalStream(io.TextIOBase):
+    """Text stream that routes writes to a per-thread target, or to the original stream"""
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+        self._local = threading.local()
+
+    @property
+    def target(self):
+        return getattr(self._local, "stream", None) or self.fallback
+
+    def set_target(self, stream) -> None:
+        self._local.stream = stream
+
+    @property
+    def buffer(self):
+        """Binary stream under the target, or None if it only takes text"""
+        return getattr(self.target, "buffer", None)
+
+    def write(self, s: str) -> int:
+        return self.target.write(s)
+
+    def flush(self) -> None:
+        self.target.flush()
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> str:
+        return self.target.read(size)
+
+    def readline(self, size: int = -1) -> str:
+        return self.target.readline(size)
+
+_capture_lock = threading.Lock()
+_capture_depth = 0
+
+@contextlib.contextmanager
+def capture_output(stdout, stderr, stdin=None):
+    """
+    Redirect sys.stdout/sys.stderr (and sys.stdin, if given) to the given streams for
+    the current thread only, so several commands can run concurrently with separate output.
+    """
+    global _capture_depth
+    with _capture_lock:
+        if _capture_depth == 0:
+            sys.stdout = _ThreadLocalStream(sys.stdout)
+            sys.stderr = _ThreadLocalStream(sys.stderr)
+            sys.stdin = _ThreadLocalStream(sys.stdin)
+        _capture_depth += 1
+        routers = (sys.stdout, sys.stderr, sys.stdin)
+    previous = [getattr(router._local, "stream", None) for router in routers]
+    routers[0].set_target(stdout)
+    routers[1].set_target(stderr)
+    if stdin is not None:
+        routers[2].set_target(stdin)
+    try:
+        yield
+    finally:
+        for router, stream in zip(routers, previous):
+            router.set_target(stream)
+        with _capture_lock:
+            _capture_depth -= 1
+            if _capture_depth == 0:
+                sys.stdout, sys.stderr, sys.stdin = (router.fallback for router in routers)
+
+def run_command(get_sdk: Callable[[], Any], parser, handlers, argv: List[str], stdin=None) -> Dict[str, Any]:
+    """
+    Run a single CLI command in-process and capture its output
+
+    Args:
+        get_sdk (Callable[[], Any]): Returns the SDK instance passed to the command handler
+        parser: Parser returned by create_parser_and_handlers
+        handlers: Handler mapping returned by create_parser_and_handlers
+        argv (List[str]): Command line arguments, without the program name
+        stdin: Stream the command reads as stdin; None leaves the process stdin
+
+    Returns:
+        Dict[str, Any]: Exit code and captured stdout/stderr of the command; stdout that is not
+            UTF-8 (raw binary output) is returned base64-encoded as stdout_b64 instead
+    """
+    # stdout has a binary buffer, so --output raw can write bytes without decoding them
+    stdout_bytes, stderr = io.BytesIO(), io.StringIO()
+    stdout = io.TextIOWrapper(stdout_bytes, encoding="utf-8", write_through=True)
+    exit_code = 0
+    with capture_output(stdout, stderr, stdin):
+        try:
+            args = parser.parse_args(argv)
+            handler = handlers.get(args.command)
+            if not handler:
+                print(f"Unknown command: {args.command}", file=sys.stderr)
+                exit_code = 1
+            elif args.command in SDK_FREE_COMMANDS:
+                handler(None, args)
+            else:
+                from .output import traced
+                with traced(args):
+                    try:
+                        sdk = get_sdk()
+                    except Exception as e:
+                        print(f"Error initializing SDK: {e}", file=sys.stderr)
+                        sys.exit(1)
+                    handler(sdk, args)
+        except SystemExit as e:
+            exit_code = _exit_code(e)
+    stdout.flush()
+    return {"exit_code": exit_code, **_stdout_fields(stdout_bytes.getvalue()), "stderr": stderr.getvalue()}
+
+def _stdout_fields(data: bytes) -> Dict[str, str]:
+    try:
+        return {"stdout": data.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"stdout_b64": base64.b64encode(data).decode("ascii")}
+
+def _exit_code(e: SystemExit) -> int:
+    if e.code is None:
+        return 0
+    if isinstance(e.code, int):
+        return e.code
+    print(e.code, file=sys.stderr)
+    return 1
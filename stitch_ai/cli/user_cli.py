@@ -1,6 +1,7 @@
 import sys
 import argparse
 from ..sdk import StitchSDK
+from .output import emit
 
 def add_user_subparsers(subparsers, handlers):
     # Get user info
@@ -35,63 +36,48 @@ def add_user_subparsers(subparsers, handlers):
 
 def handle_user_get(sdk: StitchSDK, args: argparse.Namespace) -> None:
     try:
-        print('_' * 50)
         response = sdk.user.get_user()
-        print('👤 User info:')
-        print(response)
-        print('_' * 50)
+        emit(args, response, '👤 User info:')
     except Exception as e:
         print(f'❌ Error getting user info: {e}', file=sys.stderr)
         sys.exit(1)
 
 def handle_user_stat(sdk: StitchSDK, args: argparse.Namespace) -> None:
     try:
-        print('_' * 50)
         response = sdk.user.get_user_stat()
-        print('📊 User stat:')
-        print(response)
-        print('_' * 50)
+        emit(args, response, '📊 User stat:')
     except Exception as e:
         print(f'❌ Error getting user stat: {e}', file=sys.stderr)
         sys.exit(1)
 
 def handle_user_histories(sdk: StitchSDK, args: argparse.Namespace) -> None:
     try:
-        print('_' * 50)
         response = sdk.user.get_user_histories(
             paginate=args.paginate,
             sort=args.sort,
             filters=args.filters
         )
-        print('📜 User histories:')
-        print(response)
-        print('_' * 50)
+        emit(args, response, '📜 User histories:')
     except Exception as e:
         print(f'❌ Error getting user histories: {e}', file=sys.stderr)
         sys.exit(1)
 
 def handle_user_memory(sdk: StitchSDK, args: argparse.Namespace) -> None:
     try:
-        print('_' * 50)
         response = sdk.user.get_user_memory(memory_names=args.memory_names)
-        print('🧠 User memory:')
-        print(response)
-        print('_' * 50)
+        emit(args, response, '🧠 User memory:')
     except Exception as e:
         print(f'❌ Error getting user memory: {e}', file=sys.stderr)
         sys.exit(1)
 
 def handle_user_purchases(sdk: StitchSDK, args: argparse.Namespace) -> None:
     try:
-        print('_' * 50)
         response = sdk.user.get_user_purchases(
             paginate=args.paginate,
             sort=args.sort,
             filters=args.filters
         )
-        print('🛒 User purchases:')
-        print(response)
-        print('_' * 50)
+        emit(args, response, '🛒 User purchases:')
     except Exception as e:
         print(f'❌ Error getting user purchases: {e}', file=sys.stderr)
         sys.exit(1) 
\ No newline at end of file
@@ -6,5 +6,10 @@ Contains file and text processing utilities.
 
 from .memory_processor import MemoryProcessor
 from .text_processor import TextProcessor
+from .embeddings import EmbeddingBackend, get_embedding_backend, register_embedding_backend
+from .chunking import Chunker, get_chunker, register_chunker
+from .sinks import MemorySink, get_memory_sink, register_memory_sink
 
-__all__ = ['MemoryProcessor', 'TextProcessor']
+__all__ = ['MemoryProcessor', 'TextProcessor', 'EmbeddingBackend', 'get_embedding_backend', 'register_embedding_backend',
+           'Chunker', 'get_chunker', 'register_chunker',
+           'MemorySink', 'get_memory_sink', 'register_memory_sink']
@@ -0,0 +1,147 @@
+"""
+Backups of a vector-store collection.
+
+A backup is a JSON Lines file: a header line with the collection name, its
+metadata and the number of records, then one record per chunk with its id,
+document, metadata and embedding (base64 of the float32 bytes, which is exact
+and much quicker to parse than a list of numbers). It is written and read one batch at a
+time, so memory use does not grow with the collection. Backups written by
+older versions (one JSON object of parallel ids/documents/metadatas lists,
+usually without embeddings) can still be read.
+"""
+import os
+import json
+import base64
+import itertools
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from ..api.json_stream import JSONStreamReader, DEFAULT_CHUNK_SIZE
+
+BACKUP_FORMAT = "stitch-backup"
+BACKUP_VERSION = 1
+DEFAULT_BACKUP_BATCH_SIZE = 512
+
+# id, document, embedding (None if the backup has none), metadata
+BackupRecord = Tuple[str, Optional[str], Optional[np.ndarray], Optional[Dict[str, Any]]]
+
+def write_backup(collection, path: str, batch_size: int = DEFAULT_BACKUP_BATCH_SIZE) -> int:
+    """
+    Write a Chroma collection to a backup file, a page of records at a time
+
+    Args:
+        collection: Chroma collection
+        path (str): Backup file; written to a temporary file first, so it is complete or absent
+        batch_size (int): Records read from the collection at a time
+
+    Returns:
+        int: Records written
+    """
+    count = collection.count()
+    header = {"format": BACKUP_FORMAT, "version": BACKUP_VERSION, "collection": collection.name,
+              "metadata": dict(collection.metadata or {}), "count": count, "embeddings": True}
+    written = 0
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(json.dumps(header) + "\n")
+        for offset in range(0, count, batch_size):
+            page = collection.get(limit=batch_size, offset=offset, include=["documents", "embeddings", "metadatas"])
+            embeddings = np.asarray(page["embeddings"], dtype=np.float32)
+            for i, id_ in enumerate(page["ids"]):
+                record = {"id": id_, "document": page["documents"][i], "metadata": page["metadatas"][i],
+                          "embedding": base64.b64encode(embeddings[i].tobytes()).decode("ascii")}
+                f.write(json.dumps(record) + "\n")
+            written += len(page["ids"])
+    os.replace(path + ".tmp", path)
+    return written
+
+def latest_backup(db_dir: str, collection: Optional[str] = None) -> str:
+    """
+    The most recent backup in db_dir/backups, optionally of one collection
+
+    Raises:
+        Exception: If there is none
+    """
+    backup_dir = os.path.join(db_dir, "backups")
+    prefix = f"{collection}_backup_" if collection else ""
+    names = [name for name in os.listdir(backup_dir) if name.startswith(prefix) and name.endswith((".jsonl", ".json"))] \
+        if os.path.isdir(backup_dir) else []
+    if not names:
+        raise Exception(f"No backups in {backup_dir}")
+    return max((os.path.join(backup_dir, name) for name in names), key=os.path.getmtime)
+
+def read_backup(path: str) -> Tuple[Dict[str, Any], Iterator[BackupRecord]]:
+    """
+    Open a backup for streaming
+
+    Returns:
+        Tuple[Dict[str, Any], Iterator[BackupRecord]]: The header (collection, metadata, count and
+            whether records have embeddings) and an iterator over the records
+
+    Raises:
+        ValueError: If the file is not a backup
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        first = f.readline()
+    try:
+        header = json.loads(first)
+    except ValueError:
+        header = None
+    if isinstance(header, dict) and header.get("format") == BACKUP_FORMAT:
+        return header, _iter_jsonl_records(path)
+    return _legacy_header(path), _iter_legacy_records(path)
+
+def _iter_jsonl_records(path: str) -> Iterator[BackupRecord]:
+    with open(path, "r", encoding="utf-8") as f:
+        f.readline()
+        for number, line in enumerate(f, 2):
+            if not line.endswith("\n"):
+                raise ValueError(f"Backup {path} is truncated at line {number}")
+            record = json.loads(line)
+            yield record["id"], record.get("document"), _decode_embedding(record.get("embedding")), record.get("metadata")
+
+def _decode_embedding(embedding: Any) -> Optional[np.ndarray]:
+    if embedding is None:
+        return None
+    if isinstance(embedding, str):
+        return np.frombuffer(base64.b64decode(embedding), dtype=np.float32)
+    return np.asarray(embedding, dtype=np.float32)
+
+def _legacy_header(path: str) -> Dict[str, Any]:
+    name = os.path.basename(path)
+    collection = name.split("_backup_")[0] if "_backup_" in name else None
+    first = _iter_json_array(path, "embeddings")
+    try:
+        embeddings = next(first, None) is not None
+    finally:
+        first.close()
+    return {"format": BACKUP_FORMAT, "version": 0, "collection": collection, "metadata": {}, "count": None,
+            "embeddings": embeddings}
+
+def _iter_legacy_records(path: str) -> Iterator[BackupRecord]:
+    # The lists are parallel, so each is streamed from its own reader over the file
+    arrays = [_iter_json_array(path, key) for key in ("ids", "documents", "embeddings", "metadatas")]
+    ids, documents, embeddings, metadatas = arrays
+    try:
+        for id_ in ids:
+            yield id_, next(documents, None), _decode_embedding(next(embeddings, None)), next(metadatas, None)
+    finally:
+        for array in arrays:
+            array.close()
+
+def _iter_json_array(path: str, key: str) -> Iterator[Any]:
+    """Elements of the list at key in the JSON object in path; nothing if the key is missing or null"""
+    with open(path, "r", encoding="utf-8") as f:
+        reader = JSONStreamReader(iter(lambda: f.read(DEFAULT_CHUNK_SIZE), ""))
+        for name in reader.iter_object():
+            if name != key or reader.peek() != "[":
+                reader.skip_value()
+                continue
+            for _ in reader.iter_array():
+                yield reader.read_value()
+            return
+
+def batched(records: Iterator[BackupRecord], batch_size: int) -> Iterator[List[BackupRecord]]:
+    while True:
+        batch = list(itertools.islice(records, batch_size))
+        if not batch:
+            return
+        yield batch
@@ -0,0 +1,384 @@
+import os
+import re
+import json
+import threading
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple, Type
+from .columnar import is_columnar, decode_tables
+
+class Chunker:
+    """
+    Splits memory text into the pieces that are embedded. chunk_size and overlap
+    are measured in the chunker's own unit (characters or tokens); overlap
+    defaults to a tenth of chunk_size.
+    """
+
+    name: str = ""
+    unit: str = "characters"
+
+    def __init__(self, chunk_size: int = 2000, overlap: Optional[int] = None):
+        if overlap is None:
+            overlap = chunk_size // 10
+        if chunk_size <= 0 or not 0 <= overlap < chunk_size:
+            raise ValueError("chunk_size must be positive and overlap must be between 0 and chunk_size")
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+
+    def chunk(self, text: str) -> List[str]:
+        raise NotImplementedError
+
+    def chunk_records(self, text: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """Chunks paired with metadata describing where each one came from"""
+        return [(chunk, {}) for chunk in self(text)]
+
+    def iter_records(self, pieces: Iterable[str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        chunk_records over text that arrives in pieces, yielding chunks as soon as
+        they are complete. Chunkers that cannot cut text incrementally wait for all of it.
+        """
+        yield from self.chunk_records("".join(pieces))
+
+    def describe(self) -> Dict[str, Any]:
+        """Chunker name and constructor options"""
+        return {"chunker": self.name, "chunk_size": self.chunk_size, "overlap": self.overlap}
+
+    def __call__(self, text: str) -> List[str]:
+        return self.chunk(text) if text else []
+
+
+class CharacterChunker(Chunker):
+    """Fixed-size character windows that prefer to end at a sentence boundary"""
+
+    name = "character"
+
+    def chunk(self, text: str) -> List[str]:
+        chunk_size, overlap = self.chunk_size, self.overlap
+        chunks = []
+        start = 0
+        text_length = len(text)
+
+        while start < text_length:
+            end = start + chunk_size
+
+            if end < text_length:
+                # Look for a good breaking point
+                for i in range(min(end + 100, text_length) - 1, start + chunk_size//2, -1):
+                    if text[i] in '.!?' and text[i+1:i+2] == ' ':
+                        end = i + 1
+                        break
+            else:
+                end = text_length
+
+            chunks.append(text[start:end].strip())
+            if end >= text_length:
+                break
+            start = max(end - overlap, start + 1)
+
+            if text_length - start < chunk_size:
+                if start < text_length:
+                    chunks.append(text[start:].strip())
+                break
+
+        return chunks
+
+    def iter_records(self, pieces: Iterable[str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Same chunks as chunk(), cut once the text past each window (its break search) has arrived"""
+        chunk_size, overlap = self.chunk_size, self.overlap
+        buffer = ""
+        for piece in pieces:
+            buffer += piece
+            start = 0
+            # Whole windows, while the text may still go on past the 100-character break search
+            while len(buffer) - start > chunk_size + 101:
+                end = start + chunk_size
+                for i in range(end + 99, start + chunk_size//2, -1):
+                    if buffer[i] in '.!?' and buffer[i+1] == ' ':
+                        end = i + 1
+                        break
+                yield buffer[start:end].strip(), {}
+                start = max(end - overlap, start + 1)
+            buffer = buffer[start:]
+        # The rest is chunked exactly as chunk() would continue from here
+        for chunk in self(buffer):
+            yield chunk, {}
+
+
+class SentenceChunker(Chunker):
+    """
+    Whole sentences packed into chunks of up to chunk_size characters. Trailing
+    sentences of up to overlap characters are repeated at the start of the next chunk.
+    """
+
+    name = "sentence"
+    _SENTENCE_END = re.compile(r'(?<=[.!?])\s+|\n{2,}')
+
+    def chunk(self, text: str) -> List[str]:
+        chunks = []
+        current: List[str] = []
+        length = 0
+        for sentence in self._sentences(text):
+            if current and length + len(sentence) + 1 > self.chunk_size:
+                chunks.append(" ".join(current))
+                # Carry the last sentences over as overlap
+                carried: List[str] = []
+                carried_length = 0
+                for previous in reversed(current):
+                    if carried_length + len(previous) + 1 > self.overlap:
+                        break
+                    carried.insert(0, previous)
+                    carried_length += len(previous) + 1
+                current, length = carried, carried_length
+            current.append(sentence)
+            length += len(sentence) + 1
+        if current:
+            chunks.append(" ".join(current))
+        return chunks
+
+    def _sentences(self, text: str):
+        start = 0
+        for match in self._SENTENCE_END.finditer(text):
+            yield from self._split_long(text[start:match.start()].strip())
+            start = match.end()
+        yield from self._split_long(text[start:].strip())
+
+    def _split_long(self, sentence: str):
+        # Sentences longer than a chunk are cut into chunk-sized pieces
+        for i in range(0, len(sentence), self.chunk_size):
+            yield sentence[i:i + self.chunk_size]
+
+
+class TokenChunker(Chunker):
+    """
+    Windows of chunk_size tokens counted with a Hugging Face fast tokenizer, so
+    chunks fit the embedding model's input limit. The default matches the onnx
+    backend: all-MiniLM-L6-v2 reads 256 tokens including two special tokens.
+    """
+
+    name = "token"
+    unit = "tokens"
+
+    def __init__(self, chunk_size: int = 254, overlap: Optional[int] = None, tokenizer: str = "sentence-transformers/all-MiniLM-L6-v2"):
+        super().__init__(chunk_size, overlap)
+        self.tokenizer = tokenizer
+        self._tokenizer = None
+        self._load_lock = threading.Lock()
+
+    def _load(self):
+        with self._load_lock:
+            if self._tokenizer is None:
+                try:
+                    from tokenizers import Tokenizer
+                except ImportError:
+                    raise Exception("The token chunker requires `pip install tokenizers`")
+                if os.path.isfile(self.tokenizer):
+                    tokenizer = Tokenizer.from_file(self.tokenizer)
+                elif os.path.isfile(self._onnx_tokenizer_path()) and self.tokenizer.endswith("all-MiniLM-L6-v2"):
+                    # Reuse the tokenizer downloaded with the onnx embedding model
+                    tokenizer = Tokenizer.from_file(self._onnx_tokenizer_path())
+                else:
+                    tokenizer = Tokenizer.from_pretrained(self.tokenizer)
+                tokenizer.no_truncation()
+                tokenizer.no_padding()
+                self._tokenizer = tokenizer
+        return self._tokenizer
+
+    @staticmethod
+    def _onnx_tokenizer_path() -> str:
+        return os.path.join(os.path.expanduser("~"), ".cache", "chroma", "onnx_models", "all-MiniLM-L6-v2", "onnx", "tokenizer.json")
+
+    def chunk(self, text: str) -> List[str]:
+        offsets = self._load().encode(text, add_special_tokens=False).offsets
+        chunks = []
+        step = self.chunk_size - self.overlap
+        for start in range(0, len(offsets), step):
+            window = offsets[start:start + self.chunk_size]
+            chunks.append(text[window[0][0]:window[-1][1]].strip())
+            if start + self.chunk_size >= len(offsets):
+                break
+        return [chunk for chunk in chunks if chunk]
+
+    def describe(self) -> Dict[str, Any]:
+        return {**super().describe(), "tokenizer": self.tokenizer}
+
+
+class RowChunker(Chunker):
+    """
+    One chunk per row of a SQLite memories export ({"memories": {"columns", "rows"}}
+    as produced by MemoryProcessor.process_sqlite_file). The row text is the "text"
+    of its JSON content column, or its string cells. Rows longer than chunk_size
+    and text that is not a memories export fall back to character chunking.
+    """
+
+    name = "row"
+
+    def __init__(self, chunk_size: int = 2000, overlap: Optional[int] = None):
+        super().__init__(chunk_size, overlap)
+        self._fallback = CharacterChunker(chunk_size, self.overlap)
+
+    def chunk(self, text: str) -> List[str]:
+        return [chunk for chunk, _ in self.chunk_records(text)]
+
+    def chunk_records(self, text: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """One chunk per row with the row's scalar columns (ids, type, timestamps) as metadata"""
+        table = parse_memories_table(text) if text else None
+        if table is None:
+            return [(chunk, {}) for chunk in self._fallback(text)]
+        records = []
+        for index, row in enumerate(table["rows"]):
+            records.extend(self._row_records(table["columns"], row, index))
+        return records
+
+    def iter_records(self, pieces: Iterable[str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        chunk_records over a streamed export: rows are chunked as they are parsed.
+        Pieces are kept only until the memories rows are found; anything that turns
+        out not to be a JSON memories export is chunked whole, like chunk_records.
+        """
+        from ..api.json_stream import JSONStreamReader
+
+        source = iter(pieces)
+        seen: List[str] = []
+
+        def recorded():
+            for piece in source:
+                if seen is not None:
+                    seen.append(piece)
+                yield piece
+
+        reader = JSONStreamReader(recorded())
+        try:
+            table = self._find_rows(reader)
+        except ValueError:
+            table = None
+        if table is None:
+            yield from self.chunk_records("".join(seen) + "".join(source))
+            return
+        seen = None
+        columns, rows = table
+        for index, row in enumerate(rows):
+            yield from self._row_records(columns, row, index)
+        # Drain the rest of the export so the producer is never left blocked
+        for _ in source:
+            pass
+
+    def _row_records(self, columns: List[str], row: List[Any], index: int) -> List[Tuple[str, Dict[str, Any]]]:
+        row_text = row_to_text(columns, row)
+        metadata = {"row": index, **row_metadata(columns, row)}
+        if len(row_text) > self.chunk_size:
+            return [(chunk, {**metadata, "part": part}) for part, chunk in enumerate(self._fallback(row_text))]
+        return [(row_text, metadata)] if row_text else []
+
+    @staticmethod
+    def _find_rows(reader) -> Optional[Tuple[List[str], Iterator[List[Any]]]]:
+        """Position the reader at the memories rows; returns the columns and an iterator over rows"""
+        if reader.peek() != '{':
+            return None
+        for key in reader.iter_object():
+            if key != "memories" or reader.peek() != '{':
+                reader.skip_value()
+                continue
+            columns, rows = None, None
+            for table_key in reader.iter_object():
+                if table_key == "columns" and reader.peek() == '[':
+                    columns = reader.read_value()
+                    if rows is not None:
+                        return columns, iter(rows)
+                elif table_key == "rows" and reader.peek() == '[':
+                    if columns is not None:
+                        return columns, (reader.read_value() for _ in reader.iter_array())
+                    # Rows before columns: read them all, then look for the columns
+                    rows = reader.read_value()
+                else:
+                    reader.skip_value()
+            return None
+        return None
+
+
+def parse_memories_table(text: str) -> Optional[Dict[str, Any]]:
+    """Return the {"columns", "rows"} table of a memories export (JSON or columnar), or None if text is not one"""
+    if is_columnar(text):
+        columns, rows = decode_tables(text).get("memories", (None, None))
+        return None if columns is None else {"columns": columns, "rows": rows}
+    if not text.lstrip().startswith("{"):
+        return None
+    try:
+        table = json.loads(text).get("memories")
+    except (ValueError, AttributeError):
+        return None
+    if not isinstance(table, dict) or not isinstance(table.get("columns"), list) or not isinstance(table.get("rows"), list):
+        return None
+    return table
+
+def row_to_text(columns: List[str], row: List[Any]) -> str:
+    """Text of one memories row: content.text if content is JSON with a text field, else its string cells"""
+    values = dict(zip(columns, row))
+    content = values.get("content")
+    if isinstance(content, str):
+        try:
+            parsed = json.loads(content)
+        except ValueError:
+            return content.strip()
+        if isinstance(parsed, dict) and isinstance(parsed.get("text"), str):
+            return parsed["text"].strip()
+        return content.strip()
+    return " ".join(str(v) for k, v in values.items() if isinstance(v, str) and k != "embedding").strip()
+
+def row_metadata(columns: List[str], row: List[Any]) -> Dict[str, Any]:
+    """
+    Scalar cells of a memories row, plus scalar fields of its JSON content
+    prefixed with "content_". The embedding column and empty cells are left out.
+    """
+    metadata = {}
+    for column, value in zip(columns, row):
+        if column == "embedding" or value is None:
+            continue
+        if column == "content" and isinstance(value, str):
+            try:
+                content = json.loads(value)
+            except ValueError:
+                continue
+            if isinstance(content, dict):
+                for key, field in content.items():
+                    if key != "text" and isinstance(field, (str, int, float, bool)):
+                        metadata[f"content_{key}"] = field
+        elif isinstance(value, (str, int, float, bool)):
+            metadata[column] = value
+    return metadata
+
+
+CHUNKERS: Dict[str, Type[Chunker]] = {
+    CharacterChunker.name: CharacterChunker,
+    SentenceChunker.name: SentenceChunker,
+    TokenChunker.name: TokenChunker,
+    RowChunker.name: RowChunker,
+}
+
+# Row chunking falls back to character chunking for anything that is not a memories export
+DEFAULT_CHUNKER = RowChunker.name
+
+_chunkers: Dict[Any, Chunker] = {}
+_chunkers_lock = threading.Lock()
+
+def register_chunker(chunker_class: Type[Chunker]) -> None:
+    """Make a custom chunker available by its name"""
+    CHUNKERS[chunker_class.name] = chunker_class
+
+def get_chunker(name: Optional[str] = None, **options) -> Chunker:
+    """
+    Return the shared chunker for a name and options, creating it on first use
+
+    Args:
+        name (Optional[str]): Chunker name (default: row)
+        **options: Chunker options such as chunk_size, overlap or tokenizer
+
+    Raises:
+        ValueError: If the chunker name is unknown
+    """
+    name = name or DEFAULT_CHUNKER
+    if name not in CHUNKERS:
+        raise ValueError(f"Unknown chunker: {name} (available: {', '.join(CHUNKERS)})")
+    options = {k: v for k, v in options.items() if v is not None}
+    key = (name, tuple(sorted(options.items())))
+    with _chunkers_lock:
+        if key not in _chunkers:
+            _chunkers[key] = CHUNKERS[name](**options)
+        return _chunkers[key]
@@ -0,0 +1,177 @@
+import io
+import sys
+import json
+import zlib
+import base64
+import struct
+from array import array
+from typing import Dict, Any, List, Sequence, Tuple
+
+# Episodic payloads in this format are text, so they travel in the same JSON
+# "content" field as the JSON layout: the prefix, then base64 of the packed tables.
+COLUMNAR_PREFIX = "stitch-columnar:1:"
+# Text columns are zlib-compressed when that saves at least this fraction; embedding
+# blobs barely compress, so they are never run through zlib
+_MIN_COMPRESSION_SAVING = 0.1
+_MAGIC = b"SCOL1\n"
+
+Table = Tuple[List[str], List[Sequence[Any]]]
+
+def is_columnar(text: str) -> bool:
+    """Whether an episodic payload uses the columnar format"""
+    return text.startswith(COLUMNAR_PREFIX)
+
+def _column_type(values: List[Any]) -> str:
+    kinds = {type(v) for v in values if v is not None}
+    if not kinds or kinds == {int}:
+        return "int"
+    if kinds == {float}:
+        return "float"
+    if kinds == {str}:
+        return "text"
+    if kinds == {bytes}:
+        return "blob"
+    # SQLite columns may mix storage classes; those values are kept as JSON text
+    return "json"
+
+def _typed_array(typecode: str, values) -> bytes:
+    data = array(typecode, values)
+    if sys.byteorder != "little":
+        data.byteswap()
+    return data.tobytes()
+
+def _read_array(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+def _pack_column(kind: str, values: List[Any]) -> bytes:
+    nulls = bytearray((len(values) + 7) // 8)
+    for i, value in enumerate(values):
+        if value is None:
+            nulls[i >> 3] |= 1 << (i & 7)
+    if kind == "int":
+        body = _typed_array("q", (0 if v is None else v for v in values))
+    elif kind == "float":
+        body = _typed_array("d", (0.0 if v is None else v for v in values))
+    else:
+        if kind == "text":
+            items = [b"" if v is None else v.encode("utf-8") for v in values]
+        elif kind == "blob":
+            items = [b"" if v is None else v for v in values]
+        else:
+            items = [b"" if v is None else json.dumps(_json_safe(v)).encode("utf-8") for v in values]
+        offsets = [0]
+        for item in items:
+            offsets.append(offsets[-1] + len(item))
+        body = _typed_array("Q", offsets) + b"".join(items)
+    return bytes(nulls) + body
+
+def _json_safe(value: Any) -> Any:
+    if isinstance(value, bytes):
+        return {"$b64": base64.b64encode(value).decode("ascii")}
+    return value
+
+def _unpack_column(kind: str, data: bytes, count: int) -> List[Any]:
+    null_size = (count + 7) // 8
+    nulls, body = data[:null_size], memoryview(data)[null_size:]
+    if kind == "int":
+        values = _read_array("q", body).tolist()
+    elif kind == "float":
+        values = _read_array("d", body).tolist()
+    else:
+        offsets = _read_array("Q", body[:(count + 1) * 8]).tolist()
+        blob = bytes(body[(count + 1) * 8:])
+        if kind == "text":
+            text = blob.decode("utf-8")
+            # Byte offsets are character offsets when the column is pure ASCII
+            source = text if len(text) == len(blob) else None
+            if source is not None:
+                values = [source[start:end] for start, end in zip(offsets, offsets[1:])]
+            else:
+                values = [blob[start:end].decode("utf-8") for start, end in zip(offsets, offsets[1:])]
+        elif kind == "blob":
+            values = [blob[start:end] for start, end in zip(offsets, offsets[1:])]
+        else:
+            values = [_from_json(blob[start:end]) for start, end in zip(offsets, offsets[1:])]
+    # Only visit the bytes of the bitmap that mark a null
+    for byte_index, byte in enumerate(nulls):
+        if byte:
+            for bit in range(8):
+                if byte >> bit & 1:
+                    values[byte_index * 8 + bit] = None
+    return values
+
+def _from_json(item: bytes) -> Any:
+    if not item:
+        return None
+    value = json.loads(item)
+    if isinstance(value, dict) and set(value) == {"$b64"}:
+        return base64.b64decode(value["$b64"])
+    return value
+
+def pack_tables(tables: Dict[str, Table], level: int = 1) -> bytes:
+    """
+    Pack tables into typed columns: int64 and float64 arrays, offset-indexed
+    UTF-8 text and raw blobs, each with a null bitmap.
+
+    Args:
+        tables (Dict[str, Table]): Table name to (columns, rows), with blobs as bytes
+        level (int): zlib level for text columns (0 disables compression)
+    """
+    header = {"tables": []}
+    sections = []
+    for name, (columns, rows) in tables.items():
+        table = {"name": name, "rows": len(rows), "columns": []}
+        for index, column in enumerate(columns):
+            values = [row[index] for row in rows]
+            kind = _column_type(values)
+            section = _pack_column(kind, values)
+            compressed = False
+            if kind in ("text", "json") and level:
+                packed = zlib.compress(section, level)
+                if len(packed) <= len(section) * (1 - _MIN_COMPRESSION_SAVING):
+                    section, compressed = packed, True
+            table["columns"].append({"name": column, "type": kind, "size": len(section), "compressed": compressed})
+            sections.append(section)
+        header["tables"].append(table)
+    header_bytes = json.dumps(header).encode("utf-8")
+    out = io.BytesIO()
+    out.write(_MAGIC)
+    out.write(struct.pack("<I", len(header_bytes)))
+    out.write(header_bytes)
+    for section in sections:
+        out.write(section)
+    return out.getvalue()
+
+def unpack_tables(data: bytes) -> Dict[str, Table]:
+    """Inverse of pack_tables"""
+    if not data.startswith(_MAGIC):
+        raise ValueError("Not a columnar episodic payload")
+    (header_size,) = struct.unpack_from("<I", data, len(_MAGIC))
+    offset = len(_MAGIC) + 4
+    header = json.loads(data[offset:offset + header_size])
+    offset += header_size
+    tables = {}
+    for table in header["tables"]:
+        columns = []
+        for column in table["columns"]:
+            section = data[offset:offset + column["size"]]
+            if column.get("compressed"):
+                section = zlib.decompress(section)
+            columns.append(_unpack_column(column["type"], section, table["rows"]))
+            offset += column["size"]
+        tables[table["name"]] = ([c["name"] for c in table["columns"]], list(zip(*columns)))
+    return tables
+
+def encode_tables(tables: Dict[str, Table], level: int = 1) -> str:
+    """Encode tables as a columnar episodic payload"""
+    return COLUMNAR_PREFIX + base64.b64encode(pack_tables(tables, level)).decode("ascii")
+
+def decode_tables(text: str) -> Dict[str, Table]:
+    """Decode a columnar episodic payload into table name to (columns, row tuples), with blobs as bytes"""
+    if not is_columnar(text):
+        raise ValueError("Not a columnar episodic payload")
+    return unpack_tables(base64.b64decode(text[len(COLUMNAR_PREFIX):]))
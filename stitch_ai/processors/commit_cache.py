@@ -0,0 +1,112 @@
+"""
+Local cache of memory files by commit.
+
+The content of a file at a commit never changes, so once downloaded it is
+kept on disk under the commit oid and never fetched again. A pull at a branch
+still asks the server which commit the branch points to, but when that commit
+is cached the file content is not downloaded.
+"""
+import os
+import re
+import shutil
+import tempfile
+from typing import Any, Callable, Dict, Optional, TextIO
+import requests
+from ..api.json_stream import DEFAULT_CHUNK_SIZE
+
+DEFAULT_COMMIT_CACHE = os.path.join(os.path.expanduser("~"), ".stitch-ai", "commits")
+
+_OID = re.compile(r"[0-9a-f]{40}|[0-9a-f]{64}")
+
+def is_oid(ref: Optional[str]) -> bool:
+    """Whether ref is a full commit oid rather than a branch name"""
+    return bool(ref) and _OID.fullmatch(ref) is not None
+
+class CommitCache:
+    """
+    Files at a commit, stored as root/<oid[:2]>/<oid>/<file path>
+
+    Files are written to a temporary file and renamed into place, so concurrent
+    fetches of the same commit are safe and an entry is complete or absent.
+    """
+
+    def __init__(self, root: str = DEFAULT_COMMIT_CACHE):
+        self.root = root
+
+    def path(self, oid: str, file_path: str) -> str:
+        return os.path.join(self.root, oid[:2], oid, *file_path.split("/"))
+
+    def lookup(self, oid: Optional[str], file_path: str) -> Optional[str]:
+        """The cached file at commit oid, or None"""
+        if not is_oid(oid):
+            return None
+        path = self.path(oid, file_path)
+        return path if os.path.isfile(path) else None
+
+    def fetch(self, ref: str, file_path: str, download: Callable[[TextIO, Callable[[Dict[str, Any]], bool]], Dict[str, Any]],
+              open_out: Callable[[], TextIO]) -> Optional[Dict[str, Any]]:
+        """
+        Write a file at ref to open_out(), from the cache if possible
+
+        Args:
+            ref (str): Branch or commit oid
+            file_path (str): File in the repository
+            download: Called as download(out, skip) to stream the file at ref into out (see
+                GitAPIClient.stream_file); skip tells it whether the commit is already cached
+            open_out: Opens the file the content is written to; not called if the content is empty
+
+        Returns:
+            Optional[Dict[str, Any]]: oid (None if the server did not say) and cached, or None if
+                the file does not exist at ref
+        """
+        cached = self.lookup(ref, file_path)
+        if cached is not None:
+            self._copy(cached, open_out)
+            return {"oid": ref, "cached": True}
+        os.makedirs(self.root, exist_ok=True)
+        part = tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=self.root, suffix=".part", delete=False)
+        try:
+            with part:
+                try:
+                    metadata = download(_Tee(part, open_out), lambda fields: self.lookup(fields.get("oid"), file_path) is not None)
+                except requests.HTTPError as e:
+                    if e.response is not None and e.response.status_code == 404:
+                        return None
+                    raise
+            oid = metadata.get("oid") or (ref if is_oid(ref) else None)
+            if metadata.get("skipped"):
+                self._copy(self.lookup(oid, file_path), open_out)
+                return {"oid": oid, "cached": True}
+            if is_oid(oid):
+                path = self.path(oid, file_path)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(part.name, path)
+            return {"oid": oid, "cached": False}
+        finally:
+            if os.path.exists(part.name):
+                os.remove(part.name)
+
+    @staticmethod
+    def _copy(path: str, open_out: Callable[[], TextIO]) -> None:
+        with open(path, "r", encoding="utf-8") as f:
+            first = f.read(DEFAULT_CHUNK_SIZE)
+            if first:
+                out = open_out()
+                out.write(first)
+                shutil.copyfileobj(f, out, DEFAULT_CHUNK_SIZE)
+
+class _Tee:
+    """Writes to the cache file and to the output, opening the output on the first write"""
+
+    def __init__(self, part: TextIO, open_out: Callable[[], TextIO]):
+        self.part = part
+        self.open_out = open_out
+        self.out = None
+
+    def write(self, text: str) -> int:
+        self.part.write(text)
+        if text:
+            if self.out is None:
+                self.out = self.open_out()
+            self.out.write(text)
+        return len(text)
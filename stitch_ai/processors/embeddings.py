@@ -0,0 +1,223 @@
+import os
+import math
+import hashlib
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Type
+
+class EmbeddingBackend:
+    """
+    Turns a list of texts into a list of vectors. Backends load their model lazily
+    on first use; get_embedding_backend() keeps one instance per configuration so
+    the model is loaded once per process.
+    """
+
+    name: str = ""
+
+    def __init__(self, batch_size: int = 32, threads: Optional[int] = None):
+        self.batch_size = batch_size
+        self.threads = threads
+        self._load_lock = threading.Lock()
+        self._loaded = False
+
+    def load(self) -> None:
+        """Load the model now instead of on the first call"""
+        with self._load_lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+
+    def _load(self) -> None:
+        pass
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        raise NotImplementedError
+
+    def describe(self) -> Dict[str, Any]:
+        """Backend name and constructor options needed to embed queries the same way later"""
+        return {"backend": self.name}
+
+    def __call__(self, texts: List[str]) -> List[List[float]]:
+        texts = list(texts)
+        if not texts:
+            return []
+        self.load()
+        return self.embed(texts)
+
+
+class ONNXEmbedding(EmbeddingBackend):
+    """all-MiniLM-L6-v2 on onnxruntime, the model behind chromadb's default embedding function"""
+
+    name = "onnx"
+    MODEL = "all-MiniLM-L6-v2"
+
+    def __init__(self, model: str = MODEL, **kwargs):
+        if model != self.MODEL:
+            raise ValueError(f"The onnx backend only supports {self.MODEL}; use sentence-transformers for {model}")
+        super().__init__(**kwargs)
+
+    def _load(self) -> None:
+        from functools import cached_property
+        from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+
+        threads = self.threads
+
+        class _ONNXMiniLM(ONNXMiniLM_L6_V2):
+            @cached_property
+            def model(self):
+                so = self.ort.SessionOptions()
+                so.log_severity_level = 3
+                if threads:
+                    so.intra_op_num_threads = threads
+                return self.ort.InferenceSession(
+                    os.path.join(self.DOWNLOAD_PATH, self.EXTRACTED_FOLDER_NAME, "model.onnx"),
+                    providers=self._preferred_providers or self.ort.get_available_providers(),
+                    sess_options=so,
+                )
+
+        self._model = _ONNXMiniLM()
+        self._model._download_model_if_not_exists()
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return self._model._forward(texts, batch_size=self.batch_size).tolist()
+
+    def describe(self) -> Dict[str, Any]:
+        return {"backend": self.name, "model": self.MODEL}
+
+
+class SentenceTransformersEmbedding(EmbeddingBackend):
+    """Any sentence-transformers model (requires the optional sentence-transformers package)"""
+
+    name = "sentence-transformers"
+
+    def __init__(self, model: str = "all-MiniLM-L6-v2", device: Optional[str] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.model = model
+        self.device = device
+
+    def _load(self) -> None:
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise Exception("The sentence-transformers backend requires `pip install sentence-transformers`")
+        if self.threads:
+            import torch
+            torch.set_num_threads(self.threads)
+        self._model = SentenceTransformer(self.model, device=self.device)
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return self._model.encode(texts, batch_size=self.batch_size, normalize_embeddings=True).tolist()
+
+    def describe(self) -> Dict[str, Any]:
+        return {"backend": self.name, "model": self.model}
+
+
+class HashEmbedding(EmbeddingBackend):
+    """
+    Deterministic feature-hashing embedder. No model and no network, so it is
+    meant for tests and for trying out the pipeline, not for semantic quality.
+    """
+
+    name = "hash"
+    _TOKEN = re.compile(r"\w+")
+
+    def __init__(self, dimension: int = 384, **kwargs):
+        super().__init__(**kwargs)
+        self.dimension = dimension
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed_one(text) for text in texts]
+
+    def _embed_one(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimension
+        for token in self._TOKEN.findall(text.lower()):
+            h = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+            vector[h % self.dimension] += 1.0 if h >> 63 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def describe(self) -> Dict[str, Any]:
+        return {"backend": self.name, "dimension": self.dimension}
+
+
+class HTTPEmbedding(EmbeddingBackend):
+    """
+    Embedding server reachable over HTTP using the OpenAI-style request
+    {"input": [...], "model": ...} and response {"data": [{"embedding": [...]}]}.
+    Batches are sent concurrently with up to `threads` requests in flight.
+    """
+
+    name = "http"
+
+    def __init__(self, url: Optional[str] = None, model: Optional[str] = None, timeout: float = 60, **kwargs):
+        super().__init__(**kwargs)
+        self.url = url or os.environ.get("STITCH_EMBEDDING_URL", "http://127.0.0.1:8080/embeddings")
+        self.model = model
+        self.timeout = timeout
+
+    def _load(self) -> None:
+        import requests
+        self._session = requests.Session()
+
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        payload = {"input": batch}
+        if self.model:
+            payload["model"] = self.model
+        response = self._session.post(self.url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        if isinstance(data, dict) and "data" in data:
+            return [item["embedding"] for item in sorted(data["data"], key=lambda item: item.get("index", 0))]
+        return data["embeddings"] if isinstance(data, dict) else data
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        with ThreadPoolExecutor(max_workers=self.threads or 1) as executor:
+            return [vector for vectors in executor.map(self._embed_batch, batches) for vector in vectors]
+
+    def describe(self) -> Dict[str, Any]:
+        return {"backend": self.name, "url": self.url, "model": self.model}
+
+
+EMBEDDING_BACKENDS: Dict[str, Type[EmbeddingBackend]] = {
+    ONNXEmbedding.name: ONNXEmbedding,
+    SentenceTransformersEmbedding.name: SentenceTransformersEmbedding,
+    HashEmbedding.name: HashEmbedding,
+    HTTPEmbedding.name: HTTPEmbedding,
+}
+
+DEFAULT_EMBEDDING_BACKEND = ONNXEmbedding.name
+
+_backends: Dict[Any, EmbeddingBackend] = {}
+_backends_lock = threading.Lock()
+
+def register_embedding_backend(backend_class: Type[EmbeddingBackend]) -> None:
+    """Make a custom backend available by its name"""
+    EMBEDDING_BACKENDS[backend_class.name] = backend_class
+
+def get_embedding_backend(name: Optional[str] = None, **options) -> EmbeddingBackend:
+    """
+    Return the shared backend instance for a name and options, creating it on first use
+
+    Args:
+        name (Optional[str]): Backend name (default: onnx)
+        **options: Backend options such as batch_size, threads or model
+
+    Raises:
+        ValueError: If the backend name is unknown
+    """
+    name = name or DEFAULT_EMBEDDING_BACKEND
+    if name not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {name} (available: {', '.join(EMBEDDING_BACKENDS)})")
+    options = {k: v for k, v in options.items() if v is not None}
+    key = (name, tuple(sorted(options.items())))
+    with _backends_lock:
+        if key not in _backends:
+            _backends[key] = EMBEDDING_BACKENDS[name](**options)
+        return _backends[key]
+
+def get_embedding_backend_from_description(description: Dict[str, Any]) -> EmbeddingBackend:
+    """Return the shared backend for a description produced by EmbeddingBackend.describe()"""
+    options = dict(description)
+    return get_embedding_backend(options.pop("backend"), **options)
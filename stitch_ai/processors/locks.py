@@ -0,0 +1,97 @@
+import os
+import time
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+_POLL_INTERVAL = 0.05
+
+class FileLock:
+    """
+    Advisory lock on a file, shared between processes and between threads.
+
+        with FileLock("store/.short_term.write.lock"):
+            ...
+
+    An exclusive lock has one holder; a shared lock has any number of holders but
+    none while the lock is held exclusively. Each FileLock opens its own file, so
+    two FileLocks on one path contend even within a process. Locks are released
+    when the holding process exits, so a crashed writer never leaves one behind.
+    Uses flock() on POSIX; on Windows every lock is exclusive.
+
+    Args:
+        path (str): Lock file, created if missing
+        shared (bool): Take a shared (reader) lock instead of an exclusive one
+        timeout (Optional[float]): Seconds to wait before giving up; None waits indefinitely
+    """
+
+    def __init__(self, path: str, shared: bool = False, timeout: Optional[float] = None):
+        self.path = path
+        self.shared = shared
+        self.timeout = timeout
+        self._fd = None
+
+    def acquire(self) -> "FileLock":
+        """
+        Raises:
+            TimeoutError: If the lock is not acquired within timeout
+        """
+        if self._fd is not None:
+            raise RuntimeError(f"Lock {self.path} is already held")
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        try:
+            while not self._try_lock(fd, blocking=deadline is None):
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"Timed out after {self.timeout}s waiting for lock {self.path}")
+                time.sleep(_POLL_INTERVAL)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+        return self
+
+    def _try_lock(self, fd: int, blocking: bool) -> bool:
+        if fcntl is not None:
+            flags = fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX
+            try:
+                fcntl.flock(fd, flags if blocking else flags | fcntl.LOCK_NB)
+                return True
+            except BlockingIOError:
+                return False
+        while True:
+            try:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                return True
+            except OSError:
+                if not blocking:
+                    return False
+                time.sleep(_POLL_INTERVAL)
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        fd, self._fd = self._fd, None
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
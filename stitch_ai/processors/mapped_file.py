@@ -0,0 +1,77 @@
+import os
+import mmap
+import codecs
+from json.encoder import encode_basestring_ascii
+from typing import Iterator, Optional
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+class MappedMemoryFile:
+    """
+    Read-only memory map over a UTF-8 text memory file.
+
+    The file is never loaded as a whole: text is decoded and JSON-escaped one chunk
+    at a time, so it can be streamed straight into a request body. Pages that have
+    already been consumed are released back to the OS.
+    """
+
+    def __init__(self, file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.file_path = file_path
+        # Keep chunks page aligned so consumed ranges can be released with madvise
+        self.chunk_size = max(mmap.PAGESIZE, chunk_size - chunk_size % mmap.PAGESIZE)
+        try:
+            self._file = open(file_path, 'rb')
+        except FileNotFoundError:
+            raise Exception(f"Memory file not found - {file_path}")
+        self.size = os.fstat(self._file.fileno()).st_size
+        self._map = None
+        if self.size:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                self._map.madvise(mmap.MADV_SEQUENTIAL)
+        self._json_length: Optional[int] = None
+
+    def iter_text(self) -> Iterator[str]:
+        """Yield the decoded file content chunk by chunk"""
+        if self._map is None:
+            return
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        for start in range(0, self.size, self.chunk_size):
+            end = min(start + self.chunk_size, self.size)
+            text = decoder.decode(self._map[start:end], final=end == self.size)
+            if hasattr(mmap, 'MADV_DONTNEED'):
+                self._map.madvise(mmap.MADV_DONTNEED, start, end - start)
+            if text:
+                yield text
+
+    def iter_json_string(self) -> Iterator[bytes]:
+        """Yield the content encoded as a JSON string literal, quotes included"""
+        yield b'"'
+        for text in self.iter_text():
+            yield encode_basestring_ascii(text)[1:-1].encode('ascii')
+        yield b'"'
+
+    def json_string_length(self) -> int:
+        """Length in bytes of the encoded JSON string literal"""
+        if self._json_length is None:
+            self._json_length = sum(len(chunk) for chunk in self.iter_json_string())
+        return self._json_length
+
+    def read_text(self) -> str:
+        """Return the whole content as a string"""
+        return ''.join(self.iter_text())
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"<MappedMemoryFile {self.file_path} ({self.size} bytes)>"
@@ -0,0 +1,354 @@
+import os
+import json
+import time
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from ..api.tracing import carry_context
+
+DEFAULT_CATALOG_PATH = os.path.join(os.path.expanduser("~"), ".stitch-ai", "market.sqlite")
+DEFAULT_PAGE_SIZE = 100
+DEFAULT_SYNC_WORKERS = 8
+DEFAULT_MAX_PAGES = 10000
+SORT_COLUMNS = ("updated_at", "name", "price", "created_at")
+
+_ITEM_KEYS = ("data", "items", "list", "results", "docs", "rows")
+_TOTAL_PAGE_KEYS = ("totalPages", "total_pages", "lastPage", "pageCount")
+_TOTAL_KEYS = ("total", "totalCount", "totalDocs", "count")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS spaces (
+    type TEXT NOT NULL,
+    id TEXT NOT NULL,
+    name TEXT,
+    owner TEXT,
+    price REAL,
+    created_at TEXT,
+    updated_at TEXT,
+    data TEXT NOT NULL,
+    sync_id INTEGER NOT NULL,
+    PRIMARY KEY (type, id)
+);
+CREATE INDEX IF NOT EXISTS spaces_name ON spaces (type, name);
+CREATE INDEX IF NOT EXISTS spaces_price ON spaces (type, price);
+CREATE INDEX IF NOT EXISTS spaces_owner ON spaces (type, owner);
+CREATE INDEX IF NOT EXISTS spaces_created ON spaces (type, created_at);
+CREATE INDEX IF NOT EXISTS spaces_updated ON spaces (type, updated_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS spaces_fts USING fts5 (name, description, content='');
+CREATE TABLE IF NOT EXISTS sync_state (
+    type TEXT PRIMARY KEY,
+    high_water TEXT,
+    sync_id INTEGER NOT NULL,
+    synced_at REAL NOT NULL
+);
+"""
+
+def _first(item: Dict[str, Any], *keys: str) -> Any:
+    for key in keys:
+        value = item.get(key)
+        if value is not None:
+            return value
+    return None
+
+def page_items(response: Any) -> List[Dict[str, Any]]:
+    """The listed spaces of a /marketplace page: the response itself, or its data/items list"""
+    if isinstance(response, list):
+        return response
+    if isinstance(response, dict):
+        for key in _ITEM_KEYS:
+            value = response.get(key)
+            if isinstance(value, list):
+                return value
+            if isinstance(value, dict):
+                return page_items(value)
+    return []
+
+def page_count(response: Any, page_size: int) -> Optional[int]:
+    """Total number of pages, if the page reports it"""
+    if not isinstance(response, dict):
+        return None
+    for envelope in (response, *(response.get(key) for key in _ITEM_KEYS + ("meta", "pagination"))):
+        if not isinstance(envelope, dict):
+            continue
+        pages = _first(envelope, *_TOTAL_PAGE_KEYS)
+        if isinstance(pages, int):
+            return pages
+        total = _first(envelope, *_TOTAL_KEYS)
+        if isinstance(total, int):
+            return -(-total // page_size)
+    return None
+
+def crawl_pages(fetch_page: Callable[[int], Any], page_size: int = DEFAULT_PAGE_SIZE,
+                workers: int = DEFAULT_SYNC_WORKERS,
+                stop: Optional[Callable[[int, List[Dict[str, Any]]], bool]] = None,
+                max_pages: int = DEFAULT_MAX_PAGES) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+    """
+    Fetch pages 1, 2, ... with at most `workers` requests in flight, yielding
+    (page, items) in page order.
+
+    No page beyond the last is requested once the total is known (from a page's
+    totalPages/total field, or from the first short page). `stop(page, items)`
+    returning True ends the crawl after that page, e.g. once an incremental sync
+    reaches spaces it has already seen.
+
+    A server that ignores the paginate parameter returns the same full page every
+    time, so a page listing the same spaces as the one before ends the crawl (and
+    is not yielded). No page past max_pages is requested.
+
+    Raises:
+        Exception: If the listing has not ended after max_pages pages
+    """
+    workers = max(workers, 1)
+    fetch_page = carry_context(fetch_page)
+    last_page = None
+    next_page = 1
+    next_yield = 1
+    arrived = {}
+    previous_ids = None
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {}
+        try:
+            while last_page is None or next_yield <= last_page:
+                while len(pending) + len(arrived) < workers and next_page <= max_pages and \
+                        (last_page is None or next_page <= last_page):
+                    pending[executor.submit(fetch_page, next_page)] = next_page
+                    next_page += 1
+                if not pending and next_yield not in arrived:
+                    return
+                if next_yield not in arrived:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        arrived[pending.pop(future)] = future.result()
+                # Pages are handed on in order, so stop() sees the listing as the server sorted it
+                while next_yield in arrived and (last_page is None or next_yield <= last_page):
+                    page, response = next_yield, arrived.pop(next_yield)
+                    next_yield += 1
+                    items = page_items(response)
+                    ids = [_first(item, "id", "_id", "name") for item in items if isinstance(item, dict)]
+                    if ids and ids == previous_ids:
+                        last_page = page - 1 if last_page is None else min(last_page, page - 1)
+                        break
+                    previous_ids = ids
+                    total = page_count(response, page_size)
+                    if total is not None:
+                        last_page = total if last_page is None else min(last_page, total)
+                    if len(items) < page_size or (stop is not None and stop(page, items)):
+                        last_page = page if last_page is None else min(last_page, page)
+                    if last_page is None or page <= last_page:
+                        yield page, items
+                    if page >= max_pages and (last_page is None or last_page > page):
+                        raise Exception(f"Marketplace listing did not end after {max_pages} pages")
+                # Requests already sent past the last page are no longer needed
+                for future, page in list(pending.items()):
+                    if last_page is not None and page > last_page and future.cancel():
+                        del pending[future]
+        finally:
+            for future in pending:
+                future.cancel()
+
+class MarketCatalog:
+    """
+    Local SQLite copy of the marketplace listing, indexed for search, sort and
+    filter queries that do not call the API
+    """
+
+    def __init__(self, path: str = DEFAULT_CATALOG_PATH):
+        self.path = path
+        if os.path.dirname(os.path.abspath(path)):
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def state(self, type_: str) -> Optional[Dict[str, Any]]:
+        """High-water update time and time of the last sync of a listing type"""
+        row = self.conn.execute("SELECT * FROM sync_state WHERE type = ?", (type_,)).fetchone()
+        return dict(row) if row else None
+
+    def sync(self, type_: str, fetch_page: Callable[[int], Any], page_size: int = DEFAULT_PAGE_SIZE,
+             workers: int = DEFAULT_SYNC_WORKERS, full: bool = False, max_pages: int = DEFAULT_MAX_PAGES) -> Dict[str, Any]:
+        """
+        Crawl the listing into the catalog
+
+        fetch_page(page) should return pages newest-updated first. An incremental
+        sync stops at the first page that is entirely older than the previous
+        sync's newest update time; if the pages turn out not to be in that order
+        it keeps crawling, so it is never less complete than a full sync. A full
+        sync crawls every page and drops spaces that are no longer listed.
+
+        Args:
+            type_ (str): Listing type, e.g. AGENT_MEMORY
+            fetch_page (Callable[[int], Any]): Returns the /marketplace response for a 1-based page
+            page_size (int): Spaces per page requested by fetch_page
+            workers (int): Maximum concurrent page requests
+            full (bool): Crawl everything and remove delisted spaces
+            max_pages (int): Pages after which a listing that has not ended fails the sync (see crawl_pages)
+
+        Returns:
+            Dict[str, Any]: type, pages, fetched, updated, removed, total and seconds
+        """
+        start = time.perf_counter()
+        previous = self.state(type_)
+        high_water = None if full or previous is None else previous["high_water"]
+        sync_id = (previous["sync_id"] if previous else 0) + 1
+        newest = previous["high_water"] if previous and not full else None
+        ordered = {"sorted": True, "previous": None}
+
+        def stop(page: int, items: List[Dict[str, Any]]) -> bool:
+            times = [ordered["previous"]] + [_updated_at(item) for item in items]
+            # Only trust early stopping while every page seen so far is newest first
+            if any(a is not None and b is not None and a < b for a, b in zip(times, times[1:])):
+                ordered["sorted"] = False
+            times = times[1:]
+            if times:
+                ordered["previous"] = times[-1]
+            return (high_water is not None and ordered["sorted"] and bool(times)
+                    and all(t is not None and t <= high_water for t in times))
+
+        pages = fetched = updated = 0
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            for _, items in crawl_pages(fetch_page, page_size, workers, stop, max_pages):
+                pages += 1
+                fetched += len(items)
+                updated += self._upsert(type_, items, sync_id)
+                for item in items:
+                    item_time = _updated_at(item)
+                    if item_time is not None and (newest is None or item_time > newest):
+                        newest = item_time
+            removed = 0
+            if full:
+                removed = self.conn.execute("DELETE FROM spaces WHERE type = ? AND sync_id != ?", (type_, sync_id)).rowcount
+                self._rebuild_search_index()
+            self.conn.execute(
+                "INSERT INTO sync_state (type, high_water, sync_id, synced_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (type) DO UPDATE SET high_water = excluded.high_water, sync_id = excluded.sync_id, "
+                "synced_at = excluded.synced_at", (type_, newest, sync_id, time.time()))
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        if updated or removed:
+            # Fresh statistics let the planner pick e.g. the owner index over the sort index
+            self.conn.execute("ANALYZE")
+        total = self.conn.execute("SELECT COUNT(*) FROM spaces WHERE type = ?", (type_,)).fetchone()[0]
+        return {"type": type_, "pages": pages, "fetched": fetched, "updated": updated, "removed": removed,
+                "total": total, "seconds": round(time.perf_counter() - start, 3)}
+
+    def _upsert(self, type_: str, items: List[Dict[str, Any]], sync_id: int) -> int:
+        """Write new or changed spaces and mark every listed one as seen in this sync"""
+        updated = 0
+        for item in items:
+            space_id = _first(item, "id", "_id", "name")
+            if space_id is None:
+                continue
+            space_id = str(space_id)
+            data = json.dumps(item, sort_keys=True, default=str)
+            row = self.conn.execute("SELECT rowid, data FROM spaces WHERE type = ? AND id = ?", (type_, space_id)).fetchone()
+            if row is not None and row["data"] == data:
+                self.conn.execute("UPDATE spaces SET sync_id = ? WHERE rowid = ?", (sync_id, row["rowid"]))
+                continue
+            values = (_first(item, "name", "title"), _owner(item), _price(item),
+                      _text(_first(item, "createdAt", "created_at")), _updated_at(item), data, sync_id)
+            if row is None:
+                cursor = self.conn.execute(
+                    "INSERT INTO spaces (type, id, name, owner, price, created_at, updated_at, data, sync_id) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", (type_, space_id, *values))
+                rowid = cursor.lastrowid
+            else:
+                rowid = row["rowid"]
+                old = json.loads(row["data"])
+                self.conn.execute("INSERT INTO spaces_fts (spaces_fts, rowid, name, description) VALUES ('delete', ?, ?, ?)",
+                                  (rowid, _search_name(old), _search_description(old)))
+                self.conn.execute(
+                    "UPDATE spaces SET name = ?, owner = ?, price = ?, created_at = ?, updated_at = ?, data = ?, sync_id = ? "
+                    "WHERE rowid = ?", (*values, rowid))
+            self.conn.execute("INSERT INTO spaces_fts (rowid, name, description) VALUES (?, ?, ?)",
+                              (rowid, _search_name(item), _search_description(item)))
+            updated += 1
+        return updated
+
+    def _rebuild_search_index(self) -> None:
+        self.conn.execute("INSERT INTO spaces_fts (spaces_fts) VALUES ('delete-all')")
+        for row in self.conn.execute("SELECT rowid, data FROM spaces").fetchall():
+            item = json.loads(row["data"])
+            self.conn.execute("INSERT INTO spaces_fts (rowid, name, description) VALUES (?, ?, ?)",
+                              (row["rowid"], _search_name(item), _search_description(item)))
+
+    def search(self, type_: str, query: Optional[str] = None, owner: Optional[str] = None,
+               min_price: Optional[float] = None, max_price: Optional[float] = None,
+               sort: str = "updated_at", descending: bool = True, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+        """
+        Query the catalog
+
+        Args:
+            type_ (str): Listing type, e.g. AGENT_MEMORY
+            query (Optional[str]): Words that must all appear in the name or description (prefix match)
+            owner (Optional[str]): Only spaces of this owner
+            min_price (Optional[float]): Minimum price
+            max_price (Optional[float]): Maximum price
+            sort (str): One of updated_at, name, price or created_at
+            descending (bool): Sort order
+            limit (int): Maximum number of results
+            offset (int): Results to skip
+
+        Returns:
+            List[Dict[str, Any]]: Listed spaces as returned by the API
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Unknown sort column: {sort} (available: {', '.join(SORT_COLUMNS)})")
+        conditions, params = ["type = ?"], [type_]
+        if query:
+            terms = [word for word in query.replace('"', " ").split() if word]
+            if terms:
+                conditions.append("rowid IN (SELECT rowid FROM spaces_fts WHERE spaces_fts MATCH ?)")
+                params.append(" ".join(f'"{term}"*' for term in terms))
+        if owner is not None:
+            conditions.append("owner = ?")
+            params.append(owner)
+        if min_price is not None:
+            conditions.append("price >= ?")
+            params.append(min_price)
+        if max_price is not None:
+            conditions.append("price <= ?")
+            params.append(max_price)
+        sql = (f"SELECT data FROM spaces WHERE {' AND '.join(conditions)} "
+               f"ORDER BY {sort} {'DESC' if descending else 'ASC'}, id LIMIT ? OFFSET ?")
+        rows = self.conn.execute(sql, (*params, limit, offset)).fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+def _text(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
+
+def _updated_at(item: Dict[str, Any]) -> Optional[str]:
+    return _text(_first(item, "updatedAt", "updated_at", "createdAt", "created_at"))
+
+def _owner(item: Dict[str, Any]) -> Optional[str]:
+    owner = _first(item, "owner", "ownerId", "userId", "seller")
+    if isinstance(owner, dict):
+        owner = _first(owner, "id", "userId", "walletAddress", "name")
+    return _text(owner)
+
+def _price(item: Dict[str, Any]) -> Optional[float]:
+    try:
+        price = _first(item, "price", "amount")
+        return None if price is None else float(price)
+    except (TypeError, ValueError):
+        return None
+
+def _search_name(item: Dict[str, Any]) -> str:
+    return str(_first(item, "name", "title") or "")
+
+def _search_description(item: Dict[str, Any]) -> str:
+    return str(_first(item, "description", "summary") or "")
@@ -1,51 +1,130 @@
 import json
-import sqlite3
-import base64
 import os
-import datetime
-import chromadb
-from chromadb.utils import embedding_functions
-from typing import Dict, Any
+import time
+import numpy as np
+from concurrent.futures import Executor, ThreadPoolExecutor, wait
+from typing import Dict, Any, Callable, List, Optional, Sequence, TextIO, Tuple
+from ..api.json_stream import DEFAULT_CHUNK_SIZE
+from .mapped_file import MappedMemoryFile
+from .embeddings import EmbeddingBackend, get_embedding_backend, get_embedding_backend_from_description
+from .sinks import COLLECTION_NAME, MemorySink, get_memory_sink
+from .backups import DEFAULT_BACKUP_BATCH_SIZE, batched, latest_backup, read_backup
+from .sqlite_export import iter_sqlite_tables, write_sqlite_export, json_safe_row
+from .sqlite_import import import_sqlite_tables, parse_episodic_tables
+from .columnar import encode_tables, decode_tables, is_columnar
+from .chunking import Chunker, CharacterChunker, get_chunker
+from .profiling import PipelineProfile, profile_stage
+from .pipeline import EmbeddingPipeline, DEFAULT_EMBED_WORKERS
+
+EPISODIC_FORMATS = ("json", "columnar")
+# Restores episodic SQLite exports as tables instead of embedding them
+TABLE_SINK = "memories"
+# Memory types of a space, in the order their results are stored
+MEMORY_TYPES = ("episodic", "character")
+
+def run_per_memory_type(tasks: Dict[str, Callable[[], Any]], executor: Optional[Executor] = None) -> Dict[str, Any]:
+    """
+    Run independent per-memory-type tasks concurrently
+
+    Args:
+        tasks (Dict[str, Callable[[], Any]]): Task per memory type
+        executor (Optional[Executor]): Thread pool to run them on; by default a pool
+            with a thread per task is created for the call
+
+    Returns:
+        Dict[str, Any]: Result per memory type, in the order of tasks whatever order they finish in
+
+    Raises:
+        Exception: The first failed task's error (in the order of tasks), once all tasks have finished
+    """
+    if executor is None and len(tasks) <= 1:
+        return {memory_type: task() for memory_type, task in tasks.items()}
+    own = executor is None
+    if own:
+        executor = ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix="stitch-memory-type")
+    try:
+        futures = {memory_type: executor.submit(task) for memory_type, task in tasks.items()}
+        wait(futures.values())
+        return {memory_type: future.result() for memory_type, future in futures.items()}
+    finally:
+        if own:
+            executor.shutdown()
 
 class MemoryProcessor:
+    def __init__(self, embedding_backend: Optional[str] = None, embedding_options: Optional[Dict[str, Any]] = None,
+                 chunker: Optional[str] = None, chunking_options: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            embedding_backend (Optional[str]): Default embedding backend for pulls (default: onnx)
+            embedding_options (Optional[Dict[str, Any]]): Backend options such as batch_size or threads
+            chunker (Optional[str]): Default chunking strategy for pulls (default: row)
+            chunking_options (Optional[Dict[str, Any]]): Chunker options such as chunk_size or overlap
+        """
+        self.embedding_backend = embedding_backend
+        self.embedding_options = embedding_options or {}
+        self.chunker = chunker
+        self.chunking_options = chunking_options or {}
+
+    def get_embedding_function(self, backend: Optional[str] = None, options: Optional[Dict[str, Any]] = None) -> EmbeddingBackend:
+        """Return the process-wide cached embedding backend, falling back to this processor's defaults"""
+        if backend is None:
+            backend = self.embedding_backend
+            options = {**self.embedding_options, **(options or {})}
+        return get_embedding_backend(backend, **(options or {}))
+
+    def get_chunker(self, name: Optional[str] = None, options: Optional[Dict[str, Any]] = None) -> Chunker:
+        """Return the shared chunker, falling back to this processor's defaults"""
+        if name is None:
+            name = self.chunker
+            options = {**self.chunking_options, **(options or {})}
+        return get_chunker(name, **(options or {}))
+
     @staticmethod
-    def process_sqlite_file(file_path):
-        """Extract data from SQLite database file"""
-        try:
-            conn = sqlite3.connect(file_path)
-            cursor = conn.cursor()
-            
-            # Extract data from memories table
-            cursor.execute("SELECT * FROM memories")
-            columns = [description[0] for description in cursor.description]
-            rows = cursor.fetchall()
-            
-            # Convert rows to JSON-serializable format
-            processed_rows = []
-            for row in rows:
-                processed_row = []
-                for item in row:
-                    if isinstance(item, bytes):
-                        try:
-                            processed_row.append(item.decode('utf-8'))
-                        except UnicodeDecodeError:
-                            processed_row.append(base64.b64encode(item).decode('utf-8'))
-                    else:
-                        processed_row.append(item)
-                processed_rows.append(processed_row)
-            
-            db_content = {
-                "memories": {
-                    "columns": columns,
-                    "rows": processed_rows
-                }
+    def process_sqlite_file(file_path, episodic_format: str = "json", tables: Optional[Sequence[str]] = None,
+                            workers: Optional[int] = None, snapshot: bool = False):
+        """
+        Extract data from SQLite database file
+        
+        Args:
+            file_path (str): Path to the SQLite database
+            episodic_format (str): "json" for the columns/rows JSON layout, or "columnar"
+                for typed columns with raw blobs (see processors.columnar)
+            tables (Optional[Sequence[str]]): Table names or glob patterns (default: memories)
+            workers (Optional[int]): Tables read concurrently
+            snapshot (bool): Read all tables from one consistent copy of the database
+        """
+        if episodic_format not in EPISODIC_FORMATS:
+            raise ValueError(f"Unknown episodic format: {episodic_format} (available: {', '.join(EPISODIC_FORMATS)})")
+        exported = {table: (columns, rows)
+                    for table, columns, rows in iter_sqlite_tables(file_path, tables, workers, snapshot, ordered=True)}
+
+        if episodic_format == "columnar":
+            return encode_tables(exported)
+        return MemoryProcessor._tables_to_json(exported)
+
+    @staticmethod
+    def export_sqlite_file(file_path: str, out: TextIO, tables: Optional[Sequence[str]] = None,
+                           workers: Optional[int] = None, snapshot: bool = False) -> None:
+        """Write the JSON layout of a SQLite database to out, streamed table by table"""
+        write_sqlite_export(file_path, out, tables, workers, snapshot)
+
+    @staticmethod
+    def _tables_to_json(tables) -> str:
+        """JSON layout of tables: {name: {"columns": [...], "rows": [...]}}, blobs as UTF-8 or base64 text"""
+        db_content = {}
+        for name, (columns, rows) in tables.items():
+            db_content[name] = {
+                "columns": columns,
+                "rows": [json_safe_row(row) for row in rows]
             }
-            
-            conn.close()
-            return json.dumps(db_content, indent=2)
-            
-        except sqlite3.Error as e:
-            raise Exception(f"Error reading SQLite database: {e}")
+        return json.dumps(db_content, indent=2)
+
+    @staticmethod
+    def episodic_to_json(text: str) -> str:
+        """Convert a columnar episodic payload to the JSON layout; other payloads are returned unchanged"""
+        if not is_columnar(text):
+            return text
+        return MemoryProcessor._tables_to_json(decode_tables(text))
 
     @staticmethod
     def process_character_file(file_path):
@@ -73,128 +152,264 @@ class MemoryProcessor:
         except FileNotFoundError:
             raise Exception(f"Memory file not found - {file_path}")
 
-    def save_memory_data(self, data: Dict[str, Any], output_path: str) -> None:
+    @staticmethod
+    def map_memory_file(file_path):
+        """Memory-map a regular memory file so it can be streamed without reading it into memory"""
+        return MappedMemoryFile(file_path)
+
+    def save_memory_data(self, data: Dict[str, Any], output_path: str, embedding_backend: Optional[str] = None,
+                         embedding_options: Optional[Dict[str, Any]] = None, sink: Optional[str] = None,
+                         chunker: Optional[str] = None, chunking_options: Optional[Dict[str, Any]] = None,
+                         upsert: bool = False, profile: Optional[PipelineProfile] = None,
+                         executor: Optional[Executor] = None) -> None:
         """
-        Save memory data to either JSON file or ChromaDB
+        Save memory data to a JSON file, restore it into a SQLite database, or embed it into a vector-store sink
         
         Args:
-            data (Dict[str, Any]): Memory data to save
+            data (Dict[str, Any]): Memory data to save; each memory type's text is a string or a
+                readable text file, which vector-store sinks chunk as they read it
             output_path (str): Path to save the data
+            embedding_backend (Optional[str]): Embedding backend name, overriding the processor default
+            embedding_options (Optional[Dict[str, Any]]): Embedding backend options
+            sink (Optional[str]): Sink name (chroma, numpy, sqlite or memories); inferred from output_path by default
+            chunker (Optional[str]): Chunking strategy, overriding the processor default
+            chunking_options (Optional[Dict[str, Any]]): Chunker options
+            upsert (bool): For the memories sink, merge rows by primary key instead of replacing the tables
+            profile (Optional[PipelineProfile]): Records the time and memory of each stage
+            executor (Optional[Executor]): Thread pool that chunks and embeds the memory types
+                concurrently (see run_per_memory_type)
             
         Raises:
             Exception: If saving fails
         """
-        if output_path.endswith('.json'):
-            self._save_to_json(data, output_path)
+        if sink is None and output_path.endswith('.json'):
+            with profile_stage(profile, "write_json"):
+                self._save_to_json(data, output_path)
+        elif not self.embeds(output_path, sink):
+            self._save_to_sqlite_tables(data, output_path, "upsert" if upsert else "replace", profile)
         else:
-            self._save_to_chromadb(data, output_path)
+            with profile_stage(profile, "load_embedding"):
+                ef = self.get_embedding_function(embedding_backend, embedding_options)
+            self._save_to_sink(data, get_memory_sink(output_path, sink), ef, self.get_chunker(chunker, chunking_options),
+                               profile, executor)
+
+    @staticmethod
+    def embeds(output_path: str, sink: Optional[str] = None) -> bool:
+        """Whether saving to output_path chunks and embeds the memory into a vector store"""
+        if sink is None:
+            return not output_path.endswith('.json')
+        return sink != TABLE_SINK
+
+    def stream_memory_data(self, fetch: Callable[[Callable[[str], TextIO]], Any], output_path: str,
+                           embedding_backend: Optional[str] = None, embedding_options: Optional[Dict[str, Any]] = None,
+                           sink: Optional[str] = None, chunker: Optional[str] = None,
+                           chunking_options: Optional[Dict[str, Any]] = None, profile: Optional[PipelineProfile] = None,
+                           workers: int = DEFAULT_EMBED_WORKERS, keep_text: bool = False) -> EmbeddingPipeline:
+        """
+        Embed memory into a vector-store sink while it downloads (see EmbeddingPipeline)
+
+        Args:
+            fetch (Callable): Downloads the memory on another thread, calling its argument with
+                "episodic" or "character" to get a file for that memory's text
+            output_path (str): Sink path
+            workers (int): Embedding worker threads
+            keep_text (bool): Keep the downloaded text (pipeline.texts)
+            Other arguments are as for save_memory_data.
+
+        Returns:
+            EmbeddingPipeline: The finished pipeline; result holds fetch's return value, chunks the
+                chunk count per memory type, and started whether any memory arrived
+
+        Raises:
+            Exception: If any stage fails; the sink is left unchanged
+        """
+        ef = self.get_embedding_function(embedding_backend, embedding_options)
+        chunker = self.get_chunker(chunker, chunking_options)
+        store = get_memory_sink(output_path, sink)
+        metadata = {"embedding": json.dumps(ef.describe()), "chunking": json.dumps(chunker.describe())}
+        pipeline = EmbeddingPipeline(store, ef, chunker, metadata, workers, keep_text=keep_text, profile=profile)
+        try:
+            pipeline.result = pipeline.run(fetch)
+        except BaseException:
+            store.abort()
+            raise
+        if not pipeline.started:
+            store.abort()
+            return pipeline
+        with profile_stage(profile, "commit"):
+            store.close()
+        return pipeline
 
     def _save_to_json(self, data: Dict[str, Any], file_path: str) -> None:
         """Save memory data to JSON file"""
         os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+        memory_data = {memory_type: _read_text(value) for memory_type, value in data.get('data', {}).items()}
+        if isinstance(memory_data.get('episodic'), str):
+            memory_data['episodic'] = self.episodic_to_json(memory_data['episodic'])
         with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data.get('data', {}), f, indent=2)
-
-    def _delete_short_term_collections(self, client):
-        for _ in range(5):
-            collections = client.list_collections()
-            if "short_term" in collections:
-                try:
-                    client.delete_collection("short_term")
-                except Exception as e:
-                    print(f"Error deleting short_term: {e}")
-            else:
-                break
+            json.dump(memory_data, f, indent=2)
 
-    def _save_to_chromadb(self, data: Dict[str, Any], db_path: str) -> None:
-        """Save memory data to ChromaDB"""
-        db_dir = os.path.dirname(db_path)
-        
-        # Initialize ChromaDB client
-        client = chromadb.PersistentClient(path=db_dir)
-        
-        # Backup existing collection if it exists
-        self._backup_existing_collection(client, db_dir)
+    def _save_to_sqlite_tables(self, data: Dict[str, Any], file_path: str, mode: str,
+                               profile: Optional[PipelineProfile] = None) -> None:
+        """Write the episodic SQLite export back into the tables of a SQLite database"""
+        episodic = _read_text(data.get("data", {}).get("episodic"))
+        if not episodic:
+            raise Exception("Memory does not contain episodic data to restore into SQLite")
+        with profile_stage(profile, "parse", bytes=len(episodic)):
+            tables = parse_episodic_tables(episodic)
+        with profile_stage(profile, "insert") as stage:
+            stage["rows"] = sum(import_sqlite_tables(file_path, tables, mode).values())
 
-        self._delete_short_term_collections(client)
+    def _save_to_sink(self, data: Dict[str, Any], sink: MemorySink, ef: EmbeddingBackend, chunker: Chunker,
+                      profile: Optional[PipelineProfile] = None, executor: Optional[Executor] = None) -> None:
+        """Replace the sink's collection with freshly embedded memory chunks"""
+        try:
+            # Recorded so that searches embed queries with the same backend; replacing
+            # a Chroma collection backs up the previous one first
+            with profile_stage(profile, "backup"):
+                sink.reset({"embedding": json.dumps(ef.describe()), "chunking": json.dumps(chunker.describe())})
+            memory_data = data.get("data", {})
+            # Chunked and embedded concurrently; inserted in order on this thread, which owns the sink
+            embedded = run_per_memory_type(
+                {memory_type: (lambda text=memory_data[memory_type]: self._embed_memory_type(text, ef, chunker, profile))
+                 for memory_type in MEMORY_TYPES if memory_data.get(memory_type)}, executor)
+            for memory_type, (records, embeddings) in embedded.items():
+                if records:
+                    with profile_stage(profile, "insert", chunks=len(records)):
+                        sink.bulk_insert(
+                            ids=[f"{memory_type}-memory-{i}" for i in range(len(records))],
+                            documents=[chunk for chunk, _ in records],
+                            embeddings=embeddings,
+                            metadatas=[{"memory_type": memory_type, **metadata} for _, metadata in records]
+                        )
+        except BaseException:
+            sink.abort()
+            raise
+        with profile_stage(profile, "commit"):
+            sink.close()
 
-        # Create embedding function
-        default_ef = embedding_functions.DefaultEmbeddingFunction()
+    def search(self, db_path: str, query: str, k: int = 5, sink: Optional[str] = None, method: str = "auto",
+               where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Search pulled memory for the chunks closest to a query
         
-        # Create new collection
-        collection = client.create_collection(
-            name="short_term",
-            metadata={"description": "Short term memory collection"}
-        )
-
-        # Process memories
-        memory_data = data.get("data", {})
-        self._process_memory_type(collection, memory_data, "episodic", default_ef)
-        self._process_memory_type(collection, memory_data, "character", default_ef)
-
-    def _backup_existing_collection(self, client: chromadb.PersistentClient, db_dir: str) -> None:
-        """Create backup of existing collection if it exists"""
-        if "short_term" in client.list_collections():
-            existing_collection = client.get_collection("short_term")
-            backup_data = existing_collection.get()
-            
-            backup_dir = os.path.join(db_dir, "backups")
-            os.makedirs(backup_dir, exist_ok=True)
-            
-            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_file = os.path.join(backup_dir, f"short_term_backup_{timestamp}.json")
-            
-            with open(backup_file, "w", encoding="utf-8") as f:
-                json.dump(backup_data, f, indent=2)
-            
-            print(f"Created backup at: {backup_file}")
-            client.delete_collection("short_term")
-
-    def _process_memory_type(self, 
-                           collection: chromadb.Collection, 
-                           memory_data: Dict[str, Any], 
-                           memory_type: str, 
-                           ef: embedding_functions.DefaultEmbeddingFunction) -> None:
-        """Process and add specific type of memory to collection"""
-        if memory_data.get(memory_type):
-            text = memory_data[memory_type]
-            chunks = self._chunk_text(text)
+        Args:
+            db_path (str): Path the memory was pulled to
+            query (str): Query text, embedded with the backend used at pull time
+            k (int): Number of results
+            sink (Optional[str]): Sink name; inferred from db_path by default
+            method (str): "exact", "ann" or "auto"
+            where (Optional[Dict[str, Any]]): Metadata values results must have, e.g. {"type": "messages"}
             
-            if chunks:
-                embeddings = ef(chunks)
-                collection.add(
-                    documents=chunks,
-                    embeddings=embeddings,
-                    ids=[f"{memory_type}-memory-{i}" for i in range(len(chunks))]
-                )
+        Returns:
+            List[Dict[str, Any]]: Chunks with id, document, score and metadata, best first
+        """
+        with get_memory_sink(db_path, sink) as store:
+            metadata = store.metadata()
+            if "embedding" in metadata:
+                ef = get_embedding_backend_from_description(json.loads(metadata["embedding"]))
+            else:
+                # Pulled before the backend was recorded
+                ef = self.get_embedding_function()
+            return store.query(ef([query])[0], k, method, where)
 
-    def _chunk_text(self, text: str, chunk_size: int = 2000, overlap: int = 200) -> list:
-        """Split text into overlapping chunks"""
-        if not text:
-            return []
-        
-        chunks = []
-        start = 0
-        text_length = len(text)
+    def restore_backup(self, backup: str, db_path: Optional[str] = None, sink: Optional[str] = None,
+                       embedding_backend: Optional[str] = None, embedding_options: Optional[Dict[str, Any]] = None,
+                       batch_size: int = DEFAULT_BACKUP_BATCH_SIZE) -> Dict[str, Any]:
+        """
+        Replace a vector-store collection with the contents of a backup
 
-        while start < text_length:
-            end = start + chunk_size
-            
-            if end < text_length:
-                # Look for a good breaking point
-                for i in range(min(end + 100, text_length) - 1, start + chunk_size//2, -1):
-                    if text[i] in '.!?' and text[i+1] == ' ':
-                        end = i + 1
-                        break
+        The backup is streamed and inserted batch_size chunks at a time. Stored embeddings
+        are inserted as they are; chunks are only embedded again if the backup has no
+        embeddings or embedding_backend is given. Like a pull, the restore replaces the
+        collection atomically, and replacing a Chroma collection backs it up first.
+
+        Args:
+            backup (str): Backup file, or a store directory to restore its most recent backup
+            db_path (Optional[str]): Sink path; by default the Chroma store the backup was taken from
+            sink (Optional[str]): Sink name; inferred from db_path by default
+            embedding_backend (Optional[str]): Embed the chunks again with this backend
+            embedding_options (Optional[Dict[str, Any]]): Embedding backend options
+            batch_size (int): Chunks read, embedded and inserted at a time
+
+        Returns:
+            Dict[str, Any]: backup, db_path, collection, restored (chunk count), reembedded and seconds
+
+        Raises:
+            Exception: If the backup is unreadable or the restored count does not match it;
+                the collection is left unchanged
+        """
+        start = time.perf_counter()
+        if os.path.isdir(backup):
+            backup = latest_backup(backup)
+        header, records = read_backup(backup)
+        collection = header.get("collection") or COLLECTION_NAME
+        if db_path is None:
+            db_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(backup))), collection)
+        metadata = dict(header.get("metadata") or {})
+        reembed = embedding_backend is not None or not header.get("embeddings")
+        ef = None
+        if reembed:
+            if embedding_backend is None and "embedding" in metadata:
+                ef = get_embedding_backend_from_description(json.loads(metadata["embedding"]))
             else:
-                end = text_length
+                ef = self.get_embedding_function(embedding_backend, embedding_options)
+            metadata["embedding"] = json.dumps(ef.describe())
 
-            chunks.append(text[start:end].strip())
-            start = max(end - overlap, start + 1)
-            
-            if text_length - start < chunk_size:
-                if start < text_length:
-                    chunks.append(text[start:].strip())
-                break
+        store = get_memory_sink(db_path, sink, collection)
+        restored = 0
+        try:
+            store.reset(metadata)
+            for batch in batched(records, batch_size):
+                ids, documents, embeddings, metadatas = (list(column) for column in zip(*batch))
+                embeddings = ef([document or "" for document in documents]) if reembed else np.stack(embeddings)
+                store.bulk_insert(ids, documents, embeddings, metadatas if any(metadatas) else None)
+                restored += len(ids)
+            if header.get("count") is not None and restored != header["count"]:
+                raise Exception(f"Backup {backup} has {restored} chunks but its header lists {header['count']}")
+        except BaseException:
+            store.abort()
+            raise
+        store.close()
+        with get_memory_sink(db_path, sink, collection) as check:
+            stored = check.count()
+        if stored != restored:
+            raise Exception(f"Restored {restored} chunks from {backup} but {db_path} holds {stored}")
+        return {"backup": backup, "db_path": db_path, "collection": collection, "restored": restored,
+                "reembedded": reembed, "seconds": round(time.perf_counter() - start, 3)}
+
+    @staticmethod
+    def _embed_memory_type(text: Any, ef: EmbeddingBackend, chunker: Chunker,
+                           profile: Optional[PipelineProfile] = None) -> Tuple[List[Tuple[str, Dict[str, Any]]], List[List[float]]]:
+        """
+        Chunk one memory type's text, a string or a text file read a piece at a time,
+        and embed the chunks; returns the chunk records and their embeddings
+        """
+        with profile_stage(profile, "chunk") as stage:
+            if isinstance(text, str):
+                stage["bytes"] = len(text)
+                records = chunker.chunk_records(text)
+            else:
+                pieces = iter(lambda: text.read(DEFAULT_CHUNK_SIZE), "")
+                records = list(chunker.iter_records(_counted(pieces, stage)))
+            stage["chunks"] = len(records)
+        if not records:
+            return records, []
+        with profile_stage(profile, "embed", chunks=len(records)):
+            embeddings = ef([chunk for chunk, _ in records])
+        return records, embeddings
+
+    def _chunk_text(self, text: str, chunk_size: int = 2000, overlap: int = 200) -> list:
+        """Split text into overlapping chunks"""
+        return CharacterChunker(chunk_size, overlap)(text)
+
+def _read_text(value: Any) -> Any:
+    """The whole text of a memory type given as a string or a text file"""
+    return value.read() if hasattr(value, "read") else value
 
-        return chunks
\ No newline at end of file
+def _counted(pieces, stage: Dict[str, Any]):
+    """Pass pieces of text through, adding their length to the stage's bytes"""
+    stage["bytes"] = 0
+    for piece in pieces:
+        stage["bytes"] += len(piece)
+        yield piece
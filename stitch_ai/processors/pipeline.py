@@ -0,0 +1,317 @@
+"""
+Streaming pull pipeline. Memory text is chunked while it downloads, chunks
+are embedded by worker threads as they are cut, and embedded batches are
+inserted into the sink behind them:
+
+    download ─▶ chunk (one thread per memory type) ─▶ embed (workers) ─▶ insert
+
+Stages are joined by bounded queues, so a stage that runs ahead waits for the
+next one instead of buffering the whole memory, and a pull takes about as
+long as its slowest stage rather than the sum of all of them.
+"""
+import time
+import queue
+import threading
+from typing import Any, Callable, Dict, List, Optional, TextIO
+from .chunking import Chunker
+from .embeddings import EmbeddingBackend
+from .profiling import PipelineProfile, profile_stage
+from .sinks import MemorySink
+from ..api.tracing import carry_context
+
+DEFAULT_EMBED_WORKERS = 2
+# Chunks per sink.bulk_insert call
+DEFAULT_INSERT_BATCH_SIZE = 512
+# Downloaded text pieces buffered per memory type, and batches buffered between stages
+DEFAULT_QUEUE_DEPTH = 8
+
+_POLL_INTERVAL = 0.1
+_START = "start"
+_DONE = "done"
+
+class _Stopped(Exception):
+    """Raised in a stage when another stage has failed"""
+
+def _put(q: queue.Queue, item: Any, stop: threading.Event) -> None:
+    while True:
+        try:
+            q.put(item, timeout=_POLL_INTERVAL)
+            return
+        except queue.Full:
+            if stop.is_set():
+                raise _Stopped()
+
+def _get(q: queue.Queue, stop: threading.Event) -> Any:
+    while True:
+        try:
+            return q.get(timeout=_POLL_INTERVAL)
+        except queue.Empty:
+            if stop.is_set():
+                raise _Stopped()
+
+class TextPipe:
+    """
+    Text file written on one thread and read, piece by piece, on another.
+    write() blocks while `depth` pieces are waiting to be read.
+
+    Args:
+        depth (int): Pieces buffered before the writer waits
+        stop (threading.Event): Set when the pipeline fails; blocked calls then raise
+        keep (bool): Also keep the text, for getvalue()
+    """
+
+    def __init__(self, depth: int, stop: threading.Event, keep: bool = False):
+        self._queue = queue.Queue(depth)
+        self._stop = stop
+        self._closed = False
+        self._ended = False
+        self._kept: Optional[List[str]] = [] if keep else None
+        self.characters = 0
+        self.wait_seconds = 0.0
+
+    def write(self, text: str) -> int:
+        if text:
+            _put(self._queue, text, self._stop)
+            self.characters += len(text)
+            if self._kept is not None:
+                self._kept.append(text)
+        return len(text)
+
+    def close(self) -> None:
+        """End of the text; the reader sees the end once it has read everything before it"""
+        if not self._closed:
+            self._closed = True
+            try:
+                _put(self._queue, None, self._stop)
+            except _Stopped:
+                pass
+
+    def getvalue(self) -> str:
+        return "".join(self._kept or [])
+
+    def __iter__(self):
+        while not self._ended:
+            start = time.perf_counter()
+            piece = _get(self._queue, self._stop)
+            self.wait_seconds += time.perf_counter() - start
+            if piece is None:
+                self._ended = True
+                return
+            yield piece
+
+class EmbeddingPipeline:
+    """
+    Chunk, embed and insert memory into a sink while it downloads.
+
+        pipeline = EmbeddingPipeline(sink, ef, chunker, metadata)
+        item = pipeline.run(fetch)
+
+    fetch(open_source) runs on a download thread. It calls open_source(memory_type)
+    for each memory type it finds, writes that type's text into the returned file
+    and closes it, and returns whatever the caller needs (e.g. the memory item).
+    The sink is reset when the first memory type is opened and is used only on the
+    thread that calls run(); closing or aborting it is left to the caller.
+
+    Args:
+        sink (MemorySink): Destination of the embedded chunks
+        ef (EmbeddingBackend): Embedding backend; chunks are embedded in batches of ef.batch_size
+        chunker (Chunker): Chunker; its iter_records() cuts chunks as text arrives
+        metadata (Optional[Dict[str, Any]]): Collection metadata passed to sink.reset()
+        workers (int): Embedding worker threads
+        insert_batch_size (int): Chunks per sink insert
+        depth (int): Queue depth between stages
+        keep_text (bool): Keep the downloaded text of each memory type (see texts)
+        profile (Optional[PipelineProfile]): Records the busy time of each stage
+    """
+
+    def __init__(self, sink: MemorySink, ef: EmbeddingBackend, chunker: Chunker,
+                 metadata: Optional[Dict[str, Any]] = None, workers: int = DEFAULT_EMBED_WORKERS,
+                 insert_batch_size: int = DEFAULT_INSERT_BATCH_SIZE, depth: int = DEFAULT_QUEUE_DEPTH,
+                 keep_text: bool = False, profile: Optional[PipelineProfile] = None):
+        self.sink = sink
+        self.ef = ef
+        self.chunker = chunker
+        self.metadata = metadata
+        self.workers = max(1, workers)
+        self.insert_batch_size = insert_batch_size
+        self.depth = depth
+        self.keep_text = keep_text
+        self.profile = profile
+        # Chunks inserted per memory type
+        self.chunks: Dict[str, int] = {}
+        self.started = False
+        self._pipes: Dict[str, TextPipe] = {}
+        self._chunk_threads: List[threading.Thread] = []
+        self._embed_queue = queue.Queue(depth)
+        self._insert_queue = queue.Queue(depth)
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._lock = threading.Lock()
+        self._sequence = 0
+        self._result = None
+
+    @property
+    def texts(self) -> Dict[str, str]:
+        """Downloaded text per memory type, with keep_text"""
+        return {memory_type: pipe.getvalue() for memory_type, pipe in self._pipes.items()}
+
+    def run(self, fetch: Callable[[Callable[[str], TextIO]], Any]) -> Any:
+        """
+        Run the pipeline until every chunk is inserted
+
+        Returns:
+            Any: The return value of fetch
+
+        Raises:
+            Exception: The first error of any stage, after the other stages have stopped
+        """
+        threads = [threading.Thread(target=carry_context(self._download), args=(fetch,), name="stitch-pull-download", daemon=True)]
+        threads += [threading.Thread(target=self._embed, name=f"stitch-pull-embed-{i}", daemon=True)
+                    for i in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        try:
+            # Overlaps loading the model with the download
+            with profile_stage(self.profile, "load_embedding"):
+                self.ef.load()
+            self._insert()
+        except _Stopped:
+            pass
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            for thread in threads:
+                thread.join()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+    def _fail(self, error: BaseException) -> None:
+        with self._lock:
+            if self._error is None:
+                self._error = error
+        self._stop.set()
+
+    def _open_source(self, memory_type: str) -> TextPipe:
+        if memory_type in self._pipes:
+            raise ValueError(f"Memory type {memory_type} was opened twice")
+        if not self._pipes:
+            _put(self._insert_queue, _START, self._stop)
+        pipe = self._pipes[memory_type] = TextPipe(self.depth, self._stop, self.keep_text)
+        thread = threading.Thread(target=self._chunk, args=(memory_type, pipe), name=f"stitch-pull-chunk-{memory_type}",
+                                  daemon=True)
+        self._chunk_threads.append(thread)
+        thread.start()
+        return pipe
+
+    def _download(self, fetch) -> None:
+        try:
+            self._result = fetch(self._open_source)
+        except _Stopped:
+            pass
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            for pipe in self._pipes.values():
+                pipe.close()
+            for thread in self._chunk_threads:
+                thread.join()
+        try:
+            for _ in range(self.workers):
+                _put(self._embed_queue, None, self._stop)
+        except _Stopped:
+            pass
+
+    def _chunk(self, memory_type: str, pipe: TextPipe) -> None:
+        start, cpu = time.perf_counter(), time.thread_time()
+        output_wait = 0.0
+        count = 0
+        batch: List[Any] = []
+        try:
+            for chunk, metadata in self.chunker.iter_records(pipe):
+                batch.append((f"{memory_type}-memory-{count}", chunk, {"memory_type": memory_type, **metadata}))
+                count += 1
+                if len(batch) >= self.ef.batch_size:
+                    output_wait += self._submit(batch)
+                    batch = []
+            if batch:
+                output_wait += self._submit(batch)
+            # A chunker may stop reading early; the download must not block on it
+            for _ in pipe:
+                pass
+        except _Stopped:
+            pass
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            with self._lock:
+                self.chunks[memory_type] = count
+            if self.profile is not None:
+                busy = time.perf_counter() - start - pipe.wait_seconds - output_wait
+                self.profile.record("chunk", busy, time.thread_time() - cpu, bytes=pipe.characters, chunks=count,
+                                    input_wait_seconds=pipe.wait_seconds, output_wait_seconds=output_wait)
+
+    def _submit(self, batch: List[Any]) -> float:
+        """Queue a batch for embedding; returns the seconds spent waiting for room"""
+        with self._lock:
+            sequence = self._sequence
+            self._sequence += 1
+        start = time.perf_counter()
+        _put(self._embed_queue, (sequence, batch), self._stop)
+        return time.perf_counter() - start
+
+    def _embed(self) -> None:
+        try:
+            while True:
+                item = _get(self._embed_queue, self._stop)
+                if item is None:
+                    _put(self._insert_queue, _DONE, self._stop)
+                    return
+                sequence, batch = item
+                start, cpu = time.perf_counter(), time.thread_time()
+                embeddings = self.ef([document for _, document, _ in batch])
+                if self.profile is not None:
+                    self.profile.record("embed", time.perf_counter() - start, time.thread_time() - cpu, chunks=len(batch))
+                _put(self._insert_queue, (sequence, batch, embeddings), self._stop)
+        except _Stopped:
+            pass
+        except BaseException as e:
+            self._fail(e)
+
+    def _insert(self) -> None:
+        """Insert embedded batches in the order they were chunked, insert_batch_size chunks at a time"""
+        pending: Dict[int, Any] = {}
+        next_sequence = 0
+        ids, documents, embeddings, metadatas = [], [], [], []
+        done = 0
+        while done < self.workers:
+            item = _get(self._insert_queue, self._stop)
+            if item == _START:
+                # Replacing a Chroma collection backs up the previous one first
+                with profile_stage(self.profile, "backup"):
+                    self.sink.reset(self.metadata)
+                self.started = True
+                continue
+            if item == _DONE:
+                done += 1
+                continue
+            pending[item[0]] = item
+            while next_sequence in pending:
+                _, batch, vectors = pending.pop(next_sequence)
+                next_sequence += 1
+                for (id_, document, metadata), vector in zip(batch, vectors):
+                    ids.append(id_)
+                    documents.append(document)
+                    metadatas.append(metadata)
+                    embeddings.append(vector)
+                if len(ids) >= self.insert_batch_size:
+                    self._bulk_insert(ids, documents, embeddings, metadatas)
+                    ids, documents, embeddings, metadatas = [], [], [], []
+        if ids:
+            self._bulk_insert(ids, documents, embeddings, metadatas)
+
+    def _bulk_insert(self, ids, documents, embeddings, metadatas) -> None:
+        start, cpu = time.perf_counter(), time.thread_time()
+        self.sink.bulk_insert(ids=ids, documents=documents, embeddings=embeddings, metadatas=metadatas)
+        if self.profile is not None:
+            self.profile.record("insert", time.perf_counter() - start, time.thread_time() - cpu, chunks=len(ids))
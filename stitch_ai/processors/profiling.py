@@ -0,0 +1,224 @@
+import os
+import sys
+import json
+import time
+import threading
+import contextlib
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+# RSS sampling interval while a pipeline runs
+MEMORY_SAMPLE_INTERVAL = 0.01
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes (peak so far where the current size is unavailable)"""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return peak if sys.platform == "darwin" else peak * 1024
+
+class PipelineProfile:
+    """
+    Stage timers for a push or pull pipeline, with the peak resident memory of
+    each stage sampled in the background.
+
+        profile = PipelineProfile("pull")
+        with profile:
+            with profile.stage("download"):
+                ...
+        profile.to_dict()
+
+    Stages entered more than once (e.g. embed for episodic and character memory)
+    are accumulated under one name. Nested stages are timed independently.
+    """
+
+    def __init__(self, name: str, sample_interval: float = MEMORY_SAMPLE_INTERVAL):
+        self.name = name
+        self.sample_interval = sample_interval
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self._active: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+        self._start = None
+        self._seconds = 0.0
+        self._peak_rss = 0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        self._peak_rss = current_rss()
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample, name="stitch-profile-sampler", daemon=True)
+        self._sampler.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._sampler.join()
+        self._record_rss(current_rss())
+        self._seconds = time.perf_counter() - self._start
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.sample_interval):
+            self._record_rss(current_rss())
+
+    def _record_rss(self, rss: int) -> None:
+        with self._lock:
+            self._peak_rss = max(self._peak_rss, rss)
+            for stage in self._active:
+                stage["peak_rss"] = max(stage["peak_rss"], rss)
+
+    @contextlib.contextmanager
+    def stage(self, name: str, **info: Any):
+        """
+        Time a stage
+
+        Args:
+            name (str): Stage name, e.g. "embed"
+            **info: Extra values recorded with the stage (numbers are summed across calls)
+        """
+        rss = current_rss()
+        active = {"peak_rss": rss}
+        with self._lock:
+            self._active.append(active)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield active
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            end_rss = current_rss()
+            with self._lock:
+                self._active.remove(active)
+                peak = max(active["peak_rss"], end_rss)
+                self._peak_rss = max(self._peak_rss, peak)
+                values = {**info, **{k: v for k, v in active.items() if k != "peak_rss"}}
+                self._accumulate(name, wall, cpu, peak, peak - rss, values)
+
+    def record(self, name: str, seconds: float, cpu_seconds: float = 0.0, **info: Any) -> None:
+        """
+        Add time measured elsewhere to a stage, such as the busy time of a worker
+        thread whose stage overlaps others. Memory is not sampled for these calls.
+        """
+        with self._lock:
+            self._accumulate(name, seconds, cpu_seconds, 0, 0, info)
+
+    def _accumulate(self, name: str, wall: float, cpu: float, peak: int, growth: int, values: Dict[str, Any]) -> None:
+        stage = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0, "cpu_seconds": 0.0,
+                                              "peak_rss": 0, "rss_growth": 0})
+        stage["calls"] += 1
+        stage["seconds"] += wall
+        stage["cpu_seconds"] += cpu
+        stage["peak_rss"] = max(stage["peak_rss"], peak)
+        stage["rss_growth"] = max(stage["rss_growth"], growth)
+        for key, value in values.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                stage[key] = stage.get(key, 0) + value
+            else:
+                stage[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict[str, Any]: pipeline, seconds, peak_rss_mb and stages, each with calls,
+                seconds, cpu_seconds, peak_rss_mb, rss_growth_mb and any recorded values
+        """
+        stages = []
+        for name, stage in self.stages.items():
+            entry = {"name": name}
+            for key, value in stage.items():
+                if key in ("peak_rss", "rss_growth"):
+                    entry[f"{key}_mb"] = round(value / (1024 * 1024), 1)
+                elif isinstance(value, float):
+                    entry[key] = round(value, 4)
+                else:
+                    entry[key] = value
+            stages.append(entry)
+        return {"pipeline": self.name, "seconds": round(self._seconds, 4),
+                "peak_rss_mb": round(self._peak_rss / (1024 * 1024), 1), "stages": stages}
+
+    def write(self, path: str) -> None:
+        """Write the profile as JSON"""
+        if os.path.dirname(os.path.abspath(path)):
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+@contextlib.contextmanager
+def profile_stage(profile: Optional[PipelineProfile], name: str, **info: Any):
+    """profile.stage(name) when profiling, otherwise a no-op"""
+    if profile is None:
+        yield {}
+    else:
+        with profile.stage(name, **info) as active:
+            yield active
+
+class StackSampler:
+    """
+    Statistical profiler: samples the Python stacks of all threads at a fixed
+    interval. Cheaper than cProfile on hot code, and it sees every thread.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples = 0
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stitch-stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def write_folded(self, path: str) -> None:
+        """Write collapsed stacks ("frame;frame;frame count"), the input format of flamegraph tools"""
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def top(self, limit: int = 25) -> List[Dict[str, Any]]:
+        """Functions by share of samples on the stack (total) and at the top of it (self)"""
+        total, own = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+        samples = sum(self.stacks.values()) or 1
+        return [{"function": frame, "total": round(count / samples, 4), "self": round(own[frame] / samples, 4)}
+                for frame, count in total.most_common(limit)]
+
+    def format_top(self, limit: int = 25) -> str:
+        lines = [f"{'total %':>8}{'self %':>8}  function"]
+        for row in self.top(limit):
+            lines.append(f"{row['total'] * 100:>8.1f}{row['self'] * 100:>8.1f}  {row['function']}")
+        return "\n".join(lines)
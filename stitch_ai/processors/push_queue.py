@@ -0,0 +1,415 @@
+"""
+Durable write-behind queue for memory pushes.
+
+push() calls are recorded in a SQLite file and uploaded by a background
+worker, so the caller does not wait for the export or the upload. Successive
+pushes to a space (and branch) that has not been uploaded yet are coalesced
+into one upload of the latest files. The files are copied next to the queue
+file when they are queued, so later changes to them do not reach the upload.
+"""
+import os
+import json
+import time
+import uuid
+import shutil
+import sqlite3
+import hashlib
+import threading
+import contextlib
+from typing import Any, Callable, Dict, List, Optional
+from ..api.retry import is_retryable, retry_delay
+from .locks import FileLock
+from .sqlite_export import snapshot_database
+
+DEFAULT_QUEUE_PATH = os.path.join(os.path.expanduser("~"), ".stitch-ai", "push-queue.sqlite")
+DEFAULT_PUSH_RETRIES = 5
+PENDING, UPLOADING, FAILED = "pending", "uploading", "failed"
+
+# Seconds between checks for pushes queued by other processes, and for a stop request
+_POLL_INTERVAL = 0.5
+_EPISODIC_ARGS = ("episodic_path", "episodic_format", "tables", "export_workers", "snapshot")
+_PATH_ARGS = ("episodic_path", "character_path", "profile_path")
+# Inputs of a push, copied into the queue's files directory when it is queued
+_FILE_ARGS = ("episodic_path", "character_path")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pushes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    target TEXT NOT NULL,
+    space TEXT NOT NULL,
+    state TEXT NOT NULL,
+    args TEXT NOT NULL,
+    pushes INTEGER NOT NULL,
+    enqueued_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS pushes_next ON pushes (target, state, next_attempt);
+CREATE INDEX IF NOT EXISTS pushes_space ON pushes (target, space, state);
+"""
+
+def queue_target(base_url: str, api_key: str) -> str:
+    """Account a queued push is uploaded with; a digest, so the API key is not stored"""
+    return hashlib.sha256(f"{base_url.rstrip('/')}\n{api_key}".encode("utf-8")).hexdigest()[:16]
+
+def merge_pushes(older: Dict[str, Any], newer: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    One push equivalent to two successive pushes to a space: the newer push's
+    files and options replace the older one's, memory type by memory type
+    """
+    merged = dict(older)
+    if newer.get("episodic_path"):
+        merged.update({key: newer.get(key) for key in _EPISODIC_ARGS})
+    if newer.get("character_path"):
+        merged["character_path"] = newer["character_path"]
+    for key, value in newer.items():
+        if key not in _EPISODIC_ARGS and key != "character_path":
+            merged[key] = value
+    return {key: value for key, value in merged.items() if value is not None}
+
+class PushQueue:
+    """
+    Pushes queued on disk and uploaded by a background worker thread.
+
+        queue = sdk.open_push_queue(path).start()
+        queue.enqueue("space", message="checkpoint", episodic_path="agent.sqlite")
+        queue.drain()
+
+    Every PushQueue on the same file and target shares one queue, also across
+    processes, and only one worker at a time uploads it. Uploads are retried
+    with backoff on connection errors and retryable statuses; other errors and
+    exhausted retries leave the push in the failed state. A push interrupted by
+    a crash is uploaded again, so a push may be uploaded more than once.
+
+    The episodic and character files of a push are copied into <path>.files
+    when it is queued, and the upload reads the copies. A copy is removed once
+    no queued push refers to it. Failed pushes keep theirs for retry_failed()
+    until purge_failed() drops them.
+
+    Args:
+        path (str): SQLite file of the queue, created if missing
+        target (str): Account the pushes belong to, from queue_target
+        upload (Optional[Callable[..., Any]]): Called as upload(space, **args) to upload a push; required to start the worker
+        retries (int): Retries of an upload before it fails
+    """
+
+    def __init__(self, path: str = DEFAULT_QUEUE_PATH, target: str = "", upload: Optional[Callable[..., Any]] = None,
+                 retries: int = DEFAULT_PUSH_RETRIES):
+        self.path = path
+        self.target = target
+        self.upload = upload
+        self.retries = retries
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+        self.files_dir = f"{path}.files"
+        self._released = []
+        self._cond = threading.Condition(threading.RLock())
+        self._thread = None
+        self._stopping = False
+        self.enqueued = self.coalesced = self.uploaded = self.retried = 0
+        self.last_error = None
+        self.last_lag = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        with self._cond:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            finally:
+                released, self._released = self._released, []
+        # Copies are removed only once the transaction that stopped referring to them is committed
+        self._remove(released)
+
+    def _copy_files(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        """args with the push's input files replaced by copies in the queue's files directory"""
+        copies = dict(args)
+        try:
+            for key in _FILE_ARGS:
+                if args.get(key):
+                    directory = os.path.join(self.files_dir, uuid.uuid4().hex)
+                    os.makedirs(directory)
+                    copies[key] = os.path.join(directory, os.path.basename(args[key]))
+                    if args[key].endswith('.sqlite'):
+                        snapshot_database(args[key], copies[key])
+                    else:
+                        shutil.copyfile(args[key], copies[key])
+        except BaseException:
+            self._remove(self._copies(copies, args))
+            raise
+        return copies
+
+    def _copies(self, args: Dict[str, Any], kept: Optional[Dict[str, Any]] = None) -> List[str]:
+        """The copied files args refers to that kept does not"""
+        kept_paths = [kept.get(key) for key in _FILE_ARGS] if kept else []
+        return [args[key] for key in _FILE_ARGS
+                if args.get(key) and args[key] not in kept_paths
+                and os.path.dirname(os.path.dirname(args[key])) == self.files_dir]
+
+    @staticmethod
+    def _remove(copies: List[str]) -> None:
+        for file_path in copies:
+            shutil.rmtree(os.path.dirname(file_path), ignore_errors=True)
+
+    def enqueue(self, space: str, **args: Any) -> Dict[str, Any]:
+        """
+        Queue a push to space, merged into the queued push to the same space and branch if there is one
+
+        Args:
+            space (str): Memory space to push to
+            **args: Keyword arguments of StitchSDK.push: message, episodic_path, character_path, ...
+
+        Returns:
+            Dict[str, Any]: queued, id, space, coalesced and the queue depth
+        """
+        args = {key: value for key, value in args.items() if value is not None}
+        for key in _PATH_ARGS:
+            if args.get(key):
+                args[key] = os.path.abspath(args[key])
+        for key in ("episodic_path", "character_path"):
+            if args.get(key) and not os.path.exists(args[key]):
+                raise FileNotFoundError(f"No such file: {args[key]}")
+        args = self._copy_files(args)
+        now = time.time()
+        try:
+            with self._transaction() as conn:
+                row = conn.execute("SELECT id, args FROM pushes WHERE target = ? AND space = ? AND state = ? "
+                                   "AND json_extract(args, '$.branch') IS ?",
+                                   (self.target, space, PENDING, args.get("branch"))).fetchone()
+                if row is None:
+                    push_id = conn.execute(
+                        "INSERT INTO pushes (target, space, state, args, pushes, enqueued_at, next_attempt) "
+                        "VALUES (?, ?, ?, ?, 1, ?, ?)", (self.target, space, PENDING, json.dumps(args), now, now)).lastrowid
+                else:
+                    push_id = row["id"]
+                    older = json.loads(row["args"])
+                    merged = merge_pushes(older, args)
+                    self._released.extend(self._copies(older, merged))
+                    conn.execute("UPDATE pushes SET args = ?, pushes = pushes + 1 WHERE id = ?",
+                                 (json.dumps(merged), push_id))
+                self.enqueued += 1
+                self.coalesced += row is not None
+                self._cond.notify_all()
+        except BaseException:
+            self._remove(self._copies(args))
+            raise
+        return {"queued": True, "id": push_id, "space": space, "coalesced": row is not None,
+                "depth": self.metrics()["depth"]}
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Queue depth and lag, and counts of this instance's work
+
+        Returns:
+            Dict[str, Any]: depth (pushes not uploaded yet), uploading, failed, lag_seconds (age of the
+            oldest push not uploaded yet), last_lag_seconds (queue time of the last upload), enqueued,
+            coalesced, uploaded, retries and last_error
+        """
+        with self._cond:
+            counts = dict(self.conn.execute("SELECT state, COUNT(*) FROM pushes WHERE target = ? GROUP BY state",
+                                            (self.target,)).fetchall())
+            oldest = self.conn.execute("SELECT MIN(enqueued_at) FROM pushes WHERE target = ? AND state != ?",
+                                       (self.target, FAILED)).fetchone()[0]
+            return {"depth": counts.get(PENDING, 0) + counts.get(UPLOADING, 0), "uploading": counts.get(UPLOADING, 0),
+                    "failed": counts.get(FAILED, 0),
+                    "lag_seconds": round(max(0.0, time.time() - oldest), 3) if oldest is not None else 0.0,
+                    "last_lag_seconds": self.last_lag, "enqueued": self.enqueued, "coalesced": self.coalesced,
+                    "uploaded": self.uploaded, "retries": self.retried, "last_error": self.last_error}
+
+    def entries(self, state: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Queued pushes, oldest first, optionally only those in one state"""
+        query, params = "SELECT * FROM pushes WHERE target = ?", [self.target]
+        if state is not None:
+            query += " AND state = ?"
+            params.append(state)
+        with self._cond:
+            rows = self.conn.execute(query + " ORDER BY id", params).fetchall()
+        return [{**dict(row), "args": json.loads(row["args"])} for row in rows]
+
+    def retry_failed(self) -> int:
+        """Queue failed pushes again; returns how many"""
+        with self._transaction() as conn:
+            rows = conn.execute("SELECT * FROM pushes WHERE target = ? AND state = ? ORDER BY id",
+                                (self.target, FAILED)).fetchall()
+            for row in rows:
+                self._requeue(conn, row, attempts=0, next_attempt=time.time(), error=row["error"])
+            self._cond.notify_all()
+        return len(rows)
+
+    def purge_failed(self) -> int:
+        """Drop failed pushes and their file copies; returns how many"""
+        with self._transaction() as conn:
+            rows = conn.execute("SELECT id, args FROM pushes WHERE target = ? AND state = ?",
+                                (self.target, FAILED)).fetchall()
+            for row in rows:
+                conn.execute("DELETE FROM pushes WHERE id = ?", (row["id"],))
+                self._released.extend(self._copies(json.loads(row["args"])))
+            self._cond.notify_all()
+        return len(rows)
+
+    def _requeue(self, conn: sqlite3.Connection, row: sqlite3.Row, attempts: int, next_attempt: float,
+                 error: Optional[str]) -> None:
+        """
+        Make a push pending again, folding in a newer pending push to the same space and
+        branch so there is one pending push per branch of a space, under the older id
+        """
+        args = json.loads(row["args"])
+        pushes = row["pushes"]
+        newer = conn.execute("SELECT id, args, pushes FROM pushes WHERE target = ? AND space = ? AND state = ? AND id != ? "
+                             "AND json_extract(args, '$.branch') IS ?",
+                             (self.target, row["space"], PENDING, row["id"], args.get("branch"))).fetchone()
+        if newer is not None:
+            newer_args = json.loads(newer["args"])
+            merged = merge_pushes(args, newer_args)
+            self._released.extend(self._copies(args, merged) + self._copies(newer_args, merged))
+            args = merged
+            pushes += newer["pushes"]
+            conn.execute("DELETE FROM pushes WHERE id = ?", (newer["id"],))
+        conn.execute("UPDATE pushes SET state = ?, args = ?, pushes = ?, attempts = ?, next_attempt = ?, error = ? "
+                     "WHERE id = ?", (PENDING, json.dumps(args), pushes, attempts, next_attempt, error, row["id"]))
+
+    def start(self) -> "PushQueue":
+        """Start the background worker, if it is not running"""
+        if self.upload is None:
+            raise ValueError("PushQueue needs an upload function to start its worker")
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name="stitch-push-queue", daemon=True)
+                self._thread.start()
+        return self
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def flush(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Wait until every push queued so far is uploaded or has failed, starting the worker if needed
+
+        Args:
+            timeout (Optional[float]): Seconds to wait; None waits indefinitely
+
+        Returns:
+            Dict[str, Any]: metrics() after the flush
+
+        Raises:
+            TimeoutError: If pushes are still queued after timeout seconds
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            last = self.conn.execute("SELECT MAX(id) FROM pushes WHERE target = ?", (self.target,)).fetchone()[0]
+            if last is None:
+                return self.metrics()
+            self.start()
+            while self.conn.execute("SELECT COUNT(*) FROM pushes WHERE target = ? AND id <= ? AND state != ?",
+                                    (self.target, last, FAILED)).fetchone()[0]:
+                if not self.running:
+                    raise Exception(f"Push queue worker stopped: {self.last_error}")
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"Pushes still queued after {timeout}s")
+                self._cond.wait(_POLL_INTERVAL if remaining is None else min(remaining, _POLL_INTERVAL))
+        return self.metrics()
+
+    def drain(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """flush(), then stop the worker"""
+        try:
+            return self.flush(timeout)
+        finally:
+            self.stop()
+
+    def stop(self) -> None:
+        """Stop the worker after its current upload; queued pushes stay on disk"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def close(self) -> None:
+        self.stop()
+        self.conn.close()
+
+    def _run(self) -> None:
+        # One worker per queue file and target, across processes
+        lock = FileLock(f"{self.path}.{self.target or 'default'}.lock", timeout=_POLL_INTERVAL)
+        try:
+            while not lock.held:
+                with self._cond:
+                    if self._stopping:
+                        return
+                try:
+                    lock.acquire()
+                except TimeoutError:
+                    pass
+            with self._transaction() as conn:
+                # Uploads interrupted by a crash of the previous worker
+                for row in conn.execute("SELECT * FROM pushes WHERE target = ? AND state = ? ORDER BY id",
+                                        (self.target, UPLOADING)).fetchall():
+                    self._requeue(conn, row, row["attempts"], time.time(), row["error"])
+            while True:
+                with self._cond:
+                    if self._stopping:
+                        return
+                    row, wait = self._next()
+                    if row is None:
+                        self._cond.wait(min(wait, _POLL_INTERVAL))
+                        continue
+                self._upload(row)
+        except Exception as e:
+            self.last_error = str(e)
+        finally:
+            lock.release()
+            with self._cond:
+                self._cond.notify_all()
+
+    def _next(self):
+        """The next push due for upload, marked uploading, or None and the seconds until one is due"""
+        with self._transaction() as conn:
+            row = conn.execute("SELECT * FROM pushes WHERE target = ? AND state = ? ORDER BY next_attempt, id LIMIT 1",
+                               (self.target, PENDING)).fetchone()
+            if row is None:
+                return None, _POLL_INTERVAL
+            wait = row["next_attempt"] - time.time()
+            if wait > 0:
+                return None, wait
+            conn.execute("UPDATE pushes SET state = ? WHERE id = ?", (UPLOADING, row["id"]))
+            return row, 0.0
+
+    def _upload(self, row: sqlite3.Row) -> None:
+        try:
+            self.upload(row["space"], **json.loads(row["args"]))
+        except Exception as e:
+            attempts = row["attempts"] + 1
+            with self._transaction() as conn:
+                if is_retryable(e) and attempts <= self.retries:
+                    self._requeue(conn, row, attempts, time.time() + retry_delay(e.response, attempts), str(e))
+                    self.retried += 1
+                else:
+                    conn.execute("UPDATE pushes SET state = ?, attempts = ?, error = ? WHERE id = ?",
+                                 (FAILED, attempts, str(e), row["id"]))
+                self.last_error = str(e)
+                self._cond.notify_all()
+            return
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM pushes WHERE id = ?", (row["id"],))
+            self._released.extend(self._copies(json.loads(row["args"])))
+            self.uploaded += 1
+            self.last_lag = round(time.time() - row["enqueued_at"], 3)
+            self._cond.notify_all()
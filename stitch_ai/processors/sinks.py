@@ -0,0 +1,500 @@
+import os
+import json
+import sys
+import time
+import sqlite3
+import datetime
+import numpy as np
+from typing import Dict, Any, List, Optional, Tuple, Type
+from .backups import write_backup
+from .locks import FileLock
+
+COLLECTION_NAME = "short_term"
+# Seconds a pull waits for another pull into the same store (None: as long as it takes)
+LOCK_TIMEOUT = None
+
+SEARCH_METHODS = ("auto", "exact", "ann")
+# With "auto", stores with at least this many chunks are searched through an HNSW index
+ANN_THRESHOLD = 10000
+# HNSW search breadth; 400 keeps recall@10 around 0.97 on 384-dimensional embeddings (benchmarks/search.py)
+ANN_EF = 400
+
+class MemorySink:
+    """
+    Destination for embedded memory chunks.
+
+    A pull calls reset() once, then bulk_insert() with whole batches, then close().
+    Readers use load() to get every stored chunk, or query() for the top-k matches.
+    """
+
+    name: str = ""
+
+    def __init__(self, path: str, collection: str = COLLECTION_NAME):
+        self.path = path
+        self.collection = collection
+        self._loaded = None
+
+    def reset(self, metadata: Optional[Dict[str, Any]] = None) -> None:
+        """Drop existing chunks and start an empty collection described by metadata"""
+        raise NotImplementedError
+
+    def bulk_insert(self, ids: List[str], documents: List[str], embeddings: List[List[float]],
+                    metadatas: Optional[List[Optional[Dict[str, Any]]]] = None) -> None:
+        """Insert a batch of chunks"""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Flush pending writes"""
+
+    def abort(self) -> None:
+        """Discard pending writes after a failure"""
+        self.close()
+
+    def metadata(self) -> Dict[str, Any]:
+        """Collection metadata written by reset()"""
+        raise NotImplementedError
+
+    def load(self) -> Tuple[List[str], List[str], np.ndarray, List[Optional[Dict[str, Any]]]]:
+        """Return ids, documents, an (n, dim) float32 embedding matrix and metadatas"""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        """Number of stored chunks"""
+        return len(self.load()[0])
+
+    def query(self, embedding: List[float], k: int = 5, method: str = "auto",
+              where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Top-k chunks by cosine similarity. Stored chunks are loaded once per sink.
+
+        Args:
+            embedding (List[float]): Query embedding
+            k (int): Number of results
+            method (str): "exact" for brute force, "ann" for an HNSW index, or "auto"
+                to pick by store size
+            where (Optional[Dict[str, Any]]): Only consider chunks whose metadata has
+                these values; filtered searches are always exact
+        """
+        if method not in SEARCH_METHODS:
+            raise ValueError(f"Unknown search method: {method} (available: {', '.join(SEARCH_METHODS)})")
+        if self._loaded is None:
+            self._loaded = self.load()
+        ids, documents, embeddings, metadatas = self._loaded
+        query = np.asarray(embedding, dtype=np.float32)
+        if where:
+            rows = [i for i, metadata in enumerate(metadatas) if metadata_matches(metadata, where)]
+            return top_k(query, [ids[i] for i in rows], [documents[i] for i in rows], embeddings[rows],
+                         [metadatas[i] for i in rows], k)
+        if method == "auto":
+            method = "ann" if len(ids) >= ANN_THRESHOLD and _hnswlib() is not None else "exact"
+        if method == "exact" or len(ids) == 0:
+            return top_k(query, ids, documents, embeddings, metadatas, k)
+        labels, distances = self._ann_index(embeddings, k).knn_query(query, k=min(k, len(ids)))
+        return [
+            {"id": ids[i], "document": documents[i], "score": 1.0 - float(d), "metadata": metadatas[i] if metadatas else None}
+            for i, d in zip(labels[0], distances[0])
+        ]
+
+    def _index_path(self) -> Optional[str]:
+        """File the HNSW index is cached in, or None to keep it in memory only"""
+        return None
+
+    def _ann_index(self, embeddings: np.ndarray, k: int):
+        if getattr(self, "_index", None) is not None:
+            return self._index
+        hnswlib = _hnswlib()
+        if hnswlib is None:
+            raise Exception("ANN search requires hnswlib (installed with chromadb as chroma-hnswlib)")
+        index = hnswlib.Index(space="cosine", dim=embeddings.shape[1])
+        index_path = self._index_path()
+        if index_path and os.path.exists(index_path) and os.path.getmtime(index_path) >= os.path.getmtime(self.path):
+            index.load_index(index_path, max_elements=len(embeddings))
+        else:
+            index.init_index(max_elements=len(embeddings), ef_construction=200, M=16)
+            index.add_items(embeddings, np.arange(len(embeddings)))
+            if index_path:
+                index.save_index(index_path)
+        index.set_ef(max(ANN_EF, k))
+        self._index = index
+        return index
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def _hnswlib():
+    try:
+        import hnswlib
+        return hnswlib
+    except ImportError:
+        return None
+
+def metadata_matches(metadata: Optional[Dict[str, Any]], where: Dict[str, Any]) -> bool:
+    """Whether metadata has every key of where with an equal value"""
+    return metadata is not None and all(key in metadata and metadata[key] == value for key, value in where.items())
+
+def top_k(query: np.ndarray, ids, documents, embeddings: np.ndarray, metadatas, k: int) -> List[Dict[str, Any]]:
+    """Brute-force cosine similarity search"""
+    if len(ids) == 0:
+        return []
+    norms = np.linalg.norm(embeddings, axis=1) * (np.linalg.norm(query) or 1.0)
+    scores = (embeddings @ query) / np.where(norms == 0, 1.0, norms)
+    k = min(k, len(ids))
+    best = np.argpartition(-scores, k - 1)[:k]
+    best = best[np.argsort(-scores[best])]
+    return [
+        {"id": ids[i], "document": documents[i], "score": float(scores[i]), "metadata": metadatas[i] if metadatas else None}
+        for i in best
+    ]
+
+
+class ChromaSink(MemorySink):
+    """
+    ChromaDB persistent collection in the directory containing path.
+
+    A pull holds the store's write lock from reset() to close(), so concurrent
+    pulls into one directory run one after another. Chunks go to a staging
+    collection; close() renames it to the collection name, under a swap lock that
+    readers share for each read. Every read looks the collection up by name, so a
+    reader opened before a swap sees the old collection until the swap and the new
+    one after it, and the retired collection is never deleted under a read. A swap
+    interrupted between its two renames leaves no live collection; the next reset()
+    renames the newest retired collection back first.
+    """
+
+    name = "chroma"
+
+    def __init__(self, path: str, collection: str = COLLECTION_NAME):
+        super().__init__(path, collection)
+        import chromadb
+        self.db_dir = os.path.dirname(path)
+        self._collection = None
+        self._staging = None
+        self._write_lock = None
+        # Opening a new store creates its tables, which must not run twice at once
+        with self._lock("open"):
+            self.client = chromadb.PersistentClient(path=self.db_dir)
+
+    def _lock(self, kind: str, shared: bool = False) -> FileLock:
+        return FileLock(os.path.join(self.db_dir, f".{self.collection}.{kind}.lock"), shared, LOCK_TIMEOUT)
+
+    def _scratch_name(self, kind: str) -> str:
+        # Chroma names are at most 63 characters and must end with a letter or digit;
+        # the microsecond timestamp sorts the names of a kind by creation
+        return f"{self.collection[:40]}-{kind}-{time.time_ns() // 1000:013x}"
+
+    def reset(self, metadata: Optional[Dict[str, Any]] = None) -> None:
+        self._write_lock = self._lock("write").acquire()
+        try:
+            # Left behind by a writer that crashed; no other writer can be using them while we hold the lock
+            names = self.client.list_collections()
+            retired = sorted(name for name in names if name.startswith(f"{self.collection[:40]}-retired-"))
+            if self.collection not in names and retired:
+                # The writer died between the renames of a swap: the newest retired collection is the live data
+                with self._lock("swap"):
+                    self.client.get_collection(retired.pop()).modify(name=self.collection)
+            for name in names:
+                if name in retired or name.startswith(f"{self.collection[:40]}-staging-"):
+                    self.client.delete_collection(name)
+            self._backup_existing_collection()
+            self._staging = self._scratch_name("staging")
+            self._collection = self.client.create_collection(
+                name=self._staging,
+                metadata={"description": "Short term memory collection", **(metadata or {})}
+            )
+        except BaseException:
+            self.abort()
+            raise
+
+    def bulk_insert(self, ids, documents, embeddings, metadatas=None) -> None:
+        batch_size = self.client.get_max_batch_size()
+        for start in range(0, len(ids), batch_size):
+            end = start + batch_size
+            self._collection.add(
+                ids=ids[start:end],
+                documents=documents[start:end],
+                embeddings=embeddings[start:end],
+                metadatas=metadatas[start:end] if metadatas else None,
+            )
+
+    def close(self) -> None:
+        """Swap the staging collection in for the live one"""
+        if self._staging is None:
+            return
+        try:
+            retired = None
+            with self._lock("swap"):
+                if self.collection in self.client.list_collections():
+                    retired = self._scratch_name("retired")
+                    self.client.get_collection(self.collection).modify(name=retired)
+                self._collection.modify(name=self.collection)
+            self._staging = None
+            if retired is not None:
+                self.client.delete_collection(retired)
+        finally:
+            self._release()
+
+    def abort(self) -> None:
+        """Drop the staging collection; the live one is untouched"""
+        try:
+            if self._staging is not None:
+                self._staging, staging = None, self._staging
+                self._collection = None
+                if staging in self.client.list_collections():
+                    self.client.delete_collection(staging)
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        if self._write_lock is not None:
+            self._write_lock.release()
+            self._write_lock = None
+
+    def _read(self, read):
+        """read(collection) on the live collection, looked up by name under the shared swap lock"""
+        with self._lock("swap", shared=True):
+            return read(self.client.get_collection(self.collection))
+
+    def metadata(self) -> Dict[str, Any]:
+        return self._read(lambda collection: dict(collection.metadata or {}))
+
+    def count(self) -> int:
+        return self._read(lambda collection: collection.count())
+
+    def load(self):
+        data = self._read(lambda collection: collection.get(include=["documents", "embeddings", "metadatas"]))
+        embeddings = np.asarray(data["embeddings"], dtype=np.float32)
+        return data["ids"], data["documents"], embeddings, data["metadatas"]
+
+    def query(self, embedding, k: int = 5, method: str = "auto", where=None):
+        """Top-k search on the collection's own HNSW index, or brute force with method='exact'"""
+        if method == "exact":
+            return super().query(embedding, k, method, where)
+        if where and len(where) > 1:
+            where = {"$and": [{key: value} for key, value in where.items()]}
+        result = self._read(lambda collection: collection.query(
+            query_embeddings=[embedding], n_results=min(k, collection.count()) or 1,
+            where=where or None, include=["documents", "distances", "metadatas"]))
+        return [
+            # Embeddings are normalized and the index uses squared L2, so cosine = 1 - d / 2
+            {"id": id_, "document": document, "score": 1.0 - distance / 2, "metadata": metadata}
+            for id_, document, distance, metadata in zip(
+                result["ids"][0], result["documents"][0], result["distances"][0], result["metadatas"][0])
+        ]
+
+    def _backup_existing_collection(self) -> None:
+        """Create backup of existing collection if it exists"""
+        if self.collection in self.client.list_collections():
+            backup_dir = os.path.join(self.db_dir, "backups")
+            os.makedirs(backup_dir, exist_ok=True)
+
+            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            backup_file = os.path.join(backup_dir, f"{self.collection}_backup_{timestamp}.jsonl")
+            count = 1
+            while os.path.exists(backup_file):
+                # Pulls no longer wait for each other to delete a collection, so backups can share a second
+                count += 1
+                backup_file = os.path.join(backup_dir, f"{self.collection}_backup_{timestamp}_{count}.jsonl")
+
+            # Streamed a page at a time, with the embeddings, so restoring needs no re-embedding
+            write_backup(self.client.get_collection(self.collection), backup_file)
+
+            # stderr, so it stays out of machine-readable --output on stdout
+            print(f"Created backup at: {backup_file}", file=sys.stderr)
+
+
+class NumpySink(MemorySink):
+    """
+    Flat float32 .npy vector file, opened memory-mapped for reading, with a JSONL
+    sidecar (<name>.docs.jsonl) holding the collection metadata and one
+    id/document/metadata record per row. Files are replaced atomically on close.
+    Like ChromaSink, a pull holds a write lock from reset() to close(), and both
+    files are replaced under a swap lock that load() shares.
+    """
+
+    name = "numpy"
+
+    def __init__(self, path: str, collection: str = COLLECTION_NAME):
+        super().__init__(path, collection)
+        self.sidecar_path = os.path.splitext(path)[0] + ".docs.jsonl"
+        self._metadata = None
+        self._batches = []
+        self._records = None
+        self._write_lock = None
+
+    def _lock(self, kind: str, shared: bool = False) -> FileLock:
+        directory, name = os.path.split(os.path.abspath(self.path))
+        return FileLock(os.path.join(directory, f".{name}.{kind}.lock"), shared, LOCK_TIMEOUT)
+
+    def reset(self, metadata=None) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._write_lock = self._lock("write").acquire()
+        self._metadata = {"collection": self.collection, **(metadata or {})}
+        self._batches = []
+        self._records = open(self.sidecar_path + ".tmp", "w", encoding="utf-8")
+        self._records.write(json.dumps(self._metadata) + "\n")
+
+    def bulk_insert(self, ids, documents, embeddings, metadatas=None) -> None:
+        self._batches.append(np.asarray(embeddings, dtype=np.float32))
+        for i, (id_, document) in enumerate(zip(ids, documents)):
+            record = {"id": id_, "document": document, "metadata": metadatas[i] if metadatas else None}
+            self._records.write(json.dumps(record) + "\n")
+
+    def close(self) -> None:
+        if self._records is None:
+            return
+        self._records.close()
+        self._records = None
+        try:
+            vectors = np.concatenate(self._batches) if self._batches else np.zeros((0, 0), dtype=np.float32)
+            with open(self.path + ".tmp", "wb") as f:
+                np.save(f, vectors)
+            with self._lock("swap"):
+                os.replace(self.path + ".tmp", self.path)
+                os.replace(self.sidecar_path + ".tmp", self.sidecar_path)
+                if os.path.exists(self._index_path()):
+                    os.remove(self._index_path())
+            self._batches = []
+        finally:
+            self._release()
+
+    def abort(self) -> None:
+        if self._records is None:
+            return
+        self._records.close()
+        self._records = None
+        os.remove(self.sidecar_path + ".tmp")
+        self._batches = []
+        self._release()
+
+    def _release(self) -> None:
+        if self._write_lock is not None:
+            self._write_lock.release()
+            self._write_lock = None
+
+    def _index_path(self) -> Optional[str]:
+        return os.path.splitext(self.path)[0] + ".hnsw"
+
+    def _read_sidecar(self):
+        with open(self.sidecar_path, "r", encoding="utf-8") as f:
+            metadata = json.loads(f.readline())
+            records = [json.loads(line) for line in f]
+        return metadata, records
+
+    def metadata(self) -> Dict[str, Any]:
+        with open(self.sidecar_path, "r", encoding="utf-8") as f:
+            return json.loads(f.readline())
+
+    def count(self) -> int:
+        with self._lock("swap", shared=True):
+            return np.load(self.path, mmap_mode="r").shape[0]
+
+    def load(self):
+        with self._lock("swap", shared=True):
+            _, records = self._read_sidecar()
+            embeddings = np.load(self.path, mmap_mode="r")
+        return ([r["id"] for r in records], [r["document"] for r in records],
+                embeddings, [r["metadata"] for r in records])
+
+
+class SQLiteSink(MemorySink):
+    """SQLite database with one row per chunk and the embedding stored as a float32 blob"""
+
+    name = "sqlite"
+
+    def __init__(self, path: str, collection: str = COLLECTION_NAME):
+        super().__init__(path, collection)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS collections (name TEXT PRIMARY KEY, metadata TEXT);
+            CREATE TABLE IF NOT EXISTS chunks (
+                collection TEXT NOT NULL,
+                id TEXT NOT NULL,
+                document TEXT,
+                metadata TEXT,
+                embedding BLOB NOT NULL,
+                PRIMARY KEY (collection, id)
+            );
+        """)
+
+    def reset(self, metadata=None) -> None:
+        # Everything up to close() happens in one transaction, so readers see the old or the new collection
+        self.conn.execute("BEGIN")
+        self.conn.execute("DELETE FROM chunks WHERE collection = ?", (self.collection,))
+        self.conn.execute("INSERT OR REPLACE INTO collections (name, metadata) VALUES (?, ?)",
+                          (self.collection, json.dumps(metadata or {})))
+
+    def bulk_insert(self, ids, documents, embeddings, metadatas=None) -> None:
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        self.conn.executemany(
+            "INSERT INTO chunks (collection, id, document, metadata, embedding) VALUES (?, ?, ?, ?, ?)",
+            (
+                (self.collection, id_, document,
+                 json.dumps(metadatas[i]) if metadatas and metadatas[i] is not None else None,
+                 vectors[i].tobytes())
+                for i, (id_, document) in enumerate(zip(ids, documents))
+            ),
+        )
+
+    def close(self) -> None:
+        if self.conn.in_transaction:
+            self.conn.commit()
+        self.conn.close()
+
+    def abort(self) -> None:
+        self.conn.rollback()
+        self.conn.close()
+
+    def metadata(self) -> Dict[str, Any]:
+        row = self.conn.execute("SELECT metadata FROM collections WHERE name = ?", (self.collection,)).fetchone()
+        if row is None:
+            raise Exception(f"Collection {self.collection} not found in {self.path}")
+        return json.loads(row[0])
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM chunks WHERE collection = ?", (self.collection,)).fetchone()[0]
+
+    def load(self):
+        rows = self.conn.execute(
+            "SELECT id, document, metadata, embedding FROM chunks WHERE collection = ? ORDER BY rowid",
+            (self.collection,)).fetchall()
+        embeddings = np.frombuffer(b"".join(row[3] for row in rows), dtype=np.float32)
+        if rows:
+            embeddings = embeddings.reshape(len(rows), -1)
+        return ([row[0] for row in rows], [row[1] for row in rows], embeddings,
+                [json.loads(row[2]) if row[2] else None for row in rows])
+
+
+MEMORY_SINKS: Dict[str, Type[MemorySink]] = {
+    ChromaSink.name: ChromaSink,
+    NumpySink.name: NumpySink,
+    SQLiteSink.name: SQLiteSink,
+}
+
+def register_memory_sink(sink_class: Type[MemorySink]) -> None:
+    """Make a custom sink available by its name"""
+    MEMORY_SINKS[sink_class.name] = sink_class
+
+def infer_sink_name(path: str) -> str:
+    """Pick a sink from the output path: .npy files use the NumPy sink, anything else ChromaDB"""
+    return NumpySink.name if path.endswith(".npy") else ChromaSink.name
+
+def get_memory_sink(path: str, name: Optional[str] = None, collection: str = COLLECTION_NAME) -> MemorySink:
+    """
+    Open a sink for path
+
+    Raises:
+        ValueError: If the sink name is unknown
+    """
+    name = name or infer_sink_name(path)
+    if name not in MEMORY_SINKS:
+        raise ValueError(f"Unknown memory sink: {name} (available: {', '.join(MEMORY_SINKS)})")
+    return MEMORY_SINKS[name](path, collection)
@@ -0,0 +1,171 @@
+import os
+import json
+import base64
+import shutil
+import sqlite3
+import fnmatch
+import tempfile
+import contextlib
+import multiprocessing
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from typing import Any, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+DEFAULT_TABLES = ("memories",)
+# Key of the object a non-UTF-8 blob is exported as in the JSON layout
+BLOB_KEY = "$b64"
+
+TableRows = Tuple[str, List[str], List[tuple]]
+
+def connect_readonly(file_path: str) -> sqlite3.Connection:
+    """
+    Open a SQLite database read-only. In WAL mode a reader never blocks the
+    agent writing to the database, and each read transaction sees a snapshot.
+    """
+    if not os.path.exists(file_path):
+        raise Exception(f"SQLite database not found - {file_path}")
+    conn = sqlite3.connect(f"file:{quote(os.path.abspath(file_path))}?mode=ro", uri=True, check_same_thread=False)
+    conn.execute("PRAGMA query_only = ON")
+    return conn
+
+def resolve_tables(file_path: str, tables: Optional[Sequence[str]] = None) -> List[str]:
+    """
+    Expand table names and glob patterns (e.g. "logs_*") against the database
+
+    Raises:
+        Exception: If a plain table name does not exist or a pattern matches nothing
+    """
+    conn = connect_readonly(file_path)
+    try:
+        existing = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+    finally:
+        conn.close()
+    resolved = []
+    for pattern in tables or DEFAULT_TABLES:
+        matches = fnmatch.filter(existing, pattern)
+        if not matches:
+            raise Exception(f"No table matching '{pattern}' in {file_path}")
+        resolved.extend(name for name in matches if name not in resolved)
+    return resolved
+
+def _read_table(file_path: str, table: str) -> TableRows:
+    conn = connect_readonly(file_path)
+    try:
+        cursor = conn.execute(f'SELECT * FROM "{table.replace(chr(34), chr(34) * 2)}"')
+        columns = [description[0] for description in cursor.description]
+        return table, columns, cursor.fetchall()
+    finally:
+        conn.close()
+
+def snapshot_database(file_path: str, target_path: str) -> None:
+    """
+    Copy a live database with SQLite's online backup API. The copy is one
+    consistent snapshot across all tables.
+    """
+    source = connect_readonly(file_path)
+    target = sqlite3.connect(target_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+@contextlib.contextmanager
+def _export_source(file_path: str, snapshot: bool):
+    """Yield the path to read from: the database itself, or a temporary backup copy"""
+    if not snapshot:
+        yield file_path
+        return
+    snapshot_dir = tempfile.mkdtemp(prefix="stitch-export-")
+    try:
+        snapshot_path = os.path.join(snapshot_dir, "snapshot.sqlite")
+        snapshot_database(file_path, snapshot_path)
+        yield snapshot_path
+    finally:
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+
+def iter_sqlite_tables(file_path: str, tables: Optional[Sequence[str]] = None, workers: Optional[int] = None,
+                       snapshot: bool = False, ordered: bool = False) -> Iterator[TableRows]:
+    """
+    Read tables concurrently, one read-only connection per table, yielding
+    (table, columns, rows) as each table finishes, or in table order if ordered.
+
+    Without snapshot, each table is read in its own read transaction, so tables
+    are individually consistent but may come from slightly different points in
+    time if the agent is writing. With snapshot, the database is first copied
+    with the backup API and all tables are read from that copy.
+
+    Args:
+        file_path (str): Path to the SQLite database
+        tables (Optional[Sequence[str]]): Table names or glob patterns (default: memories)
+        workers (Optional[int]): Concurrent readers (default: one per table, at most the CPU count)
+        snapshot (bool): Read from a consistent copy of the database
+        ordered (bool): Yield tables in the order they were requested
+    """
+    try:
+        names = resolve_tables(file_path, tables)
+        with _export_source(file_path, snapshot) as source:
+            with ThreadPoolExecutor(max_workers=_workers(workers, names)) as executor:
+                futures = [executor.submit(_read_table, source, name) for name in names]
+                for future in (futures if ordered else as_completed(futures)):
+                    yield future.result()
+    except sqlite3.Error as e:
+        raise Exception(f"Error reading SQLite database: {e}")
+
+def _workers(workers: Optional[int], names: List[str]) -> int:
+    return max(workers or min(len(names), os.cpu_count() or 1), 1)
+
+def json_safe_row(row: Sequence[Any]) -> List[Any]:
+    """
+    Row with blobs as UTF-8 text when they decode, otherwise as {"$b64": base64}, so an
+    import can tell base64 from text that merely looks like it
+    """
+    processed_row = []
+    for item in row:
+        if isinstance(item, bytes):
+            try:
+                processed_row.append(item.decode('utf-8'))
+            except UnicodeDecodeError:
+                processed_row.append({BLOB_KEY: base64.b64encode(item).decode('ascii')})
+        else:
+            processed_row.append(item)
+    return processed_row
+
+def _encode_table(file_path: str, table: str) -> str:
+    """Read a table and encode it as one "name": {"columns", "rows"} JSON member"""
+    table, columns, rows = _read_table(file_path, table)
+    return json.dumps({table: {"columns": columns, "rows": [json_safe_row(row) for row in rows]}})[1:-1]
+
+def write_sqlite_export(file_path: str, out: TextIO, tables: Optional[Sequence[str]] = None,
+                        workers: Optional[int] = None, snapshot: bool = False) -> None:
+    """
+    Write tables as the JSON layout {table: {"columns": [...], "rows": [...]}} to out,
+    one table at a time as soon as it has been encoded.
+
+    Encoding rows to JSON holds the GIL, so with more than one worker each table
+    is read and encoded in a separate process and export time scales with cores.
+    """
+    try:
+        names = resolve_tables(file_path, tables)
+        workers = _workers(workers, names)
+        with _export_source(file_path, snapshot) as source:
+            out.write("{")
+            if workers == 1:
+                members = (_encode_table(source, name) for name in names)
+            else:
+                # Spawned rather than forked, so exporting from a threaded process (e.g. the daemon) is safe
+                executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+                futures = [executor.submit(_encode_table, source, name) for name in names]
+                members = (future.result() for future in as_completed(futures))
+            try:
+                for index, member in enumerate(members):
+                    if index:
+                        out.write(", ")
+                    out.write(member)
+            finally:
+                if workers > 1:
+                    executor.shutdown(cancel_futures=True)
+            out.write("}")
+    except sqlite3.Error as e:
+        raise Exception(f"Error reading SQLite database: {e}")
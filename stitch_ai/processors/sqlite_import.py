@@ -0,0 +1,136 @@
+import os
+import json
+import base64
+import sqlite3
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Sequence
+
+from .columnar import is_columnar, decode_tables
+from .sqlite_export import BLOB_KEY
+
+IMPORT_MODES = ("replace", "upsert")
+DEFAULT_BATCH_SIZE = 50000
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+def parse_episodic_tables(text: str) -> Dict[str, tuple]:
+    """Table name to (columns, rows) from a JSON layout or columnar episodic payload"""
+    if is_columnar(text):
+        return decode_tables(text)
+    try:
+        data = json.loads(text)
+    except ValueError:
+        raise Exception("Episodic memory is not a SQLite export")
+    if not isinstance(data, dict) or not all(
+            isinstance(table, dict) and "columns" in table and "rows" in table for table in data.values()):
+        raise Exception("Episodic memory is not a SQLite export")
+    return {name: (table["columns"], _decode_blobs(table["rows"])) for name, table in data.items()}
+
+def _to_blob(value: Any) -> Any:
+    """
+    Undo the JSON layout's blob encoding: blobs that were valid UTF-8 were sent
+    as text, anything else as {"$b64": base64}
+    """
+    if isinstance(value, dict) and set(value) == {BLOB_KEY}:
+        return base64.b64decode(value[BLOB_KEY])
+    if isinstance(value, str):
+        return value.encode("utf-8")
+    return value
+
+def _decode_blobs(rows: List[List[Any]]) -> List[List[Any]]:
+    """Decode {"$b64": ...} values in any column, which can hold blobs without declaring BLOB"""
+    for row in rows:
+        for i, value in enumerate(row):
+            if isinstance(value, dict):
+                row[i] = _to_blob(value)
+    return rows
+
+def _table_info(conn: sqlite3.Connection, table: str) -> List[tuple]:
+    return conn.execute(f"PRAGMA table_info({_quote(table)})").fetchall()
+
+def _create_table(conn: sqlite3.Connection, table: str, columns: Sequence[str]) -> None:
+    definitions = [f"{_quote(c)} PRIMARY KEY" if c == "id" else _quote(c) for c in columns]
+    conn.execute(f"CREATE TABLE {_quote(table)} ({', '.join(definitions)})")
+
+def _rows(rows: Iterable[Sequence[Any]], blob_indexes: List[int]) -> Iterable[Sequence[Any]]:
+    if not blob_indexes:
+        return rows
+    def convert(row):
+        row = list(row)
+        for i in blob_indexes:
+            row[i] = _to_blob(row[i])
+        return row
+    return map(convert, rows)
+
+def import_sqlite_tables(file_path: str, tables: Dict[str, tuple], mode: str = "replace",
+                         batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Bulk-load tables into a SQLite database in a single transaction
+
+    Missing tables are created (with "id" as primary key when present). Existing
+    tables keep their schema; text values for BLOB columns are decoded back to bytes.
+
+    Args:
+        file_path (str): Target database, created if needed
+        tables (Dict[str, tuple]): Table name to (columns, rows)
+        mode (str): "replace" to swap each table's rows, or "upsert" to insert new rows
+            and update existing ones by primary key
+        batch_size (int): Rows per executemany call
+
+    Returns:
+        Dict[str, int]: Rows written per table
+
+    Raises:
+        Exception: If upserting into a table without a primary key, or the import fails
+    """
+    if mode not in IMPORT_MODES:
+        raise ValueError(f"Unknown import mode: {mode} (available: {', '.join(IMPORT_MODES)})")
+    os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+    conn = sqlite3.connect(file_path, isolation_level=None)
+    counts = {}
+    try:
+        # WAL keeps readers (e.g. a running agent) unblocked; NORMAL sync is durable at checkpoints
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute("PRAGMA cache_size = -65536")
+        conn.execute("BEGIN IMMEDIATE")
+        for table, (columns, rows) in tables.items():
+            info = _table_info(conn, table)
+            if not info:
+                _create_table(conn, table, columns)
+                info = _table_info(conn, table)
+            declared = {row[1]: (row[2] or "").upper() for row in info}
+            primary_key = [row[1] for row in sorted(info, key=lambda row: row[5]) if row[5]]
+            blob_indexes = [i for i, c in enumerate(columns) if "BLOB" in declared.get(c, "")]
+
+            column_list = ", ".join(_quote(c) for c in columns)
+            sql = f"INSERT INTO {_quote(table)} ({column_list}) VALUES ({', '.join('?' * len(columns))})"
+            if mode == "replace":
+                conn.execute(f"DELETE FROM {_quote(table)}")
+            else:
+                if not primary_key:
+                    raise Exception(f"Cannot upsert into {table}: it has no primary key")
+                updates = [c for c in columns if c not in primary_key]
+                sql += f" ON CONFLICT ({', '.join(_quote(c) for c in primary_key)}) DO "
+                sql += f"UPDATE SET {', '.join(f'{_quote(c)} = excluded.{_quote(c)}' for c in updates)}" if updates else "NOTHING"
+
+            iterator = iter(_rows(rows, blob_indexes))
+            counts[table] = 0
+            while True:
+                batch = list(islice(iterator, batch_size))
+                if not batch:
+                    break
+                conn.executemany(sql, batch)
+                counts[table] += len(batch)
+        conn.execute("COMMIT")
+    except BaseException as e:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        if isinstance(e, sqlite3.Error):
+            raise Exception(f"Error writing SQLite database: {e}")
+        raise
+    finally:
+        conn.close()
+    return counts
@@ -1,6 +1,21 @@
+import io
 import os
-from typing import Optional, Dict, Any
-from ..processors.memory_processor import MemoryProcessor
+import hashlib
+import tempfile
+import threading
+import contextlib
+import requests
+from contextlib import ExitStack
+from concurrent.futures import Executor
+from typing import Optional, Dict, Any, List, Sequence
+from ..api.connection import Connection, DEFAULT_POOL_SIZE, Timeout, request_timeout
+from ..api.tracing import PHASES, request_hook
+from ..processors.commit_cache import DEFAULT_COMMIT_CACHE, CommitCache
+from ..processors.memory_processor import MemoryProcessor, run_per_memory_type
+from ..processors.locks import FileLock
+from ..processors.pipeline import DEFAULT_EMBED_WORKERS
+from ..processors.profiling import PipelineProfile
+from ..processors.push_queue import DEFAULT_PUSH_RETRIES, DEFAULT_QUEUE_PATH, PushQueue, queue_target
 from ..processors.text_processor import TextProcessor
 from .user import UserSDK
 from .marketplace import MarketplaceSDK
@@ -8,80 +23,437 @@ from .memory import MemorySDK
 from .memory_space import MemorySpaceSDK
 from .git import GitSDK
 
+DEFAULT_SPACE_LOCKS = os.path.join(os.path.expanduser("~"), ".stitch-ai", "space-locks")
+
 class StitchSDK:
     """
     Main SDK class for interacting with the Stitch AI platform.
     Provides high-level interface for memory management operations.
+
+    One instance can be shared by many threads. Its API clients share one
+    Connection: a single connection pool, the user id (looked up once, on first
+    use), the optional response cache and the default timeout. Use
+    request_timeout() to set a timeout for the calls inside a with block.
+
+    With write_behind, push() queues the push on disk and returns at once; a
+    background worker uploads it (see PushQueue). flush() waits for the queued
+    pushes, drain() also stops the worker.
+
+    push(branch=...) and pull_memory(ref=...) work on a branch or commit of a
+    space through the git endpoints; files pulled at a commit are kept in a
+    CommitCache and not downloaded again.
     """
     
-    def __init__(self, base_url: str = "https://api-demo.stitch-ai.co", api_key: Optional[str] = None):
+    def __init__(self, base_url: str = "https://api-demo.stitch-ai.co", api_key: Optional[str] = None,
+                 embedding_backend: Optional[str] = None, embedding_options: Optional[Dict[str, Any]] = None,
+                 timeout: Timeout = None, pool_size: int = DEFAULT_POOL_SIZE, cache_ttl: float = 0.0,
+                 write_behind: bool = False, queue_path: str = DEFAULT_QUEUE_PATH, push_retries: int = DEFAULT_PUSH_RETRIES,
+                 commit_cache: str = DEFAULT_COMMIT_CACHE, space_locks: str = DEFAULT_SPACE_LOCKS,
+                 validate_key: bool = False):
+        """
+        Args:
+            timeout (Timeout): Default request timeout in seconds, or (connect, read) seconds
+            pool_size (int): HTTP connections kept open; size it to the number of threads sharing the SDK
+            cache_ttl (float): Seconds to cache API reads (0: no cache); any write clears the cache
+            write_behind (bool): Queue pushes and upload them in the background, starting the upload worker now
+            queue_path (str): SQLite file of the push queue
+            push_retries (int): Retries of a queued upload before it fails
+            commit_cache (str): Directory of the files pulled at a ref, by commit
+            space_locks (str): Directory of the locks on the checked-out branch of each space (see _space_lock)
+            validate_key (bool): Check the API key now (see validate_key) instead of on the first request
+        """
         self.api_key = api_key or os.environ.get("STITCH_API_KEY")
         if not self.api_key:
             raise ValueError("API key must be provided either directly or via STITCH_API_KEY environment variable")
-        self.memory_processor = MemoryProcessor()
+        self.memory_processor = MemoryProcessor(embedding_backend, embedding_options)
         self.text_processor = TextProcessor()
-        self.user = UserSDK(base_url, self.api_key)
-        self.memory = MemorySDK(base_url, self.api_key)
-        self.marketplace = MarketplaceSDK(base_url, self.api_key)
-        self.memory_space = MemorySpaceSDK(base_url, self.api_key)
-        self.git = GitSDK(base_url, self.api_key)
+        self.connection = Connection(base_url, self.api_key, timeout, pool_size, cache_ttl)
+        self.user = UserSDK(base_url, self.api_key, self.connection)
+        self.memory = MemorySDK(base_url, self.api_key, self.connection)
+        self.marketplace = MarketplaceSDK(base_url, self.api_key, self.connection)
+        self.memory_space = MemorySpaceSDK(base_url, self.api_key, self.connection)
+        self.git = GitSDK(base_url, self.api_key, self.connection)
+        self.write_behind = write_behind
+        self.queue_path = queue_path
+        self.push_retries = push_retries
+        self._push_queue = None
+        self._queue_lock = threading.Lock()
+        self.commit_cache = CommitCache(commit_cache)
+        self.space_locks = space_locks
+        if validate_key:
+            try:
+                self.validate_key()
+            except Exception:
+                self.connection.close()
+                raise
+        if write_behind:
+            self.push_queue.start()
+
+    def validate_key(self) -> str:
+        """
+        Look up the user of the API key, which is otherwise done on first use, so a bad key fails now
+
+        Returns:
+            str: The user id of the API key
+        """
+        try:
+            return self.user.client.user_id
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code in (401, 403, 404):
+                raise ValueError(f"API key rejected by {self.connection.base_url}: {e}") from e
+            raise
+
+    @property
+    def push_queue(self) -> PushQueue:
+        """The push queue at queue_path, opened on first use"""
+        with self._queue_lock:
+            if self._push_queue is None:
+                self._push_queue = self.open_push_queue(self.queue_path)
+            return self._push_queue
+
+    def open_push_queue(self, path: str = DEFAULT_QUEUE_PATH) -> PushQueue:
+        """A PushQueue at path for this SDK's account, uploading with push(); its worker is not started"""
+        return PushQueue(path, queue_target(self.connection.base_url, self.api_key),
+                         lambda space, **args: self.push(space, background=False, **args), self.push_retries)
+
+    def flush(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Wait until every queued push is uploaded or has failed; returns the queue metrics"""
+        return self.push_queue.flush(timeout)
+
+    def drain(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """flush(), then stop the upload worker"""
+        return self.push_queue.drain(timeout)
+
+    def close(self) -> None:
+        """Stop the upload worker, leaving queued pushes on disk, and close the pooled connections"""
+        with self._queue_lock:
+            push_queue, self._push_queue = self._push_queue, None
+        if push_queue is not None:
+            push_queue.close()
+        self.connection.close()
+
+    def __enter__(self):
+        return self
 
-    def push(self, space: str, message: Optional[str] = None, episodic_path: Optional[str] = None, character_path: Optional[str] = None) -> Dict[str, Any]:
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def push(self, space: str, message: Optional[str] = None, episodic_path: Optional[str] = None, character_path: Optional[str] = None,
+             episodic_format: str = "json", tables: Optional[Sequence[str]] = None, export_workers: Optional[int] = None,
+             snapshot: bool = False, profile_path: Optional[str] = None, executor: Optional[Executor] = None,
+             background: Optional[bool] = None, branch: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Push episodic and/or character memory to a space
+
+        The episodic and character files are prepared concurrently, on executor if given
+        (see run_per_memory_type), and uploaded together in one commit.
+
+        With a branch, the commit is made on that branch (see _upload_to_branch) and the
+        result includes its "branch" and "oid".
+
+        The result includes a "profile" with the time and peak memory of each stage
+        (export, read_character, upload), also written as JSON to profile_path if given.
+
+        In the background (the default with write_behind) the push is only queued, and the
+        result is the queue entry instead; the files are copied into the queue (see PushQueue).
+        """
         if not episodic_path and not character_path:
             raise ValueError("At least one of episodic_path or character_path must be provided")
-        files = []
-        if episodic_path:
-            if episodic_path.endswith('.sqlite'):
-                data = self.memory_processor.process_sqlite_file(episodic_path)
-                files.append({"filePath": "episodic.data", "content": data})
+        if background if background is not None else self.write_behind:
+            return self.push_queue.enqueue(space, message=message, episodic_path=episodic_path,
+                                           character_path=character_path, episodic_format=episodic_format,
+                                           tables=list(tables) if tables else None, export_workers=export_workers,
+                                           snapshot=snapshot or None, profile_path=profile_path, branch=branch)
+        profile = PipelineProfile("push")
+        with ExitStack() as stack:
+            stack.enter_context(profile)
+            # Temporary files and memory maps are registered on stack, so they are
+            # released whichever memory type fails
+            tasks = {}
+            if episodic_path:
+                tasks["episodic"] = lambda: self._prepare_episodic(stack, profile, episodic_path, episodic_format,
+                                                                   tables, export_workers, snapshot)
+            if character_path:
+                tasks["character"] = lambda: self._prepare_character(profile, character_path)
+            files = list(run_per_memory_type(tasks, executor).values())
+            with profile.stage("upload") as stage, _request_phases(stage):
+                if branch is None:
+                    with self._space_lock(space, shared=True):
+                        result = self.memory.push_memory(repository=space, message=message, files=files)
+                else:
+                    result = self._upload_to_branch(space, branch, message, files)
+        result["profile"] = profile.to_dict()
+        if profile_path:
+            profile.write(profile_path)
+        return result
+
+    def _upload_to_branch(self, space: str, branch: str, message: Optional[str], files) -> Dict[str, Any]:
+        """
+        Commit files on a branch of space
+
+        The push endpoint has no branch parameter and commits on the space's checked-out
+        branch, so the branch is checked out for the push and the previous one checked out
+        again afterwards, holding the space's lock exclusively. That lock only covers
+        SDKs sharing space_locks: other clients using the space in the meantime see the
+        branch, so this is not safe while they do. The commit oid comes from the push
+        response, or from the branch log if the server does not return it.
+
+        Raises:
+            ValueError: If the branch does not exist or the checked-out branch is unknown
+            Exception: If the previous branch could not be checked out again; the message
+                says the space is left on branch, and includes the push error if there was one
+        """
+        with self._space_lock(space, shared=False):
+            branches = self.git.list_branches(space)
+            if branch not in branches.get("branches", []):
+                raise ValueError(f"Branch {branch} not found in {space}; create it with create-branch")
+            current = branches.get("current")
+            if not current:
+                raise ValueError(f"Could not tell which branch {space} has checked out, so it could not be restored "
+                                 f"after pushing to {branch}")
+            if current == branch:
+                result = self._push_on_checked_out_branch(space, message, files)
             else:
-                data = self.memory_processor.process_memory_file(episodic_path)
-                files.append({"filePath": "episodic.data", "content": data})
-        if character_path:
+                self.git.checkout_branch(space, branch)
+                push_error = None
+                try:
+                    result = self._push_on_checked_out_branch(space, message, files)
+                except BaseException as e:
+                    push_error = e
+                    raise
+                finally:
+                    try:
+                        self.git.checkout_branch(space, current)
+                    except Exception as e:
+                        detail = f"; the push had failed: {push_error}" if push_error is not None else ""
+                        raise Exception(f"{space} is left on branch {branch}: checking out {current} again "
+                                        f"failed: {e}{detail}") from (push_error or e)
+        result["branch"] = branch
+        return result
+
+    def _push_on_checked_out_branch(self, space: str, message: Optional[str], files) -> Dict[str, Any]:
+        result = self.memory.push_memory(repository=space, message=message, files=files)
+        if not result.get("oid"):
+            log = self.git.get_log(space, depth=1).get("commits") or [{}]
+            result["oid"] = log[0].get("oid")
+        return result
+
+    def _space_lock(self, space: str, shared: bool) -> FileLock:
+        """
+        Lock on the checked-out branch of space, shared between the processes using space_locks
+
+        Pushes and pulls that use the checked-out branch hold it shared; a branch push holds
+        it exclusively while another branch is checked out. Clients that do not use the same
+        lock directory (other machines, the web app) can still see the other branch meanwhile.
+        """
+        key = hashlib.sha256(f"{self.connection.base_url.rstrip('/')}\n{space}".encode("utf-8")).hexdigest()[:16]
+        return FileLock(os.path.join(self.space_locks, f"{key}.lock"), shared=shared)
+
+    def _prepare_episodic(self, stack: ExitStack, profile: PipelineProfile, episodic_path: str, episodic_format: str,
+                          tables: Optional[Sequence[str]], export_workers: Optional[int], snapshot: bool) -> Dict[str, Any]:
+        if episodic_path.endswith('.sqlite') and episodic_format == "json":
+            # Tables are exported to a temporary file as they are read, then streamed from a memory map
+            with profile.stage("export") as stage:
+                export = stack.enter_context(tempfile.NamedTemporaryFile('w', suffix='.json', encoding='utf-8'))
+                self.memory_processor.export_sqlite_file(episodic_path, export, tables, export_workers, snapshot)
+                export.flush()
+                stage["bytes"] = os.path.getsize(export.name)
+            data = stack.enter_context(self.memory_processor.map_memory_file(export.name))
+        elif episodic_path.endswith('.sqlite'):
+            with profile.stage("export") as stage:
+                data = self.memory_processor.process_sqlite_file(episodic_path, episodic_format, tables, export_workers, snapshot)
+                stage["bytes"] = len(data)
+        else:
+            # Streamed from a memory map straight into the request body
+            data = stack.enter_context(self.memory_processor.map_memory_file(episodic_path))
+        return {"filePath": "episodic.data", "content": data}
+
+    def _prepare_character(self, profile: PipelineProfile, character_path: str) -> Dict[str, Any]:
+        with profile.stage("read_character"):
             data = self.memory_processor.process_character_file(character_path)
-            files.append({"filePath": "character.data", "content": data})
-        return self.memory.push_memory(repository=space, message=message, files=files)
-
-    def pull_memory(self, repository: str, db_path: str) -> Dict[str, Any]:
-        response_data = self.user.get_user_memory(repository)
-
-        memory_item = None
-        if isinstance(response_data, list) and response_data:
-            for item in response_data:
-                if item.get("name") == repository:
-                    memory_item = item
-                    break
+        return {"filePath": "character.data", "content": data}
+
+    def pull_memory(self, repository: str, db_path: str, embedding_backend: Optional[str] = None,
+                    embedding_options: Optional[Dict[str, Any]] = None, sink: Optional[str] = None,
+                    chunker: Optional[str] = None, chunking_options: Optional[Dict[str, Any]] = None,
+                    upsert: bool = False, profile_path: Optional[str] = None, pipeline: bool = True,
+                    embed_workers: int = DEFAULT_EMBED_WORKERS, executor: Optional[Executor] = None,
+                    ref: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Pull a space's memory and save it to db_path (see MemoryProcessor.save_memory_data)
+
+        Returns a list holding the pulled memory item, with each memory type's content as text.
+
+        With a ref (branch or commit oid), the memory files at that ref are read through the
+        git endpoints and the commit cache (see _fetch_at_ref) instead of the latest memory.
+
+        When db_path is a vector store, the memory is chunked, embedded and inserted while it
+        downloads (see MemoryProcessor.stream_memory_data), each memory type on its own chunking
+        thread. pipeline=False runs the stages one after another instead, chunking and embedding
+        the memory types concurrently on executor.
+
+        The returned memory item includes a "profile" with the time and peak memory of
+        each stage (download, then parse/insert or backup/chunk/embed/insert, then read_content),
+        also written as JSON to profile_path if given. Pipelined stages overlap, so their
+        times are the busy time of each stage and add up to more than the total.
+        """
+        profile = PipelineProfile("pull")
+        with profile, ExitStack() as stack:
+            if ref is None:
+                # The latest memory is read from the checked-out branch
+                stack.enter_context(self._space_lock(repository, shared=True))
+            if pipeline and self.memory_processor.embeds(db_path, sink):
+                memory_item = self._pull_pipelined(repository, db_path, embedding_backend, embedding_options, sink,
+                                                   chunker, chunking_options, profile, embed_workers, ref)
+            else:
+                memory_item = self._pull_sequential(repository, db_path, embedding_backend, embedding_options, sink,
+                                                    chunker, chunking_options, upsert, profile, executor, ref)
+        memory_item["profile"] = profile.to_dict()
+        if profile_path:
+            profile.write(profile_path)
+        return [memory_item]
+
+    def _pull_sequential(self, repository, db_path, embedding_backend, embedding_options, sink, chunker,
+                         chunking_options, upsert, profile, executor, ref) -> Dict[str, Any]:
+        if ref is not None:
+            with profile.stage("download") as stage, _request_phases(stage):
+                sources = {}
+                memory_item = self._fetch_at_ref(repository, ref,
+                                                 lambda memory_type: sources.setdefault(memory_type, io.StringIO()))
+            save_data = {"data": {}}
+            for field, memory_type in _MEMORY_TYPES.items():
+                if field in memory_item:
+                    text = sources[memory_type].getvalue() if memory_type in sources else ""
+                    memory_item[field]["content"][0] = save_data["data"][memory_type] = text
+            if not save_data["data"]:
+                raise ValueError(f"No memory found in {repository} at {ref}")
+            self.memory_processor.save_memory_data(save_data, db_path, embedding_backend, embedding_options, sink,
+                                                   chunker, chunking_options, upsert, profile, executor)
+            return memory_item
+
+        # Only the requested memory's first content entries are kept while the response streams in;
+        # the response is parsed as it downloads, so download includes JSON decoding
+        with profile.stage("download") as stage, _request_phases(stage):
+            memory_item = self.user.get_user_memory_item(repository, ("characterMemory", "episodicMemory"))
         if not memory_item:
             raise ValueError(f"No memory found with name: {repository}")
 
-        save_data = {"data": {}}
-        if "characterMemory" in memory_item and memory_item["characterMemory"].get("content"):
-            save_data["data"]["character"] = memory_item["characterMemory"]["content"][0]
-        if "episodicMemory" in memory_item and memory_item["episodicMemory"].get("content"):
-            save_data["data"]["episodic"] = memory_item["episodicMemory"]["content"][0]
-        if not save_data["data"]:
+        # The spooled content is handed to the processor as files, which vector stores chunk
+        # as they read them, and only read back as text for the result once it is saved
+        spools = {memory_type: memory_item[field]["content"][0] for field, memory_type in _MEMORY_TYPES.items()
+                  if (memory_item.get(field) or {}).get("content")}
+        try:
+            if not spools:
+                raise ValueError("Memory does not contain character or episodic data")
+            self.memory_processor.save_memory_data({"data": dict(spools)}, db_path, embedding_backend,
+                                                   embedding_options, sink, chunker, chunking_options, upsert,
+                                                   profile, executor)
+            with profile.stage("read_content"):
+                for field, memory_type in _MEMORY_TYPES.items():
+                    if memory_type in spools:
+                        memory_item[field]["content"][0] = _read_spool(spools[memory_type])
+        finally:
+            for spool in spools.values():
+                if hasattr(spool, "close"):
+                    spool.close()
+        return memory_item
+
+    def _pull_pipelined(self, repository, db_path, embedding_backend, embedding_options, sink, chunker,
+                        chunking_options, profile, embed_workers, ref) -> Dict[str, Any]:
+        def fetch(open_source):
+            with profile.stage("download") as stage, _request_phases(stage):
+                if ref is not None:
+                    return self._fetch_at_ref(repository, ref, open_source)
+                return self.user.get_user_memory_item(
+                    repository, _MEMORY_TYPES,
+                    open_content=lambda field: open_source(_MEMORY_TYPES[field]))
+
+        result = self.memory_processor.stream_memory_data(fetch, db_path, embedding_backend, embedding_options,
+                                                          sink, chunker, chunking_options, profile,
+                                                          embed_workers, keep_text=True)
+        memory_item = result.result
+        if not memory_item:
+            raise ValueError(f"No memory found with name: {repository}")
+        if not result.started:
+            if ref is not None and not any(field in memory_item for field in _MEMORY_TYPES):
+                raise ValueError(f"No memory found in {repository} at {ref}")
             raise ValueError("Memory does not contain character or episodic data")
-        self.memory_processor.save_memory_data(save_data, db_path)
-        return response_data
-
-    def pull_external_memory(self, repository: str, rag_path: str) -> Dict[str, Any]:
-        response_data = self.user.get_user_memory(repository)
-
-        memory_item = None
-        if isinstance(response_data, list) and response_data:
-            for item in response_data:
-                if item.get("name") == repository:
-                    memory_item = item
-                    break
+        # Hand back the content as text, as the sequential pull does
+        texts = result.texts
+        for field, memory_type in _MEMORY_TYPES.items():
+            content = (memory_item.get(field) or {}).get("content")
+            if content and memory_type in texts:
+                content[0] = texts[memory_type]
+        return memory_item
+
+    def _fetch_at_ref(self, repository: str, ref: str, open_source) -> Dict[str, Any]:
+        """
+        Write the memory files of repository at ref to open_source(memory_type), through the commit cache
+
+        Returns a memory item with the memory fields found (their content is filled in by the
+        caller), the ref, the commit oid and which memory types came from the cache.
+        """
+        memory_item = {"name": repository, "ref": ref, "oid": None, "cached": {}}
+        for field, memory_type in _MEMORY_TYPES.items():
+            file_path = f"{memory_type}.data"
+            # Once a file has named the commit the rest are read at that commit, so a branch that
+            # moves meanwhile cannot mix two commits, and files of a cached commit need no request
+            at = memory_item["oid"] or ref
+            fetched = self.commit_cache.fetch(
+                at, file_path,
+                lambda out, skip: self.git.stream_file(repository, file_path, at, out, skip),
+                lambda: open_source(memory_type))
+            if fetched is not None:
+                memory_item[field] = {"content": [""]}
+                memory_item["oid"] = memory_item["oid"] or fetched["oid"]
+                memory_item["cached"][memory_type] = fetched["cached"]
+        return memory_item
+
+    def pull_external_memory(self, repository: str, rag_path: str) -> List[Dict[str, Any]]:
+        memory_item = self.user.get_user_memory_item(repository, ("externalMemory",))
         if not memory_item:
             raise ValueError(f"No memory found with name: {repository}")
 
         save_data = {"data": {}}
-        if "externalMemory" in memory_item and memory_item["externalMemory"].get("content"):
-            save_data["data"]["external"] = memory_item["externalMemory"]["content"][0]
+        external = _read_first_content(memory_item, "externalMemory")
+        if external is not None:
+            save_data["data"]["external"] = external
         if not save_data["data"]:
             raise ValueError("Memory does not contain external data")
         self.memory_processor.save_memory_data(save_data, rag_path)
-        return response_data
+        return [memory_item]
+
+# Memory fields of a pulled space and the memory type each is stored as
+_MEMORY_TYPES = {"characterMemory": "character", "episodicMemory": "episodic"}
+
+@contextlib.contextmanager
+def _request_phases(stage: Dict[str, Any]):
+    """Add the phase timings and sizes of this thread's API requests to a profile stage"""
+    thread = threading.get_ident()
+    events = []
+    with request_hook(lambda event: events.append(event) if threading.get_ident() == thread else None):
+        yield
+    for event in events:
+        for phase in PHASES:
+            stage[f"request_{phase}_seconds"] = stage.get(f"request_{phase}_seconds", 0.0) + event.timings[phase]
+        stage["bytes_out"] = stage.get("bytes_out", 0) + event.bytes_out
+        stage["bytes_in"] = stage.get("bytes_in", 0) + event.bytes_in
+
+def _read_first_content(memory_item: Dict[str, Any], field: str) -> Any:
+    """Read the spooled first content entry of a memory field back into memory"""
+    content = (memory_item.get(field) or {}).get("content")
+    if not content:
+        return None
+    if hasattr(content[0], "read"):
+        with content[0] as spool:
+            content[0] = spool.read()
+    return content[0]
+
+def _read_spool(spool: Any) -> Any:
+    """The whole text of a spooled content entry, from its start; other values as they are"""
+    if not hasattr(spool, "read"):
+        return spool
+    spool.seek(0)
+    return spool.read()
 
-__all__ = ["StitchSDK"] 
\ No newline at end of file
+__all__ = ["StitchSDK", "request_timeout"]
@@ -1,8 +1,8 @@
 from stitch_ai.api.git import GitAPIClient
 
 class GitSDK:
-    def __init__(self, base_url: str, api_key: str):
-        self.client = GitAPIClient(base_url, api_key)
+    def __init__(self, base_url: str, api_key: str, connection=None):
+        self.client = GitAPIClient(base_url, api_key, connection)
 
     def create_repo(self, name: str):
         return self.client.create_repo(name)   
@@ -34,5 +34,8 @@ class GitSDK:
     def get_file(self, repository: str, file_path: str, ref: str):
         return self.client.get_file(repository, file_path, ref)
 
+    def stream_file(self, repository: str, file_path: str, ref: str, out, skip=None):
+        return self.client.stream_file(repository, file_path, ref, out, skip)
+
     def diff(self, repository: str, oid1: str, oid2: str):
         return self.client.diff(repository, oid1, oid2) 
\ No newline at end of file
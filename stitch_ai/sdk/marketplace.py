@@ -1,14 +1,33 @@
-from stitch_ai.api.marketplace import MarketplaceAPIClient
+import json
+from stitch_ai.api.marketplace import MarketplaceAPIClient, DEFAULT_BATCH_WORKERS, DEFAULT_RETRIES
+from stitch_ai.processors.market_catalog import MarketCatalog, DEFAULT_CATALOG_PATH, DEFAULT_PAGE_SIZE, DEFAULT_SYNC_WORKERS
+
+# Newest updates first, so an incremental sync can stop at spaces it has already seen
+SYNC_SORT = json.dumps({"updatedAt": "desc"})
 
 class MarketplaceSDK:
-    def __init__(self, base_url: str, api_key: str):
-        self.client = MarketplaceAPIClient(base_url, api_key)
+    def __init__(self, base_url: str, api_key: str, connection=None):
+        self.client = MarketplaceAPIClient(base_url, api_key, connection)
 
     def get_memory_space_lists(self, type_, paginate=None, sort=None, filters=None):
         return self.client.get_memory_space_lists(type_, paginate, sort, filters)
 
-    def list_memory(self, body):
-        return self.client.list_memory(body)
+    def sync_catalog(self, type_, db_path=DEFAULT_CATALOG_PATH, workers=DEFAULT_SYNC_WORKERS,
+                     page_size=DEFAULT_PAGE_SIZE, full=False, filters=None):
+        """Crawl the marketplace listing into a local catalog (see MarketCatalog.sync)"""
+        def fetch_page(page):
+            return self.client.get_memory_space_page(type_, page, page_size, SYNC_SORT, filters)
+        with MarketCatalog(db_path) as catalog:
+            return catalog.sync(type_, fetch_page, page_size, workers, full)
+
+    def list_memory(self, body, idempotency_key=None):
+        return self.client.list_memory(body, idempotency_key)
+
+    def purchase_memory(self, body, idempotency_key=None):
+        return self.client.purchase_memory(body, idempotency_key)
+
+    def list_many(self, bodies, workers=DEFAULT_BATCH_WORKERS, retries=DEFAULT_RETRIES, key_from_content=False):
+        return self.client.list_many(bodies, workers, retries, key_from_content)
 
-    def purchase_memory(self, body):
-        return self.client.purchase_memory(body) 
\ No newline at end of file
+    def purchase_many(self, bodies, workers=DEFAULT_BATCH_WORKERS, retries=DEFAULT_RETRIES, key_from_content=False):
+        return self.client.purchase_many(bodies, workers, retries, key_from_content)
@@ -1,8 +1,8 @@
 from stitch_ai.api.memory_space import MemorySpaceAPIClient, MemoryType
 
 class MemorySpaceSDK:
-    def __init__(self, base_url: str, api_key: str):
-        self.client = MemorySpaceAPIClient(base_url, api_key)
+    def __init__(self, base_url: str, api_key: str, connection=None):
+        self.client = MemorySpaceAPIClient(base_url, api_key, connection)
 
     def create_space(self, repository: str, memory_type: MemoryType = MemoryType.AGENT_MEMORY):
         return self.client.create_space(repository, memory_type)
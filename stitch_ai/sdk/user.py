@@ -1,8 +1,8 @@
 from stitch_ai.api.user import UserAPIClient
 
 class UserSDK:
-    def __init__(self, base_url: str, api_key: str):
-        self.client = UserAPIClient(base_url, api_key)
+    def __init__(self, base_url: str, api_key: str, connection=None):
+        self.client = UserAPIClient(base_url, api_key, connection)
 
     def get_user(self):
         return self.client.get_user()
@@ -16,5 +16,8 @@ class UserSDK:
     def get_user_memory(self, memory_names=None):
         return self.client.get_user_memory(memory_names)
 
+    def get_user_memory_item(self, name, content_fields=("characterMemory", "episodicMemory"), open_content=None):
+        return self.client.get_user_memory_item(name, content_fields, open_content=open_content)
+
     def get_user_purchases(self, paginate=None, sort=None, filters=None):
         return self.client.get_user_purchases(paginate, sort, filters) 
\ No newline at end of file
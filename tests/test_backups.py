@@ -0,0 +1,112 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+import numpy as np
+from stitch_ai.processors.backups import latest_backup, read_backup
+from stitch_ai.processors.memory_processor import MemoryProcessor
+from stitch_ai.processors.sinks import get_memory_sink
+
+GOOD = {"data": {"episodic": "The agent met Alice at the harbor. " * 200, "character": '{"name": "Bob"}'}}
+BAD = {"data": {"episodic": "corrupted " * 50}}
+
+class TestBackups(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.store_dir = os.path.join(self.tmpdir, "store")
+        self.path = os.path.join(self.store_dir, "chroma.sqlite3")
+        self.processor = MemoryProcessor(embedding_backend="hash")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def load(self, path=None, sink=None):
+        with get_memory_sink(path or self.path, sink) as store:
+            ids, documents, embeddings, metadatas = store.load()
+            return dict(zip(ids, zip(documents, np.asarray(embeddings).tolist(), metadatas)))
+
+    def pull_good_then_bad(self):
+        self.processor.save_memory_data(GOOD, self.path)
+        good = self.load()
+        self.processor.save_memory_data(BAD, self.path)
+        return good
+
+    def test_pull_backs_up_with_embeddings_and_restore_rolls_back(self):
+        good = self.pull_good_then_bad()
+        backup = latest_backup(self.store_dir)
+        self.assertTrue(backup.endswith(".jsonl"))
+        header, records = read_backup(backup)
+        self.assertEqual((header["collection"], header["count"], header["embeddings"]), ("short_term", len(good), True))
+        self.assertIn("embedding", header["metadata"])
+        self.assertEqual(sum(1 for _ in records), len(good))
+
+        # Stored embeddings are used as they are, in small batches
+        result = MemoryProcessor(embedding_backend="no-such-backend").restore_backup(self.store_dir, batch_size=7)
+        self.assertEqual((result["restored"], result["reembedded"]), (len(good), False))
+        self.assertEqual(self.load(), good)
+        with get_memory_sink(self.path) as store:
+            self.assertEqual(store.metadata()["embedding"], header["metadata"]["embedding"])
+        # Restoring backed up the bad collection in turn
+        self.assertEqual(len(os.listdir(os.path.join(self.store_dir, "backups"))), 2)
+
+    def test_restore_into_another_sink(self):
+        good = self.pull_good_then_bad()
+        npy = os.path.join(self.tmpdir, "restored.npy")
+        result = self.processor.restore_backup(latest_backup(self.store_dir), npy)
+        self.assertEqual(result["restored"], len(good))
+        restored = self.load(npy)
+        self.assertEqual(restored.keys(), good.keys())
+        for id_, (document, embedding, metadata) in good.items():
+            self.assertEqual(restored[id_][0], document)
+            self.assertEqual(restored[id_][2], metadata)
+            np.testing.assert_allclose(restored[id_][1], embedding, rtol=1e-6)
+
+    def test_legacy_json_backup_is_reembedded(self):
+        good = self.pull_good_then_bad()
+        with get_memory_sink(self.path) as store:
+            collection = store.client.get_collection("short_term")
+            legacy = dict(collection.get())
+        path = os.path.join(self.store_dir, "backups", "short_term_backup_20240101_000000.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(legacy, f, indent=2)
+
+        result = self.processor.restore_backup(path)
+        self.assertEqual((result["restored"], result["reembedded"]), (len(legacy["ids"]), True))
+        restored = self.load()
+        self.assertEqual(sorted(restored), sorted(legacy["ids"]))
+        self.assertNotEqual(sorted(restored), sorted(good))
+
+    def test_truncated_backup_leaves_the_store_unchanged(self):
+        self.pull_good_then_bad()
+        bad = self.load()
+        backup = latest_backup(self.store_dir)
+        with open(backup, "r", encoding="utf-8") as f:
+            lines = f.readlines()
+        with open(backup, "w", encoding="utf-8") as f:
+            f.writelines(lines[:-3])
+        with self.assertRaisesRegex(Exception, "header lists"):
+            self.processor.restore_backup(backup)
+        with open(backup, "w", encoding="utf-8") as f:
+            f.writelines(lines[:-1] + [lines[-1][:20]])
+        with self.assertRaisesRegex(ValueError, "truncated"):
+            self.processor.restore_backup(backup)
+        self.assertEqual(self.load(), bad)
+
+    def test_backup_notice_stays_off_stdout(self):
+        # stdout carries --output json/jsonl
+        self.processor.save_memory_data(GOOD, self.path)
+        out, err = io.StringIO(), io.StringIO()
+        with redirect_stdout(out), redirect_stderr(err):
+            self.processor.save_memory_data(BAD, self.path)
+        self.assertEqual(out.getvalue(), "")
+        self.assertIn(latest_backup(self.store_dir), err.getvalue())
+
+    def test_no_backups(self):
+        with self.assertRaisesRegex(Exception, "No backups"):
+            self.processor.restore_backup(self.tmpdir)
+
+if __name__ == '__main__':
+    unittest.main()
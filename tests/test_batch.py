@@ -0,0 +1,53 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from types import SimpleNamespace
+from stitch_ai.cli.batch_cli import handle_batch, parse_batch_line
+
+class TestBatchMode(unittest.TestCase):
+    def setUp(self):
+        self.sdk = SimpleNamespace(
+            memory_space=SimpleNamespace(get_space=lambda space, ref=None: {"space": space, "ref": ref}),
+        )
+
+    def run_batch(self, lines, jobs=1):
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+            f.write("\n".join(lines))
+        out = io.StringIO()
+        try:
+            with redirect_stdout(out):
+                try:
+                    handle_batch(self.sdk, SimpleNamespace(file=f.name, jobs=jobs, fail_fast=False))
+                    code = 0
+                except SystemExit as e:
+                    code = e.code
+        finally:
+            os.unlink(f.name)
+        return code, [json.loads(line) for line in out.getvalue().splitlines()]
+
+    def test_parse_batch_line_formats(self):
+        self.assertEqual(parse_batch_line("get-space 'my space'"), ["get-space", "my space"])
+        self.assertEqual(parse_batch_line('["get-space", "s"]'), ["get-space", "s"])
+        self.assertEqual(parse_batch_line('{"argv": ["get-space", "s"]}'), ["get-space", "s"])
+
+    def test_results_are_ordered_jsonl(self):
+        lines = ["# comment", ""] + [f"get-space space-{i} --ref dev" for i in range(20)]
+        code, results = self.run_batch(lines, jobs=8)
+        self.assertEqual(code, 0)
+        self.assertEqual(len(results), 20)
+        for i, result in enumerate(results):
+            self.assertEqual(result["exit_code"], 0)
+            self.assertEqual(result["argv"][1], f"space-{i}")
+            self.assertEqual(result["result"], {"space": f"space-{i}", "ref": "dev"})
+
+    def test_failures_are_reported_per_line(self):
+        code, results = self.run_batch(["get-space ok", "unknown-command", "batch other.txt"])
+        self.assertEqual(code, 1)
+        self.assertEqual([r["exit_code"] for r in results], [0, 2, 2])
+        self.assertEqual([r["line"] for r in results], [1, 2, 3])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from benchmarks.stub_server import StubServer
+from stitch_ai.processors.commit_cache import is_oid
+from stitch_ai.sdk import StitchSDK
+
+class TestBranches(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.server = StubServer().start()
+        self.sdk = StitchSDK(self.server.url, "key", embedding_backend="hash", queue_path=self.path("queue.sqlite"),
+                             commit_cache=self.path("commits"), space_locks=self.path("locks"))
+        self.sdk.memory_space.create_space("agent")
+        self.push("main", "main memory")
+        self.sdk.git.create_branch("agent", "exp-a", "main")
+        self.sdk.git.create_branch("agent", "exp-b", "main")
+
+    def tearDown(self):
+        self.sdk.close()
+        self.server.stop()
+        self.tmpdir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def push(self, branch, content, **options):
+        with open(self.path("episodic.json"), "w") as f:
+            json.dump({"memories": {"columns": ["id", "content"], "rows": [["m1", content]]}}, f)
+        with open(self.path("character.json"), "w") as f:
+            json.dump({"name": branch}, f)
+        return self.sdk.push("agent", content, episodic_path=self.path("episodic.json"),
+                             character_path=self.path("character.json"), branch=branch, **options)
+
+    def tip(self, branch):
+        return self.server.api.spaces["agent"]["branches"][branch][-1]
+
+    def pull(self, ref, name="pulled.json", **options):
+        (item,) = self.sdk.pull_memory("agent", self.path(name), ref=ref, **options)
+        return item
+
+    def test_push_to_a_branch(self):
+        result = self.push("exp-a", "experiment a")
+        self.assertEqual((result["branch"], result["oid"]), ("exp-a", self.tip("exp-a")["oid"]))
+        self.assertIn("experiment a", self.tip("exp-a")["tree"]["episodic.data"])
+        self.assertIn("main memory", self.tip("main")["tree"]["episodic.data"])
+        self.assertEqual(self.server.api.spaces["agent"]["head"], "main")
+
+        with self.assertRaisesRegex(ValueError, "Branch missing not found"):
+            self.push("missing", "lost")
+        self.assertEqual(self.server.api.spaces["agent"]["head"], "main")
+
+    def test_other_pushes_wait_for_a_branch_push(self):
+        other = StitchSDK(self.server.url, "key", queue_path=self.path("other-queue.sqlite"),
+                          space_locks=self.path("locks"))
+        self.addCleanup(other.close)
+        with open(self.path("other.json"), "w") as f:
+            json.dump({"name": "main agent"}, f)
+        self.server.latency = 0.1
+        results = {}
+        branch_push = threading.Thread(target=lambda: results.setdefault("branch", self.push("exp-a", "experiment a")))
+        branch_push.start()
+        # Starts while exp-a is checked out for the branch push
+        while self.server.requests["checkout_branch"] == 0:
+            self.assertTrue(branch_push.is_alive())
+        other.push("agent", "main step", character_path=self.path("other.json"))
+        branch_push.join()
+        self.assertEqual(self.tip("main")["message"], "main step")
+        self.assertEqual(self.tip("exp-a")["message"], "experiment a")
+        self.assertEqual(results["branch"]["oid"], self.tip("exp-a")["oid"])
+        self.assertEqual(self.server.requests["get_log"], 0)
+
+    def test_unknown_checked_out_branch_is_refused(self):
+        branches = {"branches": ["exp-a", "main"]}
+        with mock.patch.object(self.sdk.git, "list_branches", return_value=branches):
+            with self.assertRaisesRegex(ValueError, "Could not tell which branch agent has checked out"):
+                self.push("exp-a", "experiment a")
+        self.assertEqual(self.server.requests["checkout_branch"], 0)
+        self.assertEqual(len(self.server.api.spaces["agent"]["branches"]["exp-a"]), 1)
+
+    def test_failed_restore_is_reported(self):
+        checkout = self.sdk.git.checkout_branch
+
+        def checkout_once(space, branch):
+            if branch == "main":
+                raise ConnectionError("connection reset")
+            return checkout(space, branch)
+
+        with mock.patch.object(self.sdk.git, "checkout_branch", side_effect=checkout_once):
+            with self.assertRaisesRegex(Exception, "agent is left on branch exp-a: checking out main again failed"):
+                self.push("exp-a", "experiment a")
+            self.assertEqual(self.server.api.spaces["agent"]["head"], "exp-a")
+            self.server.api.spaces["agent"]["head"] = "main"
+            self.server.fail("push_memory", times=1, status=400)
+            with self.assertRaisesRegex(Exception, "left on branch exp-a.*the push had failed: 400"):
+                self.push("exp-a", "experiment a")
+
+    def test_pull_at_a_commit_is_cached(self):
+        oid = self.push("exp-a", "experiment a")["oid"]
+        self.push("exp-a", "experiment a, later")
+        item = self.pull(oid)
+        self.assertEqual((item["oid"], item["cached"]), (oid, {"character": False, "episodic": False}))
+        self.assertIn("experiment a", item["episodicMemory"]["content"][0])
+        self.assertNotIn("later", item["episodicMemory"]["content"][0])
+        self.assertEqual(self.server.requests["get_file"], 2)
+
+        item = self.pull(oid, "again.json")
+        self.assertEqual(item["cached"], {"character": True, "episodic": True})
+        self.assertEqual(self.server.requests["get_file"], 2)
+        with open(self.path("again.json")) as f:
+            self.assertIn("experiment a", f.read())
+
+    def test_switching_branches_downloads_only_changed_commits(self):
+        self.push("exp-a", "experiment a")
+        self.push("exp-b", "experiment b")
+        for name, pipeline in (("json", False), ("npy", True)):
+            with self.subTest(name):
+                for branch in ("exp-a", "exp-b"):
+                    item = self.pull(branch, f"{branch}.{name}", pipeline=pipeline)
+                self.server.requests.clear()
+                item = self.pull("exp-a", f"exp-a.{name}", pipeline=pipeline)
+                self.assertTrue(is_oid(item["oid"]))
+                self.assertEqual(item["oid"], self.tip("exp-a")["oid"])
+                self.assertEqual(item["cached"], {"character": True, "episodic": True})
+                # One request names the commit; its content is not downloaded
+                self.assertEqual(self.server.requests["get_file"], 1)
+                self.assertIn("experiment a", item["episodicMemory"]["content"][0])
+
+        # A new commit on the branch is downloaded
+        self.push("exp-a", "experiment a, step 2")
+        item = self.pull("exp-a")
+        self.assertEqual(item["cached"], {"character": False, "episodic": False})
+        self.assertIn("step 2", item["episodicMemory"]["content"][0])
+
+    def test_missing_ref(self):
+        with self.assertRaisesRegex(ValueError, "No memory found in agent at nope"):
+            self.pull("nope")
+
+    def test_queued_pushes_coalesce_per_branch(self):
+        queue = self.sdk.push_queue
+        self.assertFalse(self.push("exp-a", "a1", background=True)["coalesced"])
+        self.assertFalse(self.push("main", "m1", background=True)["coalesced"])
+        self.assertTrue(self.push("exp-a", "a2", background=True)["coalesced"])
+        self.assertEqual(sorted(row["args"]["branch"] for row in queue.entries()), ["exp-a", "main"])
+        self.sdk.drain(timeout=10)
+        self.assertEqual(self.tip("exp-a")["message"], "a2")
+        self.assertEqual(self.tip("main")["message"], "m1")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import json
+import os
+import tempfile
+import unittest
+from stitch_ai.processors.chunking import get_chunker
+from stitch_ai.processors.memory_processor import MemoryProcessor
+
+TEXT = "The agent met Alice at the harbor. She sold fish at dawn! Did Bob buy any? " * 60
+
+class TestChunkers(unittest.TestCase):
+    def test_default_chunker_matches_character_chunking_for_plain_text(self):
+        self.assertEqual(MemoryProcessor()._chunk_text(TEXT), get_chunker()(TEXT))
+        self.assertEqual(get_chunker("character")(TEXT), get_chunker()(TEXT))
+
+    def test_sentence_chunker_keeps_whole_sentences(self):
+        chunks = get_chunker("sentence", chunk_size=200, overlap=40)(TEXT)
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertLessEqual(len(chunk), 200)
+            self.assertIn(chunk[-1], ".!?")
+
+    def test_token_chunker_respects_token_limit(self):
+        from tokenizers import Tokenizer, models, pre_tokenizers
+        words = sorted(set(TEXT.replace("!", " ").replace("?", " ").replace(".", " ").split()))
+        tokenizer = Tokenizer(models.WordLevel({w: i for i, w in enumerate(words + ["[UNK]"])}, unk_token="[UNK]"))
+        tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "tokenizer.json")
+            tokenizer.save(path)
+            chunker = get_chunker("token", chunk_size=20, overlap=5, tokenizer=path)
+            chunks = chunker(TEXT)
+        for chunk in chunks:
+            self.assertLessEqual(len(tokenizer.encode(chunk).ids), 20)
+        self.assertTrue(TEXT.strip().endswith(chunks[-1]))
+
+    def test_row_chunker_makes_one_chunk_per_row(self):
+        export = json.dumps({"memories": {
+            "columns": ["id", "content", "embedding"],
+            "rows": [["1", json.dumps({"text": "Alice sold fish."}), "AAAA"], ["2", "plain text row", None]],
+        }})
+        self.assertEqual(get_chunker("row")(export), ["Alice sold fish.", "plain text row"])
+        self.assertEqual(get_chunker("row")("not an export"), ["not an export"])
+
+    def test_invalid_overlap(self):
+        with self.assertRaises(ValueError):
+            get_chunker("character", chunk_size=100, overlap=100)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import os
+import sqlite3
+import struct
+import tempfile
+import unittest
+from stitch_ai.processors.columnar import encode_tables, decode_tables, is_columnar
+from stitch_ai.processors.chunking import parse_memories_table
+from stitch_ai.processors.memory_processor import MemoryProcessor
+
+class TestColumnarFormat(unittest.TestCase):
+    def test_round_trip_keeps_types_nulls_and_blobs(self):
+        columns = ["id", "createdAt", "score", "content", "embedding", "extra"]
+        rows = [
+            ["a", 1700000000000, 0.5, '{"text": "héllo 🙂"}', struct.pack("<3f", 1, 2, 3), 1],
+            [None, None, None, None, None, "mixed"],
+            ["c", -1, 1e-9, "", b"\xff\x00", b"\x80"],
+        ]
+        text = encode_tables({"memories": (columns, rows)})
+        self.assertTrue(is_columnar(text))
+        self.assertEqual(decode_tables(text), {"memories": (columns, [tuple(row) for row in rows])})
+
+    def test_sqlite_export_matches_json_layout(self):
+        fd, path = tempfile.mkstemp(suffix=".sqlite")
+        os.close(fd)
+        try:
+            conn = sqlite3.connect(path)
+            conn.execute("CREATE TABLE memories (id TEXT, content TEXT, embedding BLOB, createdAt INTEGER)")
+            conn.executemany("INSERT INTO memories VALUES (?, ?, ?, ?)", [
+                ("m1", '{"text": "Alice sold fish"}', struct.pack("<4f", 0.1, 0.2, 0.3, 0.4), 1),
+                ("m2", '{"text": "Bob"}', None, 2),
+            ])
+            conn.commit()
+            conn.close()
+            as_json = MemoryProcessor.process_sqlite_file(path)
+            columnar = MemoryProcessor.process_sqlite_file(path, "columnar")
+            self.assertEqual(MemoryProcessor.episodic_to_json(columnar), as_json)
+            self.assertEqual(parse_memories_table(columnar)["rows"][1], ("m2", '{"text": "Bob"}', None, 2))
+        finally:
+            os.unlink(path)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import io
+import os
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from stitch_ai.cli.daemon import StitchDaemon, forward_command, send_request
+
+class TestStitchDaemon(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.tmpdir, "daemon.sock")
+        self.created = []
+        self.timeouts = []
+
+        def sdk_factory(base_url, api_key):
+            self.created.append((base_url, api_key))
+            self.timeouts.append(os.environ.get("STITCH_API_TIMEOUT"))
+            return SimpleNamespace(user=SimpleNamespace(get_user=lambda: {"userId": "user-1"}),
+                                   marketplace=SimpleNamespace(purchase_many=self.purchase_many))
+
+        self.daemon = StitchDaemon(self.socket_path, sdk_factory=sdk_factory, queue_timeout=0.1)
+        self.thread = threading.Thread(target=self.daemon.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.daemon.shutdown()
+        self.daemon.server_close()
+        self.thread.join()
+        shutil.rmtree(self.tmpdir)
+
+    def test_forwarded_commands_reuse_sdk(self):
+        request = {"argv": ["user-get"], "cwd": self.tmpdir, "base_url": "http://stub", "api_key": "key"}
+        for _ in range(3):
+            response = send_request(self.socket_path, request)
+            self.assertEqual(response["exit_code"], 0)
+            self.assertIn("user-1", response["stdout"])
+        self.assertEqual(self.created, [("http://stub", "key")])
+
+    def test_parse_error_returns_exit_code(self):
+        response = send_request(self.socket_path, {"argv": ["no-such-command"], "api_key": "key"})
+        self.assertEqual(response["exit_code"], 2)
+        self.assertIn("invalid choice", response["stderr"])
+
+    def test_piped_batch_is_forwarded_with_stdin(self):
+        stdout = io.StringIO()
+        with mock.patch("sys.stdin", io.StringIO("user-get\nuser-get\n")), mock.patch("sys.stdout", stdout), \
+                mock.patch.dict(os.environ, {"STITCH_API_KEY": "key"}):
+            exit_code = forward_command(["batch"], self.socket_path)
+        self.assertEqual(exit_code, 0)
+        results = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual([result["line"] for result in results], [1, 2])
+        self.assertEqual(results[0]["result"], {"userId": "user-1"})
+
+    def purchase_many(self, bodies, workers, retries, key_from_content):
+        return [{"index": index, "ok": True, "body": body} for index, body in enumerate(bodies)]
+
+    def test_piped_purchases_are_forwarded_with_stdin(self):
+        stdout = io.StringIO()
+        with mock.patch("sys.stdin", io.StringIO('{"id": 1}\n{"id": 2}\n')), mock.patch("sys.stdout", stdout), \
+                mock.patch.dict(os.environ, {"STITCH_API_KEY": "key"}):
+            exit_code = forward_command(["--output", "json", "market-purchase-many"], self.socket_path)
+        self.assertEqual(exit_code, 0)
+        self.assertEqual([report["body"] for report in json.loads(stdout.getvalue())], [{"id": 1}, {"id": 2}])
+
+    def test_commands_reading_stdin_are_flagged(self):
+        response = send_request(self.socket_path, {"argv": ["batch"], "api_key": "key"})
+        self.assertTrue(response["stdin_required"])
+        response = send_request(self.socket_path, {"argv": ["batch"], "api_key": "key", "stdin": ""})
+        self.assertNotIn("stdin_required", response)
+
+    def test_client_environment_is_applied_per_command(self):
+        for timeout in ("5", "5", "30"):
+            request = {"argv": ["user-get"], "api_key": "key", "env": {"STITCH_API_TIMEOUT": timeout}}
+            self.assertEqual(send_request(self.socket_path, request)["exit_code"], 0)
+            self.assertNotIn("STITCH_API_TIMEOUT", os.environ)
+        self.assertEqual(self.timeouts, ["5", "30"])
+
+    def test_busy_daemon_leaves_the_command_to_the_client(self):
+        with self.daemon._command_lock:
+            response = send_request(self.socket_path, {"argv": ["user-get"], "api_key": "key"})
+            self.assertTrue(response["busy"])
+            with mock.patch.dict(os.environ, {"STITCH_API_KEY": "key"}):
+                self.assertIsNone(forward_command(["user-get"], self.socket_path))
+        self.assertEqual(send_request(self.socket_path, {"argv": ["user-get"], "api_key": "key"})["exit_code"], 0)
+
+    def test_ping(self):
+        response = send_request(self.socket_path, {"control": "ping"})
+        self.assertEqual(response["status"], "ok")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import os
+import shutil
+import tempfile
+import unittest
+import chromadb
+from stitch_ai.processors.embeddings import HashEmbedding, get_embedding_backend
+from stitch_ai.processors.memory_processor import MemoryProcessor
+
+class TestEmbeddingBackends(unittest.TestCase):
+    def test_backends_are_cached_per_configuration(self):
+        backend = get_embedding_backend("hash", batch_size=8)
+        self.assertIs(backend, get_embedding_backend("hash", batch_size=8, threads=None))
+        self.assertIsNot(backend, get_embedding_backend("hash", batch_size=16))
+        self.assertIsInstance(backend, HashEmbedding)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            get_embedding_backend("no-such-backend")
+
+    def test_hash_embedding_is_deterministic_and_normalized(self):
+        backend = get_embedding_backend("hash", dimension=64)
+        first, second = backend(["the agent said hello", "the agent said hello"])
+        self.assertEqual(first, second)
+        self.assertEqual(len(first), 64)
+        self.assertAlmostEqual(sum(v * v for v in first), 1.0)
+
+    def test_pull_uses_selected_backend(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            db_path = os.path.join(tmpdir, "chroma.sqlite3")
+            processor = MemoryProcessor(embedding_backend="hash")
+            processor.save_memory_data({"data": {"episodic": "Hello there. " * 400, "character": "{}"}}, db_path)
+            collection = chromadb.PersistentClient(path=tmpdir).get_collection("short_term")
+            self.assertGreater(collection.count(), 1)
+        finally:
+            shutil.rmtree(tmpdir)
+
+if __name__ == "__main__":
+    unittest.main()
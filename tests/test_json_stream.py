@@ -0,0 +1,78 @@
+import io
+import json
+import random
+import unittest
+from stitch_ai.api.json_stream import JSONStreamReader, read_memory_item
+
+def split_chunks(text, seed=0):
+    rng = random.Random(seed)
+    i = 0
+    while i < len(text):
+        n = rng.randint(1, 7)
+        yield text[i:i + n]
+        i += n
+
+class TestJSONStreamReader(unittest.TestCase):
+    def test_values_split_across_chunks(self):
+        value = {
+            "text": 'esc \\ "q" \n é 🙂 \u0001',
+            "numbers": [0, -12, 3.25, -1.5e-07, 10**12],
+            "literals": [True, False, None],
+            "nested": {"a": [], "b": {}, "c": [{"d": "e"}]},
+        }
+        for ensure_ascii in (True, False):
+            text = json.dumps(value, ensure_ascii=ensure_ascii, indent=1)
+            for seed in range(20):
+                self.assertEqual(JSONStreamReader(split_chunks(text, seed)).read_value(), value)
+
+    def test_skip_and_stream_string(self):
+        big = '{"k": "v"}\\' * 1000 + '🙂'
+        text = json.dumps(["skip \\\" me", big, 7])
+        reader = JSONStreamReader(split_chunks(text))
+        sink = io.StringIO()
+        items = reader.iter_array()
+        next(items)
+        reader.skip_value()
+        next(items)
+        reader.read_string(sink)
+        next(items)
+        self.assertEqual(reader.read_value(), 7)
+        self.assertEqual(sink.getvalue(), big)
+
+    def test_read_memory_item_keeps_first_content(self):
+        item = {
+            "episodicMemory": {"content": ["first", "second"], "id": 1},
+            "externalMemory": {"content": ["ignored"]},
+            "name": "space",
+        }
+        reader = JSONStreamReader(split_chunks(json.dumps(item)))
+        result = read_memory_item(reader, ["episodicMemory"], spool_size=2)
+        self.assertEqual(result["name"], "space")
+        self.assertNotIn("externalMemory", result)
+        self.assertEqual(result["episodicMemory"]["id"], 1)
+        content = result["episodicMemory"]["content"]
+        self.assertEqual(len(content), 1)
+        self.assertEqual(content[0].read(), "first")
+        content[0].close()
+
+    def test_read_memory_item_skips_other_memories_and_nested_metadata(self):
+        item = {
+            "name": "other",
+            "id": 7,
+            "tags": ["a", {"b": 1}],
+            "episodicMemory": {"content": ["not for us"], "history": [{"content": "old"}], "id": 2},
+        }
+        reader = JSONStreamReader(split_chunks(json.dumps(item)))
+        result = read_memory_item(reader, ["episodicMemory"], spool_size=2, name="space")
+        self.assertEqual(result, {"name": "other", "id": 7})
+
+        reader = JSONStreamReader(split_chunks(json.dumps(item)))
+        result = read_memory_item(reader, ["episodicMemory"], name="other")
+        self.assertEqual(result["episodicMemory"]["id"], 2)
+        self.assertNotIn("history", result["episodicMemory"])
+        self.assertNotIn("tags", result)
+        with result["episodicMemory"]["content"][0] as content:
+            self.assertEqual(content.read(), "not for us")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import os
+import time
+import tempfile
+import threading
+import unittest
+from stitch_ai.processors.market_catalog import MarketCatalog, crawl_pages
+
+def make_spaces(count, start=0, updated="2024-01-01T00:00:00Z"):
+    return [{"id": f"s{i}", "name": f"space {i}", "description": "trading agent" if i % 2 else "chat agent",
+             "owner": f"u{i % 3}", "price": float(i), "updatedAt": updated} for i in range(start, start + count)]
+
+class FakeMarketplace:
+    """Serves pages newest first, as /marketplace is asked to, and records requests"""
+
+    def __init__(self, spaces, page_size, report_total=True, delay=0.0):
+        self.spaces = spaces
+        self.page_size = page_size
+        self.report_total = report_total
+        self.delay = delay
+        self.requested = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, page):
+        with self.lock:
+            self.requested.append(page)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        ordered = sorted(self.spaces, key=lambda s: s["updatedAt"], reverse=True)
+        items = ordered[(page - 1) * self.page_size:page * self.page_size]
+        with self.lock:
+            self.in_flight -= 1
+        if self.report_total:
+            return {"data": items, "total": len(self.spaces)}
+        return {"data": items}
+
+class TestCrawlPages(unittest.TestCase):
+    def test_pages_in_order_with_bounded_concurrency(self):
+        server = FakeMarketplace(make_spaces(95), page_size=10, report_total=False, delay=0.01)
+        pages = list(crawl_pages(server, page_size=10, workers=3))
+        self.assertEqual([page for page, _ in pages], list(range(1, 11)))
+        self.assertEqual(sum(len(items) for _, items in pages), 95)
+        self.assertLessEqual(server.max_in_flight, 3)
+
+    def test_known_total_requests_no_extra_pages(self):
+        server = FakeMarketplace(make_spaces(100), page_size=10, delay=0.005)
+        list(crawl_pages(server, page_size=10, workers=4))
+        self.assertEqual(sorted(server.requested), list(range(1, 11)))
+
+    def test_server_ignoring_pagination_ends_the_crawl(self):
+        spaces = make_spaces(25)
+        requested = []
+
+        def fetch(page):
+            requested.append(page)
+            return {"data": spaces}
+        pages = list(crawl_pages(fetch, page_size=10, workers=1))
+        self.assertEqual([(page, len(items)) for page, items in pages], [(1, 25)])
+        self.assertEqual(requested, [1, 2])
+
+    def test_listing_that_never_ends_fails_at_max_pages(self):
+        requested = []
+
+        def fetch(page):
+            requested.append(page)
+            return {"data": make_spaces(10, start=page * 10)}
+        with self.assertRaisesRegex(Exception, "did not end after 5 pages"):
+            list(crawl_pages(fetch, page_size=10, workers=3, max_pages=5))
+        self.assertLessEqual(max(requested), 5)
+
+class TestMarketCatalog(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "market.sqlite")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_incremental_sync_stops_at_known_updates(self):
+        spaces = make_spaces(50)
+        server = FakeMarketplace(spaces, page_size=10)
+        with MarketCatalog(self.path) as catalog:
+            result = catalog.sync("AGENT_MEMORY", server, page_size=10, workers=2)
+            self.assertEqual((result["fetched"], result["updated"], result["total"]), (50, 50, 50))
+
+            spaces[7]["price"] = 99.0
+            spaces[7]["updatedAt"] = "2024-02-01T00:00:00Z"
+            spaces.extend(make_spaces(3, start=50, updated="2024-03-01T00:00:00Z"))
+            server = FakeMarketplace(spaces, page_size=10)
+            result = catalog.sync("AGENT_MEMORY", server, page_size=10, workers=1)
+            self.assertEqual(result["pages"], 2)
+            self.assertEqual((result["updated"], result["total"]), (4, 53))
+            self.assertEqual(catalog.search("AGENT_MEMORY", sort="price", limit=1)[0]["id"], "s7")
+
+    def test_full_sync_removes_delisted_spaces(self):
+        spaces = make_spaces(30)
+        with MarketCatalog(self.path) as catalog:
+            catalog.sync("AGENT_MEMORY", FakeMarketplace(spaces, page_size=10), page_size=10)
+            del spaces[:5]
+            result = catalog.sync("AGENT_MEMORY", FakeMarketplace(spaces, page_size=10), page_size=10, full=True)
+            self.assertEqual((result["removed"], result["total"]), (5, 25))
+            self.assertEqual(catalog.search("AGENT_MEMORY", "space"), catalog.search("AGENT_MEMORY", limit=20))
+            self.assertEqual(catalog.search("AGENT_MEMORY", "s0"), [])
+
+    def test_search_filters_and_sorts(self):
+        with MarketCatalog(self.path) as catalog:
+            catalog.sync("AGENT_MEMORY", FakeMarketplace(make_spaces(20), page_size=10), page_size=10)
+            catalog.sync("EXTERNAL_MEMORY", FakeMarketplace(make_spaces(5), page_size=10), page_size=10)
+            results = catalog.search("AGENT_MEMORY", "trad", owner="u1", max_price=10, sort="price", descending=False)
+            self.assertEqual([space["id"] for space in results], ["s1", "s7"])
+            self.assertEqual(len(catalog.search("EXTERNAL_MEMORY", limit=100)), 5)
+            self.assertRaises(ValueError, catalog.search, "AGENT_MEMORY", sort="data")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from stitch_ai.api.marketplace import MarketplaceAPIClient, idempotency_key
+
+class MarketplaceHandler(BaseHTTPRequestHandler):
+    """Charges each idempotency key once and fails the first attempt of bodies marked flaky"""
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, payload, headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._reply(200, {"userId": "user-1"})
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        key = self.headers.get("Idempotency-Key")
+        with server.lock:
+            server.requests.append((self.path.split("?")[0], key, body))
+            attempts = server.attempts[key] = server.attempts.get(key, 0) + 1
+        if body.get("invalid"):
+            return self._reply(400, {"message": "invalid body"})
+        if body.get("flaky") and attempts == 1:
+            return self._reply(503, {"message": "unavailable"}, {"Retry-After": "0"})
+        with server.lock:
+            server.charged.add(key)
+        self._reply(200, {"ok": True})
+
+class TestMarketplaceBatch(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), MarketplaceHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests, self.server.attempts, self.server.charged = [], {}, set()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = MarketplaceAPIClient(f"http://127.0.0.1:{self.server.server_port}", "key")
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_purchase_many_retries_transient_errors_with_same_key(self):
+        bodies = [{"memoryId": i, "flaky": i % 3 == 0} for i in range(20)]
+        reports = self.client.purchase_many(bodies, workers=4)
+        self.assertEqual([r["index"] for r in reports], list(range(20)))
+        self.assertTrue(all(r["ok"] for r in reports))
+        self.assertEqual([r["attempts"] for r in reports], [2 if i % 3 == 0 else 1 for i in range(20)])
+        self.assertEqual(len(self.server.charged), 20)
+        # A retry reuses the item's key
+        flaky_keys = [key for _, key, body in self.server.requests if body["memoryId"] == 0]
+        self.assertEqual(flaky_keys, [reports[0]["idempotency_key"]] * 2)
+
+    def test_identical_bodies_get_separate_keys_unless_keyed_by_content(self):
+        bodies = [{"memoryId": 1}, {"memoryId": 1}]
+        reports = self.client.purchase_many(bodies)
+        self.assertNotEqual(reports[0]["idempotency_key"], reports[1]["idempotency_key"])
+        self.assertEqual(len(self.server.charged), 2)
+        self.client.purchase_many(bodies)
+        self.assertEqual(len(self.server.charged), 4)
+
+        reports = self.client.purchase_many(bodies, key_from_content=True)
+        self.assertEqual([r["idempotency_key"] for r in reports], [idempotency_key("purchase", bodies[0])] * 2)
+        self.assertEqual(len(self.server.charged), 5)
+
+    def test_client_errors_are_reported_not_retried(self):
+        reports = self.client.list_many([{"memoryId": 1}, {"memoryId": 2, "invalid": True}], retries=5)
+        self.assertEqual([r["ok"] for r in reports], [True, False])
+        self.assertEqual((reports[1]["status"], reports[1]["attempts"]), (400, 1))
+        self.assertTrue(all(path == "/marketplace/list" for path, _, _ in self.server.requests))
+
+    def test_explicit_idempotency_key_is_sent_as_header(self):
+        reports = self.client.purchase_many([{"memoryId": 1, "idempotencyKey": "agent-7-m1"}])
+        self.assertEqual(self.server.requests[-1][1:], ("agent-7-m1", {"memoryId": 1}))
+        self.assertEqual(reports[0]["idempotency_key"], "agent-7-m1")
+
+if __name__ == '__main__':
+    unittest.main()
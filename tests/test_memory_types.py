@@ -0,0 +1,92 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.stub_server import StubServer
+from stitch_ai.processors.memory_processor import MemoryProcessor, run_per_memory_type
+from stitch_ai.processors.sinks import get_memory_sink
+from stitch_ai.sdk import StitchSDK
+
+EPISODIC = json.dumps({"memories": {"columns": ["id", "content"],
+                                    "rows": [[f"m{i}", f"memory {i} about the harbor"] for i in range(50)]}})
+CHARACTER = "The agent met Alice at the harbor. She sold fish at dawn! " * 100
+
+class TestRunPerMemoryType(unittest.TestCase):
+    def test_tasks_run_concurrently_and_results_keep_task_order(self):
+        barrier = threading.Barrier(2, timeout=5)
+
+        def task(name, delay):
+            def run():
+                barrier.wait()
+                time.sleep(delay)
+                return name
+            return run
+
+        results = run_per_memory_type({"episodic": task("e", 0.05), "character": task("c", 0)})
+        self.assertEqual(list(results.items()), [("episodic", "e"), ("character", "c")])
+
+    def test_first_error_is_raised_after_every_task_finishes(self):
+        finished = []
+
+        def slow():
+            time.sleep(0.05)
+            finished.append("character")
+
+        def fail():
+            raise ValueError("bad episodic memory")
+
+        with ThreadPoolExecutor(2) as executor:
+            with self.assertRaisesRegex(ValueError, "bad episodic memory"):
+                run_per_memory_type({"episodic": fail, "character": slow}, executor)
+        self.assertEqual(finished, ["character"])
+
+class TestConcurrentPushPull(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def test_push_prepares_both_files_in_order(self):
+        db = self.path("agent.sqlite")
+        conn = sqlite3.connect(db)
+        conn.execute("CREATE TABLE memories (id TEXT PRIMARY KEY, content TEXT)")
+        conn.executemany("INSERT INTO memories VALUES (?, ?)", [(f"m{i}", "text") for i in range(10)])
+        conn.commit()
+        conn.close()
+        with open(self.path("character.json"), "w") as f:
+            json.dump({"name": "Ava", "bio": ["sailor"], "ignored": True}, f)
+
+        with StubServer() as server:
+            sdk = StitchSDK(server.url, "key")
+            pushed = {}
+            sdk.memory.push_memory = lambda **kwargs: pushed.update(kwargs) or {"oid": "1"}
+            with ThreadPoolExecutor(2) as executor:
+                result = sdk.push("space", "msg", episodic_path=db, character_path=self.path("character.json"),
+                                  episodic_format="columnar", executor=executor)
+        self.assertEqual([entry["filePath"] for entry in pushed["files"]], ["episodic.data", "character.data"])
+        self.assertEqual(json.loads(pushed["files"][1]["content"]), {"name": "Ava", "bio": ["sailor"]})
+        self.assertEqual({stage["name"] for stage in result["profile"]["stages"]}, {"export", "read_character", "upload"})
+
+    def test_concurrent_save_matches_serial_save(self):
+        data = {"data": {"episodic": EPISODIC, "character": CHARACTER}}
+        processor = MemoryProcessor()
+        processor.save_memory_data(data, self.path("concurrent.npy"), "hash")
+        with ThreadPoolExecutor(1) as executor:
+            processor.save_memory_data(data, self.path("serial.npy"), "hash", executor=executor)
+        concurrent = get_memory_sink(self.path("concurrent.npy")).load()
+        serial = get_memory_sink(self.path("serial.npy")).load()
+        self.assertEqual(concurrent[0], serial[0])
+        self.assertEqual(concurrent[1], serial[1])
+        self.assertEqual(concurrent[0][0], "episodic-memory-0")
+        self.assertEqual(concurrent[0][-1], f"character-memory-{len([i for i in serial[0] if i.startswith('character')]) - 1}")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import io
+import json
+import base64
+import argparse
+import unittest
+from argparse import Namespace
+from contextlib import redirect_stdout
+from stitch_ai.cli.main import create_parser_and_handlers
+from stitch_ai.cli.output import emit
+from stitch_ai.cli.runner import run_command
+
+class TestOutputFormats(unittest.TestCase):
+    def emit(self, output, response):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            emit(Namespace(output=output), response, "title")
+        return out.getvalue()
+
+    def test_output_option_before_or_after_command(self):
+        parser, _ = create_parser_and_handlers()
+        self.assertEqual(parser.parse_args(['--output', 'json', 'get-log', 'repo']).output, 'json')
+        self.assertEqual(parser.parse_args(['get-log', 'repo', '--output', 'jsonl']).output, 'jsonl')
+        self.assertEqual(parser.parse_args(['get-log', 'repo']).output, 'text')
+
+    def test_jsonl_emits_one_record_per_line(self):
+        commits = [{"oid": "a"}, {"oid": "b"}]
+        lines = self.emit('jsonl', {"commits": commits}).splitlines()
+        self.assertEqual([json.loads(line) for line in lines], commits)
+
+    def test_json_and_raw(self):
+        self.assertEqual(json.loads(self.emit('json', {"a": [1, 2]})), {"a": [1, 2]})
+        self.assertEqual(self.emit('raw', {"content": "hello"}), "hello")
+
+    def test_text_keeps_banner(self):
+        self.assertEqual(self.emit('text', {"a": 1}).splitlines(), ["_" * 50, "title", "{'a': 1}", "_" * 50])
+
+    def test_raw_bytes_are_never_decoded(self):
+        with self.assertRaisesRegex(ValueError, "Binary content"):
+            self.emit('raw', {"content": b"\xff\x00"})
+
+        parser = argparse.ArgumentParser()
+        parser.add_argument('command')
+        handlers = {'blob': lambda sdk, args: emit(Namespace(output='raw'), b"\xff\x00binary")}
+        result = run_command(lambda: None, parser, handlers, ['blob'])
+        self.assertEqual(result["exit_code"], 0)
+        self.assertNotIn("stdout", result)
+        self.assertEqual(base64.b64decode(result["stdout_b64"]), b"\xff\x00binary")
+
+if __name__ == "__main__":
+    unittest.main()
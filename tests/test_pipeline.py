@@ -0,0 +1,134 @@
+import json
+import os
+import random
+import tempfile
+import unittest
+import numpy as np
+from stitch_ai.api.json_stream import JSONStreamReader
+from stitch_ai.api.user import read_memory_item
+from stitch_ai.processors.chunking import get_chunker
+from stitch_ai.processors.embeddings import HashEmbedding, register_embedding_backend
+from stitch_ai.processors.memory_processor import MemoryProcessor
+from stitch_ai.processors.sinks import get_memory_sink
+
+EPISODIC = json.dumps({"memories": {"columns": ["id", "type", "content"],
+                                    "rows": [[f"m{i}", "messages", json.dumps({"text": f"memory {i} about the harbor"})]
+                                             for i in range(300)]}})
+CHARACTER = "The agent met Alice at the harbor. She sold fish at dawn! Did Bob buy any? " * 200
+
+def pieces(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+def fetcher(texts, size=97):
+    """fetch() that writes each memory type's text in pieces, as a download would"""
+    def fetch(open_source):
+        for memory_type, text in texts.items():
+            out = open_source(memory_type)
+            for piece in pieces(text, size):
+                out.write(piece)
+            out.close()
+        return "fetched"
+    return fetch
+
+class FailingEmbedding(HashEmbedding):
+    name = "failing"
+
+    def embed(self, texts):
+        raise RuntimeError("embedding server down")
+
+register_embedding_backend(FailingEmbedding)
+
+class TestStreamingChunkers(unittest.TestCase):
+    def test_iter_records_matches_chunk_records(self):
+        rng = random.Random(7)
+        for name, text in (("row", EPISODIC), ("row", CHARACTER), ("character", CHARACTER)):
+            chunker = get_chunker(name, chunk_size=rng.randint(50, 300))
+            for size in (1, 13, 4096):
+                self.assertEqual(list(chunker.iter_records(pieces(text, size))), chunker.chunk_records(text))
+
+    def test_character_chunker_handles_text_ending_in_punctuation(self):
+        self.assertEqual(get_chunker("character", chunk_size=10)("a" * 9 + "."), ["a" * 9 + "."])
+
+class TestEmbeddingPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.processor = MemoryProcessor()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def test_matches_sequential_pull(self):
+        for sink, name in ((None, "agent.npy"), ("sqlite", "agent.db")):
+            texts = {"episodic": EPISODIC, "character": CHARACTER}
+            self.processor.save_memory_data({"data": texts}, self.path("sequential-" + name), "hash", sink=sink)
+            pipeline = self.processor.stream_memory_data(fetcher(texts), self.path("pipelined-" + name), "hash",
+                                                         sink=sink, workers=3, keep_text=True)
+            self.assertEqual(pipeline.result, "fetched")
+            self.assertEqual(pipeline.texts, texts)
+            self.assertEqual(pipeline.chunks["episodic"], 300)
+            sequential = get_memory_sink(self.path("sequential-" + name), sink).load()
+            pipelined = get_memory_sink(self.path("pipelined-" + name), sink).load()
+            ids = sorted(range(len(sequential[0])), key=lambda i: sequential[0][i])
+            order = sorted(range(len(pipelined[0])), key=lambda i: pipelined[0][i])
+            self.assertEqual([sequential[0][i] for i in ids], [pipelined[0][i] for i in order])
+            self.assertEqual([sequential[1][i] for i in ids], [pipelined[1][i] for i in order])
+            self.assertEqual([sequential[3][i] for i in ids], [pipelined[3][i] for i in order])
+            np.testing.assert_allclose(np.asarray(sequential[2])[ids], np.asarray(pipelined[2])[order], rtol=1e-6)
+
+    def test_failure_leaves_sink_unchanged(self):
+        path = self.path("agent.npy")
+        self.processor.save_memory_data({"data": {"character": "old memory"}}, path, "hash")
+        with self.assertRaisesRegex(RuntimeError, "embedding server down"):
+            self.processor.stream_memory_data(fetcher({"character": CHARACTER}), path, "failing")
+        self.assertEqual(get_memory_sink(path).load()[1], ["old memory"])
+
+    def test_download_failure_stops_pipeline(self):
+        def fetch(open_source):
+            open_source("character").write(CHARACTER)
+            raise ConnectionError("connection reset")
+
+        path = self.path("agent.npy")
+        self.processor.save_memory_data({"data": {"character": "old memory"}}, path, "hash")
+        with self.assertRaisesRegex(ConnectionError, "connection reset"):
+            self.processor.stream_memory_data(fetch, path, "hash")
+        self.assertEqual(get_memory_sink(path).load()[1], ["old memory"])
+
+    def test_missing_memory_leaves_sink_unchanged(self):
+        path = self.path("agent.npy")
+        self.processor.save_memory_data({"data": {"character": "old memory"}}, path, "hash")
+        pipeline = self.processor.stream_memory_data(lambda open_source: None, path, "hash")
+        self.assertFalse(pipeline.started)
+        self.assertEqual(get_memory_sink(path).load()[1], ["old memory"])
+
+class TestStreamedMemoryItem(unittest.TestCase):
+    def read(self, payload, name="space"):
+        opened = {}
+
+        def open_content(field):
+            opened[field] = out = tempfile.SpooledTemporaryFile(mode="w+")
+            out.close = lambda: None
+            return out
+
+        reader = JSONStreamReader(pieces(json.dumps(payload), 7))
+        item = read_memory_item(reader, ("episodicMemory",), open_content=open_content, name=name)
+        values = {}
+        for field, out in opened.items():
+            out.seek(0)
+            values[field] = out.read()
+        return item, values
+
+    def test_content_streams_whether_name_comes_first_or_last(self):
+        for payload in ({"name": "space", "episodicMemory": {"content": [EPISODIC, "older"]}},
+                        {"episodicMemory": {"content": [EPISODIC, "older"]}, "name": "space"}):
+            _, values = self.read(payload)
+            self.assertEqual(values, {"episodicMemory": EPISODIC})
+
+    def test_other_memories_are_not_streamed(self):
+        _, values = self.read({"name": "other", "episodicMemory": {"content": [EPISODIC]}})
+        self.assertEqual(values, {})
+
+if __name__ == '__main__':
+    unittest.main()
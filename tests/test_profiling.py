@@ -0,0 +1,117 @@
+import os
+import json
+import time
+import sqlite3
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from stitch_ai.sdk import StitchSDK
+from stitch_ai.processors.profiling import PipelineProfile, StackSampler
+
+EPISODIC = json.dumps({"memories": {"columns": ["id", "type", "content"],
+                                    "rows": [[f"m{i}", "messages", json.dumps({"text": f"memory {i} about the harbor"})]
+                                             for i in range(40)]}})
+
+class MemoryHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    wbufsize = 1 << 16
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.startswith("/user/memory/all"):
+            self._reply([{"name": "space", "episodicMemory": {"content": [EPISODIC]}}])
+        else:
+            self._reply({"userId": "user-1"})
+
+    def do_POST(self):
+        self.server.pushed = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self._reply({"ok": True})
+
+    def _reply(self, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(1000))
+
+class TestPipelineProfile(unittest.TestCase):
+    def test_stages_accumulate(self):
+        profile = PipelineProfile("test")
+        with profile:
+            for _ in range(2):
+                with profile.stage("embed", chunks=5) as stage:
+                    stage["bytes"] = 10
+                    busy(0.02)
+        (stage,) = profile.to_dict()["stages"]
+        self.assertEqual((stage["name"], stage["calls"], stage["chunks"], stage["bytes"]), ("embed", 2, 10, 20))
+        self.assertGreaterEqual(stage["seconds"], 0.04)
+        self.assertGreater(stage["peak_rss_mb"], 0)
+
+    def test_stack_sampler_finds_hot_function(self):
+        with StackSampler(interval=0.001) as sampler:
+            busy(0.2)
+        self.assertGreater(sampler.samples, 0)
+        hottest = max(sampler.top(1000), key=lambda row: row["self"])
+        self.assertTrue(hottest["function"].startswith("busy "))
+
+class TestSDKProfiles(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), MemoryHandler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.sdk = StitchSDK(f"http://127.0.0.1:{self.server.server_port}", "key", embedding_backend="hash")
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmpdir.cleanup()
+
+    def test_pull_profile(self):
+        path = os.path.join(self.tmpdir.name, "profile.json")
+        (item,) = self.sdk.pull_memory("space", os.path.join(self.tmpdir.name, "agent.npy"), profile_path=path,
+                                       pipeline=False)
+        stages = {stage["name"]: stage for stage in item["profile"]["stages"]}
+        # The spooled content is chunked as it is read, and only read back whole for the result
+        self.assertEqual(list(stages), ["download", "load_embedding", "backup", "chunk", "embed",
+                                        "insert", "commit", "read_content"])
+        self.assertEqual(stages["embed"]["chunks"], 40)
+        self.assertEqual(stages["chunk"]["bytes"], len(EPISODIC))
+        self.assertEqual(item["episodicMemory"]["content"][0], EPISODIC)
+        self.assertGreater(stages["download"]["bytes_in"], len(EPISODIC))
+        with open(path) as f:
+            self.assertEqual(json.load(f)["pipeline"], "pull")
+
+    def test_pipelined_pull_profile(self):
+        (item,) = self.sdk.pull_memory("space", os.path.join(self.tmpdir.name, "agent.npy"))
+        stages = {stage["name"]: stage for stage in item["profile"]["stages"]}
+        self.assertEqual(set(stages), {"download", "load_embedding", "backup", "chunk", "embed", "insert", "commit"})
+        self.assertEqual(stages["chunk"]["chunks"], 40)
+        self.assertEqual(stages["embed"]["chunks"], 40)
+        self.assertEqual(stages["chunk"]["bytes"], len(EPISODIC))
+        self.assertGreater(stages["download"]["bytes_in"], len(EPISODIC))
+
+    def test_push_profile(self):
+        db = os.path.join(self.tmpdir.name, "agent.sqlite")
+        conn = sqlite3.connect(db)
+        conn.execute("CREATE TABLE memories (id TEXT PRIMARY KEY, content TEXT)")
+        conn.executemany("INSERT INTO memories VALUES (?, ?)", [(f"m{i}", "text") for i in range(10)])
+        conn.commit()
+        conn.close()
+        result = self.sdk.push("space", "msg", episodic_path=db)
+        stages = {stage["name"]: stage for stage in result["profile"]["stages"]}
+        self.assertEqual(list(stages), ["export", "upload"])
+        self.assertEqual(stages["upload"]["bytes_out"], len(json.dumps(self.server.pushed)))
+        self.assertIn("request_server_seconds", stages["upload"])
+
+if __name__ == '__main__':
+    unittest.main()
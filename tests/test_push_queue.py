@@ -0,0 +1,197 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from benchmarks.stub_server import StubServer
+from stitch_ai.processors.push_queue import FAILED, PENDING, PushQueue, merge_pushes
+from stitch_ai.sdk import StitchSDK
+
+class TestPushQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.queue_path = self.path("queue.sqlite")
+        self.server = StubServer().start()
+        self.sdks = []
+        self.write("episodic.json", {"memories": {"columns": ["id"], "rows": [["m1"]]}})
+        self.write("character.json", {"name": "Ava"})
+
+    def tearDown(self):
+        for sdk in self.sdks:
+            sdk.close()
+        self.server.stop()
+        self.tmpdir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def write(self, name, data):
+        with open(self.path(name), "w") as f:
+            json.dump(data, f)
+
+    def sdk(self, **options):
+        sdk = StitchSDK(self.server.url, "key", queue_path=self.queue_path, **options)
+        self.sdks.append(sdk)
+        return sdk
+
+    def files(self, space="agent"):
+        head = self.server.api.spaces[space]
+        return head["branches"][head["head"]][-1]
+
+    def test_push_returns_before_the_upload(self):
+        self.sdk().memory_space.create_space("agent")
+        self.server.latency = 0.3
+        sdk = self.sdk(write_behind=True)
+        start = time.perf_counter()
+        result = sdk.push("agent", "step 1", episodic_path=self.path("episodic.json"))
+        self.assertLess(time.perf_counter() - start, 0.2)
+        self.assertTrue(result["queued"])
+        metrics = sdk.flush(timeout=10)
+        self.assertEqual((metrics["depth"], metrics["uploaded"], metrics["failed"]), (0, 1, 0))
+        self.assertGreaterEqual(metrics["last_lag_seconds"], 0.3)
+        self.assertEqual(self.server.requests["push_memory"], 1)
+        self.assertEqual(self.files()["message"], "step 1")
+
+    def test_successive_pushes_to_a_space_are_coalesced(self):
+        sdk = self.sdk()
+        sdk.memory_space.create_space("agent")
+        sdk.push("agent", "episodic", episodic_path=self.path("episodic.json"), background=True)
+        sdk.push("agent", "character", character_path=self.path("character.json"), background=True)
+        last = sdk.push("agent", "latest", episodic_path=self.path("episodic.json"), background=True)
+        self.assertTrue(last["coalesced"])
+        (entry,) = sdk.push_queue.entries()
+        self.assertEqual(entry["pushes"], 3)
+        self.assertEqual(entry["args"]["message"], "latest")
+        metrics = sdk.push_queue.metrics()
+        self.assertEqual((metrics["depth"], metrics["coalesced"]), (1, 2))
+        self.assertEqual(self.server.requests["push_memory"], 0)
+
+        sdk.drain(timeout=10)
+        self.assertEqual(self.server.requests["push_memory"], 1)
+        commit = self.files()
+        self.assertEqual(commit["message"], "latest")
+        self.assertEqual(sorted(commit["files"]), ["character.data", "episodic.data"])
+
+    def test_queued_pushes_survive_a_restart(self):
+        sdk = self.sdk()
+        sdk.memory_space.create_space("agent")
+        sdk.push("agent", "before restart", character_path=self.path("character.json"), background=True)
+        sdk.close()
+        self.assertEqual(self.server.requests["push_memory"], 0)
+        metrics = self.sdk(write_behind=True).flush(timeout=10)
+        self.assertEqual(metrics["uploaded"], 1)
+        self.assertEqual(self.files()["message"], "before restart")
+
+    def test_retryable_errors_are_retried(self):
+        sdk = self.sdk(write_behind=True)
+        sdk.memory_space.create_space("agent")
+        self.server.fail("push_memory", times=2)
+        sdk.push("agent", "retried", character_path=self.path("character.json"))
+        metrics = sdk.flush(timeout=10)
+        self.assertEqual((metrics["uploaded"], metrics["retries"], metrics["failed"]), (1, 2, 0))
+        self.assertEqual(self.server.requests["push_memory"], 3)
+
+    def test_other_errors_fail_until_retried(self):
+        sdk = self.sdk(write_behind=True, push_retries=1)
+        sdk.memory_space.create_space("agent")
+        self.server.fail("push_memory", times=1, status=400)
+        sdk.push("agent", "rejected", character_path=self.path("character.json"))
+        metrics = sdk.flush(timeout=10)
+        self.assertEqual((metrics["uploaded"], metrics["failed"], metrics["depth"]), (0, 1, 0))
+        (entry,) = sdk.push_queue.entries(FAILED)
+        self.assertIn("400", entry["error"])
+        self.assertEqual(sdk.push_queue.retry_failed(), 1)
+        self.assertEqual(sdk.flush(timeout=10)["uploaded"], 1)
+        with self.assertRaises(FileNotFoundError):
+            sdk.push("agent", character_path=self.path("missing.json"))
+
+    def test_purging_failed_pushes_removes_their_copies(self):
+        sdk = self.sdk(write_behind=True, push_retries=1)
+        sdk.memory_space.create_space("agent")
+        self.server.fail("push_memory", times=1, status=400)
+        sdk.push("agent", "rejected", character_path=self.path("character.json"))
+        sdk.flush(timeout=10)
+        copies = self.queue_path + ".files"
+        self.assertEqual(len(os.listdir(copies)), 1)
+        self.assertEqual(sdk.push_queue.purge_failed(), 1)
+        self.assertEqual(sdk.push_queue.entries(FAILED), [])
+        self.assertEqual(os.listdir(copies), [])
+
+    def test_push_during_an_upload_is_uploaded_after_it(self):
+        sdk = self.sdk()
+        sdk.memory_space.create_space("agent")
+        started, release = threading.Event(), threading.Event()
+        uploads = []
+
+        def upload(space, **args):
+            uploads.append(args["message"])
+            started.set()
+            release.wait(5)
+
+        with PushQueue(self.queue_path, upload=upload) as queue:
+            queue.enqueue("agent", message="first", character_path=self.path("character.json"))
+            queue.start()
+            self.assertTrue(started.wait(5))
+            queue.enqueue("agent", message="second", character_path=self.path("character.json"))
+            self.assertEqual([entry["state"] for entry in queue.entries()], ["uploading", PENDING])
+            release.set()
+            queue.flush(timeout=10)
+        self.assertEqual(uploads, ["first", "second"])
+
+    def test_files_are_read_when_queued(self):
+        sdk = self.sdk()
+        sdk.memory_space.create_space("agent")
+        database = sqlite3.connect(self.path("agent.sqlite"))
+        database.execute("CREATE TABLE memories (id TEXT, content TEXT)")
+        database.execute("INSERT INTO memories VALUES ('m1', 'queued state')")
+        database.commit()
+        sdk.push("agent", "checkpoint", episodic_path=self.path("agent.sqlite"),
+                 character_path=self.path("character.json"), background=True)
+        # The database moves on and the character file is removed before the upload
+        database.execute("UPDATE memories SET content = 'later state'")
+        database.commit()
+        database.close()
+        os.remove(self.path("character.json"))
+        copies = [entry["args"][key] for entry in sdk.push_queue.entries() for key in ("episodic_path", "character_path")]
+        self.assertTrue(all(path.startswith(self.queue_path + ".files") and os.path.isfile(path) for path in copies))
+
+        metrics = sdk.drain(timeout=10)
+        self.assertEqual((metrics["uploaded"], metrics["failed"]), (1, 0))
+        tree = self.files()["tree"]
+        self.assertIn("queued state", tree["episodic.data"])
+        self.assertNotIn("later state", tree["episodic.data"])
+        self.assertIn("Ava", tree["character.data"])
+        self.assertEqual(os.listdir(self.queue_path + ".files"), [])
+
+    def test_replaced_copies_are_removed(self):
+        sdk = self.sdk()
+        sdk.push("agent", "first", episodic_path=self.path("episodic.json"),
+                 character_path=self.path("character.json"), background=True)
+        (first,) = sdk.push_queue.entries()
+        sdk.push("agent", "second", episodic_path=self.path("episodic.json"), background=True)
+        (second,) = sdk.push_queue.entries()
+        self.assertFalse(os.path.exists(first["args"]["episodic_path"]))
+        self.assertEqual(second["args"]["character_path"], first["args"]["character_path"])
+        self.assertEqual(sorted(os.listdir(self.queue_path + ".files")),
+                         sorted(os.path.basename(os.path.dirname(second["args"][key]))
+                                for key in ("episodic_path", "character_path")))
+
+    def test_queues_of_different_accounts_are_separate(self):
+        self.sdk().push("agent", character_path=self.path("character.json"), background=True)
+        other = StitchSDK(self.server.url, "other-key", queue_path=self.queue_path)
+        self.sdks.append(other)
+        self.assertEqual(other.push_queue.metrics()["depth"], 0)
+        self.assertEqual(other.flush(timeout=1)["uploaded"], 0)
+
+class TestMergePushes(unittest.TestCase):
+    def test_newer_files_replace_older_ones_per_memory_type(self):
+        older = {"message": "a", "episodic_path": "/e1", "tables": ["t"], "character_path": "/c1"}
+        self.assertEqual(merge_pushes(older, {"message": "b", "episodic_path": "/e2"}),
+                         {"message": "b", "episodic_path": "/e2", "character_path": "/c1"})
+        self.assertEqual(merge_pushes(older, {"character_path": "/c2"}),
+                         {**older, "character_path": "/c2"})
+
+if __name__ == '__main__':
+    unittest.main()
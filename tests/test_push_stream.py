@@ -0,0 +1,55 @@
+import json
+import mmap
+import os
+import tempfile
+import unittest
+from benchmarks.stub_server import StubServer
+from stitch_ai.api.body import JSONStreamBody
+from stitch_ai.processors.mapped_file import MappedMemoryFile
+from stitch_ai.sdk import StitchSDK
+
+class TestStreamingPushBody(unittest.TestCase):
+    def setUp(self):
+        # Multi-byte characters straddle chunk boundaries with a one-page chunk size
+        self.text = ('line "quoted" \\ tab\t ✨ héllo\r\n' * 2000) + '🙂'
+        fd, self.path = tempfile.mkstemp(suffix='.txt')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(self.text.encode('utf-8'))
+
+    def tearDown(self):
+        os.unlink(self.path)
+
+    def test_body_matches_json_dumps(self):
+        with MappedMemoryFile(self.path, chunk_size=mmap.PAGESIZE) as mapped:
+            payload = {"files": [{"filePath": "episodic.data", "content": mapped}], "message": "msg"}
+            body = JSONStreamBody(payload)
+            chunks = []
+            while True:
+                data = body.read(1000)
+                if not data:
+                    break
+                chunks.append(data)
+        expected = json.dumps({"files": [{"filePath": "episodic.data", "content": self.text}], "message": "msg"})
+        self.assertEqual(b''.join(chunks), expected.encode('utf-8'))
+        self.assertEqual(len(body), len(expected))
+
+    def test_empty_file(self):
+        with open(self.path, 'wb'):
+            pass
+        with MappedMemoryFile(self.path) as mapped:
+            body = JSONStreamBody({"content": mapped})
+            self.assertEqual(body.read(), b'{"content": ""}')
+
+    def test_push_result_lists_files_without_content(self):
+        with StubServer() as server:
+            sdk = StitchSDK(server.url, "key")
+            sdk.memory_space.create_space("space")
+            result = sdk.push("space", "msg", episodic_path=self.path)
+            sdk.close()
+            self.assertEqual(server.api.spaces["space"]["branches"]["main"][-1]["tree"]["episodic.data"], self.text)
+        # Serializable for --output json, though the memory map is closed by now
+        files = json.loads(json.dumps(result["files"]))
+        self.assertEqual(files, [{"filePath": "episodic.data", "path": self.path, "bytes": len(self.text.encode("utf-8"))}])
+
+if __name__ == "__main__":
+    unittest.main()
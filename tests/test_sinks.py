@@ -0,0 +1,178 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from stitch_ai.processors.memory_processor import MemoryProcessor
+from stitch_ai.processors.embeddings import get_embedding_backend
+from stitch_ai.processors.locks import FileLock
+from stitch_ai.processors.sinks import get_memory_sink, NumpySink, ChromaSink
+
+MEMORY = {"data": {"episodic": "The agent met Alice at the harbor. " * 200, "character": '{"name": "Bob"}'}}
+
+class TestMemorySinks(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.processor = MemoryProcessor(embedding_backend="hash")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_sink_inferred_from_path(self):
+        self.assertIsInstance(get_memory_sink(os.path.join(self.tmpdir, "memory.npy")), NumpySink)
+        self.assertIsInstance(get_memory_sink(os.path.join(self.tmpdir, "chroma.sqlite3")), ChromaSink)
+        with self.assertRaises(ValueError):
+            get_memory_sink(self.tmpdir, "no-such-sink")
+
+    def test_sinks_store_the_same_chunks(self):
+        paths = {
+            "chroma": os.path.join(self.tmpdir, "chroma", "chroma.sqlite3"),
+            "numpy": os.path.join(self.tmpdir, "memory.npy"),
+            "sqlite": os.path.join(self.tmpdir, "memory.db"),
+        }
+        query = get_embedding_backend("hash")(["Bob"])[0]
+        loaded = {}
+        for name, path in paths.items():
+            self.processor.save_memory_data(MEMORY, path, sink=name)
+            # A second pull replaces the collection instead of appending to it
+            self.processor.save_memory_data(MEMORY, path, sink=name)
+            with get_memory_sink(path, name) as sink:
+                ids, documents, embeddings, _ = sink.load()
+                loaded[name] = (sorted(ids), embeddings.shape)
+                self.assertTrue(sink.query(query, k=1)[0]["id"].startswith("character-memory"))
+        self.assertEqual(loaded["numpy"], loaded["sqlite"])
+        self.assertEqual(loaded["numpy"], loaded["chroma"])
+
+    def test_failed_write_keeps_previous_numpy_file(self):
+        path = os.path.join(self.tmpdir, "memory.npy")
+        self.processor.save_memory_data(MEMORY, path)
+        with self.assertRaises(RuntimeError):
+            with get_memory_sink(path) as sink:
+                sink.reset()
+                raise RuntimeError("embedding failed")
+        ids, _, _, _ = get_memory_sink(path).load()
+        self.assertTrue(ids)
+        self.assertFalse(os.path.exists(sink.sidecar_path + ".tmp"))
+
+    def test_search_uses_pull_time_backend(self):
+        path = os.path.join(self.tmpdir, "memory.npy")
+        MemoryProcessor(embedding_backend="hash", embedding_options={"dimension": 64}).save_memory_data(MEMORY, path)
+        # The search processor has no backend configured; it must come from the stored metadata
+        exact = MemoryProcessor().search(path, "Bob", k=3, method="exact")
+        ann = MemoryProcessor().search(path, "Bob", k=3, method="ann")
+        self.assertTrue(exact[0]["id"].startswith("character-memory"))
+        self.assertTrue(ann[0]["id"].startswith("character-memory"))
+        self.assertAlmostEqual(exact[0]["score"], ann[0]["score"], places=5)
+        self.assertGreaterEqual(exact[0]["score"], exact[-1]["score"])
+
+    def test_episodic_rows_are_embedded_with_metadata(self):
+        export = json.dumps({"memories": {
+            "columns": ["id", "type", "createdAt", "content", "embedding"],
+            "rows": [
+                ["m1", "messages", 1700000000, json.dumps({"text": "Alice sold fish at the harbor", "source": "discord"}), "AAAA"],
+                ["m2", "facts", 1700000100, json.dumps({"text": "Bob is a pirate"}), None],
+            ],
+        }})
+        for name, path in (("chroma", os.path.join(self.tmpdir, "chroma", "chroma.sqlite3")),
+                           ("numpy", os.path.join(self.tmpdir, "memory.npy"))):
+            self.processor.save_memory_data({"data": {"episodic": export}}, path, sink=name)
+            with get_memory_sink(path, name) as sink:
+                _, documents, _, metadatas = sink.load()
+            self.assertEqual(sorted(documents), ["Alice sold fish at the harbor", "Bob is a pirate"])
+            alice = metadatas[documents.index("Alice sold fish at the harbor")]
+            self.assertEqual(alice["id"], "m1")
+            self.assertEqual(alice["createdAt"], 1700000000)
+            self.assertEqual(alice["content_source"], "discord")
+            self.assertEqual(alice["memory_type"], "episodic")
+            results = self.processor.search(path, "harbor fish", sink=name, where={"type": "facts"})
+            self.assertEqual([r["document"] for r in results], ["Bob is a pirate"])
+
+class TestConcurrentWrites(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "chroma", "chroma.sqlite3")
+        self.processor = MemoryProcessor(embedding_backend="hash")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def documents(self):
+        with get_memory_sink(self.path) as sink:
+            return sorted(sink.load()[1])
+
+    def test_file_lock_is_exclusive_and_shared_locks_coexist(self):
+        path = os.path.join(self.tmpdir, "store.lock")
+        with FileLock(path):
+            with self.assertRaises(TimeoutError):
+                FileLock(path, timeout=0.1).acquire()
+            with self.assertRaises(TimeoutError):
+                FileLock(path, shared=True, timeout=0.1).acquire()
+        with FileLock(path, shared=True), FileLock(path, shared=True):
+            with self.assertRaises(TimeoutError):
+                FileLock(path, timeout=0.1).acquire()
+
+    def test_readers_see_the_old_collection_until_the_swap(self):
+        self.processor.save_memory_data({"data": {"character": "old memory"}}, self.path)
+        writer = get_memory_sink(self.path)
+        writer.reset()
+        writer.bulk_insert(["character-memory-0"], ["new memory"], [[1.0] * 384])
+        self.assertEqual(self.documents(), ["old memory"])
+        writer.close()
+        self.assertEqual(self.documents(), ["new memory"])
+        self.assertEqual(writer.client.list_collections(), ["short_term"])
+
+    def test_open_reader_keeps_working_across_a_swap(self):
+        self.processor.save_memory_data({"data": {"character": "old memory"}}, self.path)
+        reader = get_memory_sink(self.path)
+        self.assertEqual(reader.count(), 1)
+        self.assertEqual(reader.query([1.0] * 384, k=1)[0]["document"], "old memory")
+        self.processor.save_memory_data({"data": {"character": "new memory"}}, self.path)
+        # The collection the reader saw was retired and deleted by the second pull
+        self.assertEqual(reader.count(), 1)
+        self.assertEqual(reader.query([1.0] * 384, k=1)[0]["document"], "new memory")
+        self.assertEqual(reader.load()[1], ["new memory"])
+
+    def test_swap_interrupted_between_renames_is_recovered(self):
+        self.processor.save_memory_data({"data": {"character": "old memory"}}, self.path)
+        sink = get_memory_sink(self.path)
+        # A writer died after retiring the live collection, before renaming its staging collection
+        sink.client.get_collection("short_term").modify(name=sink._scratch_name("retired"))
+        sink.client.create_collection(sink._scratch_name("staging"))
+        self.processor.save_memory_data({"data": {"character": "new memory"}}, self.path)
+        self.assertEqual(self.documents(), ["new memory"])
+        self.assertEqual(sink.client.list_collections(), ["short_term"])
+        (backup,) = os.listdir(os.path.join(self.tmpdir, "chroma", "backups"))
+        with open(os.path.join(self.tmpdir, "chroma", "backups", backup)) as f:
+            self.assertIn("old memory", f.read())
+
+    def test_aborted_pull_drops_staging_and_keeps_old_collection(self):
+        self.processor.save_memory_data({"data": {"character": "old memory"}}, self.path)
+        with self.assertRaises(RuntimeError):
+            with get_memory_sink(self.path) as sink:
+                sink.reset()
+                raise RuntimeError("embedding failed")
+        self.assertEqual(self.documents(), ["old memory"])
+        self.assertEqual(sink.client.list_collections(), ["short_term"])
+
+    def test_concurrent_pulls_serialize(self):
+        errors = []
+
+        def pull(text):
+            try:
+                self.processor.save_memory_data({"data": {"character": text}}, self.path)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=pull, args=(f"memory {i}",)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        (document,) = self.documents()
+        self.assertIn(document, [f"memory {i}" for i in range(4)])
+        self.assertEqual(get_memory_sink(self.path).client.list_collections(), ["short_term"])
+
+if __name__ == "__main__":
+    unittest.main()
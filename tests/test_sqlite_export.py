@@ -0,0 +1,57 @@
+import io
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from stitch_ai.processors.sqlite_export import iter_sqlite_tables, resolve_tables, write_sqlite_export
+
+class TestSQLiteExport(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "agent.sqlite")
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE memories (id TEXT, content TEXT, embedding BLOB)")
+        conn.execute("CREATE TABLE logs_a (id INTEGER, body TEXT)")
+        conn.execute("CREATE TABLE logs_b (id INTEGER, body TEXT)")
+        conn.executemany("INSERT INTO memories VALUES (?, ?, ?)", [("m1", "hello", b"\xff\x00"), ("m2", "world", None)])
+        conn.executemany("INSERT INTO logs_a VALUES (?, ?)", [(i, f"a{i}") for i in range(100)])
+        conn.executemany("INSERT INTO logs_b VALUES (?, ?)", [(i, f"b{i}") for i in range(50)])
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_resolve_tables(self):
+        self.assertEqual(resolve_tables(self.path), ["memories"])
+        self.assertEqual(resolve_tables(self.path, ["logs_*", "memories"]), ["logs_a", "logs_b", "memories"])
+        with self.assertRaises(Exception):
+            resolve_tables(self.path, ["missing"])
+
+    def test_export_does_not_block_or_see_an_open_write(self):
+        writer = sqlite3.connect(self.path)
+        writer.execute("BEGIN IMMEDIATE")
+        writer.execute("INSERT INTO logs_a VALUES (1000, 'uncommitted')")
+        try:
+            for snapshot in (False, True):
+                exported = {table: rows for table, _, rows in
+                            iter_sqlite_tables(self.path, ["logs_*"], workers=2, snapshot=snapshot, ordered=True)}
+                self.assertEqual(list(exported), ["logs_a", "logs_b"])
+                self.assertEqual(len(exported["logs_a"]), 100)
+        finally:
+            writer.rollback()
+            writer.close()
+
+    def test_streamed_json_layout(self):
+        out = io.StringIO()
+        write_sqlite_export(self.path, out, ["memories", "logs_b"], workers=2)
+        data = json.loads(out.getvalue())
+        self.assertEqual(data["memories"]["columns"], ["id", "content", "embedding"])
+        self.assertEqual(data["memories"]["rows"], [["m1", "hello", {"$b64": "/wA="}], ["m2", "world", None]])
+        self.assertEqual(len(data["logs_b"]["rows"]), 50)
+
+if __name__ == "__main__":
+    unittest.main()
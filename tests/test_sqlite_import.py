@@ -0,0 +1,80 @@
+import os
+import shutil
+import sqlite3
+import struct
+import tempfile
+import unittest
+from stitch_ai.processors.memory_processor import MemoryProcessor, TABLE_SINK
+
+SCHEMA = "CREATE TABLE memories (id TEXT PRIMARY KEY, content TEXT, embedding BLOB, createdAt INTEGER)"
+ROWS = [
+    ("m1", '{"text": "Alice"}', struct.pack("<2f", 0.5, -1.0), 1),
+    ("m2", '{"text": "Bob"}', b"plain utf-8 blob", 2),
+    ("m3", '{"text": "Carol"}', None, 3),
+    # Valid base64 as text, so only an explicit marker tells them apart from encoded blobs
+    ("m4", '{"text": "Dan"}', b"test", 4),
+    ("m5", '{"text": "Eve"}', b"user", 5),
+]
+
+class TestSQLiteImport(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.source = os.path.join(self.tmpdir, "agent.sqlite")
+        self.target = os.path.join(self.tmpdir, "restored", "agent.sqlite")
+        conn = sqlite3.connect(self.source)
+        conn.execute(SCHEMA)
+        conn.executemany("INSERT INTO memories VALUES (?, ?, ?, ?)", ROWS)
+        conn.commit()
+        conn.close()
+        self.processor = MemoryProcessor()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def rows(self):
+        conn = sqlite3.connect(self.target)
+        try:
+            return conn.execute("SELECT * FROM memories ORDER BY id").fetchall()
+        finally:
+            conn.close()
+
+    def test_restore_round_trips_both_formats(self):
+        os.makedirs(os.path.dirname(self.target))
+        conn = sqlite3.connect(self.target)
+        conn.execute(SCHEMA)
+        conn.execute("INSERT INTO memories VALUES ('old', 'gone', NULL, 0)")
+        conn.commit()
+        conn.close()
+        for episodic_format in ("json", "columnar"):
+            episodic = self.processor.process_sqlite_file(self.source, episodic_format)
+            self.processor.save_memory_data({"data": {"episodic": episodic}}, self.target, sink=TABLE_SINK)
+            self.assertEqual(self.rows(), ROWS)
+
+    def test_restore_is_opt_in(self):
+        # .sqlite paths are embedded into ChromaDB unless the memories sink is asked for
+        self.assertTrue(self.processor.embeds(self.target))
+        self.assertFalse(self.processor.embeds(self.target, TABLE_SINK))
+
+    def test_upsert_merges_by_primary_key(self):
+        self.processor.save_memory_data({"data": {"episodic": self.processor.process_sqlite_file(self.source)}}, self.target,
+                                        sink=TABLE_SINK)
+        conn = sqlite3.connect(self.source)
+        conn.execute("DELETE FROM memories WHERE id != 'm1'")
+        conn.execute("UPDATE memories SET createdAt = 10 WHERE id = 'm1'")
+        conn.execute("INSERT INTO memories VALUES ('m6', 'new', NULL, 6)")
+        conn.commit()
+        conn.close()
+        episodic = self.processor.process_sqlite_file(self.source)
+        self.processor.save_memory_data({"data": {"episodic": episodic}}, self.target, sink=TABLE_SINK, upsert=True)
+        self.assertEqual([(row[0], row[3]) for row in self.rows()], [("m1", 10), ("m2", 2), ("m3", 3), ("m4", 4), ("m5", 5), ("m6", 6)])
+
+    def test_blobs_round_trip_into_a_new_database(self):
+        # Without a declared BLOB column, only marked blobs become bytes again
+        episodic = self.processor.process_sqlite_file(self.source)
+        self.processor.save_memory_data({"data": {"episodic": episodic}}, self.target, sink=TABLE_SINK)
+        rows = {row[0]: row[2] for row in self.rows()}
+        self.assertEqual(rows["m1"], ROWS[0][2])
+        self.assertEqual((rows["m2"], rows["m4"], rows["m5"]), ("plain utf-8 blob", "test", "user"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import io
+import json
+import tempfile
+import unittest
+from benchmarks.stub_server import SEED_SPACE, StubServer
+from benchmarks.suite import compare
+from stitch_ai.sdk import StitchSDK
+from stitch_ai.api.memory_space import MemoryType
+
+class TestStubServer(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer(memory_kb=8, log_commits=5, market_items=30).start()
+        self.sdk = StitchSDK(self.server.url, "key", embedding_backend="hash")
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.server.stop()
+        self.tmpdir.cleanup()
+
+    def test_every_client_endpoint(self):
+        sdk = self.sdk
+        self.assertEqual(sdk.user.get_user()["userId"], "user-1")
+        self.assertIn("spaces", sdk.user.get_user_stat())
+        self.assertTrue(sdk.user.get_user_histories()["data"])
+        self.assertEqual([item["name"] for item in sdk.user.get_user_memory(SEED_SPACE)], [SEED_SPACE])
+
+        sdk.memory_space.create_space("space", MemoryType.AGENT_MEMORY)
+        sdk.memory_space.clone_space("copy", SEED_SPACE, "user-1")
+        self.assertEqual(len(sdk.memory_space.get_history("copy")), 5)
+        self.assertIn("episodic.data", sdk.memory_space.get_space("copy")["files"])
+        sdk.memory_space.delete_space("copy")
+
+        sdk.git.create_repo("repo")
+        sdk.git.commit_file("repo", "a.txt", "one", "first")
+        sdk.git.create_branch("repo", "dev", "main")
+        sdk.git.checkout_branch("repo", "dev")
+        sdk.git.commit_file("repo", "a.txt", "two", "second")
+        sdk.git.merge("repo", "main", "dev", "merge dev")
+        sdk.git.checkout_branch("repo", "main")
+        sdk.git.delete_branch("repo", "dev")
+        self.assertEqual(sdk.git.list_branches("repo")["branches"], ["main"])
+        log = sdk.git.get_log("repo")["commits"]
+        self.assertEqual([commit["message"] for commit in log], ["merge dev", "first"])
+        self.assertEqual(sdk.git.get_file("repo", "a.txt", "main")["content"], "two")
+        out = io.StringIO()
+        sdk.git.stream_file("repo", "a.txt", log[1]["oid"], out)
+        self.assertEqual(out.getvalue(), "one")
+        self.assertEqual(sdk.git.diff("repo", log[1]["oid"], log[0]["oid"])["changes"],
+                         [{"filePath": "a.txt", "status": "modified"}])
+        sdk.git.clone_repo("repo-copy", "repo", "user-1")
+
+        page = sdk.marketplace.client.get_memory_space_page("AGENT_MEMORY", 2, 10)
+        self.assertEqual((len(page["data"]), page["total"]), (5, 15))
+        sdk.marketplace.list_memory({"memoryId": "m"})
+        for _ in range(2):
+            sdk.marketplace.purchase_memory({"memoryId": "m"}, idempotency_key="k")
+        self.assertEqual(sdk.user.get_user_purchases()["total"], 1)
+        self.assertEqual(self.server.requests["not_found"], 0)
+
+    def test_push_pull_round_trip(self):
+        path = os.path.join(self.tmpdir.name, "episodic.json")
+        with open(path, "w") as f:
+            json.dump({"memories": {"columns": ["id", "content"], "rows": [["m1", "hello"]]}}, f)
+        self.sdk.push(SEED_SPACE, "update", episodic_path=path)
+        (item,) = self.sdk.pull_memory(SEED_SPACE, os.path.join(self.tmpdir.name, "pulled.json"))
+        with open(os.path.join(self.tmpdir.name, "pulled.json")) as f:
+            self.assertIn("hello", f.read())
+        self.assertEqual(item["name"], SEED_SPACE)
+
+    def test_missing_space_is_404(self):
+        with self.assertRaises(Exception) as raised:
+            self.sdk.git.get_log("missing")
+        self.assertEqual(raised.exception.response.status_code, 404)
+
+class TestBaselineComparison(unittest.TestCase):
+    def test_regressions_follow_direction_and_thresholds(self):
+        baselines = {"threshold": 0.2, "thresholds": {"latency": 0.5},
+                     "metrics": {"latency.get_log_ms": {"value": 10, "unit": "ms"},
+                                 "push.text_mb_s": {"value": 100, "unit": "MB/s"},
+                                 "startup.cli_help_ms": {"value": 100, "unit": "ms"}}}
+        current = {"latency.get_log_ms": {"value": 14, "unit": "ms"},
+                   "push.text_mb_s": {"value": 70, "unit": "MB/s"},
+                   "startup.cli_help_ms": {"value": 50, "unit": "ms"},
+                   "pull.raw_mb_s": {"value": 1, "unit": "MB/s"}}
+        status = {row["name"]: row["status"] for row in compare(current, baselines)}
+        self.assertEqual(status, {"latency.get_log_ms": "ok", "push.text_mb_s": "regression",
+                                  "startup.cli_help_ms": "improved", "pull.raw_mb_s": "new"})
+
+if __name__ == '__main__':
+    unittest.main()
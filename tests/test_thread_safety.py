@@ -0,0 +1,114 @@
+import threading
+import unittest
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.stub_server import SEED_SPACE, StubServer
+from stitch_ai.api.connection import TTLCache
+from stitch_ai.api.tracing import request_hook
+from stitch_ai.sdk import StitchSDK, request_timeout
+
+THREADS = 16
+CALLS = 25
+
+class TestSharedSDK(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer(memory_kb=4, log_commits=5, market_items=20).start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_one_instance_from_many_threads(self):
+        sdk = StitchSDK(self.server.url, "key", pool_size=THREADS)
+        sdk.git.create_repo("shared")
+        new_connections = []
+        lock = threading.Lock()
+
+        def on_request(event):
+            if event.new_connection:
+                with lock:
+                    new_connections.append(event)
+
+        def worker(index):
+            for call in range(CALLS):
+                kind = call % 4
+                if kind == 0:
+                    assert len(sdk.git.get_log(SEED_SPACE)["commits"]) == 5
+                elif kind == 1:
+                    sdk.git.commit_file("shared", f"file-{index}.txt", str(call), f"commit {index}-{call}")
+                elif kind == 2:
+                    assert sdk.user.get_user()["userId"] == "user-1"
+                else:
+                    sdk.marketplace.purchase_memory({"memoryId": f"m{index}"}, idempotency_key=f"k{index}")
+            return index
+
+        with request_hook(on_request), ThreadPoolExecutor(THREADS) as executor:
+            self.assertEqual(sorted(executor.map(worker, range(THREADS))), list(range(THREADS)))
+        # One user-id lookup for the whole instance, and pooled connections reused across threads
+        self.assertEqual(self.server.requests["api_key_user"], 1)
+        self.assertLessEqual(len(new_connections), THREADS)
+        commits = sdk.git.get_log("shared")["commits"]
+        self.assertEqual(len(commits), THREADS * (CALLS // 4 + (CALLS % 4 > 1)))
+        self.assertEqual(sdk.user.get_user_purchases()["total"], THREADS)
+        self.assertEqual(self.server.requests["not_found"], 0)
+        sdk.close()
+
+    def test_cache_serves_reads_until_a_write(self):
+        sdk = StitchSDK(self.server.url, "key", cache_ttl=60)
+        with ThreadPoolExecutor(8) as executor:
+            logs = list(executor.map(lambda _: sdk.git.get_log(SEED_SPACE), range(32)))
+        self.assertEqual(self.server.requests["get_log"], 1)
+        # Every caller gets its own copy
+        logs[0]["commits"].clear()
+        self.assertEqual(len(sdk.git.get_log(SEED_SPACE)["commits"]), 5)
+        sdk.git.commit_file(SEED_SPACE, "notes.txt", "new", "update")
+        self.assertEqual(len(sdk.git.get_log(SEED_SPACE)["commits"]), 6)
+        self.assertEqual(self.server.requests["get_log"], 2)
+
+    def test_timeouts(self):
+        self.server.latency = 0.5
+        sdk = StitchSDK(self.server.url, "key", timeout=5)
+        with request_timeout(0.1):
+            with self.assertRaises(requests.Timeout):
+                sdk.user.get_user()
+        self.assertEqual(sdk.user.get_user()["userId"], "user-1")
+        sdk.connection.timeout = 0.1
+        with self.assertRaises(requests.Timeout):
+            sdk.user.get_user()
+
+    def test_key_is_validated_up_front(self):
+        sdk = StitchSDK(self.server.url, "key", validate_key=True)
+        self.assertEqual(self.server.requests["api_key_user"], 1)
+        self.assertEqual(sdk.git.client.get_user_id(), "user-1")
+        self.assertEqual(self.server.requests["api_key_user"], 1)
+        self.server.fail("api_key_user", status=401)
+        with self.assertRaisesRegex(ValueError, "API key rejected"):
+            StitchSDK(self.server.url, "bad", validate_key=True)
+
+class TestTTLCache(unittest.TestCase):
+    def test_concurrent_misses_load_once_and_errors_are_not_cached(self):
+        cache = TTLCache()
+        loads = []
+        gate = threading.Event()
+
+        def load():
+            loads.append(1)
+            gate.wait(5)
+            return "value"
+
+        with ThreadPoolExecutor(8) as executor:
+            futures = [executor.submit(cache.get_or_load, "key", load, 60) for _ in range(8)]
+            gate.set()
+            self.assertEqual({future.result() for future in futures}, {"value"})
+        self.assertEqual(len(loads), 1)
+
+        def fail():
+            raise ValueError("down")
+
+        with self.assertRaises(ValueError):
+            cache.get_or_load("other", fail, 60)
+        self.assertEqual(cache.get_or_load("other", lambda: "ok", 60), "ok")
+        self.assertEqual(cache.get_or_load("expired", lambda: 1, 0), 1)
+        self.assertEqual(cache.get_or_load("expired", lambda: 2, 0), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import io
+import json
+import threading
+import unittest
+import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from stitch_ai.api.git import GitAPIClient
+from stitch_ai.api.tracing import MetricsRegistry, OpenTelemetryExporter, carry_context, request_hook, scoped_request_hook
+
+class GitHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    wbufsize = 1 << 16
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/user/api-key/user":
+            self._reply(200, {"userId": "user-1"})
+        elif path == "/git/repo/log":
+            self._reply(200, {"commits": [{"oid": str(i)} for i in range(50)]})
+        elif path == "/git/repo/file":
+            self._reply(200, {"content": "x" * 10000, "oid": "abc"})
+        else:
+            self._reply(404, {"message": "not found"})
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+class TestRequestTracing(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), GitHandler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.events = []
+        self.hook = request_hook(self.events.append)
+        self.hook.__enter__()
+        self.client = GitAPIClient(f"http://127.0.0.1:{self.server.server_port}", "key")
+        # Looked up on first use; done here so each test sees only its own requests
+        self.client.user_id
+
+    def tearDown(self):
+        self.hook.__exit__(None, None, None)
+        self.client.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_events_have_template_sizes_and_phases(self):
+        self.client.get_log("repo")
+        user, log = self.events
+        self.assertEqual((user.name, log.name), ("GET /user/api-key/user", "GET /git/{repository}/log"))
+        self.assertEqual((log.status, log.error, log.retries), (200, None, 0))
+        self.assertTrue(user.new_connection)
+        self.assertFalse(log.new_connection)
+        self.assertEqual(log.timings["connect"], 0.0)
+        self.assertEqual(log.bytes_in, len(json.dumps({"commits": [{"oid": str(i)} for i in range(50)]})))
+        self.assertGreater(log.timings["parse"], 0.0)
+        phases = sum(v for k, v in log.timings.items() if k != "total")
+        self.assertLessEqual(phases, log.timings["total"] + 1e-3)
+
+    def test_errors_and_streams_are_reported(self):
+        with self.assertRaises(requests.HTTPError):
+            self.client.get_log("missing")
+        self.assertEqual((self.events[-1].status, self.events[-1].endpoint), (404, "/git/{repository}/log"))
+        self.assertIn("404", self.events[-1].error)
+
+        out = io.StringIO()
+        self.client.stream_file("repo", "episodic.data", "main", out)
+        self.assertEqual(self.events[-1].endpoint, "/git/{repository}/file")
+        self.assertGreaterEqual(self.events[-1].bytes_in, 10000)
+
+    def test_metrics_registry_and_spans(self):
+        registry = MetricsRegistry()
+        with request_hook(registry):
+            for _ in range(3):
+                self.client.get_log("repo")
+        (row,) = registry.summary()
+        self.assertEqual((row["request"], row["count"], row["errors"]), ("GET /git/{repository}/log", 3, 0))
+        self.assertIn("GET /git/{repository}/log", registry.format_summary())
+
+        span = self.events[-1].to_span()
+        attributes = {a["key"]: a["value"] for a in span["attributes"]}
+        self.assertEqual(attributes["http.response.status_code"], {"intValue": "200"})
+        self.assertEqual(attributes["url.template"], {"stringValue": "/git/{repository}/log"})
+
+    def test_scoped_hooks_see_only_their_own_requests(self):
+        # As --trace in the daemon or batch: another command's requests run meanwhile
+        scoped = []
+        self.events.clear()
+        other = threading.Thread(target=lambda: [self.client.get_log("repo") for _ in range(5)])
+        with scoped_request_hook(scoped.append):
+            other.start()
+            self.client.get_log("repo")
+            # Work handed to a thread with carry_context is still this command's
+            worker = threading.Thread(target=carry_context(lambda: self.client.get_file("repo", "episodic.data", "main")))
+            worker.start()
+            worker.join()
+            other.join()
+        self.client.get_log("repo")
+        self.assertEqual([event.endpoint for event in scoped], ["/git/{repository}/log", "/git/{repository}/file"])
+        self.assertEqual(len(self.events), 8)
+
+    def test_opentelemetry_exporter(self):
+        try:
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+            from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+        except ImportError:
+            self.skipTest("opentelemetry-sdk is not installed")
+        exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        with request_hook(OpenTelemetryExporter(provider.get_tracer("test"))):
+            self.client.get_log("repo")
+        (span,) = exporter.get_finished_spans()
+        self.assertEqual(span.name, "GET /git/{repository}/log")
+        self.assertEqual(span.attributes["http.response.status_code"], 200)
+        self.assertGreater(span.end_time, span.start_time)
+
+if __name__ == '__main__':
+    unittest.main()